@@ -0,0 +1,152 @@
+# authentication.py - Authentification JWT sans requête: claims signés et cache LRU des utilisateurs
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
+
+from api.checks import cache_partage
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LRU_PAR_DEFAUT = 1024
+# Durée de vie d'une entrée du LRU (l'utilisateur est alors relu en base)
+DUREE_LRU_SECONDES_PAR_DEFAUT = 300
+CLAIMS_UTILISATEUR = ('email', 'is_superuser')
+CLAIM_VERSION = 'rev'
+
+# str(user_id) (forme du claim) -> (version_jeton, instant de chargement, utilisateur)
+_utilisateurs = OrderedDict()
+_verrou = threading.Lock()
+
+
+def _cle_version(user_id):
+    return f"auth:rev:{user_id}"
+
+
+def publier_version_jeton(utilisateur):
+    """Version de révocation courante de l'utilisateur, lue par tous les processus si le cache est partagé"""
+    cache.set(_cle_version(utilisateur.pk), utilisateur.version_jeton, timeout=None)
+
+
+def oublier_utilisateur(user_id):
+    """Retire l'utilisateur du LRU de ce processus (les autres le voient par la version publiée)"""
+    with _verrou:
+        _utilisateurs.pop(str(user_id), None)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Jetons portant l'email, le statut superutilisateur et la version de révocation de l'utilisateur"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in CLAIMS_UTILISATEUR:
+            token[claim] = getattr(user, claim)
+        token[CLAIM_VERSION] = user.version_jeton
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse le renouvellement d'un jeton révoqué (une lecture de l'utilisateur, rare)"""
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if CLAIM_VERSION in refresh:
+            from api.models import CustomUser
+
+            version = CustomUser.objects.filter(
+                pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+            ).values_list('version_jeton', flat=True).first()
+            if version != refresh[CLAIM_VERSION]:
+                raise InvalidToken(_("Token has been revoked"))
+        return super().validate(attrs)
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """JWTAuthentication sans requête par appel authentifié.
+
+    La signature du jeton garantit ses claims (id, email, is_superuser, version
+    de révocation ``rev``). L'utilisateur est servi depuis un LRU en mémoire
+    (AUTH_UTILISATEURS_LRU entrées) tant que la version de révocation publiée
+    dans le cache est celle du jeton et de l'entrée: la base n'est lue qu'au
+    premier appel du processus, après une révocation (mot de passe, email,
+    activation ou droits modifiés, voir CustomUser.CHAMPS_JETON) ou après
+    AUTH_UTILISATEURS_LRU_SECONDES. Un jeton dont la version est dépassée est
+    refusé. Les jetons émis avant l'ajout des claims passent par le chemin
+    habituel (lecture de l'utilisateur en base).
+
+    Le LRU n'est utilisé qu'avec un cache partagé: avec un cache propre au
+    processus (LocMemCache), une révocation faite par un autre worker ne serait
+    vue ni par sa version publiée ni par ``oublier_utilisateur``, l'utilisateur
+    est donc relu en base à chaque requête.
+
+    La portée d'accès n'est pas copiée dans le jeton (taille non bornée, elle
+    change indépendamment de sa durée de vie): AccesService la sert depuis son
+    cache à partir de l'identifiant du jeton.
+    """
+
+    def _charger(self, user_id):
+        """Utilisateur lu en base; publie sa version si le cache ne l'a pas"""
+        try:
+            utilisateur = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        cache.add(_cle_version(utilisateur.pk), utilisateur.version_jeton, timeout=None)
+        return utilisateur
+
+    def get_user(self, validated_token):
+        if CLAIM_VERSION not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if cache_partage():
+            utilisateur, version = self._utilisateur_lru(user_id)
+        else:
+            utilisateur = self._charger(user_id)
+            version = utilisateur.version_jeton
+
+        if validated_token[CLAIM_VERSION] != version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if not utilisateur.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Copie par requête: les attributs posés pendant la requête (portée d'accès...) ne sont pas partagés
+        return copy.copy(utilisateur)
+
+    def _utilisateur_lru(self, user_id):
+        """(utilisateur, version) depuis le LRU tant que la version publiée est la sienne"""
+        version = cache.get(_cle_version(user_id))
+        duree = getattr(settings, 'AUTH_UTILISATEURS_LRU_SECONDES', DUREE_LRU_SECONDES_PAR_DEFAUT)
+        maintenant = time.monotonic()
+        with _verrou:
+            entree = _utilisateurs.get(user_id)
+            if entree is not None:
+                _utilisateurs.move_to_end(user_id)
+
+        if (
+            entree is not None and version is not None and entree[0] == version
+            and maintenant - entree[1] < duree
+        ):
+            return entree[2], version
+
+        utilisateur = self._charger(user_id)
+        version = utilisateur.version_jeton
+        with _verrou:
+            _utilisateurs[user_id] = (version, maintenant, utilisateur)
+            _utilisateurs.move_to_end(user_id)
+            while len(_utilisateurs) > getattr(settings, 'AUTH_UTILISATEURS_LRU', TAILLE_LRU_PAR_DEFAUT):
+                _utilisateurs.popitem(last=False)
+        return utilisateur, version
@@ -0,0 +1,2 @@
+# Banc de mesure des performances (statistiques, listes, exports PDF)
+# Lancement: python manage.py mesurer_performances --help
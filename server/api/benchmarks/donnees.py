@@ -0,0 +1,131 @@
+# donnees.py - Générateur de jeux de données synthétiques pour le banc de mesure
+import logging
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 2000
+HEURES_ENTREE = (time(7, 30), time(8, 0), time(8, 0), time(8, 30), time(9, 0))
+MARGES = (0, 5, 10, 10, 15)
+
+# Forme du jeu de données (arrivées et départs suivent une loi normale tronquée)
+PARAMETRES_PAR_DEFAUT = {
+    'departements': 5,
+    'employes': 50,
+    'annees': 1.0,
+    'retard_moyen': 5.0,       # minutes après l'heure attendue (négatif = en avance)
+    'retard_ecart': 10.0,      # écart-type des arrivées, en minutes
+    'depart_ecart': 20.0,      # écart-type des départs autour de l'heure attendue
+    'taux_absence': 0.08,
+    'taux_sans_sortie': 0.03,
+    'graine': 42,
+}
+
+
+class GenerateurDonnees:
+    """Crée départements, employés et pointages en bulk_create, puis les agrégats.
+
+    Les pointages couvrent les jours ouvrés des ``annees`` dernières années jusqu'à
+    aujourd'hui; chaque employé a ses propres horaires attendus et sa marge.
+    """
+
+    def __init__(self, **parametres):
+        inconnus = set(parametres) - set(PARAMETRES_PAR_DEFAUT)
+        if inconnus:
+            raise ValueError(f"Paramètres inconnus: {', '.join(sorted(inconnus))}")
+        self.parametres = {**PARAMETRES_PAR_DEFAUT, **parametres}
+        self.aleatoire = random.Random(self.parametres['graine'])
+
+    def _minutes(self, moyenne, ecart, borne=180):
+        return int(max(-borne, min(borne, self.aleatoire.gauss(moyenne, ecart))))
+
+    @staticmethod
+    def _decaler(jour, heure, minutes):
+        return (datetime.combine(jour, heure) + timedelta(minutes=minutes)).time()
+
+    def _jours_ouvres(self):
+        fin = date.today()
+        jour = fin - timedelta(days=int(365 * self.parametres['annees']))
+        while jour <= fin:
+            if jour.weekday() < 5:
+                yield jour
+            jour += timedelta(days=1)
+
+    def generer(self, utilisateur):
+        """Remplit la base courante; retourne le nombre de lignes créées par table"""
+        from api.models import Departement, Employe, Pointage
+        from api.services.presence_service import PresenceService
+
+        p = self.parametres
+        with transaction.atomic():
+            departements = [
+                Departement(
+                    id_departement=f'BD{i:04d}', nom=f'Département {i}',
+                    responsable=f'responsable{i}@exemple.com', localisation='Site principal',
+                    nbr_employe=len(range(i, p['employes'], p['departements'])),
+                    created_by=utilisateur,
+                )
+                for i in range(p['departements'])
+            ]
+            Departement.objects.bulk_create(departements, batch_size=TAILLE_LOT)
+
+            employes = []
+            for i in range(p['employes']):
+                fixe = i % 3 != 0
+                entree = self.aleatoire.choice(HEURES_ENTREE)
+                employes.append(Employe(
+                    cin=f'{i:012d}', titre='employe' if fixe else 'stagiaire',
+                    matricule=f'{i:06d}' if fixe else None,
+                    nom=f'Nom{i}', prenom=f'Prenom{i}', email=f'employe{i}@exemple.com',
+                    poste='Agent', departement=departements[i % p['departements']],
+                    statut='inactif' if i % 20 == 19 else 'actif',
+                    heure_entree_attendue=entree,
+                    heure_sortie_attendue=self._decaler(date.today(), entree, 8 * 60),
+                    marge_tolerance_minutes=self.aleatoire.choice(MARGES),
+                    created_by=utilisateur,
+                ))
+            Employe.objects.bulk_create(employes, batch_size=TAILLE_LOT)
+
+            jours = list(self._jours_ouvres())
+            total = 0
+            lot = []
+            for employe in employes:
+                for jour in jours:
+                    if self.aleatoire.random() < p['taux_absence']:
+                        continue
+                    entree = self._decaler(
+                        jour, employe.heure_entree_attendue, self._minutes(p['retard_moyen'], p['retard_ecart'])
+                    )
+                    sortie = None
+                    if self.aleatoire.random() >= p['taux_sans_sortie']:
+                        sortie = self._decaler(
+                            jour, employe.heure_sortie_attendue, self._minutes(0, p['depart_ecart'])
+                        )
+                        if sortie <= entree:
+                            sortie = None
+                    pointage = Pointage(
+                        id_pointage=f'B{total:09d}', employe=employe, date_pointage=jour,
+                        heure_entree=entree, heure_sortie=sortie, created_by=utilisateur,
+                    )
+                    lot.append(pointage)
+                    total += 1
+                    if len(lot) >= TAILLE_LOT:
+                        Pointage.calculer_metriques_en_lot(lot)
+                        Pointage.objects.bulk_create(lot)
+                        lot = []
+            if lot:
+                Pointage.calculer_metriques_en_lot(lot)
+                Pointage.objects.bulk_create(lot)
+
+            presences = PresenceService.reconstruire()
+
+        logger.info(f"🧪 Jeu de données: {len(employes)} employés, {total} pointages")
+        return {
+            'departements': len(departements),
+            'employes': len(employes),
+            'pointages': total,
+            'presences': presences,
+        }
@@ -0,0 +1,68 @@
+# mesures.py - Temps, nombre de requêtes SQL et pic mémoire d'un scénario
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+
+def mesurer(nom, fonction, repetitions=5, preparer=None):
+    """Exécute ``fonction`` ``repetitions`` fois et résume les mesures.
+
+    ``preparer`` est appelé avant chaque exécution, hors chronométrage (par
+    exemple pour invalider le cache). Le pic mémoire est mesuré par une
+    exécution supplémentaire sous tracemalloc, qui fausserait les temps.
+    """
+    durees = []
+    requetes = []
+    for _ in range(repetitions):
+        if preparer:
+            preparer()
+        with CaptureQueriesContext(connection) as contexte:
+            debut = time.perf_counter()
+            fonction()
+            durees.append((time.perf_counter() - debut) * 1000)
+        requetes.append(len(contexte.captured_queries))
+    reset_queries()
+
+    if preparer:
+        preparer()
+    tracemalloc.start()
+    try:
+        fonction()
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'nom': nom,
+        'repetitions': repetitions,
+        'temps_ms': {
+            'min': round(min(durees), 3),
+            'mediane': round(statistics.median(durees), 3),
+            'max': round(max(durees), 3),
+        },
+        'requetes': max(requetes),
+        'memoire_pic_ko': round(pic / 1024, 1),
+    }
+
+
+def comparer(reference, courant):
+    """Écarts entre deux fichiers de résultats, scénario par scénario"""
+    anciens = {resultat['nom']: resultat for resultat in reference.get('resultats', [])}
+    lignes = []
+    for resultat in courant.get('resultats', []):
+        ancien = anciens.get(resultat['nom'])
+        if ancien is None or 'temps_ms' not in ancien or 'temps_ms' not in resultat:
+            continue
+        avant = ancien['temps_ms']['mediane']
+        apres = resultat['temps_ms']['mediane']
+        lignes.append({
+            'nom': resultat['nom'],
+            'temps_ms': (avant, apres),
+            'ratio_temps': round(apres / avant, 2) if avant else None,
+            'requetes': (ancien['requetes'], resultat['requetes']),
+            'memoire_pic_ko': (ancien['memoire_pic_ko'], resultat['memoire_pic_ko']),
+        })
+    return lignes
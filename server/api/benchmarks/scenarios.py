@@ -0,0 +1,65 @@
+# scenarios.py - Scénarios mesurés par le banc (services et endpoints)
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+
+def _vider_cache():
+    """Invalide toutes les statistiques en cache (nouvelle époque), sans vider le cache partagé"""
+    from api.services.stats_cache import StatsCache
+
+    StatsCache.incrementer_versions({'epoque'})
+
+
+def _requete(client, url):
+    def appeler():
+        reponse = client.get(url)
+        if reponse.status_code >= 400:
+            raise RuntimeError(f"{url}: HTTP {reponse.status_code}")
+        # Les réponses en flux ne sont produites qu'à la lecture
+        if getattr(reponse, 'streaming', False):
+            for _ in reponse.streaming_content:
+                pass
+        return reponse
+    return appeler
+
+
+def scenarios(utilisateur):
+    """Liste de (nom, fonction, préparation); la préparation est exécutée hors chronométrage"""
+    from api.models import Employe
+    from api.services.pdf_service import REPORTLAB_AVAILABLE
+    from api.services.statistics_service import StatisticsService
+
+    employe = Employe.objects.order_by('cin').first()
+    # Dernier mois complet: toutes les données du mois sont en base
+    mois = (timezone.now().date().replace(day=1) - timedelta(days=1)).replace(day=1)
+    client = APIClient()
+    client.force_authenticate(utilisateur)
+
+    liste = [
+        ('stats_employe_mensuel.froid',
+         lambda: StatisticsService.calculate_employee_monthly_stats(employe, mois), _vider_cache),
+        ('stats_employe_mensuel.chaud',
+         lambda: StatisticsService.calculate_employee_monthly_stats(employe, mois), None),
+        ('stats_globales_mensuel.froid',
+         lambda: StatisticsService.calculate_global_monthly_stats(mois), _vider_cache),
+        ('stats_globales_mensuel.chaud',
+         lambda: StatisticsService.calculate_global_monthly_stats(mois), None),
+        ('api.employes.liste', _requete(client, '/api/employes/'), None),
+        ('api.pointages.liste', _requete(client, '/api/pointages/'), None),
+        ('api.pointages.liste_champs',
+         _requete(client, '/api/pointages/?fields=id_pointage,employe,date_pointage,duree_travail'), None),
+        ('api.statistiques_employe.liste', _requete(client, '/api/statistiques-employe/'), None),
+        ('api.statistiques_globales', _requete(client, f"/api/statistiques/global/?mois={mois:%Y-%m}"),
+         _vider_cache),
+    ]
+    if REPORTLAB_AVAILABLE:
+        liste += [
+            ('pdf.employe',
+             _requete(client, f"/api/statistiques/export-pdf/?type=employe&cin={employe.cin}&date={mois}"),
+             _vider_cache),
+            ('pdf.global',
+             _requete(client, f"/api/statistiques/export-pdf/?type=global&mois={mois:%Y-%m}"), _vider_cache),
+        ]
+    return liste
@@ -0,0 +1,44 @@
+# checks.py - Vérifications de configuration (manage.py check)
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends dont le contenu est propre à chaque processus
+BACKENDS_LOCAUX = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_partage(alias='default'):
+    """Vrai si le cache est commun à tous les processus (Redis, Memcached, base de données...)"""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', BACKENDS_LOCAUX[0])
+    return backend not in BACKENDS_LOCAUX
+
+
+def _probleme(classe, identifiant):
+    return classe(
+        "Le cache par défaut est propre à chaque processus (CACHES['default']).",
+        hint=(
+            "Configurer un cache partagé entre les workers (RedisCache, PyMemcacheCache ou DatabaseCache): "
+            "les invalidations des statistiques, des portées d'accès et des jetons en dépendent."
+        ),
+        id=identifiant,
+    )
+
+
+@register(Tags.caches)
+def verifier_cache_partage(app_configs, **kwargs):
+    """Versions du cache des statistiques, portées d'accès et révocations des jetons: cache partagé requis.
+
+    Avec un cache propre à chaque processus, une écriture traitée par un worker
+    n'invalide rien dans les autres. Toléré en DEBUG (serveur de développement,
+    un seul processus); bloquant pour ``check --deploy``.
+    """
+    if cache_partage() or settings.DEBUG:
+        return []
+    return [_probleme(Warning, 'api.W001')]
+
+
+@register(Tags.caches, deploy=True)
+def verifier_cache_partage_deploiement(app_configs, **kwargs):
+    return [] if cache_partage() else [_probleme(Error, 'api.E001')]
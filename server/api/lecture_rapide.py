@@ -0,0 +1,197 @@
+# lecture_rapide.py - Listes en lecture rapide: lignes values() formatées sans la mécanique champ par champ de DRF
+import functools
+import json
+import operator
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Attribut absent du modèle: DRF lève AttributeError à chaque ligne
+_ABSENT = object()
+
+
+def encoder_json(donnees):
+    """JSON compact UTF-8, comme JSONRenderer, pour des données réduites aux types JSON"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(donnees)
+    return json.dumps(donnees, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+class Calcule:
+    """Champ calculé d'un serializer (SerializerMethodField, propriété) pour la lecture rapide.
+
+    ``fonction(*valeurs des colonnes)`` par ligne, ou ``par_lot(valeurs distinctes
+    de la colonne) -> {valeur: résultat}`` appelé une fois par page (agrégats;
+    ``defaut`` pour les valeurs absentes du résultat). Les colonnes sont relatives
+    au modèle du serializer; elles servent aussi à restreindre le SELECT (?fields=).
+    """
+
+    __slots__ = ('colonnes', 'fonction', 'par_lot', 'defaut')
+
+    def __init__(self, colonnes, fonction=None, par_lot=None, defaut=None):
+        self.colonnes = tuple(colonnes)
+        self.fonction = fonction
+        self.par_lot = par_lot
+        self.defaut = defaut
+
+
+class PlanLecture:
+    """Colonnes à lire (values()) et formatage ligne -> dict d'un serializer de lecture.
+
+    Le plan est déduit des champs du serializer (mêmes clés, même ordre, même
+    représentation): colonnes du modèle et des relations, libellés des choix,
+    serializers imbriqués. Les champs dont la valeur ne se lit pas en base sont
+    décrits dans l'attribut ``lecture_rapide`` du serializer ({nom: Calcule});
+    un champ calculé non décrit est une erreur de configuration. Les champs
+    sans formatage (texte, entiers, booléens, clés étrangères) sont copiés tels
+    quels; les autres (dates, durées...) passent par le to_representation du
+    champ DRF.
+    """
+
+    def __init__(self, serializer_class, champs=None):
+        self.colonnes = set()
+        self._lots = {}
+        self.champs = self._compiler(serializer_class(), serializer_class.Meta.model, '', champs)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _pour(serializer_class, champs):
+        return PlanLecture(serializer_class, champs)
+
+    @staticmethod
+    def pour(serializer_class, champs=None):
+        """Plan mis en cache par serializer et restriction ?fields="""
+        return PlanLecture._pour(serializer_class, frozenset(champs) if champs else None)
+
+    # -----------------------
+    # Compilation
+    # -----------------------
+    def _compiler(self, serializer, model, prefixe, champs):
+        calcules = getattr(type(serializer), 'lecture_rapide', {})
+        compiles = []
+        for nom, field in serializer.fields.items():
+            if field.write_only or (champs is not None and nom not in champs):
+                continue
+            if nom in calcules:
+                fonction = self._calcule(calcules[nom], prefixe)
+            elif isinstance(field, serializers.BaseSerializer):
+                fonction = self._imbrique(field, model, prefixe)
+            else:
+                fonction = self._colonne(type(serializer).__name__, nom, field, model, prefixe)
+                if fonction is None:
+                    continue
+            compiles.append((nom, fonction))
+        return compiles
+
+    def _calcule(self, calcule, prefixe):
+        colonnes = [prefixe + colonne for colonne in calcule.colonnes]
+        self.colonnes.update(colonnes)
+        if calcule.par_lot is not None:
+            cle = (colonnes[0], calcule.par_lot)
+            self._lots[cle] = calcule.par_lot
+            defaut = calcule.defaut
+            return lambda ligne, lots, c=colonnes[0]: lots[cle].get(ligne[c], defaut)
+        lire = operator.itemgetter(*colonnes)
+        fonction = calcule.fonction
+        if len(colonnes) == 1:
+            return lambda ligne, lots: fonction(lire(ligne))
+        return lambda ligne, lots: fonction(*lire(ligne))
+
+    def _imbrique(self, field, model, prefixe):
+        """Serializer imbriqué sur une clé étrangère (éventuellement via d'autres clés étrangères)"""
+        chemin = []
+        for attribut in field.source_attrs:
+            try:
+                relation = model._meta.get_field(attribut)
+            except FieldDoesNotExist:
+                relation = None
+            if relation is None or not relation.many_to_one:
+                raise ImproperlyConfigured(f"Serializer imbriqué {field.field_name}: clé étrangère requise")
+            chemin.append(relation.name)
+            model = relation.related_model
+        colonne = prefixe + '__'.join(chemin)
+        self.colonnes.add(colonne)
+        sous_champs = self._compiler(field, model, f"{colonne}__", None)
+        # Relation nulle: None, comme Serializer.to_representation
+        return lambda ligne, lots: None if ligne[colonne] is None else {
+            nom: fonction(ligne, lots) for nom, fonction in sous_champs
+        }
+
+    def _colonne(self, serializer, nom, field, model, prefixe):
+        resolu = self._resoudre(model, field.source_attrs)
+        if resolu is _ABSENT:
+            # Même résultat que DRF pour un attribut inexistant: défaut, None ou champ omis
+            if field.default is not empty:
+                valeur = field.get_default()
+                return lambda ligne, lots: valeur
+            if field.allow_null:
+                return lambda ligne, lots: None
+            return None
+        if resolu is None:
+            raise ImproperlyConfigured(
+                f"{serializer}.{nom}: champ calculé sans équivalent en lecture rapide (voir lecture_rapide)"
+            )
+
+        colonne, libelles = resolu
+        colonne = prefixe + colonne
+        self.colonnes.add(colonne)
+        if libelles is not None:
+            return lambda ligne, lots: None if (v := ligne[colonne]) is None else str(libelles.get(v, v))
+        if isinstance(field, serializers.FloatField):
+            return lambda ligne, lots: None if (v := ligne[colonne]) is None else float(v)
+        if isinstance(field, (
+            serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+            serializers.ChoiceField, serializers.RelatedField,
+        )):
+            return lambda ligne, lots: ligne[colonne]
+        representer = field.to_representation
+        return lambda ligne, lots: None if (v := ligne[colonne]) is None else representer(v)
+
+    @staticmethod
+    def _resoudre(model, attributs):
+        """('colonne values()', libellés des choix ou None); None si non lisible en base, _ABSENT si inexistant"""
+        if not attributs:
+            return None                 # source='*': l'objet entier
+        chemin = []
+        for index, attribut in enumerate(attributs):
+            dernier = index == len(attributs) - 1
+            if dernier and attribut.startswith('get_') and attribut.endswith('_display'):
+                try:
+                    field = model._meta.get_field(attribut[len('get_'):-len('_display')])
+                except FieldDoesNotExist:
+                    field = None
+                if field is None or not field.choices:
+                    return None if hasattr(model, attribut) else _ABSENT
+                return '__'.join(chemin + [field.name]), dict(field.flatchoices)
+            try:
+                field = model._meta.get_field(attribut)
+            except FieldDoesNotExist:
+                return None if hasattr(model, attribut) else _ABSENT
+            if field.many_to_many or field.one_to_many or (field.is_relation and not field.concrete):
+                return None
+            chemin.append(field.name)
+            if not dernier:
+                if not field.is_relation:
+                    return None
+                model = field.related_model
+        return '__'.join(chemin), None
+
+    # -----------------------
+    # Formatage
+    # -----------------------
+    def formater(self, lignes):
+        """Lignes values() -> liste de dicts identiques à serializer(many=True).data"""
+        lignes = list(lignes)
+        lots = {}
+        for cle, par_lot in self._lots.items():
+            valeurs = {ligne[cle[0]] for ligne in lignes}
+            lots[cle] = par_lot(valeurs) if valeurs else {}
+        champs = self.champs
+        return [{nom: fonction(ligne, lots) for nom, fonction in champs} for ligne in lignes]
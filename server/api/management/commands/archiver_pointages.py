@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Pointage
+from api.services.archive_service import ArchiveService, ArchiveError
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive les pointages des années closes (plus anciennes que ARCHIVES_ANNEES_CHAUDES) dans des "
+        "fichiers colonnes (ARCHIVES_POINTAGES_DIR) et les retire de la table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--annee', type=int, action='append',
+            help="Année à archiver (répétable; défaut: toutes les années archivables)"
+        )
+        parser.add_argument(
+            '--forcer', action='store_true',
+            help="Archive même une année de la fenêtre chaude (elle doit être close)"
+        )
+        parser.add_argument('--restaurer', type=int, metavar='ANNEE', help="Réinsère une année archivée dans la table")
+        parser.add_argument('--lister', action='store_true', help="Affiche les années archivées")
+
+    def handle(self, *args, **options):
+        try:
+            if options['lister']:
+                for annee in ArchiveService.annees_archivees():
+                    manifeste = ArchiveService.charger(annee)['manifeste']
+                    self.stdout.write(f"{annee}: {manifeste['nb_lignes']} pointages (archivé le {manifeste['date_archivage'][:10]})")
+                return
+
+            if options['restaurer']:
+                total = ArchiveService.restaurer(options['restaurer'])
+                self.stdout.write(self.style.SUCCESS(f"{options['restaurer']}: {total} pointages restaurés"))
+                return
+
+            annees = options['annee']
+            if not annees:
+                derniere = ArchiveService.derniere_annee_archivable()
+                annees = sorted({
+                    jour.year for jour in Pointage.objects.filter(
+                        date_pointage__year__lte=derniere
+                    ).dates('date_pointage', 'year')
+                })
+                if not annees:
+                    self.stdout.write(f"Aucune année à archiver (dernière année archivable: {derniere})")
+                    return
+
+            for annee in annees:
+                total = ArchiveService.archiver(annee, forcer=options['forcer'])
+                self.stdout.write(self.style.SUCCESS(f"{annee}: {total} pointages archivés"))
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
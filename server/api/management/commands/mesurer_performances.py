@@ -0,0 +1,127 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from api.benchmarks.donnees import GenerateurDonnees, PARAMETRES_PAR_DEFAUT
+from api.benchmarks.mesures import mesurer, comparer
+from api.benchmarks.scenarios import scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure temps, requêtes SQL et pic mémoire des statistiques, listes et exports PDF "
+        "sur un jeu de données synthétique, dans une base de test dédiée (SQLite ou PostgreSQL "
+        "selon les settings)"
+    )
+
+    def add_arguments(self, parser):
+        for nom, defaut in PARAMETRES_PAR_DEFAUT.items():
+            parser.add_argument(
+                f"--{nom.replace('_', '-')}", dest=nom, type=type(defaut), default=defaut,
+                help=f"Jeu de données: {nom} (défaut: {defaut})"
+            )
+        parser.add_argument('--repetitions', type=int, default=5, help="Exécutions par scénario")
+        parser.add_argument('--filtre', help="Ne mesurer que les scénarios dont le nom contient ce texte")
+        parser.add_argument('--sortie', help="Fichier JSON de résultats (défaut: benchmark-<commit>.json)")
+        parser.add_argument('--comparer', help="Fichier JSON d'une exécution précédente à comparer")
+        parser.add_argument(
+            '--garder-base', action='store_true',
+            help="Conserve la base de test (et son jeu de données) pour les exécutions suivantes"
+        )
+
+    @staticmethod
+    def _commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        parametres = {nom: options[nom] for nom in PARAMETRES_PAR_DEFAUT}
+        reference = None
+        if options['comparer']:
+            try:
+                reference = json.loads(Path(options['comparer']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Fichier de comparaison illisible: {e}")
+
+        commit = self._commit()
+        sortie = Path(options['sortie'] or f"benchmark-{commit or 'local'}.json")
+
+        setup_test_environment()
+        nom_base = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['garder_base']
+        )
+        try:
+            from api.models import Departement, Employe, Pointage, PresenceJournaliere
+
+            utilisateur = get_user_model().objects.filter(email='benchmark@exemple.com').first()
+            if utilisateur is None:
+                utilisateur = get_user_model().objects.create_superuser('benchmark@exemple.com', 'benchmark')
+            if Employe.objects.exists():
+                self.stdout.write("Jeu de données existant conservé (--garder-base)")
+            else:
+                self.stdout.write("Génération du jeu de données...")
+                GenerateurDonnees(**parametres).generer(utilisateur)
+            jeu = {
+                'departements': Departement.objects.count(),
+                'employes': Employe.objects.count(),
+                'pointages': Pointage.objects.count(),
+                'presences': PresenceJournaliere.objects.count(),
+            }
+            self.stdout.write(", ".join(f"{nom}: {total}" for nom, total in jeu.items()))
+
+            resultats = []
+            for nom, fonction, preparer in scenarios(utilisateur):
+                if options['filtre'] and options['filtre'] not in nom:
+                    continue
+                try:
+                    resultat = mesurer(nom, fonction, options['repetitions'], preparer)
+                except Exception as e:
+                    resultat = {'nom': nom, 'erreur': str(e)}
+                    self.stdout.write(self.style.ERROR(f"{nom}: {e}"))
+                else:
+                    self.stdout.write(
+                        f"{nom:40} {resultat['temps_ms']['mediane']:>10.2f} ms "
+                        f"{resultat['requetes']:>6} req {resultat['memoire_pic_ko']:>10.1f} Ko"
+                    )
+                resultats.append(resultat)
+        finally:
+            connection.creation.destroy_test_db(nom_base, verbosity=0, keepdb=options['garder_base'])
+            teardown_test_environment()
+
+        rapport = {
+            'commit': commit,
+            'date': timezone.now().isoformat(),
+            'environnement': {
+                'base': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'parametres': {**parametres, 'repetitions': options['repetitions']},
+            'jeu_de_donnees': jeu,
+            'resultats': resultats,
+        }
+        sortie.write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {sortie}"))
+
+        if reference:
+            self.stdout.write(f"Comparaison avec {reference.get('commit')}:")
+            for ligne in comparer(reference, rapport):
+                (avant, apres), (req_avant, req_apres) = ligne['temps_ms'], ligne['requetes']
+                self.stdout.write(
+                    f"{ligne['nom']:40} {avant:>10.2f} -> {apres:>10.2f} ms (x{ligne['ratio_temps']}) "
+                    f"{req_avant:>5} -> {req_apres:<5} req"
+                )
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.partition_service import PartitionService, PartitionnementError, _mois_suivant
+
+
+class Command(BaseCommand):
+    help = (
+        "Partitionnement mensuel de la table des pointages (PostgreSQL). Sans option: crée les "
+        "partitions des mois à venir et applique POINTAGE_PARTITIONS_RETENTION_MOIS (à planifier)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convertir', action='store_true',
+            help="Convertit la table existante en table partitionnée (une fois, table verrouillée)"
+        )
+        parser.add_argument(
+            '--avance', type=int,
+            help="Mois à créer à l'avance après le mois courant (défaut: POINTAGE_PARTITIONS_AVANCE)"
+        )
+        parser.add_argument('--detacher-avant', metavar='YYYY-MM', help="Détache les partitions antérieures à ce mois")
+        parser.add_argument(
+            '--supprimer', action='store_true',
+            help="Supprime les partitions détachées au lieu de les conserver comme tables autonomes"
+        )
+        parser.add_argument('--lister', action='store_true', help="Affiche les partitions existantes")
+        parser.add_argument(
+            '--expliquer', metavar='YYYY-MM',
+            help="Affiche les tables lues par une requête des pointages de ce mois (vérifie l'élagage)"
+        )
+
+    @staticmethod
+    def _mois(valeur):
+        try:
+            return datetime.strptime(valeur, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f"Mois invalide: {valeur} (format attendu: YYYY-MM)")
+
+    def handle(self, *args, **options):
+        try:
+            if options['lister']:
+                self._lister()
+            elif options['expliquer']:
+                self._expliquer(self._mois(options['expliquer']))
+            elif options['convertir']:
+                nb = PartitionService.convertir(options['avance'])
+                self.stdout.write(self.style.SUCCESS(f"Table des pointages partitionnée ({nb} partitions mensuelles)"))
+            elif options['detacher_avant']:
+                detachees = PartitionService.detacher(self._mois(options['detacher_avant']), options['supprimer'])
+                self._resume(detachees, "supprimée(s)" if options['supprimer'] else "détachée(s)")
+            else:
+                self._resume(PartitionService.creer_partitions(options['avance']), "créée(s)")
+                self._resume(PartitionService.detacher_selon_retention(options['supprimer']), "détachée(s)")
+        except PartitionnementError as e:
+            raise CommandError(str(e))
+
+    def _resume(self, partitions, action):
+        for nom in partitions:
+            self.stdout.write(f"  {nom}")
+        self.stdout.write(self.style.SUCCESS(f"{len(partitions)} partition(s) {action}"))
+
+    def _lister(self):
+        if not PartitionService.est_partitionnee():
+            raise PartitionnementError("La table des pointages n'est pas partitionnée (voir --convertir)")
+        for nom, debut, fin in PartitionService.partitions():
+            self.stdout.write(f"{nom:40} {f'{debut} -> {fin}' if debut else 'DEFAULT'}")
+
+    def _expliquer(self, mois):
+        from api.models import Pointage
+
+        queryset = Pointage.objects.filter(date_pointage__gte=mois, date_pointage__lt=_mois_suivant(mois))
+        for table in PartitionService.partitions_parcourues(queryset):
+            self.stdout.write(table)
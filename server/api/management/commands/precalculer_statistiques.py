@@ -0,0 +1,92 @@
+import time as horloge
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.utils import parse_date
+from api.services.precalcul_service import PrecalculService, TYPES_PERIODE, TYPE_GLOBAL
+
+TYPES = TYPES_PERIODE + (TYPE_GLOBAL,)
+
+
+class Command(BaseCommand):
+    help = (
+        "Précalcule les statistiques hebdomadaires, mensuelles et annuelles des périodes closes "
+        "(StatistiquesEmploye) et les statistiques globales mensuelles (StatistiquesGlobales). "
+        "Incrémental: seules les périodes dont les présences ont changé sont recalculées"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--types', default=','.join(TYPES),
+            help=f"Types de périodes, séparés par des virgules (défaut: {','.join(TYPES)})"
+        )
+        parser.add_argument('--depuis', help="Ignore les présences antérieures à cette date (YYYY-MM-DD)")
+        parser.add_argument(
+            '--complet', action='store_true',
+            help="Recalcule toutes les périodes, même celles qui sont à jour"
+        )
+        parser.add_argument('--workers', type=int, help="Processus de calcul (défaut: PRECALCUL_WORKERS)")
+        parser.add_argument('--taille-lot', type=int, help="Employés par lot (défaut: PRECALCUL_TAILLE_LOT)")
+        parser.add_argument(
+            '--planifier', nargs='?', const=getattr(settings, 'PRECALCUL_HEURE', '02:00'), metavar='HH:MM',
+            help="Reste actif et relance le précalcul chaque jour à l'heure donnée (défaut: PRECALCUL_HEURE)"
+        )
+
+    def handle(self, *args, **options):
+        types = tuple(t.strip() for t in options['types'].split(',') if t.strip())
+        inconnus = set(types) - set(TYPES)
+        if not types or inconnus:
+            raise CommandError(f"Types invalides: {', '.join(sorted(inconnus)) or '(aucun)'} ({', '.join(TYPES)})")
+
+        depuis = parse_date(options['depuis'])
+        if options['depuis'] and not depuis:
+            raise CommandError("Date invalide, format attendu: YYYY-MM-DD")
+
+        parametres = {
+            'types': types,
+            'depuis': depuis,
+            'complet': options['complet'],
+            'workers': options['workers'],
+            'taille_lot': options['taille_lot'],
+        }
+        if not options['planifier']:
+            self._executer(parametres)
+            return
+
+        try:
+            heure = datetime.strptime(options['planifier'], '%H:%M').time()
+        except ValueError:
+            raise CommandError("Heure invalide, format attendu: HH:MM")
+
+        while True:
+            maintenant = timezone.localtime()
+            prochaine = maintenant.replace(hour=heure.hour, minute=heure.minute, second=0, microsecond=0)
+            if prochaine <= maintenant:
+                prochaine += timedelta(days=1)
+            self.stdout.write(f"Prochain précalcul: {prochaine:%Y-%m-%d %H:%M}")
+            horloge.sleep((prochaine - maintenant).total_seconds())
+
+            close_old_connections()
+            try:
+                # Les exécutions planifiées sont incrémentales
+                self._executer({**parametres, 'complet': False})
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Précalcul interrompu: {e}"))
+            finally:
+                close_old_connections()
+
+    def _executer(self, parametres):
+        debut = horloge.perf_counter()
+
+        def progression(faits, total):
+            self.stdout.write(f"Lot {faits}/{total}")
+
+        compteurs = PrecalculService.precalculer(progression=progression, **parametres)
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{type_periode}: {total}" for type_periode, total in compteurs.items())
+            + f" période(s) recalculée(s) en {horloge.perf_counter() - debut:.1f} s"
+        ))
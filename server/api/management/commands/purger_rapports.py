@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.services.rapport_service import RapportService
+
+
+class Command(BaseCommand):
+    help = "Supprime les rapports PDF expirés et clôture les générations interrompues"
+
+    def handle(self, *args, **options):
+        supprimes, perdus = RapportService.purger()
+        self.stdout.write(self.style.SUCCESS(
+            f"{supprimes} rapport(s) expiré(s) supprimé(s), {perdus} génération(s) interrompue(s)"
+        ))
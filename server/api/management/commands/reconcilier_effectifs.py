@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.services.effectif_service import EffectifService
+
+
+class Command(BaseCommand):
+    help = "Vérifie et corrige le nombre d'employés (nbr_employe) de chaque département"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verifier', action='store_true',
+            help="Affiche les écarts sans corriger les compteurs"
+        )
+
+    def handle(self, *args, **options):
+        ecarts = EffectifService.reconcilier(corriger=not options['verifier'])
+        for departement, compteur, reel in ecarts:
+            self.stdout.write(f"{departement}: {compteur} -> {reel}")
+
+        if not ecarts:
+            self.stdout.write(self.style.SUCCESS("Tous les effectifs sont à jour"))
+        elif options['verifier']:
+            self.stdout.write(self.style.WARNING(f"{len(ecarts)} département(s) à corriger"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(ecarts)} département(s) corrigé(s)"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils import parse_date
+from api.services.presence_service import PresenceService
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats journaliers de présence à partir des pointages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debut', help="Premier jour à reconstruire (YYYY-MM-DD)")
+        parser.add_argument('--fin', help="Dernier jour à reconstruire (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        debut = parse_date(options['debut'])
+        fin = parse_date(options['fin'])
+        if options['debut'] and not debut or options['fin'] and not fin:
+            raise CommandError("Date invalide, format attendu: YYYY-MM-DD")
+
+        total = PresenceService.reconstruire(debut, fin)
+        self.stdout.write(self.style.SUCCESS(f"{total} présences journalières reconstruites"))
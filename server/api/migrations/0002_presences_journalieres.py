@@ -0,0 +1,139 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:58
+
+from datetime import time
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+TAILLE_LOT = 1000
+
+
+def _minutes(heure, defaut):
+    heure = heure or defaut
+    return heure.hour * 60 + heure.minute
+
+
+def _classer(ligne):
+    """(retard, départ anticipé, catégorie) d'un pointage complet, règles des statistiques"""
+    marge = ligne['employe__marge_tolerance_minutes'] or 10
+    entree_attendue = _minutes(ligne['employe__heure_entree_attendue'], time(8, 0))
+    sortie_attendue = _minutes(ligne['employe__heure_sortie_attendue'], time(16, 0))
+    retard = max(0, _minutes(ligne['heure_entree'], None) - entree_attendue)
+    depart = max(0, sortie_attendue - _minutes(ligne['heure_sortie'], None))
+    if retard <= marge and depart <= marge:
+        return retard, depart, 'parfait'
+    if retard <= 30 and depart <= 30:
+        return retard, depart, 'acceptable'
+    return retard, depart, 'inacceptable'
+
+
+def remplir_presences(apps, schema_editor):
+    """Agrégats des pointages existants (autonome: ne dépend pas du code applicatif courant)"""
+    Pointage = apps.get_model('api', 'Pointage')
+    PresenceJournaliere = apps.get_model('api', 'PresenceJournaliere')
+    PresenceDepartementJournaliere = apps.get_model('api', 'PresenceDepartementJournaliere')
+
+    lignes = Pointage.objects.filter(duree_travail__isnull=False).values(
+        'employe_id', 'employe__departement_id', 'date_pointage', 'duree_travail',
+        'heure_entree', 'heure_sortie', 'employe__heure_entree_attendue',
+        'employe__heure_sortie_attendue', 'employe__marge_tolerance_minutes',
+    ).order_by()
+
+    lot = []
+    for ligne in lignes.iterator(chunk_size=TAILLE_LOT):
+        retard, depart, categorie = _classer(ligne)
+        lot.append(PresenceJournaliere(
+            employe_id=ligne['employe_id'],
+            departement_id=ligne['employe__departement_id'],
+            date=ligne['date_pointage'],
+            secondes_travail=int(ligne['duree_travail'].total_seconds()),
+            retard_minutes=retard,
+            depart_avance_minutes=depart,
+            ponctualite_statut=categorie,
+        ))
+        if len(lot) >= TAILLE_LOT:
+            PresenceJournaliere.objects.bulk_create(lot)
+            lot = []
+    PresenceJournaliere.objects.bulk_create(lot)
+
+    agregats = PresenceJournaliere.objects.values('departement_id', 'date').annotate(
+        nb=Count('pk'),
+        secondes=Sum('secondes_travail'),
+        retard=Sum('retard_minutes'),
+        depart_avance=Sum('depart_avance_minutes'),
+        parfait=Count('pk', filter=Q(ponctualite_statut='parfait')),
+        acceptable=Count('pk', filter=Q(ponctualite_statut='acceptable')),
+        inacceptable=Count('pk', filter=Q(ponctualite_statut='inacceptable')),
+    ).order_by()
+    PresenceDepartementJournaliere.objects.bulk_create(
+        [
+            PresenceDepartementJournaliere(
+                departement_id=a['departement_id'],
+                date=a['date'],
+                nb_pointages=a['nb'],
+                secondes_travail=a['secondes'] or 0,
+                retard_minutes_total=a['retard'] or 0,
+                depart_avance_minutes_total=a['depart_avance'] or 0,
+                ponctualite_parfaite=a['parfait'],
+                ponctualite_acceptable=a['acceptable'],
+                ponctualite_inacceptable=a['inacceptable'],
+            )
+            for a in agregats
+        ],
+        batch_size=TAILLE_LOT,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceDepartementJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('nb_pointages', models.IntegerField(default=0)),
+                ('secondes_travail', models.BigIntegerField(default=0)),
+                ('retard_minutes_total', models.IntegerField(default=0)),
+                ('depart_avance_minutes_total', models.IntegerField(default=0)),
+                ('ponctualite_parfaite', models.IntegerField(default=0)),
+                ('ponctualite_acceptable', models.IntegerField(default=0)),
+                ('ponctualite_inacceptable', models.IntegerField(default=0)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('departement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='api.departement')),
+            ],
+            options={
+                'verbose_name': 'Présence journalière département',
+                'verbose_name_plural': 'Présences journalières départements',
+                'indexes': [models.Index(fields=['date'], name='api_presenc_date_5fa490_idx')],
+                'unique_together': {('departement', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PresenceJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('secondes_travail', models.IntegerField(default=0)),
+                ('retard_minutes', models.IntegerField(default=0)),
+                ('depart_avance_minutes', models.IntegerField(default=0)),
+                ('ponctualite_statut', models.CharField(choices=[('parfait', 'Parfait'), ('acceptable', 'Acceptable'), ('inacceptable', 'Inacceptable')], max_length=20)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('departement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presences_employes', to='api.departement')),
+                ('employe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presences', to='api.employe')),
+            ],
+            options={
+                'verbose_name': 'Présence journalière',
+                'verbose_name_plural': 'Présences journalières',
+                'indexes': [models.Index(fields=['departement', 'date'], name='api_presenc_departe_b267b8_idx'), models.Index(fields=['date'], name='api_presenc_date_543115_idx')],
+                'unique_together': {('employe', 'date')},
+            },
+        ),
+        migrations.RunPython(remplir_presences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_presences_journalieres'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employe',
+            index=models.Index(fields=['nom', 'prenom', 'cin'], name='api_employe_curseur_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pointage',
+            index=models.Index(fields=['-date_pointage', 'id_pointage'], name='api_pointage_curseur_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statistiquesemploye',
+            index=models.Index(fields=['-periode_debut', '-id'], name='api_stats_emp_curseur_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_index_pagination_curseur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RapportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type_rapport', models.CharField(choices=[('employe', 'Employé'), ('global', 'Global')], max_length=20)),
+                ('parametres', models.JSONField(default=dict)),
+                ('cle_dedup', models.CharField(db_index=True, max_length=64)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('erreur', 'Erreur')], default='en_attente', max_length=20)),
+                ('contenu', models.BinaryField(blank=True, null=True)),
+                ('nom_fichier', models.CharField(blank=True, default='', max_length=255)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('date_expiration', models.DateTimeField(db_index=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rapports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Rapport PDF',
+                'verbose_name_plural': 'Rapports PDF',
+                'ordering': ['-date_creation'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_rapports_pdf'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rapportjob',
+            name='type_rapport',
+            field=models.CharField(choices=[('employe', 'Employé'), ('global', 'Global'), ('departement', 'Département (lot)')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from datetime import time
+
+from django.db import migrations
+
+TAILLE_LOT = 2000
+CHAMPS = ['ponctualite_statut', 'retard_minutes', 'depart_avance_minutes', 'entree_ponctuelle', 'sortie_ponctuelle']
+
+
+def _minutes(heure, defaut=None):
+    heure = heure or defaut
+    return heure.hour * 60 + heure.minute
+
+
+def _classer(ligne):
+    """Valeurs de ponctualité d'un pointage complet (règle « ET », marge par défaut 10 min)"""
+    marge = ligne['employe__marge_tolerance_minutes'] or 10
+    retard = max(0, _minutes(ligne['heure_entree']) - _minutes(ligne['employe__heure_entree_attendue'], time(8, 0)))
+    depart = max(0, _minutes(ligne['employe__heure_sortie_attendue'], time(16, 0)) - _minutes(ligne['heure_sortie']))
+    if retard <= marge and depart <= marge:
+        categorie = 'parfait'
+    elif retard <= 30 and depart <= 30:
+        categorie = 'acceptable'
+    else:
+        categorie = 'inacceptable'
+    return {
+        'ponctualite_statut': categorie,
+        'retard_minutes': retard,
+        'depart_avance_minutes': depart,
+        'entree_ponctuelle': retard <= marge,
+        'sortie_ponctuelle': depart <= marge,
+    }
+
+
+def reclasser_pointages(apps, schema_editor):
+    """Les pointages enregistrés suivaient la règle « retard OU départ <= 30 min » pour
+    'acceptable'; les statistiques appliquent « ET ». Reclassement en lot des pointages complets
+    (autonome: ne dépend pas du code applicatif courant)."""
+    Pointage = apps.get_model('api', 'Pointage')
+    lignes = Pointage.objects.filter(
+        heure_sortie__isnull=False
+    ).values(
+        'id_pointage', 'heure_entree', 'heure_sortie', 'ponctualite_statut', 'retard_minutes',
+        'depart_avance_minutes', 'entree_ponctuelle', 'sortie_ponctuelle',
+        'employe__heure_entree_attendue', 'employe__heure_sortie_attendue', 'employe__marge_tolerance_minutes',
+    ).order_by('id_pointage')
+
+    def enregistrer(lot):
+        modifies = []
+        for ligne in lot:
+            valeurs = _classer(ligne)
+            if any(ligne[champ] != valeur for champ, valeur in valeurs.items()):
+                modifies.append(Pointage(id_pointage=ligne['id_pointage'], **valeurs))
+        Pointage.objects.bulk_update(modifies, CHAMPS, batch_size=TAILLE_LOT)
+
+    lot = []
+    for ligne in lignes.iterator(chunk_size=TAILLE_LOT):
+        lot.append(ligne)
+        if len(lot) >= TAILLE_LOT:
+            enregistrer(lot)
+            lot = []
+    if lot:
+        enregistrer(lot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_rapports_departement'),
+    ]
+
+    operations = [
+        migrations.RunPython(reclasser_pointages, migrations.RunPython.noop),
+    ]
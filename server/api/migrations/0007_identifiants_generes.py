@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:41
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_reclasser_ponctualite_pointages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceIdentifiant',
+            fields=[
+                ('nom', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('prochain', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='departement',
+            name='id_departement',
+            field=models.CharField(default=api.models.identifiant_departement, max_length=10, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='pointage',
+            name='id_pointage',
+            field=models.CharField(default=api.models.identifiant_pointage, max_length=10, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_identifiants_generes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='version_jeton',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
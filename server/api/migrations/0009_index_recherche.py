@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Figé à la création de la migration: RechercheService doit reprendre exactement ces expressions
+DOCUMENT_EMPLOYE = (
+    "(setweight(to_tsvector('simple', nom || ' ' || prenom), 'A') || "
+    "to_tsvector('simple', email || ' ' || coalesce(matricule, '') || ' ' || poste || ' ' || cin))"
+)
+NOM_COMPLET_EMPLOYE = "UPPER(nom || ' ' || prenom)"
+COLONNES_CONTIENT = {
+    'api_employe': ('nom', 'prenom', 'email', 'cin', 'matricule', 'poste'),
+    'api_pointage': ('remarque',),
+}
+INDEX_POSTGRESQL = [
+    ("api_employe_document_fts", f"CREATE INDEX IF NOT EXISTS api_employe_document_fts ON api_employe USING gin ({DOCUMENT_EMPLOYE})"),
+    ("api_employe_nom_complet_trgm", f"CREATE INDEX IF NOT EXISTS api_employe_nom_complet_trgm ON api_employe USING gin (({NOM_COMPLET_EMPLOYE}) gin_trgm_ops)"),
+] + [
+    (
+        f"{table}_{colonne}_trgm",
+        f"CREATE INDEX IF NOT EXISTS {table}_{colonne}_trgm ON {table} USING gin ((UPPER({colonne}::text)) gin_trgm_ops)",
+    )
+    for table, colonnes in COLONNES_CONTIENT.items()
+    for colonne in colonnes
+]
+
+
+def creer_index(apps, schema_editor):
+    """Index plein texte et trigrammes de la recherche (PostgreSQL uniquement: les autres bases
+    utilisent l'index en mémoire de RechercheService)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for _, sql in INDEX_POSTGRESQL:
+        schema_editor.execute(sql)
+
+
+def supprimer_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for nom, _ in INDEX_POSTGRESQL:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {nom}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_version_jeton_utilisateur'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
@@ -6,6 +6,7 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 from django.core.validators import RegexValidator, MinLengthValidator
 from django.core.exceptions import ValidationError
+import uuid
 from datetime import datetime, time, date
 
 # ========================
@@ -36,20 +37,68 @@ class CustomUser(AbstractUser):
     username = None
     email = models.EmailField(max_length=200, unique=True)
     nom = models.CharField(max_length=100, null=True, blank=True)
+    # Incrémentée quand les jetons émis ne doivent plus être acceptés (voir api.authentication)
+    version_jeton = models.PositiveIntegerField(default=0, editable=False)
 
     objects = CustomUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    # Champs portés par les jetons ou garantissant leur validité: toute modification les révoque
+    CHAMPS_JETON = ('password', 'email', 'is_active', 'is_superuser', 'is_staff')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valeurs_jeton = {champ: instance.__dict__.get(champ) for champ in cls.CHAMPS_JETON}
+        return instance
+
+    def save(self, *args, **kwargs):
+        origine = getattr(self, '_valeurs_jeton', None)
+        if origine is not None and not self._state.adding:
+            valeurs = {champ: self.__dict__.get(champ, origine[champ]) for champ in self.CHAMPS_JETON}
+            if valeurs != origine:
+                self.version_jeton += 1
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'version_jeton'}
+        super().save(*args, **kwargs)
+        # Référence des prochains enregistrements, y compris pour une instance créée par ce save()
+        self._valeurs_jeton = {
+            champ: self.__dict__.get(champ, (origine or {}).get(champ)) for champ in self.CHAMPS_JETON
+        }
+
     def __str__(self):
         return self.email
 
+# ========================
+# Identifiants générés
+# ========================
+class SequenceIdentifiant(models.Model):
+    """Prochain numéro libre d'une séquence d'identifiants (réservé par blocs, voir IdentifiantService)"""
+    nom = models.CharField(max_length=20, primary_key=True)
+    prochain = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.nom}: {self.prochain}"
+
+
+def identifiant_pointage():
+    """Valeur par défaut de Pointage.id_pointage"""
+    from api.services.identifiant_service import IdentifiantService
+    return IdentifiantService.allouer('pointage')[0]
+
+
+def identifiant_departement():
+    """Valeur par défaut de Departement.id_departement"""
+    from api.services.identifiant_service import IdentifiantService
+    return IdentifiantService.allouer('departement')[0]
+
 # ========================
 # Département
 # ========================
 class Departement(models.Model):
-    id_departement = models.CharField(max_length=10, primary_key=True)
+    id_departement = models.CharField(max_length=10, primary_key=True, default=identifiant_departement)
     nom = models.CharField(max_length=100)
     responsable = models.TextField()
     description = models.TextField(blank=True, null=True)
@@ -61,8 +110,13 @@ class Departement(models.Model):
         return self.nom
 
     def save(self, *args, **kwargs):
-        if self.pk:
-            self.nbr_employe = self.employes.count()
+        # nbr_employe est un compteur tenu par EffectifService (incréments F()):
+        # une instance chargée plus tôt ne doit pas l'écraser avec une valeur périmée
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                champ.attname for champ in self._meta.concrete_fields
+                if not champ.primary_key and champ.attname != 'nbr_employe'
+            ]
         super().save(*args, **kwargs)
 
 # ========================
@@ -122,9 +176,22 @@ class Employe(models.Model):
     heure_sortie_attendue = models.TimeField(default=time(16, 0))
     marge_tolerance_minutes = models.IntegerField(default=10)
 
+    # Champs dont le changement impose de recalculer les agrégats journaliers
+    CHAMPS_SUIVIS = ('departement_id', 'heure_entree_attendue', 'heure_sortie_attendue', 'marge_tolerance_minutes')
+
     class Meta:
         verbose_name = "Employé"
         verbose_name_plural = "Employés"
+        indexes = [
+            # Pagination par curseur (nom, prenom, cin)
+            models.Index(fields=['nom', 'prenom', 'cin'], name='api_employe_curseur_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valeurs_origine = {champ: instance.__dict__.get(champ) for champ in cls.CHAMPS_SUIVIS}
+        return instance
 
     def __str__(self):
         return f"{self.nom} {self.prenom} (CIN: {self.cin})"
@@ -160,27 +227,12 @@ class Employe(models.Model):
         if self.titre == 'stagiaire':
             self.matricule = None
         
-        # Valider avant sauvegarde
+        # Valider avant sauvegarde (l'import en masse valide le lot en amont)
         self.full_clean()
-        
-        is_new = self._state.adding
-        old_departement = None
-
-        if not is_new:
-            try:
-                old_instance = Employe.objects.get(pk=self.cin)
-                old_departement = old_instance.departement
-            except Employe.DoesNotExist:
-                pass
 
+        # Compteur du département: ajusté par le signal post_save (EffectifService)
         super().save(*args, **kwargs)
 
-        if self.departement_id:
-            self.departement.save()
-
-        if not is_new and old_departement and old_departement.id_departement != self.departement_id:
-            old_departement.save()
-
     def get_display_name(self):
         """Retourne le nom d'affichage complet avec titre"""
         titre_display = "Stagiaire" if self.titre == 'stagiaire' else "Employé"
@@ -191,7 +243,7 @@ class Employe(models.Model):
 # Pointage
 # ========================
 class Pointage(models.Model):
-    id_pointage = models.CharField(max_length=10, primary_key=True)
+    id_pointage = models.CharField(max_length=10, primary_key=True, default=identifiant_pointage)
     employe = models.ForeignKey('Employe', on_delete=models.CASCADE, related_name="pointages")
     date_pointage = models.DateField(default=date.today)
     heure_entree = models.TimeField()
@@ -210,6 +262,17 @@ class Pointage(models.Model):
 
     class Meta:
         unique_together = ('employe', 'date_pointage')
+        indexes = [
+            # Pagination par curseur (-date_pointage, id_pointage)
+            models.Index(fields=['-date_pointage', 'id_pointage'], name='api_pointage_curseur_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Clé d'origine (employé, jour) pour mettre à jour les agrégats journaliers
+        instance._cle_origine = (instance.__dict__.get('employe_id'), instance.__dict__.get('date_pointage'))
+        return instance
 
     def clean(self):
         if self.heure_sortie and self.heure_entree:
@@ -224,54 +287,98 @@ class Pointage(models.Model):
         
         super().clean()
 
-    def _calculer_ponctualite(self):
-        """Calcule la ponctualité selon les règles (8h00-16h00 avec marge)"""
-        if not self.heure_entree or not self.heure_sortie:
-            return
-        
-        # Heures attendues de l'employé
-        heure_entree_attendue = self.employe.heure_entree_attendue or time(8, 0)
-        heure_sortie_attendue = self.employe.heure_sortie_attendue or time(16, 0)
-        marge = self.employe.marge_tolerance_minutes or 10
-        
-        # Calcul du retard à l'entrée
-        entree_attendu_minutes = heure_entree_attendue.hour * 60 + heure_entree_attendue.minute
-        entree_reelle_minutes = self.heure_entree.hour * 60 + self.heure_entree.minute
-        
-        self.retard_minutes = max(0, entree_reelle_minutes - entree_attendu_minutes)
-        self.entree_ponctuelle = self.retard_minutes <= marge
-        
-        # Calcul du départ anticipé
-        sortie_attendu_minutes = heure_sortie_attendue.hour * 60 + heure_sortie_attendue.minute
-        sortie_reelle_minutes = self.heure_sortie.hour * 60 + self.heure_sortie.minute
-        
-        self.depart_avance_minutes = max(0, sortie_attendu_minutes - sortie_reelle_minutes)
-        self.sortie_ponctuelle = self.depart_avance_minutes <= marge
-        
-        # Déterminer le statut de ponctualité
-        if self.entree_ponctuelle and self.sortie_ponctuelle:
-            self.ponctualite_statut = 'parfait'
-        elif self.retard_minutes <= 30 or self.depart_avance_minutes <= 30:
-            self.ponctualite_statut = 'acceptable'
-        else:
-            self.ponctualite_statut = 'inacceptable'
+    def _calculer_ponctualite(self, employe=None):
+        """Calcule la ponctualité selon les règles (horaires attendus de l'employé avec marge)"""
+        from .services.ponctualite import classer_pointages
 
-    def save(self, *args, **kwargs):
-        if self.heure_entree and self.heure_sortie:
-            entree_dt = datetime.combine(self.date_pointage, self.heure_entree)
-            sortie_dt = datetime.combine(self.date_pointage, self.heure_sortie)
-            self.duree_travail = sortie_dt - entree_dt
-            
-            # Calculer la ponctualité
-            self._calculer_ponctualite()
-        else:
-            self.duree_travail = None
+        classer_pointages([self], {self.employe_id: employe} if employe else None)
 
+    def _calculer_metriques(self, employe=None):
+        """Durée de travail et ponctualité, calculées en mémoire (sans requête si employe est fourni)"""
+        Pointage.calculer_metriques_en_lot([self], {self.employe_id: employe} if employe else None)
+
+    @staticmethod
+    def calculer_metriques_en_lot(pointages, employes=None):
+        """Durée et ponctualité d'un lot de pointages (classification vectorisée, voir services.ponctualite).
+
+        employes: {cin: employe} déjà chargés; sinon pointage.employe est utilisé
+        """
+        from .services.ponctualite import classer_pointages
+
+        for pointage in pointages:
+            if pointage.heure_entree and pointage.heure_sortie:
+                pointage.duree_travail = (
+                    datetime.combine(pointage.date_pointage, pointage.heure_sortie)
+                    - datetime.combine(pointage.date_pointage, pointage.heure_entree)
+                )
+            else:
+                pointage.duree_travail = None
+        classer_pointages(pointages, employes)
+
+    def save(self, *args, **kwargs):
+        self._calculer_metriques()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Pointage {self.id_pointage} - {self.employe}"
 
+# ========================
+# Agrégats journaliers de présence
+# ========================
+class PresenceJournaliere(models.Model):
+    """Agrégat d'un pointage complet par employé et par jour (maintenu à chaque écriture de Pointage)"""
+    PONCTUALITE_STATUT = [
+        ('parfait', 'Parfait'),
+        ('acceptable', 'Acceptable'),
+        ('inacceptable', 'Inacceptable')
+    ]
+
+    employe = models.ForeignKey('Employe', on_delete=models.CASCADE, related_name="presences")
+    departement = models.ForeignKey(Departement, on_delete=models.CASCADE, related_name="presences_employes")
+    date = models.DateField()
+    secondes_travail = models.IntegerField(default=0)
+    retard_minutes = models.IntegerField(default=0)
+    depart_avance_minutes = models.IntegerField(default=0)
+    ponctualite_statut = models.CharField(max_length=20, choices=PONCTUALITE_STATUT)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('employe', 'date')
+        verbose_name = "Présence journalière"
+        verbose_name_plural = "Présences journalières"
+        indexes = [
+            models.Index(fields=['departement', 'date']),
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"Présence {self.employe_id} - {self.date}"
+
+
+class PresenceDepartementJournaliere(models.Model):
+    """Somme des présences journalières des employés d'un département"""
+    departement = models.ForeignKey(Departement, on_delete=models.CASCADE, related_name="presences_journalieres")
+    date = models.DateField()
+    nb_pointages = models.IntegerField(default=0)
+    secondes_travail = models.BigIntegerField(default=0)
+    retard_minutes_total = models.IntegerField(default=0)
+    depart_avance_minutes_total = models.IntegerField(default=0)
+    ponctualite_parfaite = models.IntegerField(default=0)
+    ponctualite_acceptable = models.IntegerField(default=0)
+    ponctualite_inacceptable = models.IntegerField(default=0)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('departement', 'date')
+        verbose_name = "Présence journalière département"
+        verbose_name_plural = "Présences journalières départements"
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"Présence {self.departement_id} - {self.date}"
+
 # ========================
 # Statistiques Employé
 # ========================
@@ -329,6 +436,8 @@ class StatistiquesEmploye(models.Model):
         indexes = [
             models.Index(fields=['employe', 'periode_debut', 'periode_fin']),
             models.Index(fields=['type_periode', 'periode_debut']),
+            # Pagination par curseur (-periode_debut, -id)
+            models.Index(fields=['-periode_debut', '-id'], name='api_stats_emp_curseur_idx'),
         ]
     
     def __str__(self):
@@ -406,4 +515,48 @@ class StatistiquesGlobales(models.Model):
         ]
     
     def __str__(self):
-        return f"Stats Globales - {self.periode.strftime('%Y-%m')}"
\ No newline at end of file
+        return f"Stats Globales - {self.periode.strftime('%Y-%m')}"
+
+
+# ========================
+# Rapports PDF asynchrones
+# ========================
+class RapportJob(models.Model):
+    """Génération d'un rapport PDF en arrière-plan; le PDF produit est conservé jusqu'à expiration"""
+    TYPE_RAPPORT = [
+        ('employe', 'Employé'),
+        ('global', 'Global'),
+        ('departement', 'Département (lot)'),
+    ]
+    
+    STATUT = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('erreur', 'Erreur'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    type_rapport = models.CharField(max_length=20, choices=TYPE_RAPPORT)
+    parametres = models.JSONField(default=dict)
+    # Empreinte des paramètres et des versions de données: mêmes entrées => même PDF
+    cle_dedup = models.CharField(max_length=64, db_index=True)
+    statut = models.CharField(max_length=20, choices=STATUT, default='en_attente')
+    
+    contenu = models.BinaryField(null=True, blank=True, editable=False)
+    nom_fichier = models.CharField(max_length=255, blank=True, default='')
+    erreur = models.TextField(blank=True, default='')
+    
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    date_expiration = models.DateTimeField(db_index=True)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='rapports')
+    
+    class Meta:
+        verbose_name = "Rapport PDF"
+        verbose_name_plural = "Rapports PDF"
+        ordering = ['-date_creation']
+    
+    def __str__(self):
+        return f"Rapport {self.type_rapport} {self.id} ({self.statut})"
@@ -0,0 +1,202 @@
+# pagination.py
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Pagination par curseur (keyset) sur un tri composite.
+
+    Le curseur contient les valeurs de tri de la dernière ligne servie; la
+    page suivante est lue avec une condition lexicographique
+    ``(f1 < v1) OR (f1 = v1 AND f2 > v2) ...`` qui s'appuie sur l'index du tri,
+    sans OFFSET. La clé primaire est ajoutée au tri si aucun champ unique n'y
+    figure, ce qui garantit un ordre total.
+    """
+    ordering = ('-pk',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide'
+
+    # -----------------------
+    # Tri
+    # -----------------------
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = list(ordering or self.ordering)
+
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        ordering = [
+            champ.replace('pk', pk_name) if champ.lstrip('-') == 'pk' else champ
+            for champ in ordering
+        ]
+        if not any(self._est_unique(model, champ.lstrip('-')) for champ in ordering):
+            sens = '-' if ordering and ordering[-1].startswith('-') else ''
+            ordering.append(f'{sens}{pk_name}')
+        return ordering
+
+    @staticmethod
+    def _est_unique(model, nom):
+        try:
+            return model._meta.get_field(nom).unique
+        except FieldDoesNotExist:
+            return False
+
+    # -----------------------
+    # Pagination
+    # -----------------------
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                taille = int(request.query_params[self.page_size_query_param])
+                if taille > 0:
+                    return min(taille, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.taille_page = self.get_page_size(request)
+        self.tri = self.get_ordering(request, queryset, view)
+
+        curseur = self.decode_cursor(request)
+        position, inverse = (curseur['p'], curseur['r']) if curseur else (None, False)
+
+        tri = self._inverser(self.tri) if inverse else self.tri
+        queryset = queryset.order_by(*tri)
+        if position is not None:
+            queryset = queryset.filter(self._condition_apres(tri, position))
+
+        lignes = list(queryset[:self.taille_page + 1])
+        suite = len(lignes) > self.taille_page
+        lignes = lignes[:self.taille_page]
+        if inverse:
+            lignes.reverse()
+
+        # En arrière: la page existe après nous (d'où l'on vient); il y a une page
+        # précédente s'il reste des lignes. En avant: l'inverse.
+        self.has_next = (not inverse and suite) or (inverse and position is not None)
+        self.has_previous = (inverse and suite) or (not inverse and position is not None)
+        self.position_debut = self._position(lignes[0]) if lignes else position
+        self.position_fin = self._position(lignes[-1]) if lignes else position
+        self.page = lignes
+        return lignes
+
+    def _position(self, ligne):
+        valeurs = []
+        for champ in self.tri:
+            valeur = ligne
+            for attr in champ.lstrip('-').split('__'):
+                valeur = valeur.get(attr) if isinstance(valeur, dict) else getattr(valeur, attr, None)
+            if hasattr(valeur, 'pk'):
+                valeur = valeur.pk
+            valeurs.append(valeur.isoformat() if hasattr(valeur, 'isoformat') else valeur)
+        return valeurs
+
+    @staticmethod
+    def _inverser(tri):
+        return [champ[1:] if champ.startswith('-') else f'-{champ}' for champ in tri]
+
+    @staticmethod
+    def _condition_apres(tri, position):
+        """Condition lexicographique « strictement après la position » pour le tri donné"""
+        condition = Q()
+        egalites = {}
+        for champ, valeur in zip(tri, position):
+            nom = champ.lstrip('-')
+            operateur = 'lt' if champ.startswith('-') else 'gt'
+            condition |= Q(**egalites, **{f'{nom}__{operateur}': valeur})
+            egalites[nom] = valeur
+        return condition
+
+    # -----------------------
+    # Curseurs
+    # -----------------------
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            curseur = json.loads(base64.b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if len(curseur['p']) != len(self.tri):
+                raise ValueError
+            return {'p': curseur['p'], 'r': bool(curseur.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, inverse=False):
+        contenu = json.dumps({'p': position, 'r': int(inverse)}, separators=(',', ':'))
+        encoded = base64.b64encode(contenu.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.position_fin)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.position_debut, inverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PointagePagination(KeysetPagination):
+    ordering = ('-date_pointage', 'id_pointage')
+
+
+class EmployePagination(KeysetPagination):
+    ordering = ('nom', 'prenom', 'cin')
+
+
+class StatistiquesEmployePagination(KeysetPagination):
+    ordering = ('-periode_debut', '-id')
+
+
+class StatistiquesGlobalesPagination(KeysetPagination):
+    ordering = ('-periode',)
+
+
+class ClassementPagination(KeysetPagination):
+    """Classement: la position (ROW_NUMBER) est unique, elle suffit comme curseur"""
+    ordering = ('position',)
+    page_size = 50
+
+    def get_ordering(self, request, queryset, view):
+        return list(self.ordering)
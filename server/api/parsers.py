@@ -0,0 +1,11 @@
+# parsers.py
+from rest_framework.parsers import BaseParser
+
+
+class CSVTextParser(BaseParser):
+    """Corps text/csv transmis tel quel (décodé) à la vue"""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encodage = (parser_context or {}).get('encoding') or 'utf-8'
+        return stream.read().decode('utf-8-sig' if encodage.lower() in ('utf-8', 'utf8') else encodage)
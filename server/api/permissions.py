@@ -1,6 +1,8 @@
 # permissions.py
 from rest_framework import permissions
 
+from .services.acces_service import AccesService
+
 class IsOwnerOrAdminForWrite(permissions.BasePermission):
     """
     Permission personnalisée :
@@ -23,25 +25,14 @@ class IsOwnerOrAdminForWrite(permissions.BasePermission):
             # Cette vérification se fait généralement dans la vue via serializer.save(created_by=request.user)
             return True
 
-        # Autoriser les superutilisateurs pour toutes les actions
-        if request.user.is_superuser:
-            return True
-
-        # Autoriser la modification/suppression pour le créateur
-        if hasattr(obj, 'created_by') and obj.created_by == request.user:
+        # Superutilisateur, créateur de l'objet, ou responsable du département de l'employé
+        # concerné: tests d'appartenance sur la portée, sans charger créateur ni département
+        if AccesService.portee(request.user).peut_modifier(obj):
             return True
 
         # Autoriser si l'utilisateur est l'employé concerné (pour Pointage)
-        if hasattr(obj, 'employe') and hasattr(obj.employe, 'user'):
-            if obj.employe.user == request.user:
-                return True
-
-        # Autoriser les responsables du département pour les pointages
-        if hasattr(obj, 'employe') and hasattr(obj.employe, 'departement'):
-            if obj.employe.departement and obj.employe.departement.responsable == request.user.email:
-                return True
-        
-        return False
+        employe = getattr(obj, 'employe', None)
+        return employe is not None and getattr(employe, 'user_id', None) == request.user.id
 
 
 class IsAuthenticatedCRUD(permissions.BasePermission):
@@ -74,13 +65,11 @@ class IsOwnerOrReadOnlyForSelf(permissions.BasePermission):
             return True
         
         # Vérifier si l'utilisateur est le propriétaire de l'objet
-        # Pour les employés: vérifier si l'utilisateur est l'employé
-        if hasattr(obj, 'created_by'):
-            return obj.created_by == request.user
+        if hasattr(obj, 'created_by_id'):
+            return obj.created_by_id == request.user.id
         
-        # Pour les pointages: vérifier si l'utilisateur a créé le pointage
-        # ou si le pointage appartient à son employé
-        if hasattr(obj, 'employe') and hasattr(obj.employe, 'created_by'):
-            return obj.employe.created_by == request.user
+        # Pour les pointages: le pointage appartient à l'un de ses employés
+        if hasattr(obj, 'employe_id'):
+            return obj.employe_id in AccesService.portee(request.user).employes
         
         return False
\ No newline at end of file
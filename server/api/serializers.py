@@ -1,7 +1,11 @@
 # serializers.py
+from django.db.models import Count
 from rest_framework import serializers
-from .models import CustomUser, Departement, Employe, Pointage, StatistiquesEmploye, StatistiquesGlobales
+from .lecture_rapide import Calcule
+from .models import CustomUser, Departement, Employe, Pointage, StatistiquesEmploye, StatistiquesGlobales, RapportJob
 from django.contrib.auth.hashers import make_password
+from .services.archive_service import ArchiveService
+from .services.identifiant_service import IdentifiantService
 
 # Service pour formater les durées
 class StatisticsService:
@@ -52,6 +56,65 @@ class StatisticsService:
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         
 
+# -----------------------
+# Champs calculés (partagés avec la lecture rapide des listes)
+# -----------------------
+def nom_complet(nom, prenom):
+    return f"{nom} {prenom}"
+
+
+def matricule_display(titre, matricule):
+    if titre == 'employe' and matricule:
+        return matricule
+    return "Stagiaire"
+
+
+def matricule_employe(titre, matricule):
+    """Matricule d'un employé fixe (éventuellement vide), "Stagiaire" sinon"""
+    return matricule if titre == 'employe' else "Stagiaire"
+
+
+def employes_actifs_par_departement(departements):
+    """{id_departement: nombre d'employés actifs} en une requête"""
+    return dict(
+        Employe.objects.filter(departement_id__in=departements, statut='actif')
+        .values_list('departement_id').annotate(nombre=Count('cin')).order_by()
+    )
+
+
+def periode_display_employe(type_periode, periode_debut):
+    if type_periode == 'hebdo':
+        return f"Semaine du {periode_debut.strftime('%d/%m/%Y')}"
+    elif type_periode == 'mensuel':
+        return f"Mois de {periode_debut.strftime('%B %Y')}"
+    else:
+        return f"Année {periode_debut.year}"
+
+
+def periode_display_globale(periode):
+    return periode.strftime('%B %Y')
+
+
+# -----------------------
+# Champs dynamiques (?fields=)
+# -----------------------
+class ChampsDynamiquesMixin:
+    """Permet de restreindre les champs sérialisés: Serializer(..., fields=['cin', 'nom'])
+    
+    Les colonnes dont dépendent les champs calculés (SerializerMethodField...) sont
+    celles de `lecture_rapide` (Calcule): la vue s'en sert aussi pour limiter le
+    SELECT via only().
+    """
+    lecture_rapide = {}
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for nom in set(self.fields) - set(fields):
+                self.fields.pop(nom)
+
 # -----------------------
 # CustomUser
 # -----------------------
@@ -87,11 +150,24 @@ class DepartementSerializer(serializers.ModelSerializer):
             'nbr_employe', 'localisation', 'created_by', 
             'created_by_username', 'created_by_nom'
         ]
+        # Compteur maintenu par les écritures d'employés
+        read_only_fields = ['nbr_employe']
+
+    def validate_id_departement(self, value):
+        # Omis: identifiant généré par le serveur
+        if IdentifiantService.est_reserve(value) and (self.instance is None or value != self.instance.pk):
+            raise serializers.ValidationError("Format réservé aux identifiants générés: omettre ce champ.")
+        return value
 
 # -----------------------
 # Employe - Minimal (pour les relations)
 # -----------------------
 class EmployeMinimalSerializer(serializers.ModelSerializer):
+    lecture_rapide = {
+        'nom_complet': Calcule(['nom', 'prenom'], nom_complet),
+        'matricule_display': Calcule(['titre', 'matricule'], matricule_display),
+    }
+    
     nom_complet = serializers.SerializerMethodField()
     departement_nom = serializers.CharField(source='departement.nom', read_only=True, allow_null=True)
     matricule_display = serializers.SerializerMethodField()
@@ -102,17 +178,20 @@ class EmployeMinimalSerializer(serializers.ModelSerializer):
                  'poste', 'departement', 'departement_nom', 'email', 'titre']
     
     def get_nom_complet(self, obj):
-        return f"{obj.nom} {obj.prenom}"
+        return nom_complet(obj.nom, obj.prenom)
     
     def get_matricule_display(self, obj):
-        if obj.titre == 'employe' and obj.matricule:
-            return obj.matricule
-        return "Stagiaire"
+        return matricule_display(obj.titre, obj.matricule)
 
 # -----------------------
 # Departement - Minimal (pour les relations)
 # -----------------------
 class DepartementMinimalSerializer(serializers.ModelSerializer):
+    lecture_rapide = {
+        # Une requête par page au lieu d'une par employé listé
+        'employes_actifs': Calcule(['id_departement'], par_lot=employes_actifs_par_departement, defaut=0),
+    }
+    
     employes_actifs = serializers.SerializerMethodField()
     
     class Meta:
@@ -125,7 +204,9 @@ class DepartementMinimalSerializer(serializers.ModelSerializer):
 # -----------------------
 # Employe - Complet
 # -----------------------
-class EmployeSerializer(serializers.ModelSerializer):
+class EmployeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    lecture_rapide = EmployeMinimalSerializer.lecture_rapide
+    
     # Pour l'affichage (lecture)
     departement_info = DepartementMinimalSerializer(source='departement', read_only=True)
     
@@ -156,12 +237,10 @@ class EmployeSerializer(serializers.ModelSerializer):
         ]
     
     def get_nom_complet(self, obj):
-        return f"{obj.nom} {obj.prenom}"
+        return nom_complet(obj.nom, obj.prenom)
     
     def get_matricule_display(self, obj):
-        if obj.titre == 'employe' and obj.matricule:
-            return obj.matricule
-        return "Stagiaire"
+        return matricule_display(obj.titre, obj.matricule)
     
     def validate(self, data):
         # Validation personnalisée pour le matricule selon le titre
@@ -215,7 +294,11 @@ class EmployeSerializer(serializers.ModelSerializer):
 # -----------------------
 # Pointage
 # -----------------------
-class PointageSerializer(serializers.ModelSerializer):
+class PointageSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    lecture_rapide = {
+        'employe_matricule': Calcule(['employe__titre', 'employe__matricule'], matricule_employe),
+    }
+    
     duree_travail = serializers.DurationField(read_only=True)
     employe_nom = serializers.CharField(source='employe.nom_complet', read_only=True)
     employe_cin = serializers.CharField(source='employe.cin', read_only=True)
@@ -229,13 +312,30 @@ class PointageSerializer(serializers.ModelSerializer):
         model = Pointage
         fields = '__all__'
     
+    def validate_id_pointage(self, value):
+        # Omis: identifiant généré par le serveur
+        if IdentifiantService.est_reserve(value) and (self.instance is None or value != self.instance.pk):
+            raise serializers.ValidationError("Format réservé aux identifiants générés: omettre ce champ.")
+        return value
+
+    def validate_date_pointage(self, value):
+        if ArchiveService.est_archivee(value):
+            raise serializers.ValidationError("Les pointages des années archivées sont en lecture seule.")
+        return value
+    
     def get_employe_matricule(self, obj):
-        return obj.employe.matricule if obj.employe.titre == 'employe' else "Stagiaire"
+        return matricule_employe(obj.employe.titre, obj.employe.matricule)
 
 # -----------------------
 # Statistiques Employé (sauvegardées)
 # -----------------------
-class StatistiquesEmployeSerializer(serializers.ModelSerializer):
+class StatistiquesEmployeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    lecture_rapide = {
+        'heures_travail_total_str': Calcule(['heures_travail_total'], StatisticsService.format_duration),
+        'moyenne_heures_quotidiennes_str': Calcule(['moyenne_heures_quotidiennes'], StatisticsService.format_duration),
+        'periode_display': Calcule(['type_periode', 'periode_debut'], periode_display_employe),
+    }
+    
     employe = EmployeMinimalSerializer(read_only=True)
     heures_travail_total_str = serializers.SerializerMethodField()
     moyenne_heures_quotidiennes_str = serializers.SerializerMethodField()
@@ -276,17 +376,17 @@ class StatistiquesEmployeSerializer(serializers.ModelSerializer):
         return StatisticsService.format_duration(obj.moyenne_heures_quotidiennes)
     
     def get_periode_display(self, obj):
-        if obj.type_periode == 'hebdo':
-            return f"Semaine du {obj.periode_debut.strftime('%d/%m/%Y')}"
-        elif obj.type_periode == 'mensuel':
-            return f"Mois de {obj.periode_debut.strftime('%B %Y')}"
-        else:
-            return f"Année {obj.periode_debut.year}"
+        return periode_display_employe(obj.type_periode, obj.periode_debut)
 
 # -----------------------
 # Statistiques Globales (sauvegardées)
 # -----------------------
-class StatistiquesGlobalesSerializer(serializers.ModelSerializer):
+class StatistiquesGlobalesSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    lecture_rapide = {
+        'heures_travail_total_str': Calcule(['heures_travail_total'], StatisticsService.format_duration),
+        'periode_display': Calcule(['periode'], periode_display_globale),
+    }
+    
     heures_travail_total_str = serializers.SerializerMethodField()
     periode_display = serializers.SerializerMethodField()
     
@@ -326,7 +426,7 @@ class StatistiquesGlobalesSerializer(serializers.ModelSerializer):
         return StatisticsService.format_duration(obj.heures_travail_total)
     
     def get_periode_display(self, obj):
-        return obj.periode.strftime('%B %Y')
+        return periode_display_globale(obj.periode)
 
 
 # -----------------------
@@ -446,4 +546,27 @@ class GlobalStatsCalculatedSerializer(serializers.Serializer):
     def get_periode_display(self, obj):
         if obj.get('periode'):
             return obj['periode'].strftime('%B %Y')
-        return "Période non définie"
\ No newline at end of file
+        return "Période non définie"
+
+
+# -----------------------
+# Rapports PDF asynchrones
+# -----------------------
+class RapportJobSerializer(serializers.ModelSerializer):
+    statut_display = serializers.CharField(source='get_statut_display', read_only=True)
+    url_telechargement = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = RapportJob
+        fields = [
+            'id', 'type_rapport', 'parametres', 'statut', 'statut_display',
+            'nom_fichier', 'erreur', 'date_creation', 'date_debut', 'date_fin',
+            'date_expiration', 'url_telechargement'
+        ]
+    
+    def get_url_telechargement(self, obj):
+        if obj.statut != 'termine':
+            return None
+        url = f"/api/rapports/{obj.id}/telecharger/"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
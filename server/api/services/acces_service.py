@@ -0,0 +1,170 @@
+# acces_service.py - Portées d'accès précalculées (employés et départements d'un utilisateur)
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from api.checks import cache_partage
+
+logger = logging.getLogger(__name__)
+
+CLE_VERSION = 'acces:v'
+# Une portée périmée est de toute façon remplacée au changement de version
+TIMEOUT_PORTEE = 3600
+
+
+class PorteeAcces:
+    """Ce qu'un utilisateur peut lire ou modifier, sous forme d'ensembles d'identifiants.
+
+    - ``employes``: CIN des employés créés par l'utilisateur (statistiques,
+      rapports, pointage pour l'employé)
+    - ``departements_responsable``: départements dont il est le responsable
+      (``Departement.responsable`` = son email)
+    - ``employes_responsable``: CIN des employés de ces départements (lecture,
+      modification de leurs pointages)
+    - ``employe_propre``: CIN de la fiche employé de l'utilisateur (``Employe.user``)
+
+    Lecture (listes, statistiques, exports): employés créés, employés des
+    départements dont il est responsable et sa propre fiche.
+    Un superutilisateur (``tout``) a accès à tout: les ensembles restent vides.
+    """
+
+    __slots__ = (
+        'utilisateur_id', 'tout', 'employes', 'departements_responsable', 'employes_responsable', 'employe_propre',
+        'version',
+    )
+
+    def __init__(self, utilisateur_id, tout=False, employes=(), departements_responsable=(), employes_responsable=(),
+                 employe_propre=None, version=None):
+        self.utilisateur_id = utilisateur_id
+        self.tout = tout
+        self.employes = frozenset(employes)
+        self.departements_responsable = frozenset(departements_responsable)
+        self.employes_responsable = frozenset(employes_responsable)
+        self.employe_propre = employe_propre
+        # Version des portées (AccesService) au moment du calcul
+        self.version = version
+
+    def __getstate__(self):
+        return {champ: getattr(self, champ) for champ in self.__slots__}
+
+    def __setstate__(self, etat):
+        for champ, valeur in etat.items():
+            setattr(self, champ, valeur)
+
+    # -----------------------
+    # Tests d'appartenance
+    # -----------------------
+    def peut_lire_employe(self, cin):
+        """Fiche, pointages, statistiques, analyses et rapports d'un employé"""
+        return (
+            self.tout or cin in self.employes or cin in self.employes_responsable
+            or (cin is not None and cin == self.employe_propre)
+        )
+
+    def peut_pointer(self, cin):
+        return self.tout or cin in self.employes
+
+    def peut_modifier(self, obj):
+        """Modification d'un objet: créateur, ou responsable du département de l'employé concerné"""
+        if self.tout:
+            return True
+        if getattr(obj, 'created_by_id', None) == self.utilisateur_id:
+            return True
+        cin = getattr(obj, 'employe_id', None)
+        return cin is not None and cin in self.employes_responsable
+
+    # -----------------------
+    # Filtres SQL
+    # -----------------------
+    def filtre_employes(self, prefixe=''):
+        """Q limitant une requête aux employés de la portée (``prefixe``: chemin vers l'employé, ex. 'employe__')"""
+        if self.tout:
+            return Q()
+        filtre = Q(**{f'{prefixe}created_by_id': self.utilisateur_id}) | Q(**{f'{prefixe}user_id': self.utilisateur_id})
+        if self.departements_responsable:
+            filtre |= Q(**{f'{prefixe}departement_id__in': sorted(self.departements_responsable)})
+        return filtre
+
+    def filtrer_employes(self, queryset, prefixe=''):
+        return queryset if self.tout else queryset.filter(self.filtre_employes(prefixe))
+
+    def cle(self):
+        """Distingue les résultats mis en cache par portée (change avec la version des portées)"""
+        return 'tous' if self.tout else f"u{self.utilisateur_id}:{self.version}"
+
+
+class AccesService:
+    """Résolution des portées d'accès: une fois par requête, en cache par utilisateur.
+
+    La portée est calculée en deux requêtes (départements dont l'utilisateur est
+    responsable, employés créés, rattachés à ces départements ou liés à l'utilisateur) puis conservée
+    dans le cache sous une version globale: toute écriture d'employé ou de
+    département (signaux, imports) incrémente la version et les portées sont
+    recalculées à la demande suivante. Les contrôles d'accès deviennent des tests
+    d'appartenance, sans charger l'employé, son créateur ou son département.
+
+    Avec un cache propre au processus (LocMemCache), les invalidations des autres
+    processus n'arriveraient pas: la portée est alors recalculée à chaque requête.
+    """
+
+    @staticmethod
+    def _version():
+        version = cache.get(CLE_VERSION)
+        if version is None:
+            cache.add(CLE_VERSION, time.time_ns(), timeout=None)
+            version = cache.get(CLE_VERSION)
+        return version
+
+    @staticmethod
+    def invalider():
+        """Toutes les portées sont à recalculer (employé ou département modifié)"""
+        cache.set(CLE_VERSION, time.time_ns(), timeout=None)
+
+    @staticmethod
+    def invalider_apres_commit():
+        transaction.on_commit(AccesService.invalider)
+
+    @staticmethod
+    def _calculer(utilisateur, version):
+        from api.models import Departement, Employe
+
+        departements = set(
+            Departement.objects.filter(responsable=utilisateur.email).values_list('id_departement', flat=True)
+        ) if utilisateur.email else set()
+        employes = set()
+        employes_responsable = set()
+        employe_propre = None
+        for cin, created_by_id, departement_id, user_id in Employe.objects.filter(
+            Q(created_by_id=utilisateur.id) | Q(departement_id__in=departements) | Q(user_id=utilisateur.id)
+        ).values_list('cin', 'created_by_id', 'departement_id', 'user_id'):
+            if created_by_id == utilisateur.id:
+                employes.add(cin)
+            if departement_id in departements:
+                employes_responsable.add(cin)
+            if user_id == utilisateur.id:
+                employe_propre = cin
+        return PorteeAcces(utilisateur.id, False, employes, departements, employes_responsable, employe_propre, version)
+
+    @staticmethod
+    def portee(utilisateur):
+        """Portée de l'utilisateur (mémorisée sur l'instance pour la durée de la requête)"""
+        portee = getattr(utilisateur, '_portee_acces', None)
+        if portee is not None:
+            return portee
+
+        if utilisateur.is_superuser:
+            portee = PorteeAcces(utilisateur.id, tout=True)
+        elif not cache_partage():
+            portee = AccesService._calculer(utilisateur, AccesService._version())
+        else:
+            version = AccesService._version()
+            cle = f"acces:{utilisateur.id}:{version}"
+            portee = cache.get(cle)
+            if portee is None:
+                portee = AccesService._calculer(utilisateur, version)
+                cache.set(cle, portee, timeout=TIMEOUT_PORTEE)
+        utilisateur._portee_acces = portee
+        return portee
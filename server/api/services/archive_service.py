@@ -0,0 +1,432 @@
+# archive_service.py - Archives froides des pointages des années closes (fichiers colonnes NumPy)
+import json
+import logging
+import shutil
+from array import array
+from datetime import date, time, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+# Les archives sont des fichiers .npy lus en mémoire projetée (mmap)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ANNEES_CHAUDES_PAR_DEFAUT = 2
+TAILLE_LOT = 5000
+# Paramètres par requête DELETE (limite SQLite des anciennes versions: 999)
+TAILLE_LOT_SUPPRESSION = 900
+FICHIER_MANIFESTE = 'manifeste.json'
+VERSION_FORMAT = 1
+ABSENT = -1
+
+# Colonne -> code de type de array (stockage compact; les textes sont des codes de dictionnaire)
+COLONNES = {
+    'employe': 'i',
+    'departement': 'i',
+    'jour': 'H',                    # jours depuis le 1er janvier
+    'heure_entree': 'i',            # secondes depuis minuit
+    'heure_sortie': 'i',            # idem, ABSENT si pas de sortie
+    'duree_travail': 'i',           # secondes, ABSENT si non calculée
+    'entree_ponctuelle': 'b',
+    'sortie_ponctuelle': 'b',
+    'ponctualite_statut': 'b',
+    'retard_minutes': 'i',
+    'depart_avance_minutes': 'i',
+    'remarque': 'i',
+    'created_by': 'q',
+}
+DICTIONNAIRES = {
+    'employe': 'employes',
+    'departement': 'departements',
+    'ponctualite_statut': 'statuts',
+    'remarque': 'remarques',
+}
+
+
+class ArchiveError(RuntimeError):
+    """Archivage ou lecture d'archive impossible"""
+
+
+def _secondes(heure):
+    return ABSENT if heure is None else heure.hour * 3600 + heure.minute * 60 + heure.second
+
+
+def _heure(secondes):
+    secondes = int(secondes)
+    return None if secondes == ABSENT else time(secondes // 3600, secondes % 3600 // 60, secondes % 60)
+
+
+class _Dictionnaire:
+    """Encodage d'une colonne texte: valeur -> code (ordre d'apparition), None -> ABSENT"""
+
+    def __init__(self):
+        self.valeurs = []
+        self.codes = {}
+
+    def code(self, valeur):
+        if valeur is None:
+            return ABSENT
+        code = self.codes.get(valeur)
+        if code is None:
+            code = self.codes[valeur] = len(self.valeurs)
+            self.valeurs.append(valeur)
+        return code
+
+
+class ArchiveService:
+    """Pointages des années closes déplacés de la table vers des fichiers colonnes.
+
+    Une archive par année: un fichier .npy par colonne (entiers au plus juste, textes
+    encodés par dictionnaire, identifiants en octets de largeur fixe) et un
+    manifeste JSON. Les fichiers sont lus en mémoire projetée: seules les pages
+    utiles sont chargées. Les agrégats journaliers (PresenceJournaliere) des années
+    archivées sont conservés, les statistiques restent donc servies depuis la base;
+    leur reconstruction et les exports de pointages lisent l'archive.
+
+    Une année archivée est en lecture seule (création/modification de pointages refusée).
+    """
+
+    # -----------------------
+    # Emplacement et état
+    # -----------------------
+    @staticmethod
+    def repertoire():
+        return Path(getattr(settings, 'ARCHIVES_POINTAGES_DIR', Path(settings.BASE_DIR) / 'archives' / 'pointages'))
+
+    @staticmethod
+    def _repertoire_annee(annee):
+        return ArchiveService.repertoire() / str(annee)
+
+    @staticmethod
+    def annees_archivees():
+        racine = ArchiveService.repertoire()
+        if not racine.is_dir():
+            return []
+        return sorted(
+            int(dossier.name) for dossier in racine.iterdir()
+            if dossier.name.isdigit() and (dossier / FICHIER_MANIFESTE).is_file()
+        )
+
+    @staticmethod
+    def est_archivee(jour_ou_annee):
+        annee = getattr(jour_ou_annee, 'year', jour_ou_annee)
+        return (ArchiveService._repertoire_annee(annee) / FICHIER_MANIFESTE).is_file()
+
+    @staticmethod
+    def derniere_annee_archivable():
+        """Dernière année close hors de la fenêtre chaude (ARCHIVES_ANNEES_CHAUDES années)"""
+        annees_chaudes = getattr(settings, 'ARCHIVES_ANNEES_CHAUDES', ANNEES_CHAUDES_PAR_DEFAUT)
+        return timezone.now().date().year - annees_chaudes - 1
+
+    @staticmethod
+    def _verifier_numpy():
+        if not NUMPY_AVAILABLE:
+            raise ArchiveError("Les archives de pointages nécessitent NumPy")
+
+    # -----------------------
+    # Écriture
+    # -----------------------
+    @staticmethod
+    def archiver(annee, forcer=False):
+        """Écrit l'archive d'une année puis retire ses pointages de la table; retourne le nombre de pointages.
+
+        Lecture, écriture et suppression se font dans une transaction, les pointages
+        de l'année verrouillés (select_for_update): seuls les pointages archivés sont
+        supprimés, et si la table ne correspond plus à l'archive (pointage ajouté ou
+        retiré entre-temps) tout est annulé. Les fichiers sont écrits dans un dossier
+        temporaire, relus et comparés au nombre de lignes, puis renommés: une
+        archive n'apparaît qu'une fois complète.
+        """
+        from api.models import Pointage
+
+        ArchiveService._verifier_numpy()
+        if ArchiveService.est_archivee(annee):
+            raise ArchiveError(f"L'année {annee} est déjà archivée")
+        if annee >= timezone.now().date().year:
+            raise ArchiveError(f"L'année {annee} n'est pas close")
+        if not forcer and annee > ArchiveService.derniere_annee_archivable():
+            raise ArchiveError(
+                f"L'année {annee} est trop récente (dernière année archivable: "
+                f"{ArchiveService.derniere_annee_archivable()})"
+            )
+
+        debut = date(annee, 1, 1)
+        dossier = ArchiveService._repertoire_annee(annee)
+        temporaire = dossier.with_name(f".{annee}.tmp")
+        renomme = False
+        try:
+            with transaction.atomic():
+                queryset = Pointage.objects.filter(date_pointage__year=annee)
+                colonnes = {nom: array(code) for nom, code in COLONNES.items()}
+                dictionnaires = {nom: _Dictionnaire() for nom in DICTIONNAIRES}
+                identifiants = []
+
+                lignes = queryset.select_for_update(of=('self',)).order_by('date_pointage', 'employe_id').values_list(
+                    'id_pointage', 'employe_id', 'employe__departement_id', 'date_pointage', 'heure_entree',
+                    'heure_sortie', 'duree_travail', 'entree_ponctuelle', 'sortie_ponctuelle', 'ponctualite_statut',
+                    'retard_minutes', 'depart_avance_minutes', 'remarque', 'created_by_id',
+                ).iterator(chunk_size=TAILLE_LOT)
+                for (id_pointage, cin, departement_id, jour, entree, sortie, duree, entree_ponctuelle,
+                     sortie_ponctuelle, statut, retard, depart, remarque, created_by) in lignes:
+                    identifiants.append(id_pointage)
+                    colonnes['employe'].append(dictionnaires['employe'].code(cin))
+                    colonnes['departement'].append(dictionnaires['departement'].code(departement_id))
+                    colonnes['jour'].append((jour - debut).days)
+                    colonnes['heure_entree'].append(_secondes(entree))
+                    colonnes['heure_sortie'].append(_secondes(sortie))
+                    colonnes['duree_travail'].append(ABSENT if duree is None else int(duree.total_seconds()))
+                    colonnes['entree_ponctuelle'].append(entree_ponctuelle)
+                    colonnes['sortie_ponctuelle'].append(sortie_ponctuelle)
+                    colonnes['ponctualite_statut'].append(dictionnaires['ponctualite_statut'].code(statut))
+                    colonnes['retard_minutes'].append(retard)
+                    colonnes['depart_avance_minutes'].append(depart)
+                    colonnes['remarque'].append(dictionnaires['remarque'].code(remarque))
+                    colonnes['created_by'].append(ABSENT if created_by is None else created_by)
+
+                nb_lignes = len(identifiants)
+                if not nb_lignes:
+                    raise ArchiveError(f"Aucun pointage en {annee}")
+
+                shutil.rmtree(temporaire, ignore_errors=True)
+                temporaire.mkdir(parents=True)
+                np.save(temporaire / 'id_pointage.npy', np.array([i.encode('utf-8') for i in identifiants]))
+                for nom, valeurs in colonnes.items():
+                    np.save(temporaire / f'{nom}.npy', np.frombuffer(valeurs, dtype=valeurs.typecode))
+                manifeste = {
+                    'version': VERSION_FORMAT,
+                    'annee': annee,
+                    'nb_lignes': nb_lignes,
+                    'date_archivage': timezone.now().isoformat(),
+                    'dictionnaires': {
+                        cle: dictionnaires[colonne].valeurs for colonne, cle in DICTIONNAIRES.items()
+                    },
+                }
+                (temporaire / FICHIER_MANIFESTE).write_text(json.dumps(manifeste, ensure_ascii=False), encoding='utf-8')
+
+                relu = ArchiveService._lire(temporaire)
+                if any(len(relu[nom]) != nb_lignes for nom in [*COLONNES, 'id_pointage']):
+                    raise ArchiveError(f"Archive {annee} incomplète après écriture")
+
+                supprimes = ArchiveService._supprimer(identifiants)
+                if supprimes != nb_lignes or queryset.exists():
+                    raise ArchiveError(
+                        f"Pointages {annee} modifiés pendant l'archivage ({supprimes} supprimés pour "
+                        f"{nb_lignes} archivés): archivage annulé"
+                    )
+                temporaire.rename(dossier)
+                renomme = True
+        except Exception:
+            shutil.rmtree(temporaire, ignore_errors=True)
+            if renomme:
+                # Transaction annulée à la validation: pas d'archive sans suppression
+                shutil.rmtree(dossier, ignore_errors=True)
+            raise
+
+        logger.info(f"🧊 Année {annee} archivée: {nb_lignes} pointages retirés de la table")
+        return nb_lignes
+
+    @staticmethod
+    def _supprimer(identifiants):
+        """DELETE SQL des pointages archivés, par lots; retourne le nombre de lignes supprimées.
+
+        Sans passer par QuerySet.delete(): ni collecte ni signaux, les agrégats
+        journaliers (PresenceJournaliere) de l'année restent en place.
+        """
+        from api.models import Pointage
+
+        table = connection.ops.quote_name(Pointage._meta.db_table)
+        colonne = connection.ops.quote_name(Pointage._meta.pk.column)
+        supprimes = 0
+        with connection.cursor() as curseur:
+            for i in range(0, len(identifiants), TAILLE_LOT_SUPPRESSION):
+                lot = identifiants[i:i + TAILLE_LOT_SUPPRESSION]
+                curseur.execute(f"DELETE FROM {table} WHERE {colonne} IN ({', '.join(['%s'] * len(lot))})", lot)
+                supprimes += curseur.rowcount
+        return supprimes
+
+    @staticmethod
+    def restaurer(annee):
+        """Réinsère les pointages d'une année archivée dans la table puis supprime l'archive.
+
+        Les pointages des employés supprimés depuis l'archivage (qui auraient été
+        supprimés avec eux) ne sont pas réinsérés; ils sont signalés dans le journal.
+        """
+        from api.models import Employe, Pointage
+
+        archive = ArchiveService.charger(annee)
+        existants = set(Employe.objects.filter(
+            cin__in=archive['manifeste']['dictionnaires']['employes']
+        ).values_list('cin', flat=True))
+        lot = []
+        total = 0
+        orphelins = 0
+        with transaction.atomic():
+            for ligne in ArchiveService._lignes(annee, archive):
+                if ligne['employe_id'] not in existants:
+                    orphelins += 1
+                    continue
+                lot.append(Pointage(
+                    id_pointage=ligne['id_pointage'],
+                    employe_id=ligne['employe_id'],
+                    date_pointage=ligne['date_pointage'],
+                    heure_entree=ligne['heure_entree'],
+                    heure_sortie=ligne['heure_sortie'],
+                    remarque=ligne['remarque'],
+                    duree_travail=ligne['duree_travail'],
+                    entree_ponctuelle=ligne['entree_ponctuelle'],
+                    sortie_ponctuelle=ligne['sortie_ponctuelle'],
+                    ponctualite_statut=ligne['ponctualite_statut'],
+                    retard_minutes=ligne['retard_minutes'],
+                    depart_avance_minutes=ligne['depart_avance_minutes'],
+                    created_by_id=ligne['created_by_id'],
+                ))
+                if len(lot) >= TAILLE_LOT:
+                    Pointage.objects.bulk_create(lot)
+                    total += len(lot)
+                    lot = []
+            Pointage.objects.bulk_create(lot)
+            total += len(lot)
+        shutil.rmtree(ArchiveService._repertoire_annee(annee))
+        ArchiveService._charger.cache_clear()
+        if orphelins:
+            logger.warning(f"⚠️ Année {annee}: {orphelins} pointages d'employés supprimés non restaurés")
+        logger.info(f"🔥 Année {annee} restaurée: {total} pointages")
+        return total
+
+    # -----------------------
+    # Lecture
+    # -----------------------
+    @staticmethod
+    def _lire(dossier):
+        archive = {
+            nom: np.load(dossier / f'{nom}.npy', mmap_mode='r')
+            for nom in [*COLONNES, 'id_pointage']
+        }
+        archive['manifeste'] = json.loads((dossier / FICHIER_MANIFESTE).read_text(encoding='utf-8'))
+        return archive
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _charger(annee, version):
+        return ArchiveService._lire(ArchiveService._repertoire_annee(annee))
+
+    @staticmethod
+    def charger(annee):
+        """Colonnes projetées en mémoire et manifeste d'une année archivée"""
+        ArchiveService._verifier_numpy()
+        manifeste = ArchiveService._repertoire_annee(annee) / FICHIER_MANIFESTE
+        if not manifeste.is_file():
+            raise ArchiveError(f"L'année {annee} n'est pas archivée")
+        # Clé de cache: date du manifeste (archive restaurée puis réécrite)
+        return ArchiveService._charger(annee, manifeste.stat().st_mtime_ns)
+
+    @staticmethod
+    def _selection(annee, archive, debut=None, fin=None, cins=None):
+        """Indices des lignes dans [debut, fin] (et pour ces employés), dans l'ordre (date, employé)"""
+        jours = archive['jour']
+        premier, dernier = date(annee, 1, 1), date(annee, 12, 31)
+        debut = max(debut or premier, premier)
+        fin = min(fin or dernier, dernier)
+        if debut > fin:
+            return np.arange(0)
+        # Lignes triées par jour: bornes par recherche dichotomique
+        gauche = int(np.searchsorted(jours, (debut - premier).days, 'left'))
+        droite = int(np.searchsorted(jours, (fin - premier).days, 'right'))
+        indices = np.arange(gauche, droite)
+        if cins is not None:
+            codes = [
+                code for code, cin in enumerate(archive['manifeste']['dictionnaires']['employes'])
+                if cin in cins
+            ]
+            indices = indices[np.isin(archive['employe'][gauche:droite], codes)]
+        return indices
+
+    @staticmethod
+    def _lignes(annee, archive, debut=None, fin=None, cins=None):
+        """Pointages archivés sous forme de dicts (champs du modèle)"""
+        dictionnaires = archive['manifeste']['dictionnaires']
+        premier = date(annee, 1, 1)
+        indices = ArchiveService._selection(annee, archive, debut, fin, cins)
+        for debut_lot in range(0, len(indices), TAILLE_LOT):
+            lot = indices[debut_lot:debut_lot + TAILLE_LOT]
+            valeurs = {nom: archive[nom][lot].tolist() for nom in [*COLONNES, 'id_pointage']}
+            for i in range(len(lot)):
+                remarque = valeurs['remarque'][i]
+                duree = valeurs['duree_travail'][i]
+                created_by = valeurs['created_by'][i]
+                departement = valeurs['departement'][i]
+                yield {
+                    'id_pointage': valeurs['id_pointage'][i].decode('utf-8'),
+                    'employe_id': dictionnaires['employes'][valeurs['employe'][i]],
+                    'departement_id': None if departement == ABSENT else dictionnaires['departements'][departement],
+                    'date_pointage': premier + timedelta(days=valeurs['jour'][i]),
+                    'heure_entree': _heure(valeurs['heure_entree'][i]),
+                    'heure_sortie': _heure(valeurs['heure_sortie'][i]),
+                    'duree_travail': None if duree == ABSENT else timedelta(seconds=duree),
+                    'entree_ponctuelle': bool(valeurs['entree_ponctuelle'][i]),
+                    'sortie_ponctuelle': bool(valeurs['sortie_ponctuelle'][i]),
+                    'ponctualite_statut': dictionnaires['statuts'][valeurs['ponctualite_statut'][i]],
+                    'retard_minutes': valeurs['retard_minutes'][i],
+                    'depart_avance_minutes': valeurs['depart_avance_minutes'][i],
+                    'remarque': None if remarque == ABSENT else dictionnaires['remarques'][remarque],
+                    'created_by_id': None if created_by == ABSENT else created_by,
+                }
+
+    @staticmethod
+    def lignes(annee, debut=None, fin=None, cins=None):
+        """Pointages archivés d'une année, triés par (date, employé), éventuellement filtrés"""
+        return ArchiveService._lignes(annee, ArchiveService.charger(annee), debut, fin, cins)
+
+    @staticmethod
+    def presences(annee, debut=None, fin=None):
+        """Champs PresenceJournaliere des pointages complets archivés (reconstruction des agrégats)"""
+        for ligne in ArchiveService.lignes(annee, debut, fin):
+            if ligne['duree_travail'] is None:
+                continue
+            yield {
+                'employe_id': ligne['employe_id'],
+                'departement_id': ligne['departement_id'],
+                'date': ligne['date_pointage'],
+                'secondes_travail': int(ligne['duree_travail'].total_seconds()),
+                'retard_minutes': ligne['retard_minutes'],
+                'depart_avance_minutes': ligne['depart_avance_minutes'],
+                'ponctualite_statut': ligne['ponctualite_statut'],
+            }
+
+    @staticmethod
+    def totaux(annee, debut=None, fin=None):
+        """(nombre, secondes de travail) des pointages complets de la période, vectorisé"""
+        archive = ArchiveService.charger(annee)
+        durees = archive['duree_travail'][ArchiveService._selection(annee, archive, debut, fin)]
+        durees = durees[durees != ABSENT]
+        return len(durees), int(durees.sum(dtype=np.int64))
+
+    @staticmethod
+    def segments(debut=None, fin=None):
+        """Découpe [debut, fin] (bornes optionnelles) en segments (annee archivée ou None, debut, fin).
+
+        Les segments None sont à lire en base; l'ordre chronologique est conservé.
+        """
+        segments = []
+        curseur = debut
+        for annee in ArchiveService.annees_archivees():
+            premier, dernier = date(annee, 1, 1), date(annee, 12, 31)
+            if (fin and premier > fin) or (curseur and dernier < curseur):
+                continue
+            if curseur is None or curseur < premier:
+                segments.append((None, curseur, premier - timedelta(days=1)))
+            segments.append((annee, max(curseur or premier, premier), min(fin or dernier, dernier)))
+            curseur = dernier + timedelta(days=1)
+        if not (curseur and fin and curseur > fin):
+            segments.append((None, curseur, fin))
+        return segments
@@ -0,0 +1,103 @@
+# classement_service.py - Classement des employés (agrégats groupés + fonctions de fenêtrage)
+import logging
+
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, IntegerField, Q, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce, PercentRank, Rank, RowNumber, Round
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Critère -> ordre du classement (le meilleur en premier)
+CRITERES = {
+    'heures': (F('secondes_travail').desc(),),
+    'taux_parfait': (F('taux_parfait').desc(), F('jours_travailles').desc()),
+    'absences': (F('jours_absents').asc(),),
+}
+CRITERE_PAR_DEFAUT = 'heures'
+
+
+class ClassementService:
+    """Classement d'employés sur une période, calculé entièrement en base.
+
+    Une requête: présences journalières agrégées par employé (LEFT JOIN, les
+    employés sans présence sont classés derniers), puis rang, rang dans le
+    département et percentile par fonctions de fenêtrage. ``position`` (rang
+    sans ex æquo) sert de curseur à la pagination.
+    """
+
+    @staticmethod
+    def jours_passes(debut, fin):
+        """Jours calendaires écoulés de la période (même base que les statistiques mensuelles)"""
+        fin = min(fin, timezone.now().date())
+        return max(0, (fin - debut).days + 1)
+
+    @staticmethod
+    def classement(debut, fin, critere=CRITERE_PAR_DEFAUT, departement=None, statut=None, portee=None):
+        """QuerySet de dictionnaires (values) trié par position; ``portee`` (PorteeAcces) limite les employés classés"""
+        from api.models import Employe
+
+        if critere not in CRITERES:
+            raise ValueError(f"Critère inconnu: {critere} ({', '.join(CRITERES)})")
+
+        employes = Employe.objects.all()
+        if departement:
+            employes = employes.filter(departement_id=departement)
+        if statut:
+            employes = employes.filter(statut=statut)
+        if portee is not None:
+            employes = portee.filtrer_employes(employes)
+
+        periode = Q(presences__date__range=(debut, min(fin, timezone.now().date())))
+        jours_passes = ClassementService.jours_passes(debut, fin)
+        employes = employes.annotate(
+            jours_travailles=Count('presences', filter=periode),
+            secondes_travail=Coalesce(Sum('presences__secondes_travail', filter=periode), 0),
+            ponctualite_parfaite=Count('presences', filter=periode & Q(presences__ponctualite_statut='parfait')),
+        ).annotate(
+            jours_absents=ExpressionWrapper(
+                Value(jours_passes) - F('jours_travailles'), output_field=IntegerField()
+            ),
+            taux_parfait=Case(
+                When(jours_travailles__gt=0, then=Round(
+                    F('ponctualite_parfaite') * 100.0 / F('jours_travailles'), 2
+                )),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+
+        ordre = CRITERES[critere]
+        return employes.annotate(
+            rang=Window(Rank(), order_by=ordre),
+            rang_departement=Window(Rank(), partition_by=F('departement_id'), order_by=ordre),
+            rang_relatif=Window(PercentRank(), order_by=ordre),
+            position=Window(RowNumber(), order_by=(*ordre, F('cin').asc())),
+        ).values(
+            'position', 'rang', 'rang_departement', 'rang_relatif',
+            'cin', 'matricule', 'nom', 'prenom', 'titre', 'statut', 'departement_id', 'departement__nom',
+            'jours_travailles', 'jours_absents', 'secondes_travail', 'ponctualite_parfaite', 'taux_parfait',
+        ).order_by('position')
+
+    @staticmethod
+    def formater(ligne):
+        """Ligne de classement pour l'API (heures décimales, percentile 0-100, 100 = meilleur)"""
+        return {
+            'position': ligne['position'],
+            'rang': ligne['rang'],
+            'rang_departement': ligne['rang_departement'],
+            'percentile': round((1 - ligne['rang_relatif']) * 100, 1),
+            'cin': ligne['cin'],
+            'matricule': ligne['matricule'],
+            'nom_complet': f"{ligne['nom']} {ligne['prenom']}",
+            'titre': ligne['titre'],
+            'statut': ligne['statut'],
+            'departement': ligne['departement_id'],
+            'departement_nom': ligne['departement__nom'],
+            'heures_travaillees': round(ligne['secondes_travail'] / 3600, 2),
+            'jours_travailles': ligne['jours_travailles'],
+            'jours_absents': ligne['jours_absents'],
+            'ponctualite_parfaite': ligne['ponctualite_parfaite'],
+            'taux_parfait': ligne['taux_parfait'],
+        }
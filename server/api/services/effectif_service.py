@@ -0,0 +1,82 @@
+# effectif_service.py - Compteur d'employés par département (Departement.nbr_employe)
+import logging
+from collections import Counter
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+
+class EffectifService:
+    """Maintient nbr_employe par incréments atomiques (F()) plutôt que par recomptage.
+
+    Les écritures d'employés ajustent le compteur du ou des départements touchés
+    par un UPDATE relatif, sans relire ni réécrire la ligne du département.
+    Les modifications qui contournent save()/delete() (QuerySet.update,
+    SQL brut) se corrigent avec ``manage.py reconcilier_effectifs``.
+    """
+
+    @staticmethod
+    def ajuster(deltas):
+        """Applique {id_departement: delta} en une seule requête"""
+        from api.models import Departement
+
+        deltas = {dep: delta for dep, delta in Counter(deltas).items() if dep and delta}
+        if not deltas:
+            return 0
+        if len(deltas) == 1:
+            (dep, delta), = deltas.items()
+            expression = F('nbr_employe') + delta
+        else:
+            expression = F('nbr_employe') + Case(
+                *[When(pk=dep, then=Value(delta)) for dep, delta in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        return Departement.objects.filter(pk__in=deltas).update(nbr_employe=expression)
+
+    @staticmethod
+    def deplacer(ancien_departement_id, nouveau_departement_id):
+        """Un employé change de département"""
+        if ancien_departement_id == nouveau_departement_id:
+            return 0
+        return EffectifService.ajuster({ancien_departement_id: -1, nouveau_departement_id: 1})
+
+    @staticmethod
+    def recompter(ids_departements):
+        """Recalcule exactement le compteur des départements donnés"""
+        from api.models import Departement, Employe
+
+        effectif = Employe.objects.filter(departement=OuterRef('pk')).order_by().values(
+            'departement'
+        ).annotate(total=Count('pk')).values('total')
+        return Departement.objects.filter(pk__in=set(ids_departements)).update(
+            nbr_employe=Coalesce(Subquery(effectif), 0)
+        )
+
+    @staticmethod
+    def reconcilier(corriger=True):
+        """Compare les compteurs aux effectifs réels (une requête groupée).
+
+        Retourne la liste des écarts (id_departement, compteur, effectif réel);
+        les compteurs faux sont corrigés si ``corriger``.
+        """
+        from api.models import Departement
+
+        ecarts = [
+            (dep, compteur, reel)
+            for dep, compteur, reel in Departement.objects.annotate(
+                reel=Count('employes')
+            ).values_list('pk', 'nbr_employe', 'reel').order_by('pk')
+            if compteur != reel
+        ]
+        if ecarts and corriger:
+            Departement.objects.filter(pk__in=[dep for dep, _, _ in ecarts]).update(
+                nbr_employe=Case(
+                    *[When(pk=dep, then=Value(reel)) for dep, _, reel in ecarts],
+                    output_field=IntegerField(),
+                )
+            )
+            logger.warning(f"⚠️ Effectifs corrigés pour {len(ecarts)} département(s)")
+        return ecarts
@@ -0,0 +1,244 @@
+# employe_import_service.py - Import en masse des employés
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.dateparse import parse_time
+
+from .acces_service import AccesService
+from .effectif_service import EffectifService
+from .pointage_import_service import PointageImportService
+from .recherche_service import RechercheService
+from .stats_cache import StatsCache
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 1000
+MAX_LIGNES_PAR_DEFAUT = 10000
+TITRES = ('stagiaire', 'employe')
+STATUTS = ('actif', 'inactif')
+LONGUEURS = {'nom': 100, 'prenom': 100, 'poste': 100, 'telephone': 50, 'email': 254}
+
+
+class ImportEmployesError(ValueError):
+    """Lot rejeté dans son ensemble (format illisible, trop de lignes)"""
+
+
+class EmployeImportService:
+    """Création d'un lot d'employés sans la cascade par ligne de Employe.save().
+
+    Les règles de Employe.clean() (CIN, matricule selon le titre, unicités) sont
+    vérifiées en mémoire avec une requête par lot pour les départements, CIN,
+    emails et matricules déjà pris; les lignes valides sont insérées par
+    bulk_create puis les compteurs des départements sont ajustés en une requête.
+    """
+
+    lire_csv = staticmethod(PointageImportService.lire_csv)
+
+    @staticmethod
+    def lire_donnees(donnees):
+        """Accepte une liste d'employés ou {"employes": [...]}"""
+        if isinstance(donnees, dict):
+            donnees = donnees.get('employes')
+        if not isinstance(donnees, list):
+            raise ImportEmployesError("Le corps doit être une liste d'employés (ou {\"employes\": [...]}).")
+        return donnees
+
+    # -----------------------
+    # Validation
+    # -----------------------
+    @staticmethod
+    def _analyser_ligne(ligne):
+        """Convertit une ligne brute; retourne (valeurs, erreurs)"""
+        texte = PointageImportService._texte
+        erreurs = []
+
+        if not isinstance(ligne, dict):
+            return None, ["Ligne invalide: objet attendu."]
+
+        valeurs = {
+            champ: texte(ligne.get(champ))
+            for champ in ('cin', 'matricule', 'nom', 'prenom', 'email', 'telephone', 'poste', 'departement')
+        }
+        valeurs['titre'] = texte(ligne.get('titre')) or 'stagiaire'
+        valeurs['statut'] = texte(ligne.get('statut')) or 'actif'
+
+        cin = valeurs['cin']
+        if not cin:
+            erreurs.append("cin est requis.")
+        elif len(cin) != 12 or not cin.isdigit():
+            erreurs.append("Le CIN doit contenir exactement 12 chiffres")
+
+        for champ in ('nom', 'prenom', 'email', 'poste', 'departement'):
+            if not valeurs[champ]:
+                erreurs.append(f"{champ} est requis.")
+        for champ, longueur in LONGUEURS.items():
+            if valeurs[champ] and len(valeurs[champ]) > longueur:
+                erreurs.append(f"{champ} ne doit pas dépasser {longueur} caractères.")
+        if valeurs['email']:
+            try:
+                validate_email(valeurs['email'])
+            except ValidationError:
+                erreurs.append(f"email invalide: {valeurs['email']}")
+
+        if valeurs['titre'] not in TITRES:
+            erreurs.append(f"titre invalide: {valeurs['titre']}")
+        if valeurs['statut'] not in STATUTS:
+            erreurs.append(f"statut invalide: {valeurs['statut']}")
+
+        matricule = valeurs['matricule']
+        if valeurs['titre'] == 'employe' and not matricule:
+            erreurs.append("Le matricule est obligatoire pour les employés fixes")
+        elif valeurs['titre'] == 'stagiaire' and matricule:
+            erreurs.append("Le matricule est réservé aux employés fixes uniquement")
+        elif matricule and (len(matricule) != 6 or not matricule.isdigit()):
+            erreurs.append("Le matricule doit contenir exactement 6 chiffres")
+
+        for champ in ('heure_entree_attendue', 'heure_sortie_attendue'):
+            brut = texte(ligne.get(champ))
+            if brut is None:
+                continue
+            try:
+                valeurs[champ] = parse_time(brut)
+            except ValueError:
+                valeurs[champ] = None
+            if valeurs[champ] is None:
+                erreurs.append(f"{champ} invalide: {brut}")
+
+        brut = texte(ligne.get('marge_tolerance_minutes'))
+        if brut is not None:
+            try:
+                valeurs['marge_tolerance_minutes'] = int(brut)
+            except ValueError:
+                erreurs.append(f"marge_tolerance_minutes invalide: {brut}")
+
+        return valeurs, erreurs
+
+    @staticmethod
+    def _existants(queryset, champ, valeurs):
+        """Valeurs de ``champ`` déjà présentes en base, par paquets de TAILLE_LOT"""
+        valeurs = list(valeurs)
+        existants = set()
+        for i in range(0, len(valeurs), TAILLE_LOT):
+            existants.update(queryset.filter(
+                **{f'{champ}__in': valeurs[i:i + TAILLE_LOT]}
+            ).values_list(champ, flat=True))
+        return existants
+
+    # -----------------------
+    # Import
+    # -----------------------
+    @staticmethod
+    def importer(lignes, utilisateur):
+        """Valide et crée le lot; retourne le résumé et le résultat de chaque ligne"""
+        from api.models import Departement, Employe
+
+        max_lignes = getattr(settings, 'EMPLOYE_BULK_MAX_LIGNES', MAX_LIGNES_PAR_DEFAUT)
+        if len(lignes) > max_lignes:
+            raise ImportEmployesError(f"Lot trop volumineux: {len(lignes)} lignes (maximum {max_lignes}).")
+
+        resultats = []
+        valides = []
+        for numero, ligne in enumerate(lignes, start=1):
+            valeurs, erreurs = EmployeImportService._analyser_ligne(ligne)
+            resultat = {
+                'ligne': numero,
+                'cin': valeurs.get('cin') if valeurs else None,
+                'statut': 'erreur',
+                'erreurs': erreurs,
+            }
+            resultats.append(resultat)
+            if not erreurs:
+                valides.append((resultat, valeurs))
+
+        # Une requête par contrainte pour tout le lot
+        departements = set(Departement.objects.filter(
+            pk__in={valeurs['departement'] for _, valeurs in valides}
+        ).values_list('pk', flat=True))
+        existants = Employe.objects.all()
+        cins_pris = EmployeImportService._existants(
+            existants, 'cin', {valeurs['cin'] for _, valeurs in valides}
+        )
+        emails_pris = EmployeImportService._existants(
+            existants, 'email', {valeurs['email'] for _, valeurs in valides}
+        )
+        matricules_pris = EmployeImportService._existants(
+            existants.filter(titre='employe'), 'matricule',
+            {valeurs['matricule'] for _, valeurs in valides if valeurs['titre'] == 'employe'}
+        )
+
+        cins_lot, emails_lot, matricules_lot = set(), set(), set()
+        a_creer = []
+        for resultat, valeurs in valides:
+            erreurs = resultat['erreurs']
+            matricule = valeurs['matricule'] if valeurs['titre'] == 'employe' else None
+
+            if valeurs['departement'] not in departements:
+                erreurs.append("Département non trouvé.")
+            if valeurs['cin'] in cins_pris:
+                erreurs.append("Un employé avec ce CIN existe déjà.")
+            elif valeurs['cin'] in cins_lot:
+                erreurs.append("CIN en double dans le lot.")
+            if valeurs['email'] in emails_pris:
+                erreurs.append("Un employé avec cet email existe déjà.")
+            elif valeurs['email'] in emails_lot:
+                erreurs.append("Email en double dans le lot.")
+            if matricule and matricule in matricules_pris:
+                erreurs.append("Ce matricule est déjà attribué à un autre employé fixe")
+            elif matricule and matricule in matricules_lot:
+                erreurs.append("Matricule en double dans le lot.")
+            if erreurs:
+                continue
+
+            cins_lot.add(valeurs['cin'])
+            emails_lot.add(valeurs['email'])
+            if matricule:
+                matricules_lot.add(matricule)
+
+            options = {
+                champ: valeurs[champ]
+                for champ in ('heure_entree_attendue', 'heure_sortie_attendue', 'marge_tolerance_minutes')
+                if valeurs.get(champ) is not None
+            }
+            a_creer.append(Employe(
+                cin=valeurs['cin'],
+                titre=valeurs['titre'],
+                matricule=matricule,
+                nom=valeurs['nom'],
+                prenom=valeurs['prenom'],
+                email=valeurs['email'],
+                telephone=valeurs['telephone'],
+                poste=valeurs['poste'],
+                departement_id=valeurs['departement'],
+                statut=valeurs['statut'],
+                created_by=utilisateur,
+                **options
+            ))
+            resultat['statut'] = 'cree'
+
+        if a_creer:
+            effectifs = Counter(employe.departement_id for employe in a_creer)
+            with transaction.atomic():
+                Employe.objects.bulk_create(a_creer, batch_size=TAILLE_LOT)
+                # bulk_create n'envoie pas post_save: compteurs et versions du cache ajustés ici
+                EffectifService.ajuster(effectifs)
+                AccesService.invalider_apres_commit()
+                RechercheService.invalider_apres_commit()
+                StatsCache.incrementer_versions_apres_commit(
+                    {"global"} | {f"dep:{departement}" for departement in effectifs}
+                )
+
+        for resultat in resultats:
+            if not resultat['erreurs']:
+                del resultat['erreurs']
+
+        logger.info(f"📥 Import employés: {len(a_creer)} créés, {len(resultats) - len(a_creer)} rejetés")
+        return {
+            'total': len(resultats),
+            'crees': len(a_creer),
+            'erreurs': len(resultats) - len(a_creer),
+            'resultats': resultats,
+        }
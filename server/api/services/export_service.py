@@ -0,0 +1,263 @@
+# export_service.py - Exports en flux (CSV / NDJSON) des pointages et statistiques
+import csv
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .archive_service import ArchiveService
+from .statistics_service import StatisticsService, DurationFormatter
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 2000
+FORMATS = ('csv', 'ndjson')
+
+
+class _Tampon:
+    """Pseudo-fichier: csv.writer écrit une ligne, on la récupère telle quelle"""
+
+    def write(self, valeur):
+        return valeur
+
+
+class ExportService:
+    """Générateurs de lignes pour StreamingHttpResponse.
+
+    Chaque export lit la base par un curseur côté serveur (iterator) et produit
+    les lignes au fil de l'eau: la mémoire reste constante quelle que soit la
+    période exportée.
+    """
+
+    # -----------------------
+    # Sérialisation
+    # -----------------------
+    @staticmethod
+    def _valeur(valeur):
+        if isinstance(valeur, timedelta):
+            return DurationFormatter.format_for_frontend(valeur)
+        if isinstance(valeur, (date, datetime, time)):
+            return valeur.isoformat()
+        return valeur
+
+    @staticmethod
+    def flux(colonnes, lignes, format_sortie='csv'):
+        """Encode les lignes (tuples dans l'ordre des colonnes) en CSV ou NDJSON"""
+        if format_sortie == 'ndjson':
+            for ligne in lignes:
+                yield json.dumps(
+                    dict(zip(colonnes, map(ExportService._valeur, ligne))),
+                    ensure_ascii=False
+                ) + '\n'
+            return
+
+        ecrivain = csv.writer(_Tampon())
+        yield ecrivain.writerow(colonnes)
+        for ligne in lignes:
+            yield ecrivain.writerow([
+                '' if valeur is None else ExportService._valeur(valeur) for valeur in ligne
+            ])
+
+    @staticmethod
+    def _filtres_employe(prefixe, departement=None, statut=None, portee=None):
+        """Q sur l'employé (``prefixe``: chemin vers l'employé); ``portee`` (PorteeAcces) limite aux employés accessibles"""
+        filtres = Q()
+        if departement:
+            filtres &= Q(**{f'{prefixe}departement_id': departement})
+        if statut:
+            filtres &= Q(**{f'{prefixe}statut': statut})
+        if portee is not None:
+            filtres &= portee.filtre_employes(prefixe)
+        return filtres
+
+    # -----------------------
+    # Pointages
+    # -----------------------
+    COLONNES_POINTAGES = [
+        'id_pointage', 'employe_cin', 'employe_matricule', 'employe_nom', 'employe_prenom',
+        'departement', 'date_pointage', 'heure_entree', 'heure_sortie', 'duree_travail',
+        'retard_minutes', 'depart_avance_minutes', 'ponctualite_statut', 'remarque',
+    ]
+
+    @staticmethod
+    def lignes_pointages(debut=None, fin=None, departement=None, statut=None, portee=None):
+        """Pointages triés par date; les années archivées sont lues dans leur archive"""
+        for annee, debut_segment, fin_segment in ArchiveService.segments(debut, fin):
+            if annee is None:
+                yield from ExportService._lignes_pointages_base(
+                    debut_segment, fin_segment, departement, statut, portee
+                )
+            else:
+                yield from ExportService._lignes_pointages_archive(
+                    annee, debut_segment, fin_segment, departement, statut, portee
+                )
+
+    @staticmethod
+    def _lignes_pointages_base(debut=None, fin=None, departement=None, statut=None, portee=None):
+        from api.models import Pointage
+
+        queryset = Pointage.objects.filter(
+            ExportService._filtres_employe('employe__', departement, statut, portee)
+        )
+        if debut:
+            queryset = queryset.filter(date_pointage__gte=debut)
+        if fin:
+            queryset = queryset.filter(date_pointage__lte=fin)
+
+        return queryset.order_by('date_pointage', 'employe_id').values_list(
+            'id_pointage', 'employe_id', 'employe__matricule', 'employe__nom', 'employe__prenom',
+            'employe__departement_id', 'date_pointage', 'heure_entree', 'heure_sortie', 'duree_travail',
+            'retard_minutes', 'depart_avance_minutes', 'ponctualite_statut', 'remarque',
+        ).iterator(chunk_size=TAILLE_LOT)
+
+    @staticmethod
+    def _lignes_pointages_archive(annee, debut, fin, departement=None, statut=None, portee=None):
+        """Mêmes colonnes que _lignes_pointages_base; les employés sont lus en base (filtres inclus)"""
+        from api.models import Employe
+
+        employes = {
+            cin: (matricule, nom, prenom, departement_id)
+            for cin, matricule, nom, prenom, departement_id in Employe.objects.filter(
+                ExportService._filtres_employe('', departement, statut, portee)
+            ).values_list('cin', 'matricule', 'nom', 'prenom', 'departement_id')
+        }
+        restreint = departement or statut or (portee is not None and not portee.tout)
+        filtre = set(employes) if restreint else None
+        for ligne in ArchiveService.lignes(annee, debut, fin, filtre):
+            # Employé supprimé depuis l'archivage: identité inconnue
+            matricule, nom, prenom, departement_id = employes.get(ligne['employe_id'], (None, None, None, None))
+            yield (
+                ligne['id_pointage'], ligne['employe_id'], matricule, nom, prenom, departement_id,
+                ligne['date_pointage'], ligne['heure_entree'], ligne['heure_sortie'], ligne['duree_travail'],
+                ligne['retard_minutes'], ligne['depart_avance_minutes'], ligne['ponctualite_statut'],
+                ligne['remarque'],
+            )
+
+    # -----------------------
+    # Statistiques sauvegardées
+    # -----------------------
+    COLONNES_STATISTIQUES_EMPLOYE = [
+        'employe_cin', 'employe_matricule', 'employe_nom', 'employe_prenom', 'departement',
+        'type_periode', 'periode_debut', 'periode_fin',
+        'heures_travail_total', 'jours_travailles', 'jours_absents', 'moyenne_heures_quotidiennes',
+        'ponctualite_parfaite', 'ponctualite_acceptable', 'ponctualite_inacceptable',
+        'retard_moyen_minutes', 'depart_avance_moyen_minutes',
+        'regularite_statut', 'taux_regularite', 'taux_presence', 'taux_absence',
+        'jours_total', 'heures_attendues', 'ecart_heures', 'date_calcul',
+    ]
+
+    @staticmethod
+    def lignes_statistiques_employe(debut=None, fin=None, departement=None, statut=None, type_periode=None,
+                                    portee=None):
+        from api.models import StatistiquesEmploye
+
+        queryset = StatistiquesEmploye.objects.filter(
+            ExportService._filtres_employe('employe__', departement, statut, portee)
+        )
+        if debut:
+            queryset = queryset.filter(periode_fin__gte=debut)
+        if fin:
+            queryset = queryset.filter(periode_debut__lte=fin)
+        if type_periode:
+            queryset = queryset.filter(type_periode=type_periode)
+
+        return queryset.order_by('periode_debut', 'employe_id', 'id').values_list(
+            'employe_id', 'employe__matricule', 'employe__nom', 'employe__prenom', 'employe__departement_id',
+            'type_periode', 'periode_debut', 'periode_fin',
+            'heures_travail_total', 'jours_travailles', 'jours_absents', 'moyenne_heures_quotidiennes',
+            'ponctualite_parfaite', 'ponctualite_acceptable', 'ponctualite_inacceptable',
+            'retard_moyen_minutes', 'depart_avance_moyen_minutes',
+            'regularite_statut', 'taux_regularite', 'taux_presence', 'taux_absence',
+            'jours_total', 'heures_attendues', 'ecart_heures', 'date_calcul',
+        ).iterator(chunk_size=TAILLE_LOT)
+
+    # -----------------------
+    # Statistiques mensuelles calculées
+    # -----------------------
+    COLONNES_STATS_MENSUELLES = [
+        'employe_cin', 'employe_matricule', 'employe_nom', 'employe_prenom', 'departement', 'mois',
+        'jours_travailles', 'jours_absents', 'jours_total_passes',
+        'heures_travail_total_hours', 'heures_attendues_jours_passes_hours', 'moyenne_heures_quotidiennes',
+        'statut_heures', 'pourcentage_ecart',
+        'ponctualite_parfaite', 'ponctualite_acceptable', 'ponctualite_inacceptable',
+        'retard_moyen_minutes', 'depart_avance_moyen_minutes',
+        'regularite_statut', 'taux_regularite', 'taux_presence', 'taux_absence',
+    ]
+
+    @staticmethod
+    def _mois_entre(debut, fin):
+        mois = debut.replace(day=1)
+        while mois <= fin:
+            yield mois
+            mois = (mois + timedelta(days=32)).replace(day=1)
+
+    @staticmethod
+    def lignes_stats_mensuelles(debut, fin, departement=None, statut=None, portee=None):
+        """Statistiques mensuelles de chaque employé, mois par mois, sur [debut, fin].
+
+        Deux curseurs triés par employé (employés, totaux mensuels groupés en SQL)
+        sont fusionnés au fil de l'eau; les mois sans présence donnent des
+        statistiques à zéro comme StatisticsService.calculate_employee_monthly_stats.
+        """
+        from api.models import Employe, PresenceJournaliere
+
+        debut = debut.replace(day=1)
+        fin_mois = (fin.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        fin = min(fin_mois, max(debut, timezone.now().date()))
+        mois_periode = list(ExportService._mois_entre(debut, fin))
+
+        employes = Employe.objects.filter(
+            ExportService._filtres_employe('', departement, statut, portee)
+        ).order_by('cin').only(
+            'cin', 'matricule', 'nom', 'prenom', 'departement_id'
+        ).iterator(chunk_size=TAILLE_LOT)
+
+        totaux_mensuels = PresenceJournaliere.objects.filter(
+            ExportService._filtres_employe('employe__', departement, statut, portee),
+            date__range=(debut, fin),
+        ).annotate(mois=TruncMonth('date')).values('employe_id', 'mois').annotate(
+            jours_travailles=Count('pk'),
+            secondes_travail=Sum('secondes_travail'),
+            retard_total=Sum('retard_minutes'),
+            depart_avance_total=Sum('depart_avance_minutes'),
+            ponctualite_parfaite=Count('pk', filter=Q(ponctualite_statut='parfait')),
+            ponctualite_acceptable=Count('pk', filter=Q(ponctualite_statut='acceptable')),
+            ponctualite_inacceptable=Count('pk', filter=Q(ponctualite_statut='inacceptable')),
+        ).order_by('employe_id', 'mois').iterator(chunk_size=TAILLE_LOT)
+
+        totaux_vides = {
+            'jours_travailles': 0, 'secondes_travail': 0, 'retard_total': 0, 'depart_avance_total': 0,
+            'ponctualite_parfaite': 0, 'ponctualite_acceptable': 0, 'ponctualite_inacceptable': 0,
+        }
+        suivant = next(totaux_mensuels, None)
+
+        for employe in employes:
+            # Totaux de l'employé courant (mêmes filtres et même tri par cin des deux côtés)
+            totaux_employe = {}
+            while suivant is not None and suivant['employe_id'] == employe.cin:
+                mois = suivant['mois']
+                mois = mois.date() if isinstance(mois, datetime) else mois
+                totaux_employe[mois] = {cle: suivant[cle] or 0 for cle in totaux_vides}
+                suivant = next(totaux_mensuels, None)
+
+            for mois in mois_periode:
+                stats = StatisticsService._stats_mensuelles_depuis_totaux(
+                    employe, mois, totaux_employe.get(mois, totaux_vides)
+                )
+                yield (
+                    employe.cin, employe.matricule, employe.nom, employe.prenom, employe.departement_id,
+                    mois.strftime('%Y-%m'),
+                    stats['jours_travailles'], stats['jours_absents'], stats['jours_total_passes'],
+                    round(stats['heures_travail_total_hours'], 2),
+                    round(stats['heures_attendues_jours_passes_hours'], 2),
+                    stats['moyenne_heures_quotidiennes'],
+                    stats['statut_heures'], stats['pourcentage_ecart'],
+                    stats['ponctualite_parfaite'], stats['ponctualite_acceptable'],
+                    stats['ponctualite_inacceptable'],
+                    stats['retard_moyen_minutes'], stats['depart_avance_moyen_minutes'],
+                    stats['regularite_statut'], stats['taux_regularite'],
+                    stats['taux_presence'], stats['taux_absence'],
+                )
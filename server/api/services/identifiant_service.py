@@ -0,0 +1,139 @@
+# identifiant_service.py - Identifiants générés côté serveur (Pointage, Departement), réservés par blocs
+import logging
+import os
+import re
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+TAILLE_BLOC_PAR_DEFAUT = 100
+LONGUEUR = 10
+# Séquence -> préfixe; identifiant = préfixe + numéro sur 9 chiffres (ex. P000004217)
+PREFIXES = {'pointage': 'P', 'departement': 'D'}
+CHIFFRES = LONGUEUR - 1
+FORMAT_RESERVE = re.compile(rf"^[{''.join(PREFIXES.values())}][0-9]{{{CHIFFRES}}}$")
+
+# Bloc courant de chaque séquence pour ce processus: nom -> (prochain numéro, fin exclue)
+_blocs = {}
+_pid = None
+_verrou = threading.Lock()
+
+
+class IdentifiantService:
+    """Allocation d'identifiants sans aller-retour en base par identifiant.
+
+    Chaque processus réserve un bloc de numéros (IDENTIFIANTS_TAILLE_BLOC) par une
+    seule requête UPDATE ... RETURNING sur SequenceIdentifiant, puis le distribue
+    en mémoire: deux processus ne reçoivent jamais le même bloc, les insertions
+    concurrentes ne peuvent donc pas entrer en collision. Les numéros d'un bloc non
+    épuisé sont perdus à l'arrêt du processus (les identifiants ne sont pas contigus).
+
+    Dans une transaction, la réservation passe par une connexion séparée (validée
+    aussitôt). Sous SQLite elle fait partie de la transaction en cours: le reste du
+    bloc n'est distribué qu'après sa validation, un rollback annulant la réservation.
+    """
+
+    @staticmethod
+    def formater(nom, numero):
+        return f"{PREFIXES[nom]}{numero:0{CHIFFRES}d}"
+
+    @staticmethod
+    def est_reserve(identifiant):
+        """Format des identifiants générés (refusé pour un identifiant saisi)"""
+        return bool(identifiant) and FORMAT_RESERVE.match(identifiant) is not None
+
+    @staticmethod
+    def allouer(nom, nombre=1):
+        """``nombre`` identifiants de la séquence ``nom`` ('pointage' ou 'departement')"""
+        global _pid
+        taille_bloc = getattr(settings, 'IDENTIFIANTS_TAILLE_BLOC', TAILLE_BLOC_PAR_DEFAUT)
+        with _verrou:
+            if _pid != os.getpid():
+                # Processus issu d'un fork: le bloc du parent lui appartient
+                _blocs.clear()
+                _pid = os.getpid()
+
+            prochain, fin = _blocs.get(nom, (0, 0))
+            disponibles = min(nombre, fin - prochain)
+            numeros = list(range(prochain, prochain + disponibles))
+            prochain += disponibles
+
+            reste = nombre - disponibles
+            if reste:
+                debut, fin_bloc, provisoire = IdentifiantService._reserver(nom, max(reste, taille_bloc))
+                numeros.extend(range(debut, debut + reste))
+                if provisoire:
+                    transaction.on_commit(partial(IdentifiantService._adopter, nom, debut + reste, fin_bloc, _pid))
+                else:
+                    prochain, fin = debut + reste, fin_bloc
+            _blocs[nom] = (prochain, fin)
+
+        return [IdentifiantService.formater(nom, numero) for numero in numeros]
+
+    @staticmethod
+    def _adopter(nom, prochain, fin, pid):
+        """Reste d'un bloc réservé dans une transaction, distribué une fois celle-ci validée"""
+        with _verrou:
+            if pid != _pid:
+                return
+            courant, fin_courante = _blocs.get(nom, (0, 0))
+            if courant >= fin_courante:
+                _blocs[nom] = (prochain, fin)
+
+    @staticmethod
+    def _reserver(nom, taille):
+        """Réserve [début, fin) dans la séquence; retourne (début, fin, provisoire).
+
+        ``provisoire``: la réservation fait partie de la transaction en cours et
+        disparaît avec elle en cas de rollback.
+        """
+        if not connection.in_atomic_block:
+            return (*IdentifiantService._reserver_sur(connection, nom, taille), False)
+        if connection.vendor == 'sqlite':
+            # Un seul écrivain: une seconde connexion attendrait la fin de la transaction
+            return (*IdentifiantService._reserver_sur(connection, nom, taille), True)
+        # Hors de la transaction en cours: un rollback ne doit pas remettre le bloc en circulation
+        autre = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            return (*IdentifiantService._reserver_sur(autre, nom, taille), False)
+        finally:
+            autre.close()
+
+    @staticmethod
+    def _reserver_sur(base, nom, taille):
+        from api.models import SequenceIdentifiant
+
+        table = base.ops.quote_name(SequenceIdentifiant._meta.db_table)
+        with base.cursor() as cursor:
+            for _ in range(2):
+                cursor.execute(
+                    f"UPDATE {table} SET prochain = prochain + %s WHERE nom = %s RETURNING prochain",
+                    [taille, nom]
+                )
+                ligne = cursor.fetchone()
+                if ligne:
+                    fin = ligne[0]
+                    return fin - taille, fin
+                # Première utilisation: la séquence démarre après les identifiants déjà au format
+                cursor.execute(
+                    f"INSERT INTO {table} (nom, prochain) VALUES (%s, %s) ON CONFLICT (nom) DO NOTHING",
+                    [nom, IdentifiantService._premier_numero(nom)]
+                )
+        raise RuntimeError(f"Séquence d'identifiants introuvable: {nom}")
+
+    @staticmethod
+    def _premier_numero(nom):
+        from api.models import Departement, Pointage
+
+        modele = {'pointage': Pointage, 'departement': Departement}[nom]
+        champ = modele._meta.pk.name
+        dernier = modele.objects.filter(
+            **{f'{champ}__regex': rf"^{PREFIXES[nom]}[0-9]{{{CHIFFRES}}}$"}
+        ).order_by(f'-{champ}').values_list(champ, flat=True).first()
+        premier = int(dernier[1:]) + 1 if dernier else 1
+        logger.info(f"🔢 Séquence {nom} initialisée à {premier}")
+        return premier
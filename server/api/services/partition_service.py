@@ -0,0 +1,278 @@
+# partition_service.py - Partitionnement mensuel de la table des pointages (PostgreSQL, optionnel)
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+AVANCE_MOIS_PAR_DEFAUT = 3
+COLONNE_PARTITION = 'date_pointage'
+_BORNES = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+class PartitionnementError(RuntimeError):
+    """Opération de partitionnement impossible (base non PostgreSQL, table non partitionnée...)"""
+
+
+def _mois_suivant(mois):
+    return (mois + timedelta(days=32)).replace(day=1)
+
+
+class PartitionService:
+    """Table des pointages partitionnée par mois (PARTITION BY RANGE sur date_pointage).
+
+    Le modèle Pointage n'est pas modifié: la table partitionnée garde son nom, ses
+    colonnes, ses index et ses contraintes; PostgreSQL élague les partitions des
+    requêtes filtrées sur date_pointage. Une partition par défaut reçoit les dates
+    hors des mois créés; ses lignes sont déplacées quand le mois correspondant est créé.
+
+    Contrainte de PostgreSQL: la clé primaire d'une table partitionnée inclut la clé
+    de partition, elle devient (id_pointage, date_pointage). L'unicité de
+    id_pointage seul est assurée par l'application (identifiants générés).
+    """
+
+    @staticmethod
+    def _table():
+        from api.models import Pointage
+
+        return Pointage._meta.db_table
+
+    @staticmethod
+    def _colonne_cle():
+        from api.models import Pointage
+
+        return Pointage._meta.pk.column
+
+    @staticmethod
+    def nom_partition(mois):
+        return f"{PartitionService._table()}_p{mois:%Y_%m}"
+
+    @staticmethod
+    def nom_partition_defaut():
+        return f"{PartitionService._table()}_defaut"
+
+    @staticmethod
+    def _verifier_postgresql():
+        if connection.vendor != 'postgresql':
+            raise PartitionnementError("Le partitionnement des pointages nécessite PostgreSQL")
+
+    @staticmethod
+    def est_partitionnee():
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+                [PartitionService._table()]
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def partitions():
+        """Partitions attachées: [(nom, premier mois, mois suivant)], triées; bornes None pour la partition par défaut"""
+        PartitionService._verifier_postgresql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+                ORDER BY c.relname
+                """,
+                [PartitionService._table()]
+            )
+            lignes = cursor.fetchall()
+
+        partitions = []
+        for nom, bornes in lignes:
+            trouve = _BORNES.search(bornes or '')
+            if trouve:
+                debut, fin = (datetime.strptime(valeur, '%Y-%m-%d').date() for valeur in trouve.groups())
+                partitions.append((nom, debut, fin))
+            else:
+                partitions.append((nom, None, None))
+        return partitions
+
+    @staticmethod
+    def _mois_a_creer(premier_mois, avance):
+        """Mois de ``premier_mois`` jusqu'au mois courant + ``avance``"""
+        dernier = timezone.now().date().replace(day=1)
+        for _ in range(avance):
+            dernier = _mois_suivant(dernier)
+        mois = premier_mois
+        while mois <= dernier:
+            yield mois
+            mois = _mois_suivant(mois)
+
+    @staticmethod
+    def convertir(avance=None):
+        """Convertit la table des pointages en table partitionnée par mois (une seule transaction).
+
+        Les définitions des contraintes et index existants sont relues dans le
+        catalogue puis recréées à l'identique sur la table partitionnée (hors clé
+        primaire, étendue à date_pointage). Retourne le nombre de partitions créées.
+        """
+        PartitionService._verifier_postgresql()
+        if PartitionService.est_partitionnee():
+            raise PartitionnementError("La table des pointages est déjà partitionnée")
+
+        if avance is None:
+            avance = getattr(settings, 'POINTAGE_PARTITIONS_AVANCE', AVANCE_MOIS_PAR_DEFAUT)
+        table = PartitionService._table()
+        ancienne = f"{table}_non_partitionnee"
+        qn = connection.ops.quote_name
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(
+                "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f', 'c', 'x')",
+                [table]
+            )
+            contraintes = cursor.fetchall()
+            # Index hors contraintes (les index des contraintes sont recréés avec elles)
+            cursor.execute(
+                "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = to_regclass(%s) "
+                "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid "
+                "AND c.conrelid = i.indrelid)",
+                [table]
+            )
+            index = [ligne[0] for ligne in cursor.fetchall()]
+            cursor.execute(f"SELECT min({qn(COLONNE_PARTITION)}) FROM {qn(table)}")
+            premiere_date = cursor.fetchone()[0] or timezone.now().date()
+
+            cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(ancienne)}")
+            cursor.execute(
+                f"CREATE TABLE {qn(table)} (LIKE {qn(ancienne)} INCLUDING DEFAULTS) "
+                f"PARTITION BY RANGE ({qn(COLONNE_PARTITION)})"
+            )
+            nb_partitions = 0
+            for mois in PartitionService._mois_a_creer(premiere_date.replace(day=1), avance):
+                cursor.execute(
+                    f"CREATE TABLE {qn(PartitionService.nom_partition(mois))} PARTITION OF {qn(table)} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [mois, _mois_suivant(mois)]
+                )
+                nb_partitions += 1
+            cursor.execute(
+                f"CREATE TABLE {qn(PartitionService.nom_partition_defaut())} PARTITION OF {qn(table)} DEFAULT"
+            )
+
+            cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(ancienne)}")
+            cursor.execute(f"DROP TABLE {qn(ancienne)}")
+
+            # Contraintes et index après la copie (plus rapide), avec leurs noms d'origine
+            for nom, type_contrainte, definition in contraintes:
+                if type_contrainte == 'p':
+                    cle = ", ".join(qn(colonne) for colonne in (PartitionService._colonne_cle(), COLONNE_PARTITION))
+                    definition = f"PRIMARY KEY ({cle})"
+                cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(nom)} {definition}")
+            for definition in index:
+                cursor.execute(definition)
+            cursor.execute(f"ANALYZE {qn(table)}")
+
+        logger.info(f"🗂️ Table {table} partitionnée par mois ({nb_partitions} partitions)")
+        return nb_partitions
+
+    @staticmethod
+    def creer_partitions(avance=None):
+        """Crée les partitions manquantes jusqu'au mois courant + ``avance`` (POINTAGE_PARTITIONS_AVANCE).
+
+        Les lignes du mois déjà présentes dans la partition par défaut y sont déplacées.
+        Retourne les noms des partitions créées.
+        """
+        if not PartitionService.est_partitionnee():
+            raise PartitionnementError("La table des pointages n'est pas partitionnée (voir --convertir)")
+        if avance is None:
+            avance = getattr(settings, 'POINTAGE_PARTITIONS_AVANCE', AVANCE_MOIS_PAR_DEFAUT)
+
+        table = PartitionService._table()
+        qn = connection.ops.quote_name
+        existantes = PartitionService.partitions()
+        mois_existants = {debut for _, debut, _ in existantes if debut}
+        defaut = PartitionService.nom_partition_defaut()
+        a_defaut = any(nom == defaut for nom, _, _ in existantes)
+        premier_mois = min(mois_existants) if mois_existants else timezone.now().date().replace(day=1)
+
+        creees = []
+        for mois in PartitionService._mois_a_creer(premier_mois, avance):
+            if mois in mois_existants:
+                continue
+            nom = PartitionService.nom_partition(mois)
+            bornes = [mois, _mois_suivant(mois)]
+            with transaction.atomic(), connection.cursor() as cursor:
+                # Table autonome, remplie puis attachée: l'attachement crée les index de la table mère
+                cursor.execute(f"CREATE TABLE {qn(nom)} (LIKE {qn(table)} INCLUDING DEFAULTS)")
+                if a_defaut:
+                    filtre = f"{qn(COLONNE_PARTITION)} >= %s AND {qn(COLONNE_PARTITION)} < %s"
+                    cursor.execute(f"INSERT INTO {qn(nom)} SELECT * FROM {qn(defaut)} WHERE {filtre}", bornes)
+                    cursor.execute(f"DELETE FROM {qn(defaut)} WHERE {filtre}", bornes)
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(nom)} FOR VALUES FROM (%s) TO (%s)", bornes
+                )
+            creees.append(nom)
+
+        if creees:
+            logger.info(f"🗂️ Partitions créées: {', '.join(creees)}")
+        return creees
+
+    @staticmethod
+    def detacher(avant, supprimer=False):
+        """Détache (et supprime si demandé) les partitions des mois antérieurs à ``avant``.
+
+        Les pointages d'une partition détachée restent dans une table autonome du même
+        nom mais ne sont plus visibles par l'application; les agrégats journaliers
+        (PresenceJournaliere) et les statistiques précalculées sont conservés.
+        """
+        if not PartitionService.est_partitionnee():
+            raise PartitionnementError("La table des pointages n'est pas partitionnée (voir --convertir)")
+
+        avant = avant.replace(day=1)
+        table = PartitionService._table()
+        qn = connection.ops.quote_name
+        detachees = []
+        for nom, _, fin in PartitionService.partitions():
+            if fin is None or fin > avant:
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(nom)}")
+                if supprimer:
+                    cursor.execute(f"DROP TABLE {qn(nom)}")
+            detachees.append(nom)
+
+        if detachees:
+            logger.info(f"🗂️ Partitions {'supprimées' if supprimer else 'détachées'}: {', '.join(detachees)}")
+        return detachees
+
+    @staticmethod
+    def detacher_selon_retention(supprimer=False):
+        """Applique POINTAGE_PARTITIONS_RETENTION_MOIS (aucun détachement si non défini)"""
+        retention = getattr(settings, 'POINTAGE_PARTITIONS_RETENTION_MOIS', None)
+        if not retention:
+            return []
+        avant = timezone.now().date().replace(day=1)
+        for _ in range(retention):
+            avant = (avant - timedelta(days=1)).replace(day=1)
+        return PartitionService.detacher(avant, supprimer)
+
+    @staticmethod
+    def partitions_parcourues(queryset):
+        """Tables lues par le plan d'exécution d'un QuerySet (vérification de l'élagage)"""
+        PartitionService._verifier_postgresql()
+        plan = json.loads(queryset.explain(format='json'))
+        tables = set()
+
+        def parcourir(noeud):
+            if 'Relation Name' in noeud:
+                tables.add(noeud['Relation Name'])
+            for enfant in noeud.get('Plans', []):
+                parcourir(enfant)
+
+        for racine in plan:
+            parcourir(racine['Plan'])
+        return sorted(tables)
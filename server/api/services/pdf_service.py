@@ -0,0 +1,439 @@
+# pdf_service.py - Construction des rapports PDF (ReportLab)
+import io
+import re
+import logging
+from datetime import time
+from functools import lru_cache
+from django.utils import timezone
+
+# Import conditionnel pour ReportLab
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib import colors
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class PdfService:
+    """Rapports PDF construits à partir de statistiques déjà calculées.
+
+    Sans dépendance à la requête HTTP: utilisé par l'export direct et par les
+    workers de génération asynchrone (RapportService).
+    """
+
+    @staticmethod
+    def normaliser_nom_fichier(nom):
+        correspondances = {
+            'à': 'a', 'á': 'a', 'â': 'a', 'ã': 'a', 'ä': 'a',
+            'è': 'e', 'é': 'e', 'ê': 'e', 'ë': 'e',
+            'ì': 'i', 'í': 'i', 'î': 'i', 'ï': 'i',
+            'ò': 'o', 'ó': 'o', 'ô': 'o', 'õ': 'o', 'ö': 'o',
+            'ù': 'u', 'ú': 'u', 'û': 'u', 'ü': 'u',
+            'ç': 'c', 'ñ': 'n',
+            'À': 'A', 'Á': 'A', 'Â': 'A', 'Ã': 'A', 'Ä': 'A',
+            'È': 'E', 'É': 'E', 'Ê': 'E', 'Ë': 'E',
+            'Ì': 'I', 'Í': 'I', 'Î': 'I', 'Ï': 'I',
+            'Ò': 'O', 'Ó': 'O', 'Ô': 'O', 'Õ': 'O', 'Ö': 'O',
+            'Ù': 'U', 'Ú': 'U', 'Û': 'U', 'Ü': 'U',
+            'Ç': 'C', 'Ñ': 'N'
+        }
+        
+        for accent, sans_accent in correspondances.items():
+            nom = nom.replace(accent, sans_accent)
+        
+        nom = re.sub(r'[^\w\s-]', '', nom)
+        nom = re.sub(r'[-\s]+', '_', nom)
+        
+        return nom.strip('_')
+
+    @staticmethod
+    def _format_duration(duration):
+        if not duration:
+            return "0h 00min"
+        
+        try:
+            if hasattr(duration, 'total_seconds'):
+                total_seconds = duration.total_seconds()
+            else:
+                total_seconds = float(duration)
+            
+            hours = int(total_seconds // 3600)
+            minutes = int((total_seconds % 3600) // 60)
+            return f"{hours}h {minutes:02d}min"
+        except:
+            return "0h 00min"
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _styles():
+        """Feuille de styles ReportLab, construite une fois par processus"""
+        return getSampleStyleSheet()
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _styles_tables_employe():
+        """Parties fixes des styles des tableaux du rapport employé"""
+        return {
+            'pointage': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0F8FF')),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 10),
+                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+                ('PADDING', (0, 0), (-1, -1), 6),
+            ]),
+            'ponctualite': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FF6B6B')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF5F5')),
+                ('FONTNAME', (5, 5), (5, 5), 'Helvetica-Bold'),
+                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+                ('PADDING', (0, 0), (-1, -1), 6),
+            ]),
+            'analyse': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4A4A4A')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8F9FA')),
+                ('FONTNAME', (5, 5), (5, 5), 'Helvetica-Bold'),
+                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+                ('PADDING', (0, 0), (-1, -1), 6),
+            ]),
+        }
+
+    @staticmethod
+    def nom_fichier_employe(employe):
+        nom_employe = f"{employe.nom}_{employe.prenom}"
+        nom_employe_normalise = PdfService.normaliser_nom_fichier(nom_employe)
+        type_employe = "stagiaire" if employe.titre == 'stagiaire' else "employe"
+        return f"rapport_statistiques_{nom_employe_normalise}_{type_employe}_{employe.cin}.pdf"
+
+    @staticmethod
+    def nom_fichier_global():
+        return f"statistiques_globales_{timezone.now().strftime('%Y%m%d')}.pdf"
+
+    @staticmethod
+    def generer_pdf_employe(employe, stats):
+        """PDF détaillé des statistiques d'un employé (octets)"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        doc.build(PdfService._elements_employe(employe, stats))
+        return buffer.getvalue()
+
+    @staticmethod
+    def generer_pdf_employes(employes_stats):
+        """Un seul PDF regroupant les rapports de plusieurs employés (un rapport par page)"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        elements = []
+        for index, (employe, stats) in enumerate(employes_stats):
+            if index:
+                elements.append(PageBreak())
+            elements.extend(PdfService._elements_employe(employe, stats))
+        doc.build(elements)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _elements_employe(employe, stats):
+        """Contenu (flowables) du rapport d'un employé"""
+        elements = []
+        styles = PdfService._styles()
+        styles_tables = PdfService._styles_tables_employe()
+        
+        # Titre principal
+        titre_type = "STAGIAIRE" if employe.titre == 'stagiaire' else "EMPLOYÉ FIXE"
+        title = Paragraph(f"RAPPORT DÉTAILLÉ DES STATISTIQUES - {titre_type}", styles['Title'])
+        elements.append(title)
+        elements.append(Spacer(1, 20))
+        
+        # Informations employé
+        info_style = styles['Normal']
+        info_elements = [
+            Paragraph(f"<b>Nom:</b> {employe.nom} {employe.prenom}", info_style),
+            Paragraph(f"<b>CIN:</b> {employe.cin}", info_style),
+            Paragraph(f"<b>Type:</b> {titre_type}", info_style),
+        ]
+        
+        if employe.titre == 'employe' and employe.matricule:
+            info_elements.append(Paragraph(f"<b>Matricule:</b> {employe.matricule}", info_style))
+        
+        # Horaires attendus
+        heure_entree = employe.heure_entree_attendue or time(8, 0)
+        heure_sortie = employe.heure_sortie_attendue or time(16, 0)
+        marge = employe.marge_tolerance_minutes or 10
+        
+        info_elements.extend([
+            Paragraph(f"<b>Horaires attendus:</b> {heure_entree.strftime('%H:%M')} - {heure_sortie.strftime('%H:%M')}", info_style),
+            Paragraph(f"<b>Marge de tolérance:</b> {marge} minutes", info_style),
+            Paragraph(f"<b>Département:</b> {employe.departement.nom if employe.departement else 'Non assigné'}", info_style),
+            Paragraph(f"<b>Poste:</b> {employe.poste}", info_style),
+            Paragraph(f"<b>Période analysée:</b> {stats.get('periode_debut', 'N/A')} à {stats.get('periode_fin', 'N/A')}", info_style),
+            Paragraph(f"<b>Type de période:</b> {stats.get('type_periode', 'N/A')}", info_style),
+        ])
+        
+        for element in info_elements:
+            elements.append(element)
+        
+        elements.append(Spacer(1, 25))
+        
+        # Section 1: POINTAGES ET ABSENCES
+        section_style = styles['Heading2']
+        elements.append(Paragraph("📊 STATISTIQUES DE POINTAGE ET ABSENCES", section_style))
+        elements.append(Spacer(1, 10))
+        
+        pointage_data = [
+            ['Heures totales travaillées', PdfService._format_duration(stats.get('heures_travail_total'))],
+            ['Jours travaillés', f"{stats.get('jours_travailles', 0)} jours"],
+            ['Jours d\'absence', f"{stats.get('jours_absents', 0)} jours"],
+            ['Moyenne quotidienne', PdfService._format_duration(stats.get('moyenne_heures_quotidiennes'))],
+        ]
+        
+        pointage_table = Table(pointage_data, colWidths=[100*mm, 60*mm])
+        pointage_table.setStyle(styles_tables['pointage'])
+        elements.append(pointage_table)
+        elements.append(Spacer(1, 20))
+        
+        # Section 2: PONCTUALITÉ ET RÉGULARITÉ (NOUVELLE SECTION)
+        elements.append(Paragraph("🕒 ANALYSE DE PONCTUALITÉ ET RÉGULARITÉ", section_style))
+        elements.append(Spacer(1, 10))
+        
+        ponctualite_data = [
+            ['Ponctualité parfaite', f"{stats.get('ponctualite_parfaite', 0)} jours"],
+            ['Ponctualité acceptable', f"{stats.get('ponctualite_acceptable', 0)} jours"],
+            ['Ponctualité inacceptable', f"{stats.get('ponctualite_inacceptable', 0)} jours"],
+            ['Retard moyen', f"{stats.get('retard_moyen_minutes', 0):.1f} min"],
+            ['Départ moyen anticipé', f"{stats.get('depart_avance_moyen_minutes', 0):.1f} min"],
+            ['Statut de régularité', f"{stats.get('regularite_statut', 'acceptable').upper()}"],
+            ['Taux de régularité', f"{stats.get('taux_regularite', 0):.1f}%"],
+        ]
+        
+        # Couleurs pour le statut de régularité
+        regularite_statut = stats.get('regularite_statut', 'acceptable')
+        statut_color = colors.green if regularite_statut == 'parfait' else colors.orange if regularite_statut == 'acceptable' else colors.red
+        
+        ponctualite_table = Table(ponctualite_data, colWidths=[80*mm, 80*mm])
+        ponctualite_table.setStyle(styles_tables['ponctualite'])
+        ponctualite_table.setStyle(TableStyle([
+            ('TEXTCOLOR', (5, 5), (5, 5), statut_color),
+        ]))
+        elements.append(ponctualite_table)
+        elements.append(Spacer(1, 20))
+        
+        # Section 3: ANALYSE DES HEURES ET ABSENCES
+        elements.append(Paragraph("⏰ ANALYSE DES HEURES TRAVAILLÉES ET ABSENCES", section_style))
+        elements.append(Spacer(1, 10))
+        
+        jours_total_passes = stats.get('jours_total_passes', stats.get('jours_passes_mois', 0))
+        analyse_heures_data = [
+            ['Jours passés dans le mois', f"{stats.get('jours_passes_mois', 0)} jours"],
+            ['Jours totaux passés', f"{jours_total_passes} jours"],
+            ['Heures attendues', PdfService._format_duration(stats.get('heures_attendues_jours_passes'))],
+            ['Heures réelles', PdfService._format_duration(stats.get('heures_travail_total'))],
+            ['Écart', PdfService._format_duration(stats.get('ecart_heures'))],
+            ['Statut des heures', f"{stats.get('statut_heures', 'N/A')}"],
+            ['Pourcentage d\'écart', f"{stats.get('pourcentage_ecart', 0):.1f}%"],
+            ['Taux de présence', f"{stats.get('taux_presence', 0):.1f}%"],
+            ['Taux d\'absence', f"{stats.get('taux_absence', 0):.1f}%"],
+        ]
+        
+        # Déterminer la couleur du statut
+        statut = stats.get('statut_heures', 'NORMAL')
+        statut_color = colors.green
+        if statut == 'INSUFFISANT':
+            statut_color = colors.red
+        elif statut == 'SURPLUS':
+            statut_color = colors.blue
+        
+        analyse_table = Table(analyse_heures_data, colWidths=[80*mm, 80*mm])
+        analyse_table.setStyle(styles_tables['analyse'])
+        analyse_table.setStyle(TableStyle([
+            ('TEXTCOLOR', (5, 5), (5, 5), statut_color),
+            ('TEXTCOLOR', (8, 8), (8, 8), colors.red if stats.get('taux_absence', 0) > 10 else colors.black),
+        ]))
+        elements.append(analyse_table)
+        elements.append(Spacer(1, 20))
+        
+        # Section 4: OBSERVATION (avec absences)
+        if stats.get('observation_heures'):
+            elements.append(Paragraph("📝 OBSERVATION ET RECOMMANDATIONS", section_style))
+            elements.append(Spacer(1, 10))
+            
+            observation_style = styles['Normal']
+            observation_text = Paragraph(f"<i>{stats.get('observation_heures', 'Aucune observation disponible.')}</i>", observation_style)
+            elements.append(observation_text)
+            elements.append(Spacer(1, 20))
+        
+        # Pied de page
+        footer_style = styles['Italic']
+        footer = Paragraph(f"Rapport généré le {timezone.now().strftime('%d/%m/%Y à %H:%M')} - Système de Gestion RH", footer_style)
+        elements.append(footer)
+        
+        return elements
+
+    @staticmethod
+    def generer_pdf_global(stats):
+        """PDF des statistiques globales mensuelles (octets)"""
+        buffer = io.BytesIO()
+        
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        elements = []
+        styles = PdfService._styles()
+        
+        title = Paragraph("RAPPORT STATISTIQUES GLOBALES", styles['Title'])
+        elements.append(title)
+        elements.append(Spacer(1, 20))
+        
+        periode_text = Paragraph(f"<b>Période:</b> {stats.get('periode', 'N/A').strftime('%B %Y') if hasattr(stats.get('periode'), 'strftime') else 'N/A'} ({stats.get('jours_passes_mois', 0)} jours analysés)", styles['Normal'])
+        elements.append(periode_text)
+        elements.append(Spacer(1, 25))
+        elements.append(Spacer(1, 10))
+        
+        # Section 1: RÉSUMÉ GLOBAL
+        section_style = styles['Heading2']
+        elements.append(Paragraph("🌐 RÉSUMÉ GLOBAL", section_style))
+        elements.append(Spacer(1, 10))
+        
+        resume_data = [
+            ['Total employés', f"{stats.get('total_employes', 0)}"],
+            ['Employés actifs', f"{stats.get('employes_actifs', 0)}"],
+            ['Taux d\'activité', f"{stats.get('taux_activite_global', 0):.1f}%"],
+            ['Total départements', f"{stats.get('total_departements', 0)}"],
+            ['Départements actifs', f"{stats.get('departements_actifs', 0)}"],
+        ]
+        
+        resume_table = Table(resume_data, colWidths=[80*mm, 80*mm])
+        resume_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0F8FF')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+            ('PADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(resume_table)
+        elements.append(Spacer(1, 20))
+        elements.append(Spacer(1, 10))
+        
+        # Section 2: POINTAGE ET ABSENCES
+        elements.append(Paragraph("📅 POINTAGE ET ABSENCES GLOBALES", section_style))
+        elements.append(Spacer(1, 10))
+        
+        pointage_data = [
+            ['Jours analysés', f"{stats.get('jours_passes_mois', 0)} jours"],
+            ['Jours possibles de travail', f"{stats.get('jours_total_possibles', 0)} jours"],
+            ['Pointages effectués', f"{stats.get('total_pointages', 0)}"],
+            ['Jours travaillés', f"{stats.get('total_jours_travailles', 0)} jours"],
+            ['Total absences', f"{stats.get('total_absences', 0)} jours"],
+            ['Taux de présence', f"{stats.get('taux_presence', 0):.1f}%"],
+            ['Taux d\'absence global', f"{stats.get('taux_absence_global', 0):.1f}%"],
+        ]
+        
+        pointage_table = Table(pointage_data, colWidths=[80*mm, 80*mm])
+        pointage_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FF6B6B')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF5F5')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+            ('PADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(pointage_table)
+        elements.append(Spacer(1, 20))
+        elements.append(Spacer(1, 10))
+        
+        # Section 4: PONCTUALITÉ ET RÉGULARITÉ
+        elements.append(Paragraph("🕒 PONCTUALITÉ ET RÉGULARITÉ GLOBALE", section_style))
+        elements.append(Spacer(1, 10))
+        
+        ponctualite_data = [
+            ['Ponctualité parfaite', f"{stats.get('ponctualite_parfaite', 0)}"],
+            ['Ponctualité acceptable', f"{stats.get('ponctualite_acceptable', 0)}"],
+            ['Ponctualité inacceptable', f"{stats.get('ponctualite_inacceptable', 0)}"],
+            ['Taux régularité parfaite', f"{stats.get('taux_regularite_parfaite', 0):.1f}%"],
+            ['Taux régularité acceptable', f"{stats.get('taux_regularite_acceptable', 0):.1f}%"],
+            ['Taux régularité inacceptable', f"{stats.get('taux_regularite_inacceptable', 0):.1f}%"],
+        ]
+        
+        ponctualite_table = Table(ponctualite_data, colWidths=[80*mm, 80*mm])
+        ponctualite_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6B48FF')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0F5FF')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+            ('PADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(ponctualite_table)
+        elements.append(Spacer(1, 20))
+        elements.append(Spacer(1, 20))
+        
+        # Section 5: ANALYSE DES HEURES
+        elements.append(Paragraph("⏰ ANALYSE DES HEURES GLOBALES", section_style))
+        elements.append(Spacer(1, 10))
+        
+        statut = stats.get('statut_heures_global', 'NORMAL')
+        statut_color = colors.green
+        if statut == 'INSUFFISANT':
+            statut_color = colors.red
+        elif statut == 'SURPLUS':
+            statut_color = colors.blue
+        
+        heures_data = [
+            ['Heures attendues totales', PdfService._format_duration(stats.get('heures_attendues_total'))],
+            ['Heures travaillées totales', PdfService._format_duration(stats.get('heures_travail_total'))],
+            ['Moyenne quotidienne', PdfService._format_duration(stats.get('moyenne_heures_quotidiennes'))],
+            ['Écart global', PdfService._format_duration(stats.get('ecart_heures_global'))],
+            ['Pourcentage d\'écart', f"{stats.get('pourcentage_ecart_global', 0):.1f}%"],
+            ['Statut des heures', f"{statut}"],
+        ]
+        
+        heures_table = Table(heures_data, colWidths=[80*mm, 80*mm])
+        heures_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4A4A4A')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8F9FA')),
+            ('TEXTCOLOR', (5, 5), (5, 5), statut_color),
+            ('FONTNAME', (5, 5), (5, 5), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
+            ('PADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(heures_table)
+        
+        # Section 6: OBSERVATION GLOBALE
+        if stats.get('observation_globale'):
+            elements.append(Spacer(1, 20))
+            elements.append(Paragraph("📝 OBSERVATION GLOBALE", section_style))
+            elements.append(Spacer(1, 10))
+            
+            observation_style = styles['Normal']
+            # Diviser l'observation en lignes plus petites
+            observation_lines = stats.get('observation_globale', '').split('\n')
+            for line in observation_lines:
+                if line.strip():
+                    observation_text = Paragraph(f"• {line.strip()}", observation_style)
+                    elements.append(observation_text)
+        
+        elements.append(Spacer(1, 25))
+        footer = Paragraph(f"Rapport généré le {timezone.now().strftime('%d/%m/%Y à %H:%M')} - Système de Gestion RH", styles['Italic'])
+        elements.append(footer)
+        
+        doc.build(elements)
+        return buffer.getvalue()
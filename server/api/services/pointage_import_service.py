@@ -0,0 +1,306 @@
+# pointage_import_service.py - Import en masse des pointages (bornes de badgeage)
+import csv
+import io
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from .acces_service import AccesService
+from .archive_service import ArchiveService
+from .identifiant_service import IdentifiantService
+from .presence_live_service import PresenceLiveService
+from .presence_service import PresenceService
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 1000
+MAX_LIGNES_PAR_DEFAUT = 50000
+CHAMPS_MIS_A_JOUR = [
+    'heure_entree', 'heure_sortie', 'remarque', 'duree_travail',
+    'entree_ponctuelle', 'sortie_ponctuelle', 'ponctualite_statut',
+    'retard_minutes', 'depart_avance_minutes',
+]
+
+
+class ImportPointagesError(ValueError):
+    """Lot rejeté dans son ensemble (format illisible, trop de lignes)"""
+
+
+class PointageImportService:
+    """Validation et insertion d'un lot de pointages en quelques requêtes.
+
+    Les employés et les pointages existants sont chargés une fois pour tout le
+    lot; durée et ponctualité sont calculées en mémoire puis les lignes valides
+    sont insérées par bulk_create (ou upsert sur (employe, date_pointage)).
+    Chaque ligne reçoit un résultat: 'cree', 'mis_a_jour' ou 'erreur'. Une ligne
+    sans id_pointage reçoit un identifiant généré (IdentifiantService). Si une
+    autre requête enregistre un pointage en conflit entre la vérification et
+    l'insertion, le lot est repris ligne par ligne: seules les lignes en conflit
+    passent en erreur.
+    """
+
+    # -----------------------
+    # Lecture du lot
+    # -----------------------
+    @staticmethod
+    def lire_csv(contenu):
+        """Lignes d'un CSV avec en-tête (séparateur ',' ou ';' détecté)"""
+        if isinstance(contenu, bytes):
+            contenu = contenu.decode('utf-8-sig')
+        contenu = contenu.lstrip('\ufeff')
+        if not contenu.strip():
+            return []
+        premiere_ligne = contenu.split('\n', 1)[0]
+        separateur = ';' if premiere_ligne.count(';') > premiere_ligne.count(',') else ','
+        lecteur = csv.DictReader(io.StringIO(contenu), delimiter=separateur)
+        return [
+            {(cle or '').strip(): valeur for cle, valeur in ligne.items()}
+            for ligne in lecteur
+        ]
+
+    @staticmethod
+    def lire_donnees(donnees):
+        """Accepte une liste de pointages ou {"pointages": [...]}"""
+        if isinstance(donnees, dict):
+            donnees = donnees.get('pointages')
+        if not isinstance(donnees, list):
+            raise ImportPointagesError("Le corps doit être une liste de pointages (ou {\"pointages\": [...]}).")
+        return donnees
+
+    # -----------------------
+    # Validation
+    # -----------------------
+    @staticmethod
+    def _texte(valeur):
+        if valeur is None:
+            return None
+        valeur = str(valeur).strip()
+        return valeur or None
+
+    @staticmethod
+    def _analyser_ligne(ligne):
+        """Convertit une ligne brute; retourne (valeurs, erreurs)"""
+        texte = PointageImportService._texte
+        erreurs = []
+
+        if not isinstance(ligne, dict):
+            return None, ["Ligne invalide: objet attendu."]
+
+        valeurs = {
+            'id_pointage': texte(ligne.get('id_pointage')),
+            'employe': texte(ligne.get('employe')),
+            'remarque': texte(ligne.get('remarque')) or "Sans remarque.",
+        }
+
+        if valeurs['id_pointage'] and len(valeurs['id_pointage']) > 10:
+            erreurs.append("id_pointage ne doit pas dépasser 10 caractères.")
+        if not valeurs['employe']:
+            erreurs.append("employe est requis.")
+
+        for champ, analyseur, requis in (
+            ('date_pointage', parse_date, True),
+            ('heure_entree', parse_time, True),
+            ('heure_sortie', parse_time, False),
+        ):
+            brut = texte(ligne.get(champ))
+            if brut is None:
+                valeurs[champ] = None
+                if requis:
+                    erreurs.append(f"{champ} est requis.")
+                continue
+            try:
+                valeurs[champ] = analyseur(brut)
+            except ValueError:
+                valeurs[champ] = None
+            if valeurs[champ] is None:
+                erreurs.append(f"{champ} invalide: {brut}")
+
+        if valeurs.get('heure_entree') and valeurs.get('heure_sortie'):
+            if valeurs['heure_sortie'] <= valeurs['heure_entree']:
+                erreurs.append("L'heure de sortie doit être après l'heure d'entrée.")
+        if valeurs.get('date_pointage') and ArchiveService.est_archivee(valeurs['date_pointage']):
+            erreurs.append(f"L'année {valeurs['date_pointage'].year} est archivée (lecture seule).")
+
+        return valeurs, erreurs
+
+    @staticmethod
+    def _peut_pointer(utilisateur, employe):
+        return AccesService.portee(utilisateur).peut_pointer(employe.cin)
+
+    # -----------------------
+    # Import
+    # -----------------------
+    @staticmethod
+    def importer(lignes, utilisateur, upsert=False):
+        """Valide et enregistre le lot; retourne le résumé et le résultat de chaque ligne"""
+        from api.models import Employe, Pointage
+
+        max_lignes = getattr(settings, 'POINTAGE_BULK_MAX_LIGNES', MAX_LIGNES_PAR_DEFAUT)
+        if len(lignes) > max_lignes:
+            raise ImportPointagesError(f"Lot trop volumineux: {len(lignes)} lignes (maximum {max_lignes}).")
+
+        resultats = []
+        valides = []
+        for numero, ligne in enumerate(lignes, start=1):
+            valeurs, erreurs = PointageImportService._analyser_ligne(ligne)
+            resultat = {
+                'ligne': numero,
+                'id_pointage': valeurs.get('id_pointage') if valeurs else None,
+                'statut': 'erreur',
+                'erreurs': erreurs,
+            }
+            resultats.append(resultat)
+            if not erreurs:
+                valides.append((resultat, valeurs))
+
+        # Une seule requête pour tous les employés du lot
+        cins = {valeurs['employe'] for _, valeurs in valides}
+        employes = Employe.objects.only(
+            'cin', 'statut', 'created_by_id', 'departement_id',
+            'heure_entree_attendue', 'heure_sortie_attendue', 'marge_tolerance_minutes'
+        ).in_bulk(cins)
+
+        # Pointages déjà en base pour ces employés sur la période du lot
+        existants = {}
+        ids_existants = {}
+        if valides:
+            dates = [valeurs['date_pointage'] for _, valeurs in valides]
+            for cin, jour, id_pointage in Pointage.objects.filter(
+                employe_id__in=cins, date_pointage__range=(min(dates), max(dates))
+            ).values_list('employe_id', 'date_pointage', 'id_pointage').iterator(chunk_size=TAILLE_LOT):
+                existants[(cin, jour)] = id_pointage
+            ids = [valeurs['id_pointage'] for _, valeurs in valides if valeurs['id_pointage']]
+            for i in range(0, len(ids), TAILLE_LOT):
+                for id_pointage, cin, jour in Pointage.objects.filter(
+                    id_pointage__in=ids[i:i + TAILLE_LOT]
+                ).values_list('id_pointage', 'employe_id', 'date_pointage'):
+                    ids_existants[id_pointage] = (cin, jour)
+
+        cles_lot = set()
+        ids_lot = set()
+        a_enregistrer = []
+        sans_id = []
+        for resultat, valeurs in valides:
+            erreurs = resultat['erreurs']
+            employe = employes.get(valeurs['employe'])
+            cle = (valeurs['employe'], valeurs['date_pointage'])
+
+            if employe is None:
+                erreurs.append("Employé non trouvé.")
+            elif employe.statut != 'actif':
+                erreurs.append("Les employés inactifs ne peuvent pas effectuer de pointage.")
+            elif not PointageImportService._peut_pointer(utilisateur, employe):
+                erreurs.append("Vous ne pouvez pointer que pour vos propres employés.")
+            if cle in cles_lot:
+                erreurs.append("Doublon dans le lot pour cet employé à cette date.")
+            if valeurs['id_pointage'] and valeurs['id_pointage'] in ids_lot:
+                erreurs.append("id_pointage en double dans le lot.")
+
+            id_existant = existants.get(cle)
+            if id_existant and not upsert:
+                erreurs.append("Un pointage existe déjà pour cet employé à cette date.")
+            cle_id = ids_existants.get(valeurs['id_pointage'])
+            if cle_id and cle_id != cle:
+                erreurs.append("id_pointage déjà utilisé par un autre pointage.")
+            elif not cle_id and IdentifiantService.est_reserve(valeurs['id_pointage']):
+                erreurs.append("Format d'identifiant réservé aux identifiants générés: omettre id_pointage.")
+            if erreurs:
+                continue
+
+            cles_lot.add(cle)
+            if valeurs['id_pointage']:
+                ids_lot.add(valeurs['id_pointage'])
+            if id_existant:
+                # L'upsert conserve l'identifiant du pointage existant
+                valeurs['id_pointage'] = id_existant
+                resultat['id_pointage'] = id_existant
+
+            pointage = Pointage(
+                id_pointage=valeurs['id_pointage'],
+                employe=employe,
+                date_pointage=valeurs['date_pointage'],
+                heure_entree=valeurs['heure_entree'],
+                heure_sortie=valeurs['heure_sortie'],
+                remarque=valeurs['remarque'],
+                created_by=utilisateur,
+            )
+            resultat['statut'] = 'mis_a_jour' if id_existant else 'cree'
+            a_enregistrer.append((resultat, pointage))
+            if not id_existant and not valeurs['id_pointage']:
+                sans_id.append((resultat, pointage))
+
+        # Identifiants des nouvelles lignes sans id_pointage: un seul appel, au plus une requête
+        if sans_id:
+            for (resultat, pointage), identifiant in zip(
+                sans_id, IdentifiantService.allouer('pointage', len(sans_id))
+            ):
+                pointage.id_pointage = resultat['id_pointage'] = identifiant
+
+        # Durée et ponctualité de tout le lot en une passe
+        Pointage.calculer_metriques_en_lot([pointage for _, pointage in a_enregistrer], employes)
+        pointages = []
+        if a_enregistrer:
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        PointageImportService._inserer([pointage for _, pointage in a_enregistrer], upsert)
+                    pointages = [pointage for _, pointage in a_enregistrer]
+                except IntegrityError:
+                    # Pointage enregistré par une autre requête depuis la vérification: ligne par ligne
+                    pointages = PointageImportService._inserer_par_ligne(a_enregistrer, upsert)
+                # bulk_create n'envoie pas post_save: agrégats mis à jour explicitement
+                PresenceService.actualiser_pointages(pointages)
+                PresenceLiveService.appliquer_pointages(pointages)
+
+        for resultat in resultats:
+            if not resultat['erreurs']:
+                del resultat['erreurs']
+
+        crees = sum(1 for resultat in resultats if resultat['statut'] == 'cree')
+        mis_a_jour = sum(1 for resultat in resultats if resultat['statut'] == 'mis_a_jour')
+        logger.info(
+            f"📥 Import pointages: {crees} créés, {mis_a_jour} mis à jour, "
+            f"{len(resultats) - len(pointages)} rejetés"
+        )
+        return {
+            'total': len(resultats),
+            'crees': crees,
+            'mis_a_jour': mis_a_jour,
+            'erreurs': len(resultats) - len(pointages),
+            'resultats': resultats,
+        }
+
+    @staticmethod
+    def _inserer(pointages, upsert):
+        from api.models import Pointage
+
+        if upsert:
+            Pointage.objects.bulk_create(
+                pointages,
+                batch_size=TAILLE_LOT,
+                update_conflicts=True,
+                unique_fields=['employe', 'date_pointage'],
+                update_fields=CHAMPS_MIS_A_JOUR,
+            )
+        else:
+            Pointage.objects.bulk_create(pointages, batch_size=TAILLE_LOT)
+
+    @staticmethod
+    def _inserer_par_ligne(a_enregistrer, upsert):
+        """Insère chaque ligne dans son propre savepoint; les lignes en conflit passent en erreur"""
+        enregistres = []
+        for resultat, pointage in a_enregistrer:
+            try:
+                with transaction.atomic():
+                    PointageImportService._inserer([pointage], upsert)
+            except IntegrityError:
+                resultat['statut'] = 'erreur'
+                resultat['erreurs'].append(
+                    "Un pointage a été enregistré pour cet employé à cette date (ou avec cet id_pointage) "
+                    "pendant l'import."
+                )
+            else:
+                enregistres.append(pointage)
+        return enregistres
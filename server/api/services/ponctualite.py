@@ -0,0 +1,123 @@
+# ponctualite.py - Classification de la ponctualité des pointages, en lot
+from datetime import time
+
+# NumPy vectorise le calcul pour les gros lots; repli en Python pur sinon
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+ENTREE_PAR_DEFAUT = time(8, 0)
+SORTIE_PAR_DEFAUT = time(16, 0)
+MARGE_PAR_DEFAUT = 10
+SEUIL_ACCEPTABLE_MINUTES = 30
+# En dessous, la conversion vers/depuis les tableaux coûte plus que la boucle
+SEUIL_NUMPY = 64
+
+CATEGORIES = ('parfait', 'acceptable', 'inacceptable')
+
+
+def minutes(heure, defaut=None):
+    """Minutes depuis minuit d'une heure (``defaut`` si l'heure est absente)"""
+    heure = heure or defaut
+    return heure.hour * 60 + heure.minute
+
+
+def classer(entrees, sorties, entrees_attendues, sorties_attendues, marges):
+    """Classe un lot de pointages complets.
+
+    Toutes les entrées sont des séquences de même longueur, en minutes depuis
+    minuit; une marge nulle ou absente vaut MARGE_PAR_DEFAUT. Règles:
+
+    - parfait: retard <= marge ET départ anticipé <= marge
+    - acceptable: sinon, retard <= 30 min ET départ anticipé <= 30 min
+    - inacceptable: tous les autres cas
+
+    Retourne un dict de listes: categorie, retard_minutes, depart_avance_minutes,
+    entree_ponctuelle, sortie_ponctuelle.
+    """
+    if NUMPY_AVAILABLE and len(entrees) >= SEUIL_NUMPY:
+        return _classer_numpy(entrees, sorties, entrees_attendues, sorties_attendues, marges)
+
+    resultat = {cle: [] for cle in (
+        'categorie', 'retard_minutes', 'depart_avance_minutes', 'entree_ponctuelle', 'sortie_ponctuelle'
+    )}
+    for entree, sortie, entree_attendue, sortie_attendue, marge in zip(
+        entrees, sorties, entrees_attendues, sorties_attendues, marges
+    ):
+        marge = marge or MARGE_PAR_DEFAUT
+        retard = max(0, entree - entree_attendue)
+        depart = max(0, sortie_attendue - sortie)
+        entree_ponctuelle = retard <= marge
+        sortie_ponctuelle = depart <= marge
+        if entree_ponctuelle and sortie_ponctuelle:
+            categorie = 'parfait'
+        elif retard <= SEUIL_ACCEPTABLE_MINUTES and depart <= SEUIL_ACCEPTABLE_MINUTES:
+            categorie = 'acceptable'
+        else:
+            categorie = 'inacceptable'
+        resultat['categorie'].append(categorie)
+        resultat['retard_minutes'].append(retard)
+        resultat['depart_avance_minutes'].append(depart)
+        resultat['entree_ponctuelle'].append(entree_ponctuelle)
+        resultat['sortie_ponctuelle'].append(sortie_ponctuelle)
+    return resultat
+
+
+def _classer_numpy(entrees, sorties, entrees_attendues, sorties_attendues, marges):
+    marges = np.asarray([marge or MARGE_PAR_DEFAUT for marge in marges], dtype=np.int32)
+    retards = np.maximum(
+        np.asarray(entrees, dtype=np.int32) - np.asarray(entrees_attendues, dtype=np.int32), 0
+    )
+    departs = np.maximum(
+        np.asarray(sorties_attendues, dtype=np.int32) - np.asarray(sorties, dtype=np.int32), 0
+    )
+    entrees_ponctuelles = retards <= marges
+    sorties_ponctuelles = departs <= marges
+    acceptables = (retards <= SEUIL_ACCEPTABLE_MINUTES) & (departs <= SEUIL_ACCEPTABLE_MINUTES)
+    indices = np.where(entrees_ponctuelles & sorties_ponctuelles, 0, np.where(acceptables, 1, 2))
+    return {
+        'categorie': np.asarray(CATEGORIES, dtype=object)[indices].tolist(),
+        'retard_minutes': retards.tolist(),
+        'depart_avance_minutes': departs.tolist(),
+        'entree_ponctuelle': entrees_ponctuelles.tolist(),
+        'sortie_ponctuelle': sorties_ponctuelles.tolist(),
+    }
+
+
+def classer_lignes(lignes, entree, sortie, entree_attendue, sortie_attendue, marge):
+    """Classe des lignes (dicts) dont les clés des heures sont données; heures en objets time"""
+    return classer(
+        [minutes(ligne[entree]) for ligne in lignes],
+        [minutes(ligne[sortie]) for ligne in lignes],
+        [minutes(ligne[entree_attendue], ENTREE_PAR_DEFAUT) for ligne in lignes],
+        [minutes(ligne[sortie_attendue], SORTIE_PAR_DEFAUT) for ligne in lignes],
+        [ligne[marge] for ligne in lignes],
+    )
+
+
+def classer_pointages(pointages, employes=None):
+    """Renseigne retard, départ anticipé, ponctualité et statut des instances Pointage.
+
+    ``employes``: {cin: employe} déjà chargés (sinon pointage.employe). Les
+    pointages sans heure de sortie sont laissés tels quels.
+    """
+    complets = [p for p in pointages if p.heure_entree and p.heure_sortie]
+    if not complets:
+        return
+    horaires = [employes[p.employe_id] if employes else p.employe for p in complets]
+    resultat = classer(
+        [minutes(p.heure_entree) for p in complets],
+        [minutes(p.heure_sortie) for p in complets],
+        [minutes(e.heure_entree_attendue, ENTREE_PAR_DEFAUT) for e in horaires],
+        [minutes(e.heure_sortie_attendue, SORTIE_PAR_DEFAUT) for e in horaires],
+        [e.marge_tolerance_minutes for e in horaires],
+    )
+    for i, pointage in enumerate(complets):
+        pointage.retard_minutes = resultat['retard_minutes'][i]
+        pointage.depart_avance_minutes = resultat['depart_avance_minutes'][i]
+        pointage.entree_ponctuelle = resultat['entree_ponctuelle'][i]
+        pointage.sortie_ponctuelle = resultat['sortie_ponctuelle'][i]
+        pointage.ponctualite_statut = resultat['categorie'][i]
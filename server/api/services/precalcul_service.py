@@ -0,0 +1,258 @@
+# precalcul_service.py - Précalcul des statistiques des périodes closes (StatistiquesEmploye/Globales)
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .rapport_service import _initialiser_worker
+from .statistics_service import StatisticsService
+from .stats_cache import StatsCache
+
+logger = logging.getLogger(__name__)
+
+WORKERS_PAR_DEFAUT = 2
+TAILLE_LOT_PAR_DEFAUT = 200
+TYPES_PERIODE = ('hebdo', 'mensuel', 'annuel')
+# StatistiquesGlobales: mensuel uniquement (``periode`` est unique, une ligne annuelle
+# entrerait en conflit avec le mois de janvier)
+TYPE_GLOBAL = 'global'
+
+TOTAUX_VIDES = {
+    'jours_travailles': 0, 'secondes_travail': 0, 'retard_total': 0, 'depart_avance_total': 0,
+    'ponctualite_parfaite': 0, 'ponctualite_acceptable': 0, 'ponctualite_inacceptable': 0,
+    'derniere_maj': None,
+}
+
+
+def _debut_periode(type_periode, jour):
+    if type_periode == 'hebdo':
+        return jour - timedelta(days=jour.weekday())
+    if type_periode == 'mensuel':
+        return jour.replace(day=1)
+    return jour.replace(month=1, day=1)
+
+
+def _periode_suivante(type_periode, debut):
+    if type_periode == 'hebdo':
+        return debut + timedelta(days=7)
+    if type_periode == 'mensuel':
+        return (debut + timedelta(days=32)).replace(day=1)
+    return debut.replace(year=debut.year + 1)
+
+
+def _a_recalculer(totaux, existante):
+    """Période absente, ou dont les présences ont changé depuis le dernier calcul"""
+    if existante is None:
+        return True
+    jours_travailles, date_calcul = existante
+    return (
+        totaux['jours_travailles'] != jours_travailles
+        or bool(totaux['derniere_maj']) and totaux['derniere_maj'] > date_calcul
+    )
+
+
+def precalculer_lot(cins, types_periode, depuis=None, complet=False):
+    """Point d'entrée exécuté dans un worker (fonction de module, sérialisable par pickle)"""
+    close_old_connections()
+    try:
+        return PrecalculService.precalculer_employes(cins, types_periode, depuis, complet)
+    finally:
+        close_old_connections()
+
+
+class PrecalculService:
+    """Précalcul des statistiques hebdomadaires, mensuelles et annuelles des périodes closes.
+
+    Incrémental: une période n'est recalculée que si elle n'existe pas encore ou si
+    ses présences journalières ont changé (nombre de jours, ou ``date_maj`` postérieure
+    au calcul). Chaque lot d'employés est écrit dans sa propre transaction par upsert
+    groupé: une exécution interrompue reprend là où elle s'est arrêtée.
+    """
+
+    PERIODES = {
+        'hebdo': (TruncWeek, StatisticsService._stats_hebdo_depuis_totaux),
+        'mensuel': (TruncMonth, StatisticsService._stats_mensuelles_depuis_totaux),
+        'annuel': (TruncYear, StatisticsService._stats_annuelles_depuis_totaux),
+    }
+
+    @staticmethod
+    def precalculer(types=TYPES_PERIODE + (TYPE_GLOBAL,), depuis=None, complet=False,
+                    workers=None, taille_lot=None, progression=None):
+        """Précalcule tous les employés (en lots, sur un pool de processus) puis les statistiques globales.
+
+        Retourne {type: nombre de périodes recalculées}. ``progression(lots_faits, lots_total)``
+        est appelée après chaque lot.
+        """
+        from api.models import Employe
+
+        types_employe = [t for t in TYPES_PERIODE if t in types]
+        compteurs = dict.fromkeys(types, 0)
+
+        if types_employe:
+            taille_lot = taille_lot or getattr(settings, 'PRECALCUL_TAILLE_LOT', TAILLE_LOT_PAR_DEFAUT)
+            cins = list(Employe.objects.order_by('cin').values_list('cin', flat=True))
+            lots = [cins[i:i + taille_lot] for i in range(0, len(cins), taille_lot)]
+
+            workers = workers or getattr(settings, 'PRECALCUL_WORKERS', WORKERS_PAR_DEFAUT)
+            if connection.vendor == 'sqlite':
+                # Un seul écrivain à la fois: les processus ne feraient que s'attendre
+                workers = 1
+            workers = min(workers, len(lots))
+
+            if workers > 1:
+                executeur = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_initialiser_worker,
+                )
+                with executeur:
+                    resultats = executeur.map(
+                        precalculer_lot, lots, repeat(types_employe), repeat(depuis), repeat(complet)
+                    )
+                    PrecalculService._cumuler(compteurs, resultats, len(lots), progression)
+            else:
+                resultats = (
+                    PrecalculService.precalculer_employes(lot, types_employe, depuis, complet)
+                    for lot in lots
+                )
+                PrecalculService._cumuler(compteurs, resultats, len(lots), progression)
+
+        if TYPE_GLOBAL in types:
+            compteurs[TYPE_GLOBAL] = PrecalculService.precalculer_globales(depuis, complet)
+
+        logger.info(f"🗓️ Précalcul terminé: {compteurs}")
+        return compteurs
+
+    @staticmethod
+    def _cumuler(compteurs, resultats, nb_lots, progression):
+        for i, resultat in enumerate(resultats, start=1):
+            for type_periode, total in resultat.items():
+                compteurs[type_periode] += total
+            if progression:
+                progression(i, nb_lots)
+
+    @staticmethod
+    def precalculer_employes(cins, types_periode=TYPES_PERIODE, depuis=None, complet=False):
+        """Recalcule les périodes closes périmées d'un lot d'employés; une transaction par lot"""
+        from api.models import Employe, PresenceJournaliere, StatistiquesEmploye
+
+        compteurs = dict.fromkeys(types_periode, 0)
+        aujourdhui = timezone.now().date()
+
+        presences = PresenceJournaliere.objects.filter(employe_id__in=cins)
+        if depuis:
+            presences = presences.filter(date__gte=depuis)
+        premieres = dict(
+            presences.values('employe_id').annotate(premiere=Min('date')).values_list('employe_id', 'premiere')
+        )
+        if not premieres:
+            return compteurs
+        employes = Employe.objects.in_bulk(list(premieres))
+
+        objets = []
+        champs = None
+        for type_periode in types_periode:
+            troncature, construire = PrecalculService.PERIODES[type_periode]
+            debut = _debut_periode(type_periode, min(premieres.values()))
+            limite = _debut_periode(type_periode, aujourdhui)  # première période non close
+            if debut >= limite:
+                continue
+
+            totaux = StatisticsService._totaux_periodiques_par_employe(
+                debut, limite - timedelta(days=1), troncature, employe_id__in=list(premieres)
+            )
+            existantes = {
+                (cin, periode_debut): (jours_travailles, date_calcul)
+                for cin, periode_debut, jours_travailles, date_calcul in StatistiquesEmploye.objects.filter(
+                    employe_id__in=list(premieres), type_periode=type_periode,
+                    periode_debut__gte=debut, periode_debut__lt=limite,
+                ).values_list('employe_id', 'periode_debut', 'jours_travailles', 'date_calcul')
+            }
+
+            for cin, premiere in premieres.items():
+                totaux_employe = totaux.get(cin, {})
+                periode = _debut_periode(type_periode, premiere)
+                while periode < limite:
+                    totaux_periode = totaux_employe.get(periode, TOTAUX_VIDES)
+                    if complet or _a_recalculer(totaux_periode, existantes.get((cin, periode))):
+                        stats = construire(employes[cin], periode, totaux_periode)
+                        valeurs = StatisticsService.valeurs_statistiques_employe(stats)
+                        champs = champs or [*valeurs, 'date_calcul']
+                        objets.append(StatistiquesEmploye(
+                            employe_id=cin,
+                            periode_debut=stats['periode_debut'],
+                            periode_fin=stats['periode_fin'],
+                            type_periode=type_periode,
+                            **valeurs,
+                        ))
+                        compteurs[type_periode] += 1
+                    periode = _periode_suivante(type_periode, periode)
+
+        if objets:
+            with transaction.atomic():
+                StatistiquesEmploye.objects.bulk_create(
+                    objets,
+                    batch_size=500,
+                    update_conflicts=True,
+                    unique_fields=['employe', 'periode_debut', 'periode_fin', 'type_periode'],
+                    update_fields=champs,
+                )
+                # bulk_create n'envoie pas post_save: validateurs HTTP de la liste
+                StatsCache.incrementer_versions_apres_commit({"stockees:employe"})
+        return compteurs
+
+    @staticmethod
+    def precalculer_globales(depuis=None, complet=False):
+        """Recalcule les mois clos périmés de StatistiquesGlobales; retourne le nombre de mois écrits"""
+        from api.models import PresenceDepartementJournaliere, StatistiquesGlobales
+
+        limite = timezone.now().date().replace(day=1)
+        presences = PresenceDepartementJournaliere.objects.filter(date__lt=limite)
+        if depuis:
+            presences = presences.filter(date__gte=depuis.replace(day=1))
+
+        mois_presences = {}
+        for ligne in presences.annotate(mois=TruncMonth('date')).values('mois').annotate(
+            pointages=Sum('nb_pointages'), derniere_maj=Max('date_maj'),
+        ).order_by():
+            mois = ligne['mois']
+            mois = mois.date() if isinstance(mois, datetime) else mois
+            mois_presences[mois] = {'jours_travailles': ligne['pointages'], 'derniere_maj': ligne['derniere_maj']}
+        if not mois_presences:
+            return 0
+
+        premier = min(mois_presences)
+        existantes = {
+            periode: (total_pointages, date_calcul)
+            for periode, total_pointages, date_calcul in StatistiquesGlobales.objects.filter(
+                periode__gte=premier, periode__lt=limite
+            ).values_list('periode', 'total_pointages', 'date_calcul')
+        }
+
+        objets = []
+        champs = None
+        mois = premier
+        while mois < limite:
+            totaux = mois_presences.get(mois, {'jours_travailles': 0, 'derniere_maj': None})
+            if complet or _a_recalculer(totaux, existantes.get(mois)):
+                valeurs = StatisticsService.valeurs_statistiques_globales(
+                    StatisticsService._compute_global_monthly_stats(mois)
+                )
+                champs = champs or [*valeurs, 'date_calcul']
+                objets.append(StatistiquesGlobales(periode=mois, **valeurs))
+            mois = _periode_suivante('mensuel', mois)
+
+        if objets:
+            with transaction.atomic():
+                StatistiquesGlobales.objects.bulk_create(
+                    objets, update_conflicts=True, unique_fields=['periode'], update_fields=champs,
+                )
+                StatsCache.incrementer_versions_apres_commit({"stockees:globales"})
+        return len(objets)
@@ -0,0 +1,323 @@
+# presence_live_service.py - Index en mémoire des présences du jour et diffusion des changements (SSE)
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CLE_VERSION = 'presence:live:v'
+TAILLE_HISTORIQUE = 1000
+TAILLE_FILE_ABONNE = 500
+SYNCHRONISATION_SECONDES_PAR_DEFAUT = 10
+
+# Index du jour: departement_id -> {cin: présence}; un seul pointage par employé et par jour
+_index = {}
+_jour = None
+# Employés vus par l'index: cin -> (nom complet, departement_id)
+_employes = {}
+_sequence = 0
+# Identifie ce processus dans les identifiants d'événements (une séquence n'a de sens que dans son processus)
+EPOQUE = str(time.time_ns())
+# Derniers changements (sequence, evenement) pour la reprise d'un flux (Last-Event-ID)
+_historique = deque(maxlen=TAILLE_HISTORIQUE)
+_abonnes = set()
+# Version partagée (cache) connue de ce processus et date de la dernière vérification
+_version = None
+_derniere_synchronisation = 0.0
+_resynchroniser = False
+_verrou = threading.RLock()
+
+
+class Abonne:
+    """File d'événements d'un flux, consommée dans sa boucle asyncio"""
+
+    def __init__(self, departement=None, portee=None):
+        self.departement = departement
+        self.portee = portee
+        self.boucle = asyncio.get_running_loop()
+        self.file = asyncio.Queue(maxsize=TAILLE_FILE_ABONNE)
+        # File pleine (client trop lent): le flux renverra un instantané complet
+        self.deborde = False
+
+    def deposer(self, evenement):
+        """Appelé depuis n'importe quel thread"""
+        self.boucle.call_soon_threadsafe(self._deposer, evenement)
+
+    def _deposer(self, evenement):
+        if self.deborde:
+            return
+        try:
+            self.file.put_nowait(evenement)
+        except asyncio.QueueFull:
+            self.deborde = True
+
+
+class PresenceLiveService:
+    """Qui est présent maintenant, par département, sans relire la table des pointages.
+
+    L'index est chargé une fois par jour et par processus (une requête sur les
+    pointages du jour) puis tenu à jour par les écritures: chaque pointage
+    enregistré ou supprimé produit au plus un changement ('entree', 'sortie',
+    'modification', 'retrait') diffusé aux flux abonnés.
+
+    Les écritures faites par un autre processus sont rattrapées par
+    ``synchroniser``: une version partagée dans le cache signale l'écriture, le
+    processus recharge alors les pointages du jour et diffuse la différence
+    (délai maximal PRESENCE_LIVE_SYNCHRONISATION_SECONDES). Avec un cache local
+    au processus (LocMemCache), seules les écritures du processus sont vues.
+
+    Lectures et flux sont limités à une portée d'accès (PorteeAcces): seules les
+    présences des employés que l'utilisateur peut lire sont renvoyées. La portée
+    d'un flux est celle de son ouverture.
+    """
+
+    # -----------------------
+    # Index
+    # -----------------------
+    @staticmethod
+    def _presence(id_pointage, cin, heure_entree, heure_sortie):
+        nom, departement = _employes[cin]
+        return {
+            'id_pointage': id_pointage,
+            'cin': cin,
+            'nom_complet': nom,
+            'departement': departement,
+            'statut': 'parti' if heure_sortie else 'present',
+            'heure_entree': heure_entree.strftime('%H:%M') if heure_entree else None,
+            'heure_sortie': heure_sortie.strftime('%H:%M') if heure_sortie else None,
+        }
+
+    @staticmethod
+    def _charger_employes(cins):
+        from api.models import Employe
+
+        manquants = set(cins) - _employes.keys()
+        if manquants:
+            for cin, nom, prenom, departement in Employe.objects.filter(cin__in=manquants).values_list(
+                'cin', 'nom', 'prenom', 'departement_id'
+            ):
+                _employes[cin] = (f"{nom} {prenom}", departement)
+
+    @staticmethod
+    def _lire_jour(jour):
+        """Présences du jour lues en base: {cin: présence}"""
+        from api.models import Pointage
+
+        lignes = list(Pointage.objects.filter(date_pointage=jour).values_list(
+            'id_pointage', 'employe_id', 'heure_entree', 'heure_sortie'
+        ))
+        PresenceLiveService._charger_employes(ligne[1] for ligne in lignes)
+        return {
+            cin: PresenceLiveService._presence(id_pointage, cin, entree, sortie)
+            for id_pointage, cin, entree, sortie in lignes
+            if cin in _employes
+        }
+
+    @staticmethod
+    def _assurer_jour():
+        """Charge l'index au premier accès et à chaque changement de jour (verrou tenu)"""
+        global _jour, _version
+        # Même jour civil que les pointages et les agrégats (fuseau TIME_ZONE)
+        jour = timezone.localdate()
+        if _jour == jour:
+            return
+        _version = cache.get(CLE_VERSION)
+        _index.clear()
+        _employes.clear()
+        for cin, presence in PresenceLiveService._lire_jour(jour).items():
+            _index.setdefault(presence['departement'], {})[cin] = presence
+        changement_de_jour = _jour is not None
+        _jour = jour
+        if changement_de_jour:
+            # Les flux ouverts repartent d'un instantané du nouveau jour
+            _historique.clear()
+            for abonne in list(_abonnes):
+                abonne.deposer({'type': 'instantane'})
+
+    @staticmethod
+    def _visible(presence, departement=None, portee=None):
+        return (
+            (departement is None or presence['departement'] == departement)
+            and (portee is None or portee.peut_lire_employe(presence['cin']))
+        )
+
+    @staticmethod
+    def _trouver(cin):
+        for departement, presences in _index.items():
+            if cin in presences:
+                return departement, presences[cin]
+        return None, None
+
+    @staticmethod
+    def _publier(type_evenement, presence):
+        """Enregistre et diffuse un changement (verrou tenu)"""
+        global _sequence
+        _sequence += 1
+        evenement = {'type': type_evenement, 'sequence': _sequence, 'jour': _jour.isoformat(), 'presence': presence}
+        _historique.append(evenement)
+        for abonne in list(_abonnes):
+            if PresenceLiveService._visible(presence, abonne.departement, abonne.portee):
+                abonne.deposer(evenement)
+
+    @staticmethod
+    def _remplacer(cin, presence):
+        """Place ``presence`` (ou None) pour l'employé et publie le changement éventuel (verrou tenu)"""
+        departement, actuelle = PresenceLiveService._trouver(cin)
+        if actuelle == presence:
+            return
+        if actuelle is not None and (presence is None or actuelle['departement'] != presence['departement']):
+            del _index[departement][cin]
+            PresenceLiveService._publier('retrait', actuelle)
+            actuelle = None
+        if presence is None:
+            return
+        _index.setdefault(presence['departement'], {})[cin] = presence
+
+        if actuelle is None:
+            type_evenement = 'entree' if presence['statut'] == 'present' else 'sortie'
+        elif actuelle['statut'] != presence['statut']:
+            type_evenement = 'sortie' if presence['statut'] == 'parti' else 'entree'
+        else:
+            type_evenement = 'modification'
+        PresenceLiveService._publier(type_evenement, presence)
+
+    # -----------------------
+    # Écritures
+    # -----------------------
+    @staticmethod
+    def _signaler_ecriture():
+        """Version partagée: les autres processus rechargeront le jour"""
+        global _version, _resynchroniser
+        if cache.get(CLE_VERSION) != _version:
+            # Écriture d'un autre processus pas encore rattrapée
+            _resynchroniser = True
+        _version = time.time_ns()
+        cache.set(CLE_VERSION, _version, timeout=None)
+
+    @staticmethod
+    def appliquer_pointages(pointages, supprimes=False):
+        """Répercute des pointages enregistrés (ou supprimés) sur l'index, après validation de la transaction"""
+        valeurs = [
+            (p.id_pointage, p.employe_id, p.date_pointage, p.heure_entree, p.heure_sortie)
+            for p in pointages
+        ]
+        if valeurs:
+            transaction.on_commit(lambda: PresenceLiveService._appliquer(valeurs, supprimes))
+
+    @staticmethod
+    def _appliquer(valeurs, supprimes):
+        with _verrou:
+            PresenceLiveService._assurer_jour()
+            PresenceLiveService._charger_employes(
+                cin for _, cin, jour, _, _ in valeurs if jour == _jour
+            )
+            for id_pointage, cin, jour, entree, sortie in valeurs:
+                _, actuelle = PresenceLiveService._trouver(cin)
+                if jour == _jour and not supprimes and cin in _employes:
+                    PresenceLiveService._remplacer(
+                        cin, PresenceLiveService._presence(id_pointage, cin, entree, sortie)
+                    )
+                elif actuelle is not None and actuelle['id_pointage'] == id_pointage:
+                    # Pointage du jour supprimé ou déplacé à une autre date
+                    PresenceLiveService._remplacer(cin, None)
+            PresenceLiveService._signaler_ecriture()
+
+    @staticmethod
+    def actualiser_employe(cin, nom_complet, departement):
+        """Nom ou département modifié: déplace la présence du jour de l'employé"""
+        def appliquer():
+            with _verrou:
+                if _employes.get(cin, (nom_complet, departement)) == (nom_complet, departement):
+                    return
+                _employes[cin] = (nom_complet, departement)
+                _, actuelle = PresenceLiveService._trouver(cin)
+                if actuelle is not None:
+                    PresenceLiveService._remplacer(
+                        cin, dict(actuelle, nom_complet=nom_complet, departement=departement)
+                    )
+                PresenceLiveService._signaler_ecriture()
+        transaction.on_commit(appliquer)
+
+    @staticmethod
+    def synchroniser(force=False):
+        """Recharge le jour si un autre processus a écrit depuis la dernière vérification"""
+        global _derniere_synchronisation, _version, _resynchroniser
+        intervalle = getattr(
+            settings, 'PRESENCE_LIVE_SYNCHRONISATION_SECONDES', SYNCHRONISATION_SECONDES_PAR_DEFAUT
+        )
+        with _verrou:
+            PresenceLiveService._assurer_jour()
+            maintenant = time.monotonic()
+            if not force and maintenant - _derniere_synchronisation < intervalle:
+                return
+            _derniere_synchronisation = maintenant
+            version = cache.get(CLE_VERSION)
+            if not force and not _resynchroniser and version == _version:
+                return
+            _version = version
+            _resynchroniser = False
+
+            _employes.clear()
+            lues = PresenceLiveService._lire_jour(_jour)
+            connus = {cin for presences in _index.values() for cin in presences}
+            for cin in connus | lues.keys():
+                PresenceLiveService._remplacer(cin, lues.get(cin))
+
+    # -----------------------
+    # Lecture
+    # -----------------------
+    @staticmethod
+    def instantane(departement=None, portee=None):
+        """Présences du jour par département, avec la séquence du dernier changement inclus"""
+        with _verrou:
+            PresenceLiveService._assurer_jour()
+            departements = {}
+            for dep, presences in _index.items():
+                if departement is not None and dep != departement:
+                    continue
+                visibles = [p for p in presences.values() if PresenceLiveService._visible(p, portee=portee)]
+                if visibles:
+                    departements[dep] = sorted(visibles, key=lambda p: p['nom_complet'])
+            return {
+                'jour': _jour.isoformat(),
+                'epoque': EPOQUE,
+                'sequence': _sequence,
+                'presents': sum(
+                    1 for presences in departements.values() for p in presences if p['statut'] == 'present'
+                ),
+                'departements': departements,
+            }
+
+    @staticmethod
+    def depuis(sequence, departement=None, portee=None):
+        """Changements postérieurs à ``sequence``; None si l'historique ne remonte pas jusque-là"""
+        with _verrou:
+            if sequence > _sequence:
+                return None
+            if sequence < _sequence and (not _historique or _historique[0]['sequence'] > sequence + 1):
+                return None
+            return [
+                evenement for evenement in _historique
+                if evenement['sequence'] > sequence
+                and PresenceLiveService._visible(evenement['presence'], departement, portee)
+            ]
+
+    @staticmethod
+    def abonner(departement=None, portee=None):
+        """Nouvel abonné (à appeler depuis la boucle asyncio du flux)"""
+        abonne = Abonne(departement, portee)
+        with _verrou:
+            _abonnes.add(abonne)
+        return abonne
+
+    @staticmethod
+    def desabonner(abonne):
+        with _verrou:
+            _abonnes.discard(abonne)
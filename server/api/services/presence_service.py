@@ -0,0 +1,261 @@
+# presence_service.py - Maintenance des agrégats journaliers de présence
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+
+from .archive_service import ArchiveService
+from .ponctualite import classer_lignes
+from .stats_cache import StatsCache
+
+logger = logging.getLogger(__name__)
+
+CHAMPS_PRESENCE = [
+    'departement', 'secondes_travail', 'retard_minutes',
+    'depart_avance_minutes', 'ponctualite_statut', 'date_maj'
+]
+CHAMPS_PRESENCE_DEPARTEMENT = [
+    'nb_pointages', 'secondes_travail', 'retard_minutes_total', 'depart_avance_minutes_total',
+    'ponctualite_parfaite', 'ponctualite_acceptable', 'ponctualite_inacceptable', 'date_maj'
+]
+TAILLE_LOT = 1000
+
+
+class PresenceService:
+    """Tient à jour PresenceJournaliere et PresenceDepartementJournaliere.
+
+    Chaque écriture de Pointage ne recalcule que les jours touchés; les
+    statistiques lisent ensuite ces agrégats au lieu des pointages bruts.
+    """
+
+    @staticmethod
+    def _pointages_complets(queryset):
+        """Pointages complets avec les horaires attendus de l'employé (pour la classification)"""
+        return queryset.filter(duree_travail__isnull=False).values(
+            'employe_id', 'employe__departement_id', 'date_pointage', 'duree_travail',
+            'heure_entree', 'heure_sortie', 'employe__heure_entree_attendue',
+            'employe__heure_sortie_attendue', 'employe__marge_tolerance_minutes',
+        ).order_by()
+
+    @staticmethod
+    def _presences_depuis_lignes(modele, lignes):
+        """Agrégats journaliers d'un lot de pointages, classés en une passe (services.ponctualite)"""
+        classement = classer_lignes(
+            lignes, 'heure_entree', 'heure_sortie', 'employe__heure_entree_attendue',
+            'employe__heure_sortie_attendue', 'employe__marge_tolerance_minutes',
+        )
+        return [
+            modele(
+                employe_id=ligne['employe_id'],
+                departement_id=ligne['employe__departement_id'],
+                date=ligne['date_pointage'],
+                secondes_travail=int(ligne['duree_travail'].total_seconds()),
+                retard_minutes=retard,
+                depart_avance_minutes=depart_avance,
+                ponctualite_statut=categorie,
+            )
+            for ligne, retard, depart_avance, categorie in zip(
+                lignes, classement['retard_minutes'], classement['depart_avance_minutes'],
+                classement['categorie'],
+            )
+        ]
+
+    @staticmethod
+    def _supprimer_cles(queryset, cles, champ_cle):
+        """Supprime les lignes dont la clé (champ_cle, date) figure dans cles"""
+        cles = list(cles)
+        for i in range(0, len(cles), TAILLE_LOT):
+            condition = Q()
+            for valeur, jour in cles[i:i + TAILLE_LOT]:
+                condition |= Q(**{champ_cle: valeur, 'date': jour})
+            queryset.filter(condition).delete()
+
+    @staticmethod
+    def actualiser_jours(cles):
+        """Recalcule les agrégats des couples (cin, date) donnés à partir des pointages"""
+        from api.models import Pointage, PresenceJournaliere
+
+        # Les années archivées sont figées: leurs agrégats ne sont plus recalculés
+        annees_archivees = set(ArchiveService.annees_archivees())
+        cles = {(cin, jour) for cin, jour in cles if cin and jour and jour.year not in annees_archivees}
+        if not cles:
+            return
+
+        cins = {cin for cin, _ in cles}
+        dates = [jour for _, jour in cles]
+        periode = (min(dates), max(dates))
+
+        with transaction.atomic():
+            # Départements concernés avant mise à jour (un employé a pu changer de département)
+            departements_touches = {
+                (departement_id, jour)
+                for cin, jour, departement_id in PresenceJournaliere.objects.filter(
+                    employe_id__in=cins, date__range=periode
+                ).values_list('employe_id', 'date', 'departement_id')
+                if (cin, jour) in cles
+            }
+
+            lignes = [
+                ligne for ligne in PresenceService._pointages_complets(
+                    Pointage.objects.filter(employe_id__in=cins, date_pointage__range=periode)
+                )
+                if (ligne['employe_id'], ligne['date_pointage']) in cles
+            ]
+            presences = PresenceService._presences_depuis_lignes(PresenceJournaliere, lignes)
+
+            # Jours sans pointage complet: l'agrégat disparaît
+            presents = {(p.employe_id, p.date) for p in presences}
+            PresenceService._supprimer_cles(
+                PresenceJournaliere.objects.all(), cles - presents, 'employe_id'
+            )
+            PresenceJournaliere.objects.bulk_create(
+                presences,
+                batch_size=TAILLE_LOT,
+                update_conflicts=True,
+                unique_fields=['employe', 'date'],
+                update_fields=CHAMPS_PRESENCE,
+            )
+
+            departements_touches.update((p.departement_id, p.date) for p in presences)
+            PresenceService.recalculer_departements(departements_touches)
+
+            StatsCache.invalider_jours(cles, departements_touches)
+
+    @staticmethod
+    def actualiser_pointages(pointages):
+        """Met à jour les agrégats après un chargement en masse (bulk_create/update)"""
+        PresenceService.actualiser_jours(
+            (p.employe_id, p.date_pointage) for p in pointages
+        )
+
+    @staticmethod
+    def actualiser_employe(cin):
+        """Recalcule tout l'historique d'un employé (horaires ou département modifiés)"""
+        from api.models import Pointage, PresenceJournaliere
+
+        cles = set(Pointage.objects.filter(employe_id=cin).values_list('employe_id', 'date_pointage'))
+        cles.update(PresenceJournaliere.objects.filter(employe_id=cin).values_list('employe_id', 'date'))
+        PresenceService.actualiser_jours(cles)
+
+    @staticmethod
+    def _agregats_departements(queryset):
+        return queryset.values('departement_id', 'date').annotate(
+            nb=Count('pk'),
+            secondes=Sum('secondes_travail'),
+            retard=Sum('retard_minutes'),
+            depart_avance=Sum('depart_avance_minutes'),
+            parfait=Count('pk', filter=Q(ponctualite_statut='parfait')),
+            acceptable=Count('pk', filter=Q(ponctualite_statut='acceptable')),
+            inacceptable=Count('pk', filter=Q(ponctualite_statut='inacceptable')),
+        ).order_by()
+
+    @staticmethod
+    def _presence_departement_depuis_agregat(modele, agregat):
+        return modele(
+            departement_id=agregat['departement_id'],
+            date=agregat['date'],
+            nb_pointages=agregat['nb'],
+            secondes_travail=agregat['secondes'] or 0,
+            retard_minutes_total=agregat['retard'] or 0,
+            depart_avance_minutes_total=agregat['depart_avance'] or 0,
+            ponctualite_parfaite=agregat['parfait'],
+            ponctualite_acceptable=agregat['acceptable'],
+            ponctualite_inacceptable=agregat['inacceptable'],
+        )
+
+    @staticmethod
+    def recalculer_departements(cles):
+        """Recalcule les agrégats (département, date) à partir des présences des employés"""
+        from api.models import PresenceJournaliere, PresenceDepartementJournaliere
+
+        cles = {(departement_id, jour) for departement_id, jour in cles if departement_id and jour}
+        if not cles:
+            return
+
+        departements = {departement_id for departement_id, _ in cles}
+        dates = [jour for _, jour in cles]
+        agregats = PresenceService._agregats_departements(
+            PresenceJournaliere.objects.filter(
+                departement_id__in=departements, date__range=(min(dates), max(dates))
+            )
+        )
+        lignes = [
+            PresenceService._presence_departement_depuis_agregat(PresenceDepartementJournaliere, a)
+            for a in agregats
+            if (a['departement_id'], a['date']) in cles
+        ]
+
+        presents = {(l.departement_id, l.date) for l in lignes}
+        PresenceService._supprimer_cles(
+            PresenceDepartementJournaliere.objects.all(), cles - presents, 'departement_id'
+        )
+        PresenceDepartementJournaliere.objects.bulk_create(
+            lignes,
+            batch_size=TAILLE_LOT,
+            update_conflicts=True,
+            unique_fields=['departement', 'date'],
+            update_fields=CHAMPS_PRESENCE_DEPARTEMENT,
+        )
+
+    @staticmethod
+    def reconstruire(debut=None, fin=None):
+        """Reconstruit entièrement les agrégats (optionnellement sur une période)"""
+        from api.models import Pointage, PresenceJournaliere, PresenceDepartementJournaliere
+
+        filtres = {}
+        if debut:
+            filtres['date__gte'] = debut
+        if fin:
+            filtres['date__lte'] = fin
+        filtres_pointage = {k.replace('date', 'date_pointage', 1): v for k, v in filtres.items()}
+
+        with transaction.atomic():
+            PresenceJournaliere.objects.filter(**filtres).delete()
+            PresenceDepartementJournaliere.objects.filter(**filtres).delete()
+
+            total = 0
+            lot = []
+            lignes = PresenceService._pointages_complets(Pointage.objects.filter(**filtres_pointage))
+            for ligne in lignes.iterator(chunk_size=TAILLE_LOT):
+                lot.append(ligne)
+                if len(lot) >= TAILLE_LOT:
+                    PresenceJournaliere.objects.bulk_create(
+                        PresenceService._presences_depuis_lignes(PresenceJournaliere, lot)
+                    )
+                    total += len(lot)
+                    lot = []
+            if lot:
+                PresenceJournaliere.objects.bulk_create(
+                    PresenceService._presences_depuis_lignes(PresenceJournaliere, lot)
+                )
+                total += len(lot)
+
+            # Années archivées: les pointages ne sont plus en table, l'archive fait foi
+            for annee in ArchiveService.annees_archivees():
+                if (debut and annee < debut.year) or (fin and annee > fin.year):
+                    continue
+                lot = []
+                for presence in ArchiveService.presences(annee, debut, fin):
+                    lot.append(PresenceJournaliere(**presence))
+                    if len(lot) >= TAILLE_LOT:
+                        PresenceJournaliere.objects.bulk_create(lot)
+                        total += len(lot)
+                        lot = []
+                PresenceJournaliere.objects.bulk_create(lot)
+                total += len(lot)
+
+            agregats = PresenceService._agregats_departements(
+                PresenceJournaliere.objects.filter(**filtres)
+            )
+            PresenceDepartementJournaliere.objects.bulk_create(
+                [
+                    PresenceService._presence_departement_depuis_agregat(PresenceDepartementJournaliere, a)
+                    for a in agregats
+                ],
+                batch_size=TAILLE_LOT,
+            )
+
+            StatsCache.incrementer_versions_apres_commit({'epoque'})
+
+        logger.info(f"🔄 Agrégats de présence reconstruits: {total} jours employé")
+        return total
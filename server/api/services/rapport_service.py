@@ -0,0 +1,348 @@
+# rapport_service.py - Rapports PDF générés en arrière-plan (pool de processus local)
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+
+from .acces_service import AccesService, PorteeAcces
+from .pdf_service import PdfService, REPORTLAB_AVAILABLE
+from .statistics_service import StatisticsService
+from .stats_cache import StatsCache
+
+logger = logging.getLogger(__name__)
+
+TTL_HEURES_PAR_DEFAUT = 24
+WORKERS_PAR_DEFAUT = 2
+# En dessous, le rendu d'un lot se fait dans le worker courant (démarrer un pool coûte plus cher)
+SEUIL_RENDU_PARALLELE = 20
+# Au-delà, un job non terminé est considéré comme perdu (worker arrêté)
+DUREE_MAX_JOB_MINUTES = 30
+STATUTS_REUTILISABLES = ('en_attente', 'en_cours', 'termine')
+
+_executeur = None
+_verrou_executeur = threading.Lock()
+
+
+def _initialiser_worker():
+    """Initialisation d'un processus worker (démarré en 'spawn': Django n'y est pas chargé)"""
+    import django
+    django.setup()
+
+
+def executer_rapport(job_id):
+    """Point d'entrée exécuté dans le worker (fonction de module, sérialisable par pickle)"""
+    close_old_connections()
+    try:
+        RapportService.executer(job_id)
+    finally:
+        close_old_connections()
+
+
+def rendre_pdfs_employes(employes_stats):
+    """Rendu d'une partie d'un lot dans un processus de rendu: [(nom_fichier, octets), ...]"""
+    return [
+        (PdfService.nom_fichier_employe(employe), PdfService.generer_pdf_employe(employe, stats))
+        for employe, stats in employes_stats
+    ]
+
+
+class RapportService:
+    """Soumission, exécution et stockage des rapports PDF asynchrones (RapportJob).
+
+    La génération (statistiques + ReportLab) tourne dans un pool de processus
+    local, hors des workers WSGI. Le PDF est stocké en base jusqu'à expiration.
+    Une demande identique (mêmes paramètres, mêmes versions de données, voir
+    StatsCache) réutilise le job existant au lieu de reconstruire le PDF.
+    """
+
+    # -----------------------
+    # Pool de processus
+    # -----------------------
+    @staticmethod
+    def _executeur():
+        global _executeur
+        with _verrou_executeur:
+            if _executeur is None:
+                _executeur = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'RAPPORTS_WORKERS', WORKERS_PAR_DEFAUT),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_initialiser_worker,
+                )
+            return _executeur
+
+    @staticmethod
+    def _reinitialiser_executeur():
+        global _executeur
+        with _verrou_executeur:
+            if _executeur is not None:
+                _executeur.shutdown(wait=False, cancel_futures=False)
+            _executeur = None
+
+    @staticmethod
+    def _planifier(job_id):
+        """Envoie le job au pool (ou l'exécute sur place si RAPPORTS_EXECUTION = 'synchrone')"""
+        job_id = str(job_id)
+        if getattr(settings, 'RAPPORTS_EXECUTION', 'processus') == 'synchrone':
+            RapportService.executer(job_id)
+            return
+
+        try:
+            try:
+                future = RapportService._executeur().submit(executer_rapport, job_id)
+            except BrokenProcessPool:
+                # Pool cassé (worker tué): on en recrée un
+                logger.warning("⚠️ Pool de génération des rapports réinitialisé")
+                RapportService._reinitialiser_executeur()
+                future = RapportService._executeur().submit(executer_rapport, job_id)
+        except Exception as e:
+            from api.models import RapportJob
+            logger.error(f"❌ Impossible de planifier le rapport {job_id}: {str(e)}")
+            RapportJob.objects.filter(pk=job_id).update(
+                statut='erreur', erreur="Génération indisponible", date_fin=timezone.now()
+            )
+            return
+
+        def _journaliser(f):
+            if f.exception() is not None:
+                logger.error(f"❌ Worker rapport {job_id}: {f.exception()}")
+        future.add_done_callback(_journaliser)
+
+    # -----------------------
+    # Paramètres et déduplication
+    # -----------------------
+    @staticmethod
+    def preparer_parametres(type_rapport, donnees):
+        """Paramètres normalisés d'un rapport (deux demandes équivalentes donnent le même dict)"""
+        if type_rapport == 'employe':
+            cin = donnees.get('cin')
+            if not cin:
+                raise ValueError("CIN requis")
+            periode = donnees.get('periode', 'mois')
+            if periode == 'semaine':
+                date_reference = StatisticsService._parse_date_reference(donnees.get('date'))
+                debut = date_reference - timedelta(days=date_reference.weekday())
+            else:
+                periode = 'mois'
+                debut = StatisticsService._parse_mois(donnees.get('date'))
+            return {'cin': str(cin), 'periode': periode, 'debut': debut.isoformat()}
+
+        if type_rapport == 'global':
+            mois = StatisticsService._parse_mois(donnees.get('mois'))
+            return {'mois': mois.isoformat()}
+
+        if type_rapport == 'departement':
+            departement = donnees.get('departement')
+            if not departement:
+                raise ValueError("Département requis")
+            sortie = donnees.get('sortie', 'zip')
+            if sortie not in ('zip', 'pdf'):
+                raise ValueError("Sortie non valide (zip ou pdf)")
+            mois = StatisticsService._parse_mois(donnees.get('mois'))
+            return {'departement': str(departement), 'mois': mois.isoformat(), 'sortie': sortie}
+
+        raise ValueError("Type de rapport non valide")
+
+    @staticmethod
+    def _cle_donnees(type_rapport, parametres):
+        """Clé de cache des statistiques du rapport: elle intègre les versions des données"""
+        if type_rapport == 'employe':
+            debut = date.fromisoformat(parametres['debut'])
+            if parametres['periode'] == 'semaine':
+                return StatsCache.cle_employe_hebdo(parametres['cin'], debut)
+            return StatsCache.cle_employe_mensuel(parametres['cin'], debut)
+        if type_rapport == 'departement':
+            return StatsCache.cle_departement_mensuel(
+                parametres['departement'], date.fromisoformat(parametres['mois'])
+            )
+        return StatsCache.cle_global_mensuel(date.fromisoformat(parametres['mois']))
+
+    @staticmethod
+    def cle_dedup(type_rapport, parametres):
+        contenu = json.dumps({
+            'type': type_rapport,
+            'parametres': parametres,
+            'donnees': RapportService._cle_donnees(type_rapport, parametres),
+        }, sort_keys=True)
+        return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+    # -----------------------
+    # Soumission
+    # -----------------------
+    @staticmethod
+    def soumettre(type_rapport, parametres, utilisateur):
+        """Crée le job (ou retourne un job identique encore valide); retourne (job, cree)"""
+        from api.models import RapportJob
+
+        cle = RapportService.cle_dedup(type_rapport, parametres)
+        maintenant = timezone.now()
+
+        existant = RapportJob.objects.filter(
+            cle_dedup=cle,
+            statut__in=STATUTS_REUTILISABLES,
+            date_expiration__gt=maintenant,
+        ).defer('contenu').order_by('-date_creation').first()
+        if existant:
+            logger.info(f"♻️ Rapport réutilisé: {existant.id} ({existant.statut})")
+            return existant, False
+
+        ttl = timedelta(hours=getattr(settings, 'RAPPORTS_TTL_HEURES', TTL_HEURES_PAR_DEFAUT))
+        job = RapportJob.objects.create(
+            type_rapport=type_rapport,
+            parametres=parametres,
+            cle_dedup=cle,
+            date_expiration=maintenant + ttl,
+            created_by=utilisateur,
+        )
+        transaction.on_commit(lambda: RapportService._planifier(job.id))
+        return job, True
+
+    # -----------------------
+    # Génération (worker ou requête)
+    # -----------------------
+    @staticmethod
+    def generer(type_rapport, parametres):
+        """Calcule les statistiques et construit le PDF; retourne (octets, nom de fichier).
+
+        Exécution d'un job, ou génération pendant la requête (export direct d'un département).
+        """
+        from api.models import Employe
+
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError("ReportLab n'est pas installé")
+
+        if type_rapport == 'employe':
+            employe = Employe.objects.select_related('departement').get(cin=parametres['cin'])
+            if parametres['periode'] == 'semaine':
+                stats = StatisticsService.calculate_employee_weekly_stats(employe, parametres['debut'])
+            else:
+                stats = StatisticsService.calculate_employee_monthly_stats(employe, parametres['debut'])
+            return PdfService.generer_pdf_employe(employe, stats), PdfService.nom_fichier_employe(employe)
+
+        if type_rapport == 'departement':
+            return RapportService._generer_departement(parametres)
+
+        stats = StatisticsService.calculate_global_monthly_stats(parametres['mois'])
+        return PdfService.generer_pdf_global(stats), PdfService.nom_fichier_global()
+
+    @staticmethod
+    def _generer_departement(parametres):
+        """Rapports mensuels de tous les employés d'un département: ZIP de PDF ou PDF unique"""
+        # Lot restreint: portée de l'utilisateur qui l'a soumis (voir restreindre)
+        portee = None
+        if parametres.get('created_by') is not None:
+            portee = RapportService._portee_soumission(parametres['created_by'])
+        employes_stats = StatisticsService.calculate_department_employees_monthly_stats(
+            parametres['departement'], parametres['mois'], portee=portee
+        )
+        if not employes_stats:
+            raise ValueError("Aucun employé dans ce département")
+
+        mois = parametres['mois'][:7]
+        nom_base = f"rapports_{PdfService.normaliser_nom_fichier(parametres['departement'])}_{mois}"
+
+        if parametres['sortie'] == 'pdf':
+            # Un seul document: rendu dans ce worker
+            return PdfService.generer_pdf_employes(employes_stats), f"{nom_base}.pdf"
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for nom_fichier, contenu in RapportService._rendre_en_parallele(employes_stats):
+                archive.writestr(nom_fichier, contenu)
+        return buffer.getvalue(), f"{nom_base}.zip"
+
+    @staticmethod
+    def _portee_soumission(utilisateur_id):
+        from api.models import CustomUser
+
+        utilisateur = CustomUser.objects.filter(pk=utilisateur_id).first()
+        # Utilisateur supprimé depuis la soumission: aucun employé
+        return AccesService.portee(utilisateur) if utilisateur is not None else PorteeAcces(utilisateur_id)
+
+    @staticmethod
+    def _rendre_en_parallele(employes_stats):
+        """Répartit le rendu des PDF entre plusieurs processus (RAPPORTS_WORKERS_RENDU)"""
+        nb_processus = getattr(settings, 'RAPPORTS_WORKERS_RENDU', None) or os.cpu_count() or 1
+        nb_processus = min(nb_processus, max(1, len(employes_stats) // SEUIL_RENDU_PARALLELE))
+        if nb_processus <= 1:
+            return rendre_pdfs_employes(employes_stats)
+
+        lots = [employes_stats[i::nb_processus] for i in range(nb_processus)]
+        with ProcessPoolExecutor(
+            max_workers=nb_processus,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_initialiser_worker,
+        ) as executeur:
+            return [pdf for lot in executeur.map(rendre_pdfs_employes, lots) for pdf in lot]
+
+    @staticmethod
+    def executer(job_id):
+        from api.models import RapportJob
+
+        # Prise en charge atomique: un job n'est exécuté qu'une fois
+        pris = RapportJob.objects.filter(pk=job_id, statut='en_attente').update(
+            statut='en_cours', date_debut=timezone.now()
+        )
+        if not pris:
+            return
+
+        job = RapportJob.objects.defer('contenu').get(pk=job_id)
+        try:
+            contenu, nom_fichier = RapportService.generer(job.type_rapport, job.parametres)
+        except Exception as e:
+            logger.error(f"❌ Erreur génération rapport {job_id}: {str(e)}")
+            RapportJob.objects.filter(pk=job_id).update(
+                statut='erreur', erreur=str(e), date_fin=timezone.now()
+            )
+            return
+
+        RapportJob.objects.filter(pk=job_id).update(
+            statut='termine', contenu=contenu, nom_fichier=nom_fichier, date_fin=timezone.now()
+        )
+        logger.info(f"✅ Rapport {job_id} généré ({len(contenu)} octets)")
+
+    # -----------------------
+    # Accès et nettoyage
+    # -----------------------
+    @staticmethod
+    def peut_acceder(utilisateur, job):
+        """Même règle que l'export direct: rapport employé réservé à son créateur (ou superuser)"""
+        portee = AccesService.portee(utilisateur)
+        if portee.tout or job.created_by_id == utilisateur.id:
+            return True
+        if job.type_rapport == 'employe':
+            return portee.peut_lire_employe(job.parametres.get('cin'))
+        if job.type_rapport == 'departement':
+            # Lot restreint aux employés de l'utilisateur (voir RapportService.restreindre)
+            return job.parametres.get('created_by') == portee.utilisateur_id
+        return True
+
+    @staticmethod
+    def restreindre(parametres, portee):
+        """Lot département limité aux employés de la portée (tout pour un superutilisateur)"""
+        if not portee.tout:
+            parametres['created_by'] = portee.utilisateur_id
+        return parametres
+
+    @staticmethod
+    def purger(maintenant=None):
+        """Supprime les rapports expirés et marque en erreur les jobs perdus; retourne (supprimés, perdus)"""
+        from api.models import RapportJob
+
+        maintenant = maintenant or timezone.now()
+        supprimes, _ = RapportJob.objects.filter(date_expiration__lte=maintenant).delete()
+        perdus = RapportJob.objects.filter(
+            statut__in=('en_attente', 'en_cours'),
+            date_creation__lt=maintenant - timedelta(minutes=DUREE_MAX_JOB_MINUTES),
+        ).update(statut='erreur', erreur="Génération interrompue", date_fin=maintenant)
+        return supprimes, perdus
@@ -0,0 +1,218 @@
+# recherche_service.py - Recherche d'employés par index: plein texte et trigrammes (PostgreSQL), préfixes en mémoire sinon
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+CLE_VERSION = 'recherche:employes:v'
+LIMITE_PAR_DEFAUT = 10
+LIMITE_MAX = 50
+CHAMPS_RESULTAT = ('cin', 'nom', 'prenom', 'matricule', 'poste', 'titre', 'statut', 'departement_id')
+
+# -----------------------
+# PostgreSQL: expressions indexées (migration 0009); les requêtes doivent reprendre exactement ces expressions
+# -----------------------
+# Nom et prénom pèsent plus que l'email, le matricule, le poste et le CIN dans le classement
+DOCUMENT_EMPLOYE = (
+    "(setweight(to_tsvector('simple', nom || ' ' || prenom), 'A') || "
+    "to_tsvector('simple', email || ' ' || coalesce(matricule, '') || ' ' || poste || ' ' || cin))"
+)
+# Recherche approchée (fautes de frappe) sur le nom complet
+NOM_COMPLET_EMPLOYE = "UPPER(nom || ' ' || prenom)"
+# Colonnes des search_fields (SearchFilter: UPPER(colonne::text) LIKE UPPER('%terme%'))
+COLONNES_CONTIENT = {
+    'api_employe': ('nom', 'prenom', 'email', 'cin', 'matricule', 'poste'),
+    'api_pointage': ('remarque',),
+}
+INDEX_POSTGRESQL = [
+    ("api_employe_document_fts", f"CREATE INDEX IF NOT EXISTS api_employe_document_fts ON api_employe USING gin ({DOCUMENT_EMPLOYE})"),
+    ("api_employe_nom_complet_trgm", f"CREATE INDEX IF NOT EXISTS api_employe_nom_complet_trgm ON api_employe USING gin (({NOM_COMPLET_EMPLOYE}) gin_trgm_ops)"),
+] + [
+    (
+        f"{table}_{colonne}_trgm",
+        f"CREATE INDEX IF NOT EXISTS {table}_{colonne}_trgm ON {table} USING gin ((UPPER({colonne}::text)) gin_trgm_ops)",
+    )
+    for table, colonnes in COLONNES_CONTIENT.items()
+    for colonne in colonnes
+]
+
+# -----------------------
+# Index en mémoire (autres bases): (jeton, cin, poids) triés, fiches des employés
+# -----------------------
+_jetons = []
+_fiches = {}
+_version = None
+_verrou = threading.Lock()
+_MOTS = re.compile(r"[^\W_]+")
+
+
+def normaliser(texte):
+    """Minuscules sans accents: 'Hélène' -> 'helene'"""
+    decompose = unicodedata.normalize('NFKD', texte or '')
+    return ''.join(c for c in decompose if not unicodedata.combining(c)).lower()
+
+
+def jetons(texte):
+    return _MOTS.findall(normaliser(texte))
+
+
+class RechercheService:
+    """Recherche instantanée (typeahead) d'employés, classée par pertinence.
+
+    Sous PostgreSQL, la recherche s'appuie sur les index de la migration 0009:
+    un index plein texte (préfixes de chaque mot saisi, classement ts_rank, nom
+    et prénom en priorité) complété, s'il manque des résultats, par l'index
+    trigramme du nom complet (fautes de frappe). Les index trigrammes par colonne
+    servent aussi les recherches ``?search=`` des listes (SearchFilter).
+
+    Sur les autres bases (SQLite), chaque processus tient un index des préfixes
+    en mémoire: une liste triée des mots des employés, parcourue par dichotomie.
+    Il est reconstruit (une requête) à la première recherche qui suit une écriture
+    d'employé, signalée par une version partagée dans le cache.
+    """
+
+    @staticmethod
+    def moteur():
+        return 'postgresql' if connection.vendor == 'postgresql' else 'index_memoire'
+
+    @staticmethod
+    def invalider():
+        cache.set(CLE_VERSION, time.time_ns(), timeout=None)
+
+    @staticmethod
+    def invalider_apres_commit():
+        transaction.on_commit(RechercheService.invalider)
+
+    @staticmethod
+    def employes(terme, limite=LIMITE_PAR_DEFAUT, portee=None):
+        """Employés correspondant à ``terme`` (chaque mot est un début de mot), les plus pertinents d'abord.
+
+        ``portee`` (PorteeAcces) limite les résultats aux employés que l'utilisateur peut lire.
+        """
+        limite = max(1, min(int(limite), LIMITE_MAX))
+        if not jetons(terme):
+            return []
+        if portee is not None and portee.tout:
+            portee = None
+        if connection.vendor == 'postgresql':
+            return RechercheService._employes_postgresql(terme, limite, portee)
+        return RechercheService._employes_memoire(terme, limite, portee)
+
+    # -----------------------
+    # PostgreSQL
+    # -----------------------
+    @staticmethod
+    def _employes_postgresql(terme, limite, portee=None):
+        from api.models import Employe
+
+        employes = Employe.objects.all() if portee is None else portee.filtrer_employes(Employe.objects.all())
+        # Mots réduits aux lettres et chiffres: aucune syntaxe tsquery ne passe du texte saisi
+        requete = ' & '.join(f"{mot}:*" for mot in _MOTS.findall(terme.lower()))
+        resultats = list(
+            employes.filter(
+                RawSQL(f"{DOCUMENT_EMPLOYE} @@ to_tsquery('simple', %s)", [requete], output_field=BooleanField())
+            ).annotate(
+                score=RawSQL(f"ts_rank({DOCUMENT_EMPLOYE}, to_tsquery('simple', %s))", [requete], output_field=FloatField())
+            ).order_by('-score', 'nom', 'prenom', 'cin').values(*CHAMPS_RESULTAT, 'score')[:limite]
+        )
+
+        if len(resultats) < limite:
+            nom_complet = terme.upper()
+            approches = employes.filter(
+                RawSQL(f"%s <%% {NOM_COMPLET_EMPLOYE}", [nom_complet], output_field=BooleanField())
+            ).exclude(
+                cin__in=[r['cin'] for r in resultats]
+            ).annotate(
+                score=RawSQL(f"word_similarity(%s, {NOM_COMPLET_EMPLOYE})", [nom_complet], output_field=FloatField())
+            ).order_by('-score', 'nom', 'prenom', 'cin').values(*CHAMPS_RESULTAT, 'score')[:limite - len(resultats)]
+            resultats.extend(approches)
+
+        for resultat in resultats:
+            resultat['departement'] = resultat.pop('departement_id')
+            resultat['score'] = round(resultat['score'], 4)
+        return resultats
+
+    # -----------------------
+    # Index en mémoire
+    # -----------------------
+    @staticmethod
+    def _assurer_index():
+        """Reconstruit l'index si un employé a été écrit depuis le dernier chargement (verrou tenu)"""
+        global _jetons, _version
+        version = cache.get(CLE_VERSION)
+        if version is None:
+            cache.add(CLE_VERSION, time.time_ns(), timeout=None)
+            version = cache.get(CLE_VERSION)
+        if version == _version and _version is not None:
+            return
+
+        from api.models import Employe
+
+        debut = time.perf_counter()
+        entrees = []
+        _fiches.clear()
+        for fiche in Employe.objects.values(*CHAMPS_RESULTAT, 'email').iterator(chunk_size=2000):
+            cin = fiche['cin']
+            ponderes = {}
+            for champ, poids in (('nom', 2), ('prenom', 2), ('matricule', 1), ('poste', 1), ('cin', 1)):
+                for mot in jetons(fiche[champ]):
+                    ponderes[mot] = max(ponderes.get(mot, 0), poids)
+            for mot in jetons(fiche.pop('email').split('@')[0]):
+                ponderes.setdefault(mot, 1)
+            entrees.extend((mot, cin, poids) for mot, poids in ponderes.items())
+            fiche['departement'] = fiche.pop('departement_id')
+            _fiches[cin] = fiche
+        entrees.sort()
+        _jetons = entrees
+        _version = version
+        logger.info(
+            f"🔎 Index de recherche: {len(_fiches)} employés, {len(entrees)} mots "
+            f"({(time.perf_counter() - debut) * 1000:.0f} ms)"
+        )
+
+    @staticmethod
+    def _correspondances(mot):
+        """{cin: score} des employés ayant un mot commençant par ``mot`` (mot entier: score doublé)"""
+        scores = {}
+        i = bisect.bisect_left(_jetons, (mot,))
+        while i < len(_jetons) and _jetons[i][0].startswith(mot):
+            jeton, cin, poids = _jetons[i]
+            score = poids * (2 if jeton == mot else 1)
+            if score > scores.get(cin, 0):
+                scores[cin] = score
+            i += 1
+        return scores
+
+    @staticmethod
+    def _employes_memoire(terme, limite, portee=None):
+        with _verrou:
+            RechercheService._assurer_index()
+            scores = None
+            # Mots les plus longs d'abord: les moins fréquents réduisent le plus tôt les candidats
+            for mot in sorted(set(jetons(terme)), key=len, reverse=True):
+                trouves = RechercheService._correspondances(mot)
+                if scores is None:
+                    scores = trouves
+                else:
+                    scores = {cin: score + trouves[cin] for cin, score in scores.items() if cin in trouves}
+                if not scores:
+                    return []
+            if portee is not None:
+                # Mêmes employés que PorteeAcces.filtre_employes
+                scores = {cin: score for cin, score in scores.items() if portee.peut_lire_employe(cin)}
+
+            classes = heapq.nsmallest(
+                limite, scores.items(),
+                key=lambda item: (-item[1], _fiches[item[0]]['nom'], _fiches[item[0]]['prenom'], item[0])
+            )
+            return [dict(_fiches[cin], score=float(score)) for cin, score in classes]
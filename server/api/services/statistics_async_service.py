@@ -0,0 +1,205 @@
+# statistics_async_service.py - Statistiques pour les vues asynchrones (ASGI): requêtes indépendantes en parallèle
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .pdf_service import PdfService
+from .rapport_service import _initialiser_worker
+from .statistics_service import StatisticsService
+from .stats_cache import StatsCache
+
+logger = logging.getLogger(__name__)
+
+WORKERS_REQUETES_PAR_DEFAUT = 8
+WORKERS_RENDU_PAR_DEFAUT = 2
+
+_executeur_requetes = None
+_executeur_rendu = None
+_verrou_executeurs = threading.Lock()
+
+
+def _executer_requete(fonction, *args, **kwargs):
+    """Exécutée dans un thread du pool: chaque thread a sa connexion, libérée comme en fin de requête"""
+    try:
+        return fonction(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def rendre_pdf(type_rapport, employe, stats):
+    """Rendu ReportLab dans un processus de rendu (fonction de module, sérialisable par pickle)"""
+    if type_rapport == 'employe':
+        return PdfService.generer_pdf_employe(employe, stats)
+    return PdfService.generer_pdf_global(stats)
+
+
+class StatisticsAsyncService:
+    """Variantes asynchrones des statistiques temps réel (mêmes résultats, même cache).
+
+    Les requêtes indépendantes (fiche employé et totaux de la période; effectifs
+    et agrégats des départements) partent en même temps, chacune dans un thread
+    du pool STATS_ASYNC_WORKERS avec sa propre connexion: la latence est celle
+    de la plus lente au lieu de leur somme. Le rendu des PDF, limité par le CPU,
+    tourne dans un pool de processus (STATS_ASYNC_WORKERS_RENDU) pour ne bloquer
+    ni la boucle d'événements ni les autres requêtes du processus.
+    """
+
+    # -----------------------
+    # Pools
+    # -----------------------
+    @staticmethod
+    def _executeur_requetes():
+        global _executeur_requetes
+        with _verrou_executeurs:
+            if _executeur_requetes is None:
+                _executeur_requetes = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'STATS_ASYNC_WORKERS', WORKERS_REQUETES_PAR_DEFAUT),
+                    thread_name_prefix='stats-async',
+                )
+            return _executeur_requetes
+
+    @staticmethod
+    def _executeur_rendu():
+        global _executeur_rendu
+        with _verrou_executeurs:
+            if _executeur_rendu is None:
+                _executeur_rendu = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'STATS_ASYNC_WORKERS_RENDU', WORKERS_RENDU_PAR_DEFAUT),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_initialiser_worker,
+                )
+            return _executeur_rendu
+
+    @staticmethod
+    def _reinitialiser_executeur_rendu():
+        global _executeur_rendu
+        with _verrou_executeurs:
+            if _executeur_rendu is not None:
+                _executeur_rendu.shutdown(wait=False, cancel_futures=False)
+            _executeur_rendu = None
+
+    @staticmethod
+    async def _en_parallele(*appels):
+        """Exécute les appels (fonction, *args) simultanément dans le pool de requêtes"""
+        boucle = asyncio.get_running_loop()
+        executeur = StatisticsAsyncService._executeur_requetes()
+        return await asyncio.gather(*(
+            boucle.run_in_executor(executeur, functools.partial(_executer_requete, *appel))
+            for appel in appels
+        ))
+
+    # -----------------------
+    # Statistiques employé
+    # -----------------------
+    @staticmethod
+    def _employe(cin):
+        from api.models import Employe
+
+        return Employe.objects.select_related('departement').filter(cin=cin).first()
+
+    @staticmethod
+    def periode_employe(periode_type, date_reference):
+        """(type, début, fin de l'analyse, fin de période, mois ou début de semaine)"""
+        if periode_type == 'semaine':
+            date_reference = StatisticsService._parse_date_reference(date_reference)
+            debut = date_reference - timedelta(days=date_reference.weekday())
+            fin = debut + timedelta(days=6)
+            return 'semaine', debut, fin, fin, debut
+        mois = StatisticsService._parse_mois(date_reference)
+        debut, fin, _, fin_analyse = StatisticsService._periode_mensuelle(mois)
+        return 'mois', debut, fin_analyse, fin, mois
+
+    @staticmethod
+    def _stats_en_cache_ou_totaux(type_periode, cin, reference, debut, fin_analyse):
+        """Statistiques en cache, sinon totaux de la période: (clé, stats, totaux)"""
+        cle = (
+            StatsCache.cle_employe_hebdo(cin, reference) if type_periode == 'semaine'
+            else StatsCache.cle_employe_mensuel(cin, reference)
+        )
+        stats = StatsCache.lire(cle)
+        if stats is not None:
+            return cle, stats, None
+        totaux = StatisticsService._totaux_presences(debut, fin_analyse, employe_id=cin)
+        if type_periode == 'mois':
+            totaux['heures_details'] = StatisticsService._heures_details(cin, debut, fin_analyse)
+        return cle, None, totaux
+
+    @staticmethod
+    async def employe(cin, periode_type='mois', date_reference=None):
+        """Statistiques hebdomadaires ou mensuelles d'un employé: (employe ou None, stats)
+
+        Identique à calculate_employee_weekly_stats / calculate_employee_monthly_stats;
+        la fiche employé et les totaux de la période sont lus en parallèle.
+        """
+        type_periode, debut, fin_analyse, fin, reference = \
+            StatisticsAsyncService.periode_employe(periode_type, date_reference)
+        employe, (cle, stats, totaux) = await StatisticsAsyncService._en_parallele(
+            (StatisticsAsyncService._employe, cin),
+            (StatisticsAsyncService._stats_en_cache_ou_totaux, type_periode, cin, reference, debut, fin_analyse),
+        )
+        if employe is None:
+            return None, None
+
+        if stats is None:
+            if type_periode == 'semaine':
+                stats = StatisticsService._stats_hebdo_depuis_totaux(employe, reference, totaux)
+            else:
+                stats = StatisticsService._stats_mensuelles_depuis_totaux(employe, reference, totaux)
+            await StatisticsAsyncService._en_parallele(
+                (StatsCache.ecrire, cle, stats, StatsCache.timeout(debut, fin))
+            )
+        stats['employe'] = employe
+        return employe, stats
+
+    # -----------------------
+    # Statistiques globales
+    # -----------------------
+    @staticmethod
+    def _global_en_cache(mois):
+        cle = StatsCache.cle_global_mensuel(mois)
+        return cle, StatsCache.lire(cle)
+
+    @staticmethod
+    async def global_mensuel(mois=None):
+        """Identique à calculate_global_monthly_stats; effectifs et agrégats lus en parallèle"""
+        mois = StatisticsService._parse_mois(mois)
+        debut, fin, _, fin_analyse = StatisticsService._periode_mensuelle(mois)
+        (cle, stats), = await StatisticsAsyncService._en_parallele(
+            (StatisticsAsyncService._global_en_cache, mois)
+        )
+        if stats is not None:
+            return stats
+
+        departements, presences = await StatisticsAsyncService._en_parallele(
+            (StatisticsService._agregats_departements,),
+            (StatisticsService._agregats_presences_departements, debut, fin_analyse),
+        )
+        stats = StatisticsService._stats_globales_depuis_agregats(mois, departements, presences)
+        await StatisticsAsyncService._en_parallele((StatsCache.ecrire, cle, stats, StatsCache.timeout(debut, fin)))
+        return stats
+
+    # -----------------------
+    # Rendu PDF
+    # -----------------------
+    @staticmethod
+    async def rendre_pdf(type_rapport, employe=None, stats=None):
+        """Génère le PDF dans le pool de processus de rendu (recréé s'il est cassé)"""
+        boucle = asyncio.get_running_loop()
+        try:
+            return await boucle.run_in_executor(
+                StatisticsAsyncService._executeur_rendu(), rendre_pdf, type_rapport, employe, stats
+            )
+        except BrokenProcessPool:
+            logger.warning("⚠️ Pool de rendu PDF réinitialisé")
+            StatisticsAsyncService._reinitialiser_executeur_rendu()
+            return await boucle.run_in_executor(
+                StatisticsAsyncService._executeur_rendu(), rendre_pdf, type_rapport, employe, stats
+            )
@@ -1,11 +1,14 @@
 # statistics_service.py - VERSION COMPLÈTE ET CORRIGÉE
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Avg, Sum, Max
+from django.db.models.functions import TruncMonth
 from datetime import timedelta, datetime, time, date
 from django.utils import timezone
-from django.core.cache import cache
 import logging
 import calendar
 
+from .ponctualite import classer, minutes, ENTREE_PAR_DEFAUT, SORTIE_PAR_DEFAUT
+from .stats_cache import StatsCache
+
 logger = logging.getLogger(__name__)
 
 class DurationFormatter:
@@ -60,44 +63,18 @@ class StatisticsService:
     
     @staticmethod
     def _calculer_ponctualite_pointage(pointage, employe):
-        """Calcule la ponctualité d'un pointage spécifique"""
+        """Calcule la ponctualité d'un pointage spécifique (voir services.ponctualite.classer)"""
         if not pointage.heure_entree or not pointage.heure_sortie:
             return None
         
-        # Heures attendues de l'employé
-        heure_entree_attendue = employe.heure_entree_attendue or time(8, 0)
-        heure_sortie_attendue = employe.heure_sortie_attendue or time(16, 0)
-        marge = employe.marge_tolerance_minutes or 10
-        
-        # Calcul du retard à l'entrée
-        entree_attendu_minutes = heure_entree_attendue.hour * 60 + heure_entree_attendue.minute
-        entree_reelle_minutes = pointage.heure_entree.hour * 60 + pointage.heure_entree.minute
-        
-        retard_minutes = max(0, entree_reelle_minutes - entree_attendu_minutes)
-        entree_ponctuelle = retard_minutes <= marge
-        
-        # Calcul du départ anticipé
-        sortie_attendu_minutes = heure_sortie_attendue.hour * 60 + heure_sortie_attendue.minute
-        sortie_reelle_minutes = pointage.heure_sortie.hour * 60 + pointage.heure_sortie.minute
-        
-        depart_avance_minutes = max(0, sortie_attendu_minutes - sortie_reelle_minutes)
-        sortie_ponctuelle = depart_avance_minutes <= marge
-        
-        # Déterminer la catégorie de ponctualité
-        if entree_ponctuelle and sortie_ponctuelle:
-            categorie = 'parfait'
-        elif retard_minutes <= 30 and depart_avance_minutes <= 30:
-            categorie = 'acceptable'
-        else:
-            categorie = 'inacceptable'
-        
-        return {
-            'categorie': categorie,
-            'retard_minutes': retard_minutes,
-            'depart_avance_minutes': depart_avance_minutes,
-            'entree_ponctuelle': entree_ponctuelle,
-            'sortie_ponctuelle': sortie_ponctuelle
-        }
+        resultat = classer(
+            [minutes(pointage.heure_entree)],
+            [minutes(pointage.heure_sortie)],
+            [minutes(employe.heure_entree_attendue, ENTREE_PAR_DEFAUT)],
+            [minutes(employe.heure_sortie_attendue, SORTIE_PAR_DEFAUT)],
+            [employe.marge_tolerance_minutes],
+        )
+        return {cle: valeurs[0] for cle, valeurs in resultat.items()}
     
     @staticmethod
     def _calculer_regularite_statut(ponctualite_parfaite, ponctualite_acceptable, ponctualite_inacceptable):
@@ -118,38 +95,176 @@ class StatisticsService:
             return 'inacceptable'
     
     @staticmethod
-    def calculate_employee_weekly_stats(employe, date_reference=None):
-        """Calcule les statistiques hebdomadaires avec nouveau système de ponctualité"""
-        logger.info(f"📊 Calcul stats hebdo pour {employe.matricule}")
-        
-        # Gestion des dates
+    def _totaux_presences(debut, fin, **filtres):
+        """Totaux des agrégats journaliers (PresenceJournaliere) sur une période"""
+        from api.models import PresenceJournaliere
+        
+        totaux = PresenceJournaliere.objects.filter(
+            date__range=[debut, fin], **filtres
+        ).aggregate(
+            jours_travailles=Count('pk'),
+            secondes_travail=Sum('secondes_travail'),
+            retard_total=Sum('retard_minutes'),
+            depart_avance_total=Sum('depart_avance_minutes'),
+            ponctualite_parfaite=Count('pk', filter=Q(ponctualite_statut='parfait')),
+            ponctualite_acceptable=Count('pk', filter=Q(ponctualite_statut='acceptable')),
+            ponctualite_inacceptable=Count('pk', filter=Q(ponctualite_statut='inacceptable')),
+        )
+        return {cle: valeur or 0 for cle, valeur in totaux.items()}
+    
+    @staticmethod
+    def _heures_details(cin, debut, fin, limite=5):
+        """Premiers pointages complets de la période (détail de debug des statistiques mensuelles)"""
+        from api.models import Pointage
+        
+        pointages = Pointage.objects.filter(
+            employe_id=cin, date_pointage__range=[debut, fin], duree_travail__isnull=False
+        ).order_by('date_pointage').values('date_pointage', 'duree_travail', 'heure_entree', 'heure_sortie')
+        return [
+            {'date': p['date_pointage'], 'duree': p['duree_travail'], 'entree': p['heure_entree'], 'sortie': p['heure_sortie']}
+            for p in pointages[:limite]
+        ]
+    
+    @staticmethod
+    def _totaux_presences_par_employe(debut, fin, *conditions, **filtres):
+        """Totaux de _totaux_presences pour chaque employé, en une requête groupée"""
+        from api.models import PresenceJournaliere
+        
+        lignes = PresenceJournaliere.objects.filter(
+            *conditions, date__range=[debut, fin], **filtres
+        ).values('employe_id').annotate(
+            jours_travailles=Count('pk'),
+            secondes_travail=Sum('secondes_travail'),
+            retard_total=Sum('retard_minutes'),
+            depart_avance_total=Sum('depart_avance_minutes'),
+            ponctualite_parfaite=Count('pk', filter=Q(ponctualite_statut='parfait')),
+            ponctualite_acceptable=Count('pk', filter=Q(ponctualite_statut='acceptable')),
+            ponctualite_inacceptable=Count('pk', filter=Q(ponctualite_statut='inacceptable')),
+        ).order_by()
+        return {
+            ligne.pop('employe_id'): {cle: valeur or 0 for cle, valeur in ligne.items()}
+            for ligne in lignes
+        }
+    
+    @staticmethod
+    def _totaux_mensuels_par_employe(debut, fin, *conditions, **filtres):
+        """Totaux de _totaux_presences par employé et par mois: {cin: {mois: totaux}}, une requête"""
+        return StatisticsService._totaux_periodiques_par_employe(debut, fin, TruncMonth, *conditions, **filtres)
+    
+    @staticmethod
+    def _totaux_periodiques_par_employe(debut, fin, troncature, *conditions, **filtres):
+        """Totaux par employé et par période (TruncWeek, TruncMonth, TruncYear): {cin: {début: totaux}}
+        
+        Chaque totaux porte aussi ``derniere_maj``, la plus récente mise à jour des
+        présences de la période (détection des périodes à recalculer).
+        """
+        from api.models import PresenceJournaliere
+        
+        lignes = PresenceJournaliere.objects.filter(
+            *conditions, date__range=[debut, fin], **filtres
+        ).annotate(periode=troncature('date')).values('employe_id', 'periode').annotate(
+            jours_travailles=Count('pk'),
+            secondes_travail=Sum('secondes_travail'),
+            retard_total=Sum('retard_minutes'),
+            depart_avance_total=Sum('depart_avance_minutes'),
+            ponctualite_parfaite=Count('pk', filter=Q(ponctualite_statut='parfait')),
+            ponctualite_acceptable=Count('pk', filter=Q(ponctualite_statut='acceptable')),
+            ponctualite_inacceptable=Count('pk', filter=Q(ponctualite_statut='inacceptable')),
+            derniere_maj=Max('date_maj'),
+        ).order_by()
+        totaux = {}
+        for ligne in lignes:
+            cin = ligne.pop('employe_id')
+            periode = ligne.pop('periode')
+            periode = periode.date() if isinstance(periode, datetime) else periode
+            totaux.setdefault(cin, {})[periode] = {cle: valeur or 0 for cle, valeur in ligne.items()}
+        return totaux
+    
+    @staticmethod
+    def _parse_date_reference(date_reference):
+        """Normalise une date de référence (date, 'YYYY-MM-DD' ou None = aujourd'hui)"""
         if isinstance(date_reference, str):
             try:
                 date_reference = datetime.strptime(date_reference, '%Y-%m-%d').date()
             except (ValueError, TypeError):
                 date_reference = timezone.now().date()
         
-        date_reference = date_reference or timezone.now().date()
+        return date_reference or timezone.now().date()
+    
+    @staticmethod
+    def _parse_mois(mois):
+        """Normalise un mois (date, 'YYYY-MM', 'YYYY-MM-DD' ou None = mois courant) au 1er du mois"""
+        if isinstance(mois, str):
+            try:
+                if len(mois) == 7:  # Format YYYY-MM
+                    mois = datetime.strptime(mois, '%Y-%m').date().replace(day=1)
+                else:  # Format YYYY-MM-DD
+                    mois = datetime.strptime(mois, '%Y-%m-%d').date().replace(day=1)
+            except (ValueError, TypeError):
+                mois = timezone.now().date().replace(day=1)
+        
+        return (mois or timezone.now().date()).replace(day=1)
+    
+    @staticmethod
+    def _periode_mensuelle(mois):
+        """Retourne (début, fin, jours passés, fin d'analyse) pour le mois donné (1er du mois)"""
+        start_of_month = mois
+        end_of_month = (mois + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        
+        today = timezone.now().date()
+        if mois > today:
+            jours_passes = 0
+            date_fin_analyse = start_of_month
+        elif mois.month == today.month and mois.year == today.year:
+            jours_passes = (today - start_of_month).days + 1
+            date_fin_analyse = today
+        else:
+            jours_passes = (end_of_month - start_of_month).days + 1
+            date_fin_analyse = end_of_month
+        
+        return start_of_month, end_of_month, jours_passes, date_fin_analyse
+    
+    @staticmethod
+    def calculate_employee_weekly_stats(employe, date_reference=None):
+        """Calcule les statistiques hebdomadaires (résultat mis en cache, voir StatsCache)"""
+        date_reference = StatisticsService._parse_date_reference(date_reference)
         start_of_week = date_reference - timedelta(days=date_reference.weekday())
         end_of_week = start_of_week + timedelta(days=6)
         
+        stats = StatsCache.get_or_compute(
+            StatsCache.cle_employe_hebdo(employe.cin, start_of_week),
+            lambda: StatisticsService._compute_employee_weekly_stats(employe, start_of_week),
+            timeout=StatsCache.timeout(start_of_week, end_of_week),
+        )
+        stats['employe'] = employe
+        return stats
+    
+    @staticmethod
+    def _compute_employee_weekly_stats(employe, start_of_week):
+        """Calcule les statistiques hebdomadaires avec nouveau système de ponctualité"""
+        logger.info(f"📊 Calcul stats hebdo pour {employe.matricule}")
+        
+        end_of_week = start_of_week + timedelta(days=6)
+        
         logger.info(f"📅 Période: {start_of_week} à {end_of_week}")
         
-        # Récupération des pointages
-        try:
-            pointages = employe.pointages.filter(
-                date_pointage__range=[start_of_week, end_of_week]
-            ).exclude(duree_travail__isnull=True)
-        except AttributeError:
-            try:
-                pointages = employe.pointage_set.filter(
-                    date_pointage__range=[start_of_week, end_of_week]
-                ).exclude(duree_travail__isnull=True)
-            except AttributeError:
-                pointages = []
+        # Agrégats journaliers de la semaine (une requête)
+        totaux = StatisticsService._totaux_presences(start_of_week, end_of_week, employe_id=employe.cin)
+        
+        stats = StatisticsService._stats_hebdo_depuis_totaux(employe, start_of_week, totaux)
+        
+        logger.info(f"✅ Stats hebdo calculées - "
+                   f"Ponctualité: {stats['ponctualite_parfaite']}/{stats['ponctualite_acceptable']}/"
+                   f"{stats['ponctualite_inacceptable']}")
+        return stats
+    
+    @staticmethod
+    def _stats_hebdo_depuis_totaux(employe, start_of_week, totaux):
+        """Construit les statistiques hebdomadaires d'un employé à partir des totaux de la semaine"""
+        end_of_week = start_of_week + timedelta(days=6)
         
         # Jours travaillés distincts
-        jours_travailles = pointages.values('date_pointage').distinct().count()
+        jours_travailles = totaux['jours_travailles']
         
         # Calcul des jours dans la semaine (7 jours)
         jours_total_semaine = 7
@@ -158,32 +273,14 @@ class StatisticsService:
         jours_absents = max(0, jours_total_semaine - jours_travailles)
         
         # Calcul des heures totales
-        total_heures = timedelta()
-        retard_total = 0
-        depart_avance_total = 0
+        total_heures = timedelta(seconds=totaux['secondes_travail'])
+        retard_total = totaux['retard_total']
+        depart_avance_total = totaux['depart_avance_total']
         
         # Compteurs de ponctualité
-        ponctualite_parfaite = 0
-        ponctualite_acceptable = 0
-        ponctualite_inacceptable = 0
-        
-        # Analyse de chaque pointage
-        for p in pointages:
-            if p.duree_travail:
-                total_heures += p.duree_travail
-            
-            # Calculer la ponctualité
-            ponctualite = StatisticsService._calculer_ponctualite_pointage(p, employe)
-            if ponctualite:
-                if ponctualite['categorie'] == 'parfait':
-                    ponctualite_parfaite += 1
-                elif ponctualite['categorie'] == 'acceptable':
-                    ponctualite_acceptable += 1
-                else:
-                    ponctualite_inacceptable += 1
-                
-                retard_total += ponctualite['retard_minutes']
-                depart_avance_total += ponctualite['depart_avance_minutes']
+        ponctualite_parfaite = totaux['ponctualite_parfaite']
+        ponctualite_acceptable = totaux['ponctualite_acceptable']
+        ponctualite_inacceptable = totaux['ponctualite_inacceptable']
         
         # Calcul des moyennes
         retard_moyen = retard_total / jours_travailles if jours_travailles > 0 else 0
@@ -247,8 +344,6 @@ class StatisticsService:
             'observation_heures': observation
         }
         
-        logger.info(f"✅ Stats hebdo calculées - "
-                   f"Ponctualité: {ponctualite_parfaite}/{ponctualite_acceptable}/{ponctualite_inacceptable}")
         return stats
     
     @staticmethod
@@ -288,55 +383,110 @@ class StatisticsService:
     
     @staticmethod
     def calculate_employee_monthly_stats(employe, mois=None):
+        """Calcule les statistiques mensuelles (résultat mis en cache, voir StatsCache)"""
+        mois = StatisticsService._parse_mois(mois)
+        start_of_month, end_of_month, _, _ = StatisticsService._periode_mensuelle(mois)
+        
+        stats = StatsCache.get_or_compute(
+            StatsCache.cle_employe_mensuel(employe.cin, mois),
+            lambda: StatisticsService._compute_employee_monthly_stats(employe, mois),
+            timeout=StatsCache.timeout(start_of_month, end_of_month),
+        )
+        stats['employe'] = employe
+        return stats
+    
+    @staticmethod
+    def _mois_precedent(mois):
+        return (mois - timedelta(days=1)).replace(day=1)
+    
+    @staticmethod
+    def calculate_employee_monthly_stats_window(employe, mois=None, nb_mois=3):
+        """Statistiques des ``nb_mois`` mois calendaires finissant à ``mois``: [(mois, stats)], récent d'abord.
+        
+        Une seule requête groupée par mois; chaque mois est identique à
+        calculate_employee_monthly_stats(employe, mois).
+        """
+        mois = StatisticsService._parse_mois(mois)
+        periode = [mois]
+        for _ in range(nb_mois - 1):
+            periode.append(StatisticsService._mois_precedent(periode[-1]))
+        
+        fin = min(StatisticsService._periode_mensuelle(mois)[3], timezone.now().date())
+        totaux = StatisticsService._totaux_mensuels_par_employe(
+            periode[-1], fin, employe_id=employe.cin
+        ).get(employe.cin, {})
+        totaux_vides = {
+            'jours_travailles': 0, 'secondes_travail': 0, 'retard_total': 0, 'depart_avance_total': 0,
+            'ponctualite_parfaite': 0, 'ponctualite_acceptable': 0, 'ponctualite_inacceptable': 0,
+        }
+        return [
+            (m, StatisticsService._stats_mensuelles_depuis_totaux(employe, m, totaux.get(m, totaux_vides)))
+            for m in periode
+        ]
+    
+    @staticmethod
+    def _compute_employee_monthly_stats(employe, mois):
         """Calcule les statistiques mensuelles avec nouveau système de ponctualité"""
         logger.info(f"📊 Calcul stats mensuelles pour {employe.matricule}")
         
-        # Gestion des dates
-        if isinstance(mois, str):
-            try:
-                if len(mois) == 7:  # Format YYYY-MM
-                    mois = datetime.strptime(mois, '%Y-%m').date().replace(day=1)
-                else:  # Format YYYY-MM-DD
-                    mois = datetime.strptime(mois, '%Y-%m-%d').date().replace(day=1)
-            except (ValueError, TypeError):
-                mois = timezone.now().date().replace(day=1)
-        
-        mois = (mois or timezone.now().date()).replace(day=1)
-        start_of_month = mois
-        end_of_month = (mois + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
         # Calcul de la période d'analyse
-        today = timezone.now().date()
-        if mois > today:
-            jours_passes = 0
-            date_fin_analyse = start_of_month
-        elif mois.month == today.month and mois.year == today.year:
-            jours_passes = (today - start_of_month).days + 1
-            date_fin_analyse = today
-        else:
-            jours_passes = (end_of_month - start_of_month).days + 1
-            date_fin_analyse = end_of_month
+        start_of_month, end_of_month, jours_passes, date_fin_analyse = \
+            StatisticsService._periode_mensuelle(mois)
         
         logger.info(f"📅 Période analysée: {start_of_month} à {date_fin_analyse}")
         
-        # Récupération des pointages
-        try:
-            pointages = employe.pointages.filter(
-                date_pointage__range=[start_of_month, date_fin_analyse]
-            ).exclude(duree_travail__isnull=True)
-        except AttributeError:
-            try:
-                pointages = employe.pointage_set.filter(
-                    date_pointage__range=[start_of_month, date_fin_analyse]
-                ).exclude(duree_travail__isnull=True)
-            except AttributeError:
-                logger.warning(f"❌ Aucune relation pointages trouvée pour {employe.matricule}")
-                pointages = []
+        # Agrégats journaliers de la période (une requête)
+        totaux = StatisticsService._totaux_presences(start_of_month, date_fin_analyse, employe_id=employe.cin)
+        totaux['heures_details'] = StatisticsService._heures_details(employe.cin, start_of_month, date_fin_analyse)
+        
+        logger.info(f"🔍 {totaux['jours_travailles']} pointages trouvés")
+        
+        stats = StatisticsService._stats_mensuelles_depuis_totaux(employe, mois, totaux)
+        
+        logger.info(f"✅ Stats mensuelles calculées - "
+                   f"Ponctualité: {stats['ponctualite_parfaite']}/{stats['ponctualite_acceptable']}/"
+                   f"{stats['ponctualite_inacceptable']}, "
+                   f"Régularité: {stats['regularite_statut']}")
         
-        logger.info(f"🔍 {pointages.count()} pointages trouvés")
+        return stats
+    
+    @staticmethod
+    def _stats_mensuelles_depuis_totaux(employe, mois, totaux):
+        """Construit les statistiques mensuelles d'un employé à partir des totaux du mois.
+        
+        totaux: même structure que _totaux_presences (peut provenir d'une requête groupée)
+        """
+        start_of_month, end_of_month, jours_passes, _ = StatisticsService._periode_mensuelle(mois)
+        return StatisticsService._stats_periode_depuis_totaux(
+            employe, start_of_month, end_of_month, jours_passes, 'mensuel', totaux
+        )
+    
+    @staticmethod
+    def _periode_annuelle(annee):
+        """Retourne (début, fin, jours passés) pour l'année donnée (1er janvier)"""
+        debut = annee.replace(month=1, day=1)
+        fin = debut.replace(month=12, day=31)
+        today = timezone.now().date()
+        jours_passes = max(0, (min(fin, today) - debut).days + 1)
+        return debut, fin, jours_passes
+    
+    @staticmethod
+    def _stats_annuelles_depuis_totaux(employe, annee, totaux):
+        """Statistiques annuelles d'un employé (mêmes règles que le mensuel, 8h par jour passé)"""
+        debut, fin, jours_passes = StatisticsService._periode_annuelle(annee)
+        return StatisticsService._stats_periode_depuis_totaux(
+            employe, debut, fin, jours_passes, 'annuel', totaux
+        )
+    
+    @staticmethod
+    def _stats_periode_depuis_totaux(employe, start_of_month, end_of_month, jours_passes, type_periode, totaux):
+        """Statistiques d'un employé sur une période (mois ou année) à partir de ses totaux
         
+        ``totaux['heures_details']`` (optionnel): premiers pointages, repris dans ``_debug``
+        (renseigné par le calcul d'un seul employé, vide pour les calculs groupés).
+        """
         # Jours travaillés distincts
-        jours_travailles = pointages.values('date_pointage').distinct().count()
+        jours_travailles = totaux['jours_travailles']
         
         # Calcul des jours passés dans le mois (tous les jours, pas seulement ouvrables)
         jours_total_passes = jours_passes
@@ -345,39 +495,14 @@ class StatisticsService:
         jours_absents = max(0, jours_total_passes - jours_travailles)
         
         # Calcul des heures totales
-        total_heures = timedelta()
-        retard_total = 0
-        depart_avance_total = 0
+        total_heures = timedelta(seconds=totaux['secondes_travail'])
+        retard_total = totaux['retard_total']
+        depart_avance_total = totaux['depart_avance_total']
         
         # Compteurs de ponctualité
-        ponctualite_parfaite = 0
-        ponctualite_acceptable = 0
-        ponctualite_inacceptable = 0
-        
-        # Analyse de chaque pointage
-        heures_details = []
-        for p in pointages:
-            if p.duree_travail:
-                total_heures += p.duree_travail
-                heures_details.append({
-                    'date': p.date_pointage,
-                    'duree': p.duree_travail,
-                    'entree': p.heure_entree,
-                    'sortie': p.heure_sortie
-                })
-            
-            # Calculer la ponctualité
-            ponctualite = StatisticsService._calculer_ponctualite_pointage(p, employe)
-            if ponctualite:
-                if ponctualite['categorie'] == 'parfait':
-                    ponctualite_parfaite += 1
-                elif ponctualite['categorie'] == 'acceptable':
-                    ponctualite_acceptable += 1
-                else:
-                    ponctualite_inacceptable += 1
-                
-                retard_total += ponctualite['retard_minutes']
-                depart_avance_total += ponctualite['depart_avance_minutes']
+        ponctualite_parfaite = totaux['ponctualite_parfaite']
+        ponctualite_acceptable = totaux['ponctualite_acceptable']
+        ponctualite_inacceptable = totaux['ponctualite_inacceptable']
         
         # Calcul des moyennes
         retard_moyen = retard_total / jours_travailles if jours_travailles > 0 else 0
@@ -433,7 +558,7 @@ class StatisticsService:
             'employe': employe,
             'periode_debut': start_of_month,
             'periode_fin': end_of_month,
-            'type_periode': 'mensuel',
+            'type_periode': type_periode,
             
             # Métriques de base
             'heures_travail_total': total_heures,
@@ -477,18 +602,50 @@ class StatisticsService:
             
             # Données de debug
             '_debug': {
-                'pointages_count': pointages.count(),
-                'heures_details': heures_details[:5],
+                'pointages_count': jours_travailles,
+                'heures_details': totaux.get('heures_details', []),
                 'calcul_timestamp': timezone.now().isoformat()
             }
         }
         
-        logger.info(f"✅ Stats mensuelles calculées - "
-                   f"Ponctualité: {ponctualite_parfaite}/{ponctualite_acceptable}/{ponctualite_inacceptable}, "
-                   f"Régularité: {regularite_statut}")
-        
         return stats
     
+    @staticmethod
+    def calculate_department_employees_monthly_stats(departement_id, mois=None, portee=None):
+        """Statistiques mensuelles de tous les employés d'un département: [(employe, stats), ...]
+        
+        Deux requêtes (employés, totaux groupés par employé) au lieu d'un calcul par employé;
+        même résultat que calculate_employee_monthly_stats pour chacun. ``portee``
+        (PorteeAcces) limite le lot aux employés accessibles.
+        """
+        from api.models import Employe
+        
+        mois = StatisticsService._parse_mois(mois)
+        start_of_month, end_of_month, _, date_fin_analyse = StatisticsService._periode_mensuelle(mois)
+        
+        employes = Employe.objects.select_related('departement').filter(departement_id=departement_id)
+        conditions = []
+        if portee is not None:
+            employes = portee.filtrer_employes(employes)
+            conditions.append(portee.filtre_employes('employe__'))
+        
+        totaux_par_employe = StatisticsService._totaux_presences_par_employe(
+            start_of_month, date_fin_analyse, *conditions, employe__departement_id=departement_id
+        )
+        totaux_vides = {
+            'jours_travailles': 0, 'secondes_travail': 0, 'retard_total': 0, 'depart_avance_total': 0,
+            'ponctualite_parfaite': 0, 'ponctualite_acceptable': 0, 'ponctualite_inacceptable': 0,
+        }
+        
+        resultats = [
+            (employe, StatisticsService._stats_mensuelles_depuis_totaux(
+                employe, mois, totaux_par_employe.get(employe.cin, totaux_vides)
+            ))
+            for employe in employes.order_by('nom', 'prenom', 'cin')
+        ]
+        logger.info(f"📊 Stats mensuelles du département {departement_id}: {len(resultats)} employés")
+        return resultats
+    
     @staticmethod
     def _generer_observation_mensuel(statut, heures_reelles, heures_attendues, ecart, 
                                    jours_passes, jours_travailles, jours_absents, jours_total_passes,
@@ -557,129 +714,115 @@ class StatisticsService:
 
     @staticmethod
     def calculate_global_monthly_stats(mois=None):
-        """Calcule les statistiques globales mensuelles pour TOUS les employés avec départements"""
-        # IMPORT CORRECT - utilisez le chemin relatif correct
-        try:
-            from .models import Employe, Departement, Pointage
-        except ImportError:
-            # Si l'importation directe échoue, essayez l'autre chemin
-            try:
-                from api.models import Employe, Departement, Pointage
-            except ImportError:
-                from models import Employe, Departement, Pointage
-        
-        # Gestion des dates
-        if isinstance(mois, str):
-            try:
-                mois = datetime.strptime(mois, '%Y-%m').date().replace(day=1)
-            except (ValueError, TypeError):
-                mois = timezone.now().date().replace(day=1)
-        
-        mois = (mois or timezone.now().date()).replace(day=1)
-        start_of_month = mois
-        end_of_month = (mois + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        """Calcule les statistiques globales mensuelles (résultat mis en cache, voir StatsCache)"""
+        mois = StatisticsService._parse_mois(mois)
+        start_of_month, end_of_month, _, _ = StatisticsService._periode_mensuelle(mois)
+        
+        return StatsCache.get_or_compute(
+            StatsCache.cle_global_mensuel(mois),
+            lambda: StatisticsService._compute_global_monthly_stats(mois),
+            timeout=StatsCache.timeout(start_of_month, end_of_month),
+        )
+    
+    @staticmethod
+    def _compute_global_monthly_stats(mois):
+        """Calcule les statistiques globales mensuelles pour TOUS les employés avec départements
         
+        Le nombre de requêtes est fixe (deux agrégats groupés), quel que soit le
+        nombre de départements ou de pointages: les pointages sont lus depuis les
+        agrégats journaliers par département (PresenceDepartementJournaliere).
+        """
         # Calcul de la période d'analyse (jours passés dans le mois)
-        today = timezone.now().date()
-        if mois > today:
-            jours_passes_mois = 0
-            date_fin_analyse = start_of_month
-        elif mois.month == today.month and mois.year == today.year:
-            jours_passes_mois = (today - start_of_month).days + 1
-            date_fin_analyse = today
-        else:
-            jours_passes_mois = (end_of_month - start_of_month).days + 1
-            date_fin_analyse = end_of_month
+        start_of_month, _, _, date_fin_analyse = StatisticsService._periode_mensuelle(mois)
         
-        logger.info(f"📅 Période analysée globale: {start_of_month} à {date_fin_analyse} ({jours_passes_mois} jours)")
-        
-        # 1. DONNÉES DE BASE - TOUS LES EMPLOYÉS
-        total_employes = Employe.objects.count()
-        employes_actifs = Employe.objects.filter(statut='actif').count()
+        return StatisticsService._stats_globales_depuis_agregats(
+            mois,
+            StatisticsService._agregats_departements(),
+            StatisticsService._agregats_presences_departements(start_of_month, date_fin_analyse),
+        )
+    
+    @staticmethod
+    def _agregats_departements():
+        """1. Effectifs par département (une requête groupée)"""
+        from api.models import Departement
+        
+        return list(Departement.objects.annotate(
+            employes_count=Count('employes'),
+            employes_actifs=Count('employes', filter=Q(employes__statut='actif')),
+        ).values('id_departement', 'nom', 'employes_count', 'employes_actifs'))
+    
+    @staticmethod
+    def _agregats_presences_departements(debut, fin):
+        """2. Agrégats journaliers par département sur la période (une requête groupée): {departement_id: agrégat}"""
+        from api.models import PresenceDepartementJournaliere
+        
+        agregats_presences = PresenceDepartementJournaliere.objects.filter(
+            date__range=[debut, fin]
+        ).values('departement_id').annotate(
+            pointages_count=Sum('nb_pointages'),
+            secondes_travail=Sum('secondes_travail'),
+            ponctualite_parfaite=Sum('ponctualite_parfaite'),
+            ponctualite_acceptable=Sum('ponctualite_acceptable'),
+            ponctualite_inacceptable=Sum('ponctualite_inacceptable'),
+        ).order_by()
+        return {a['departement_id']: a for a in agregats_presences}
+    
+    @staticmethod
+    def _stats_globales_depuis_agregats(mois, departements, presences_par_departement):
+        """Consolide les deux agrégats en statistiques globales (sans requête)"""
+        start_of_month, end_of_month, jours_passes_mois, date_fin_analyse = \
+            StatisticsService._periode_mensuelle(mois)
         
-        # 2. DONNÉES DES DÉPARTEMENTS
-        total_departements = Departement.objects.count()
+        logger.info(f"📅 Période analysée globale: {start_of_month} à {date_fin_analyse} ({jours_passes_mois} jours)")
         
-        # Récupérer tous les départements avec leurs statistiques
+        # 3. CONSOLIDATION DES DÉPARTEMENTS ET DES TOTAUX GLOBAUX
+        total_employes = 0
+        employes_actifs = 0
+        total_departements = 0
         departements_data = []
         departements_actifs_count = 0
         
-        for departement in Departement.objects.all():
-            # Compter les employés actifs dans le département
-            employes_departement = departement.employes.filter(statut='actif').count()
-            
-            # Récupérer les pointages pour ce département
-            employes_departement_ids = departement.employes.values_list('cin', flat=True)
-            pointages_departement = Pointage.objects.filter(
-                employe__cin__in=employes_departement_ids,
-                date_pointage__range=[start_of_month, date_fin_analyse]
-            ).exclude(duree_travail__isnull=True)
-            
-            # Calculer les heures pour ce département
-            heures_departement = timedelta()
-            for p in pointages_departement:
-                if p.duree_travail:
-                    heures_departement += p.duree_travail
+        total_pointages = 0
+        total_heures = timedelta()
+        ponctualite_parfaite = 0
+        ponctualite_acceptable = 0
+        ponctualite_inacceptable = 0
+        
+        for departement in departements:
+            agregat = presences_par_departement.get(departement['id_departement'], {})
+            employes_departement = departement['employes_actifs']
+            pointages_count = agregat.get('pointages_count') or 0
+            heures_departement = timedelta(seconds=agregat.get('secondes_travail') or 0)
             
             departements_data.append({
-                'id': departement.id_departement,
-                'nom': departement.nom,
-                'employes_count': departement.employes.count(),
+                'id': departement['id_departement'],
+                'nom': departement['nom'],
+                'employes_count': departement['employes_count'],
                 'employes_actifs': employes_departement,
-                'pointages_count': pointages_departement.count(),
+                'pointages_count': pointages_count,
                 'heures_travail': heures_departement,
                 'est_actif': employes_departement > 0
             })
             
+            total_departements += 1
+            total_employes += departement['employes_count']
+            employes_actifs += employes_departement
             if employes_departement > 0:
                 departements_actifs_count += 1
-        
-        # 3. POINTAGES POUR TOUS LES EMPLOYÉS ACTIFS
-        pointages_mois = Pointage.objects.filter(
-            date_pointage__range=[start_of_month, date_fin_analyse]
-        ).exclude(duree_travail__isnull=True).select_related('employe')
-        
-        total_pointages = pointages_mois.count()
-        
-        # 4. CALCUL DES MÉTRIQUES GLOBALES
-        # Heures totales travaillées par tous les employés
-        total_heures = timedelta()
-        
-        # Compteurs de ponctualité pour tous les pointages
-        ponctualite_parfaite = 0
-        ponctualite_acceptable = 0
-        ponctualite_inacceptable = 0
-        
-        # Dictionnaire pour suivre les jours de travail par employé
-        jours_travailles_par_employe = {}
-        
-        # Analyse de chaque pointage de TOUS les employés
-        for p in pointages_mois:
-            if p.duree_travail:
-                total_heures += p.duree_travail
-            
-            # Calculer la ponctualité
-            ponctualite = StatisticsService._calculer_ponctualite_pointage(p, p.employe)
-            if ponctualite:
-                if ponctualite['categorie'] == 'parfait':
-                    ponctualite_parfaite += 1
-                elif ponctualite['categorie'] == 'acceptable':
-                    ponctualite_acceptable += 1
-                else:
-                    ponctualite_inacceptable += 1
-            
-            # Compter les jours travaillés par employé
-            employe_id = p.employe.cin
-            if employe_id not in jours_travailles_par_employe:
-                jours_travailles_par_employe[employe_id] = set()
-            jours_travailles_par_employe[employe_id].add(p.date_pointage)
+            
+            total_pointages += pointages_count
+            total_heures += heures_departement
+            ponctualite_parfaite += agregat.get('ponctualite_parfaite') or 0
+            ponctualite_acceptable += agregat.get('ponctualite_acceptable') or 0
+            ponctualite_inacceptable += agregat.get('ponctualite_inacceptable') or 0
         
         # 5. CALCUL DES ABSENCES GLOBALES
         # Nombre total de jours où les employés auraient dû travailler
         jours_total_possibles = employes_actifs * jours_passes_mois
         
         # Nombre total de jours effectivement travaillés
-        total_jours_travailles = sum(len(jours) for jours in jours_travailles_par_employe.values())
+        # (un seul pointage par employé et par jour: unique_together)
+        total_jours_travailles = total_pointages
         
         # Total des absences
         total_absences = max(0, jours_total_possibles - total_pointages)
@@ -817,45 +960,75 @@ class StatisticsService:
                    f"Pointages: {total_pointages}, Ponctualité: {ponctualite_parfaite}/{ponctualite_acceptable}/{ponctualite_inacceptable}")
         return stats
     
+    @staticmethod
+    def valeurs_statistiques_employe(stats_data):
+        """Champs de StatistiquesEmploye à partir d'un résultat de calcul (hebdo, mensuel ou annuel)"""
+        return {
+            # Métriques de base
+            'heures_travail_total': stats_data['heures_travail_total'],
+            'jours_travailles': stats_data['jours_travailles'],
+            'jours_absents': stats_data.get('jours_absents', 0),
+            'moyenne_heures_quotidiennes': stats_data['moyenne_heures_quotidiennes'],
+            
+            # Ponctualité détaillée
+            'ponctualite_parfaite': stats_data.get('ponctualite_parfaite', 0),
+            'ponctualite_acceptable': stats_data.get('ponctualite_acceptable', 0),
+            'ponctualite_inacceptable': stats_data.get('ponctualite_inacceptable', 0),
+            'retard_moyen_minutes': stats_data.get('retard_moyen_minutes', 0),
+            'depart_avance_moyen_minutes': stats_data.get('depart_avance_moyen_minutes', 0),
+            
+            # Régularité
+            'regularite_statut': stats_data.get('regularite_statut', 'acceptable'),
+            'taux_regularite': stats_data.get('taux_regularite', 0),
+            
+            # Présence et absence
+            'taux_presence': stats_data.get('taux_presence', 0),
+            'taux_absence': stats_data.get('taux_absence', 0),
+            
+            # Analyse complémentaire
+            'heures_attendues': stats_data.get('heures_attendues_jours_passes'),
+            'ecart_heures': stats_data.get('ecart_heures'),
+            
+            'jours_total': stats_data.get('jours_total_passes', stats_data.get('jours_total', 0))
+        }
+
+    @staticmethod
+    def valeurs_statistiques_globales(stats_data):
+        """Champs de StatistiquesGlobales à partir de _compute_global_monthly_stats (durées en secondes)"""
+        champs_entiers = (
+            'total_employes', 'employes_actifs', 'total_departements', 'departements_actifs',
+            'total_pointages', 'jours_total_possibles', 'total_jours_travailles',
+            'ponctualite_parfaite', 'ponctualite_acceptable', 'ponctualite_inacceptable',
+            'jours_passes_mois', 'total_absences',
+        )
+        champs_taux = (
+            'taux_activite_global', 'taux_presence', 'taux_absence_global', 'taux_regularite_parfaite',
+            'taux_regularite_acceptable', 'taux_regularite_inacceptable', 'pourcentage_ecart_global',
+        )
+        champs_durees = (
+            'heures_travail_total', 'moyenne_heures_quotidiennes', 'heures_attendues_total', 'ecart_heures_global',
+        )
+        valeurs = {champ: stats_data.get(champ, 0) for champ in champs_entiers + champs_taux}
+        valeurs.update({champ: timedelta(seconds=stats_data.get(champ) or 0) for champ in champs_durees})
+        valeurs.update({
+            'type_periode': stats_data.get('type_periode', 'mensuel'),
+            'statut_heures_global': stats_data.get('statut_heures_global', 'NORMAL'),
+            'observation_globale': stats_data.get('observation_globale'),
+        })
+        return valeurs
+
     @staticmethod
     def save_employee_stats_to_db(stats_data):
         """Sauvegarde les statistiques employé en base de données"""
         try:
-            from .models import StatistiquesEmploye
+            from api.models import StatistiquesEmploye
             
             stats, created = StatistiquesEmploye.objects.update_or_create(
                 employe=stats_data['employe'],
                 periode_debut=stats_data['periode_debut'],
                 periode_fin=stats_data['periode_fin'],
                 type_periode=stats_data['type_periode'],
-                defaults={
-                    # Métriques de base
-                    'heures_travail_total': stats_data['heures_travail_total'],
-                    'jours_travailles': stats_data['jours_travailles'],
-                    'jours_absents': stats_data.get('jours_absents', 0),
-                    'moyenne_heures_quotidiennes': stats_data['moyenne_heures_quotidiennes'],
-                    
-                    # Ponctualité détaillée
-                    'ponctualite_parfaite': stats_data.get('ponctualite_parfaite', 0),
-                    'ponctualite_acceptable': stats_data.get('ponctualite_acceptable', 0),
-                    'ponctualite_inacceptable': stats_data.get('ponctualite_inacceptable', 0),
-                    'retard_moyen_minutes': stats_data.get('retard_moyen_minutes', 0),
-                    'depart_avance_moyen_minutes': stats_data.get('depart_avance_moyen_minutes', 0),
-                    
-                    # Régularité
-                    'regularite_statut': stats_data.get('regularite_statut', 'acceptable'),
-                    'taux_regularite': stats_data.get('taux_regularite', 0),
-                    
-                    # Présence et absence
-                    'taux_presence': stats_data.get('taux_presence', 0),
-                    'taux_absence': stats_data.get('taux_absence', 0),
-                    
-                    # Analyse complémentaire
-                    'heures_attendues': stats_data.get('heures_attendues_jours_passes'),
-                    'ecart_heures': stats_data.get('ecart_heures'),
-                    
-                    'jours_total': stats_data.get('jours_total_passes', 0)
-                }
+                defaults=StatisticsService.valeurs_statistiques_employe(stats_data),
             )
             logger.info(f"💾 Stats sauvegardées pour {stats_data['employe'].matricule}")
             return stats
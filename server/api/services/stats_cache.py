@@ -0,0 +1,265 @@
+# stats_cache.py - Cache versionné des statistiques calculées
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PREFIXE = 'stats'
+COMPTEURS = ('hits', 'misses', 'invalidations')
+# Une entrée non invalidée (version perdue par le cache...) n'est jamais servie au-delà
+TIMEOUT_PERIODE_CLOSE_PAR_DEFAUT = 7 * 24 * 3600
+
+
+class ValidateurHTTP:
+    """ETag, Last-Modified (secondes epoch, None si non daté) et max-age (None: revalidation à chaque requête)"""
+
+    __slots__ = ('etag', 'last_modified', 'max_age')
+
+    def __init__(self, etag, last_modified, max_age=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.max_age = max_age
+
+
+class StatsCache:
+    """Cache des statistiques dont les clés intègrent des versions de données.
+
+    Chaque écriture incrémente la version de l'employé, du département et du
+    mois concernés: les anciennes entrées deviennent inaccessibles (invalidation)
+    sans balayage du cache. Les mois clôturés restent donc en cache tant
+    qu'aucune donnée les concernant n'est modifiée, dans la limite de
+    STATS_CACHE_TIMEOUT_PERIODE_CLOSE.
+
+    Les versions doivent être vues par tous les processus: le cache par défaut
+    doit être partagé (Redis, Memcached...; voir api.checks).
+
+    Portées de version:
+    - ``emp:<cin>`` / ``dep:<id>`` / ``global``: fiche employé, département, effectifs
+    - ``emp:<cin>:<YYYY-MM>`` / ``dep:<id>:<YYYY-MM>`` / ``global:<YYYY-MM>``: pointages du mois
+    - ``stockees:employe`` / ``stockees:globales``: statistiques enregistrées (validateurs HTTP)
+    - ``epoque``: toutes les entrées (reconstruction complète des agrégats)
+    """
+
+    # -----------------------
+    # Versions
+    # -----------------------
+    @staticmethod
+    def _cle_version(portee):
+        return f"{PREFIXE}:v:{portee}"
+
+    @staticmethod
+    def versions(*portees):
+        """Versions courantes des portées (initialisées si absentes du cache)"""
+        cles = [StatsCache._cle_version(p) for p in portees]
+        valeurs = cache.get_many(cles)
+        manquantes = [c for c in cles if c not in valeurs]
+        for cle in manquantes:
+            cache.add(cle, time.time_ns(), timeout=None)
+        if manquantes:
+            valeurs.update(cache.get_many(manquantes))
+        return [valeurs.get(c, 0) for c in cles]
+
+    @staticmethod
+    def incrementer_versions(portees):
+        """Invalide les entrées dépendant des portées données"""
+        portees = set(portees)
+        if not portees:
+            return
+        version = time.time_ns()
+        cache.set_many({StatsCache._cle_version(p): version for p in portees}, timeout=None)
+        StatsCache._incrementer('invalidations', len(portees))
+
+    @staticmethod
+    def incrementer_versions_apres_commit(portees):
+        """Incrémente les versions une fois la transaction validée"""
+        portees = set(portees)
+        transaction.on_commit(lambda: StatsCache.incrementer_versions(portees))
+
+    @staticmethod
+    def invalider_jours(cles_employes=(), cles_departements=()):
+        """Invalide les mois touchés par une écriture de pointages.
+
+        cles_employes: couples (cin, date); cles_departements: couples (id_departement, date)
+        """
+        portees = set()
+        for cin, jour in cles_employes:
+            mois = jour.strftime('%Y-%m')
+            portees.add(f"emp:{cin}:{mois}")
+            portees.add(f"global:{mois}")
+        for departement_id, jour in cles_departements:
+            portees.add(f"dep:{departement_id}:{jour.strftime('%Y-%m')}")
+        StatsCache.incrementer_versions_apres_commit(portees)
+
+    # -----------------------
+    # Clés des statistiques
+    # -----------------------
+    @staticmethod
+    def _suffixe_jour(debut, fin):
+        """Les périodes en cours dépendent du jour courant (jours passés)"""
+        today = timezone.now().date()
+        return f":{today.isoformat()}" if debut <= today <= fin else ""
+
+    @staticmethod
+    def _fin_de_mois(mois):
+        return (mois + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    @staticmethod
+    def portees_employe_mensuel(cin, mois):
+        return ["epoque", f"emp:{cin}", f"emp:{cin}:{mois.strftime('%Y-%m')}"]
+
+    @staticmethod
+    def portees_employe_hebdo(cin, debut_semaine):
+        fin_semaine = debut_semaine + timedelta(days=6)
+        mois = sorted({debut_semaine.strftime('%Y-%m'), fin_semaine.strftime('%Y-%m')})
+        return ["epoque", f"emp:{cin}", *[f"emp:{cin}:{m}" for m in mois]]
+
+    @staticmethod
+    def portees_global_mensuel(mois):
+        return ["epoque", "global", f"global:{mois.strftime('%Y-%m')}"]
+
+    @staticmethod
+    def cle_employe_mensuel(cin, mois):
+        mois_str = mois.strftime('%Y-%m')
+        versions = StatsCache.versions(*StatsCache.portees_employe_mensuel(cin, mois))
+        suffixe = StatsCache._suffixe_jour(mois, StatsCache._fin_de_mois(mois))
+        return f"{PREFIXE}:employe_mensuel:{cin}:{mois_str}:{'.'.join(map(str, versions))}{suffixe}"
+
+    @staticmethod
+    def cle_employe_hebdo(cin, debut_semaine):
+        fin_semaine = debut_semaine + timedelta(days=6)
+        versions = StatsCache.versions(*StatsCache.portees_employe_hebdo(cin, debut_semaine))
+        suffixe = StatsCache._suffixe_jour(debut_semaine, fin_semaine)
+        return f"{PREFIXE}:employe_hebdo:{cin}:{debut_semaine.isoformat()}:{'.'.join(map(str, versions))}{suffixe}"
+
+    @staticmethod
+    def cle_global_mensuel(mois):
+        mois_str = mois.strftime('%Y-%m')
+        versions = StatsCache.versions(*StatsCache.portees_global_mensuel(mois))
+        suffixe = StatsCache._suffixe_jour(mois, StatsCache._fin_de_mois(mois))
+        return f"{PREFIXE}:global_mensuel:{mois_str}:{'.'.join(map(str, versions))}{suffixe}"
+
+    @staticmethod
+    def cle_departement_mensuel(departement_id, mois):
+        mois_str = mois.strftime('%Y-%m')
+        versions = StatsCache.versions("epoque", f"dep:{departement_id}", f"dep:{departement_id}:{mois_str}")
+        suffixe = StatsCache._suffixe_jour(mois, StatsCache._fin_de_mois(mois))
+        return f"{PREFIXE}:departement_mensuel:{departement_id}:{mois_str}:{'.'.join(map(str, versions))}{suffixe}"
+
+    @staticmethod
+    def cle_tendances(portee, mois, *complements):
+        """Séries mensuelles de ``portee`` ('emp:<cin>' ou 'dep:<id>') sur les mois clôturés donnés"""
+        mois_str = [m.strftime('%Y-%m') for m in mois]
+        versions = StatsCache.versions("epoque", portee, *[f"{portee}:{m}" for m in mois_str])
+        suffixe = ''.join(f":{c}" for c in complements)
+        # Jusqu'à 38 versions: condensées pour rester sous la limite de longueur des clés
+        empreinte = hashlib.sha1('.'.join(map(str, versions)).encode()).hexdigest()
+        return f"{PREFIXE}:tendances:{portee}:{mois_str[0]}:{mois_str[-1]}{suffixe}:{empreinte}"
+
+    @staticmethod
+    def timeout(debut, fin):
+        """Période clôturée: une semaine par défaut; période en cours: jusqu'au lendemain"""
+        today = timezone.now().date()
+        if fin < today:
+            return StatsCache.timeout_periode_close()
+        return getattr(settings, 'STATS_CACHE_TIMEOUT_PERIODE_COURANTE', 24 * 3600)
+
+    @staticmethod
+    def timeout_periode_close():
+        return getattr(settings, 'STATS_CACHE_TIMEOUT_PERIODE_CLOSE', TIMEOUT_PERIODE_CLOSE_PAR_DEFAUT)
+
+    # -----------------------
+    # Validateurs HTTP (GET conditionnels)
+    # -----------------------
+    @staticmethod
+    def validateur(portees, *complements, fin=None):
+        """ETag fort, Last-Modified et durée de cache HTTP d'une réponse dépendant des portées.
+
+        ``complements``: tout ce qui change la représentation (chemin, paramètres,
+        type de média). ``fin``: dernier jour de la période décrite; une période en
+        cours dépend aussi du jour courant, une période clôturée ne change plus
+        qu'avec ses versions et reçoit STATS_HTTP_MAX_AGE_PERIODE_CLOSE.
+
+        L'ETag est le validateur principal. Last-Modified n'a qu'une précision d'une
+        seconde: la dernière version est arrondie à la seconde supérieure, et la date
+        n'est donnée qu'une fois cette seconde écoulée. Une modification ultérieure
+        tombe ainsi toujours dans une seconde plus récente (pas de 304 à tort pour
+        un client qui n'envoie que If-Modified-Since).
+        """
+        versions = StatsCache.versions(*portees)
+        today = timezone.now().date()
+        en_cours = fin is not None and fin >= today
+        empreinte = hashlib.sha1(repr((
+            list(zip(portees, versions)), complements, today.isoformat() if en_cours else None
+        )).encode()).hexdigest()
+
+        derniere_modification = -(-max(versions) // 1_000_000_000) if versions else 0
+        if derniere_modification * 1_000_000_000 > time.time_ns():
+            derniere_modification = None
+        elif en_cours:
+            minuit = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+            derniere_modification = max(derniere_modification, int(minuit.timestamp()))
+        max_age = None
+        if fin is not None and not en_cours:
+            max_age = getattr(settings, 'STATS_HTTP_MAX_AGE_PERIODE_CLOSE', 24 * 3600)
+        return ValidateurHTTP(f'"{empreinte}"', derniere_modification, max_age)
+
+    # -----------------------
+    # Lecture / calcul
+    # -----------------------
+    @staticmethod
+    def lire(cle):
+        """Entrée en cache ou None (compte un hit ou un miss)"""
+        if not getattr(settings, 'STATS_CACHE_ENABLED', True):
+            return None
+
+        resultat = cache.get(cle)
+        StatsCache._incrementer('hits' if resultat is not None else 'misses')
+        return resultat
+
+    @staticmethod
+    def ecrire(cle, resultat, timeout=None):
+        """Enregistre un résultat (``timeout`` absent: durée des périodes clôturées)"""
+        if getattr(settings, 'STATS_CACHE_ENABLED', True):
+            cache.set(cle, resultat, timeout=timeout or StatsCache.timeout_periode_close())
+
+    @staticmethod
+    def get_or_compute(cle, calcul, timeout=None):
+        resultat = StatsCache.lire(cle)
+        if resultat is None:
+            resultat = calcul()
+            StatsCache.ecrire(cle, resultat, timeout=timeout)
+        return resultat
+
+    # -----------------------
+    # Compteurs
+    # -----------------------
+    @staticmethod
+    def _incrementer(compteur, delta=1):
+        cle = f"{PREFIXE}:compteur:{compteur}"
+        try:
+            cache.incr(cle, delta)
+        except ValueError:
+            cache.add(cle, 0, timeout=None)
+            try:
+                cache.incr(cle, delta)
+            except ValueError:
+                logger.warning(f"⚠️ Compteur de cache indisponible: {compteur}")
+
+    @staticmethod
+    def compteurs():
+        valeurs = cache.get_many([f"{PREFIXE}:compteur:{c}" for c in COMPTEURS])
+        resultat = {c: valeurs.get(f"{PREFIXE}:compteur:{c}", 0) for c in COMPTEURS}
+        lectures = resultat['hits'] + resultat['misses']
+        resultat['taux_hit'] = round(resultat['hits'] / lectures * 100, 2) if lectures > 0 else 0
+        return resultat
+
+    @staticmethod
+    def reinitialiser_compteurs():
+        cache.delete_many([f"{PREFIXE}:compteur:{c}" for c in COMPTEURS])
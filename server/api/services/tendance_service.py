@@ -0,0 +1,326 @@
+# tendance_service.py - Tendances mensuelles (séries, régression, prévisions)
+import calendar
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .statistics_service import StatisticsService
+from .stats_cache import StatsCache
+
+logger = logging.getLogger(__name__)
+
+# NumPy accélère le calcul en lot (département entier); repli en Python pur sinon
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+NB_MOIS_MIN = 12
+NB_MOIS_MAX = 36
+NB_MOIS_PAR_DEFAUT = 12
+POINTS_MIN_REGRESSION = 3
+
+# Indicateurs mensuels et sens favorable (+1: une hausse est une amélioration)
+INDICATEURS = {
+    'heures': 1,
+    'taux_presence': 1,
+    'taux_regularite': 1,
+    'taux_ponctualite': 1,
+    'retard_moyen': -1,
+}
+# Plancher de la moyenne pour la variation relative (évite la division par ~0)
+PLANCHERS = {'heures': 8.0, 'taux_presence': 5.0, 'taux_regularite': 5.0, 'taux_ponctualite': 5.0, 'retard_moyen': 5.0}
+BORNES = {'heures': (0, None), 'taux_presence': (0, 100), 'taux_regularite': (0, 100),
+          'taux_ponctualite': (0, 100), 'retard_moyen': (0, None)}
+# Variation relative mensuelle sous laquelle un indicateur est jugé stable
+SEUIL_STABILITE = 0.02
+# Variation relative mensuelle qui sature le score (±100)
+SEUIL_SCORE = 0.10
+
+# Clés de tendances exposées par l'API -> indicateur
+TENDANCES = {
+    'productivite': 'heures',
+    'presence': 'taux_presence',
+    'regularite': 'taux_regularite',
+    'ponctualite': 'taux_ponctualite',
+    'retard': 'retard_moyen',
+}
+
+
+class TendanceService:
+    """Séries mensuelles par employé et tendance de chaque indicateur.
+
+    Les séries viennent d'une seule requête groupée (employé, mois) sur les
+    présences journalières. La pente de chaque série est estimée par moindres
+    carrés sur les mois clôturés, à partir du premier mois avec présence; tous
+    les employés sont traités ensemble (matrices NumPy si disponible).
+    """
+
+    # -----------------------
+    # Période
+    # -----------------------
+    @staticmethod
+    def nb_mois(valeur):
+        """Valide ?nb_mois= (None = valeur par défaut); ValueError si hors bornes"""
+        if valeur in (None, ''):
+            return NB_MOIS_PAR_DEFAUT
+        nb = int(valeur)
+        if not NB_MOIS_MIN <= nb <= NB_MOIS_MAX:
+            raise ValueError(f"nb_mois doit être compris entre {NB_MOIS_MIN} et {NB_MOIS_MAX}")
+        return nb
+
+    @staticmethod
+    def mois_periode(nb_mois):
+        """Les ``nb_mois`` derniers mois clôturés (1er de chaque mois), du plus ancien au plus récent"""
+        mois = timezone.now().date().replace(day=1)
+        periode = []
+        for _ in range(nb_mois):
+            mois = (mois - timedelta(days=1)).replace(day=1)
+            periode.append(mois)
+        return periode[::-1]
+
+    @staticmethod
+    def _mois_suivant(mois):
+        return (mois + timedelta(days=32)).replace(day=1)
+
+    # -----------------------
+    # Séries
+    # -----------------------
+    @staticmethod
+    def _series(cins, periode, totaux):
+        """{indicateur: [[valeur par mois] par employé]} et premier mois actif de chaque employé"""
+        series = {nom: [] for nom in INDICATEURS}
+        series.update({'parfait': [], 'acceptable': [], 'inacceptable': [], 'jours_travailles': []})
+        debuts = []
+        jours_mois = [calendar.monthrange(m.year, m.month)[1] for m in periode]
+
+        for cin in cins:
+            totaux_employe = totaux.get(cin, {})
+            lignes = {nom: [] for nom in series}
+            debut = None
+            for indice, (mois, jours) in enumerate(zip(periode, jours_mois)):
+                t = totaux_employe.get(mois)
+                travailles = t['jours_travailles'] if t else 0
+                if travailles and debut is None:
+                    debut = indice
+                parfait = t['ponctualite_parfaite'] if t else 0
+                acceptable = t['ponctualite_acceptable'] if t else 0
+                # Mêmes formules que StatisticsService._stats_mensuelles_depuis_totaux
+                lignes['heures'].append(round(t['secondes_travail'] / 3600, 2) if t else 0.0)
+                lignes['taux_presence'].append(round(travailles / jours * 100, 2))
+                lignes['taux_regularite'].append(round(parfait / travailles * 100, 2) if travailles else 0.0)
+                lignes['taux_ponctualite'].append(
+                    round((parfait + acceptable) / travailles * 100, 2) if travailles else 0.0
+                )
+                lignes['retard_moyen'].append(round(t['retard_total'] / travailles, 1) if travailles else 0.0)
+                lignes['parfait'].append(parfait)
+                lignes['acceptable'].append(acceptable)
+                lignes['inacceptable'].append(t['ponctualite_inacceptable'] if t else 0)
+                lignes['jours_travailles'].append(travailles)
+            for nom, valeurs in lignes.items():
+                series[nom].append(valeurs)
+            debuts.append(len(periode) if debut is None else debut)
+        return series, debuts
+
+    # -----------------------
+    # Régression
+    # -----------------------
+    @staticmethod
+    def _regression(valeurs, debuts):
+        """Pente et valeur prévue au mois suivant pour chaque ligne (moindres carrés pondérés).
+
+        Les mois antérieurs à ``debuts[i]`` ont un poids nul; retourne
+        [(pente, prevision, moyenne, points)] par ligne.
+        """
+        nb = len(valeurs[0]) if valeurs else 0
+        if NUMPY_AVAILABLE and valeurs:
+            y = np.asarray(valeurs, dtype=float)
+            x = np.arange(nb, dtype=float)
+            poids = (x[None, :] >= np.asarray(debuts, dtype=float)[:, None]).astype(float)
+            points = poids.sum(axis=1)
+            n = np.maximum(points, 1)
+            x_moyen = (poids * x).sum(axis=1) / n
+            y_moyen = (poids * y).sum(axis=1) / n
+            dx = (x[None, :] - x_moyen[:, None]) * poids
+            variance = (dx * dx).sum(axis=1)
+            pente = np.where(
+                variance > 0, (dx * (y - y_moyen[:, None])).sum(axis=1) / np.where(variance > 0, variance, 1), 0.0
+            )
+            prevision = y_moyen + pente * (nb - x_moyen)
+            return list(zip(pente.tolist(), prevision.tolist(), y_moyen.tolist(), points.astype(int).tolist()))
+
+        resultats = []
+        for ligne, debut in zip(valeurs, debuts):
+            xs = list(range(debut, nb))
+            ys = ligne[debut:]
+            points = len(xs)
+            if not points:
+                resultats.append((0.0, 0.0, 0.0, 0))
+                continue
+            x_moyen = sum(xs) / points
+            y_moyen = sum(ys) / points
+            variance = sum((x - x_moyen) ** 2 for x in xs)
+            pente = sum((x - x_moyen) * (y - y_moyen) for x, y in zip(xs, ys)) / variance if variance else 0.0
+            resultats.append((pente, y_moyen + pente * (nb - x_moyen), y_moyen, points))
+        return resultats
+
+    @staticmethod
+    def _direction(indicateur, pente, moyenne, points):
+        if points < POINTS_MIN_REGRESSION:
+            return 'donnees_insuffisantes', 0.0
+        variation = pente / max(abs(moyenne), PLANCHERS[indicateur]) * INDICATEURS[indicateur]
+        if variation > SEUIL_STABILITE:
+            return 'en_amelioration', variation
+        if variation < -SEUIL_STABILITE:
+            return 'en_degradation', variation
+        return 'stable', variation
+
+    @staticmethod
+    def _borner(indicateur, valeur):
+        minimum, maximum = BORNES[indicateur]
+        valeur = max(minimum, valeur)
+        return min(maximum, valeur) if maximum is not None else valeur
+
+    # -----------------------
+    # Analyse
+    # -----------------------
+    @staticmethod
+    def _recommandation(tendances):
+        degradations = [cle for cle, valeur in tendances.items() if valeur == 'en_degradation']
+        if all(valeur == 'donnees_insuffisantes' for valeur in tendances.values()):
+            return "Historique insuffisant pour une recommandation"
+        if not degradations:
+            return "Maintenir le rythme actuel"
+        libelles = {
+            'productivite': "les heures travaillées", 'presence': "la présence",
+            'regularite': "la régularité", 'ponctualite': "la ponctualité", 'retard': "les retards",
+        }
+        return "Point d'attention: " + ", ".join(libelles[cle] for cle in degradations)
+
+    @staticmethod
+    def _alertes(series, indice, tendances, previsions):
+        alertes = []
+        if series['jours_travailles'][indice][-1] == 0:
+            alertes.append("Aucune présence le mois dernier")
+        elif series['taux_presence'][indice][-1] < 50:
+            alertes.append(f"Taux de présence faible le mois dernier ({series['taux_presence'][indice][-1]}%)")
+        if tendances['ponctualite'] == 'en_degradation':
+            alertes.append("Ponctualité en baisse continue")
+        if tendances['retard'] == 'en_degradation' and previsions['retard_moyen'] > 15:
+            alertes.append(f"Retard moyen prévu de {previsions['retard_moyen']:.0f} min")
+        return alertes
+
+    @staticmethod
+    def analyser(employes, nb_mois=NB_MOIS_PAR_DEFAUT, avec_series=True, conditions=(), **filtres):
+        """Tendances de chaque employé donné (une requête pour toutes les séries).
+
+        ``conditions`` (Q) et ``filtres`` restreignent la requête des présences (ex.
+        employe__departement_id); à défaut, les présences sont filtrées sur les employés donnés.
+        """
+        periode = TendanceService.mois_periode(nb_mois)
+        cins = [employe.cin for employe in employes]
+        if not filtres and not conditions:
+            filtres = {'employe_id__in': cins}
+        totaux = StatisticsService._totaux_mensuels_par_employe(
+            periode[0], StatsCache._fin_de_mois(periode[-1]), *conditions, **filtres
+        )
+        series, debuts = TendanceService._series(cins, periode, totaux)
+        regressions = {nom: TendanceService._regression(series[nom], debuts) for nom in INDICATEURS}
+
+        mois_str = [m.strftime('%Y-%m') for m in periode]
+        mois_prevu = TendanceService._mois_suivant(periode[-1]).strftime('%Y-%m')
+        resultats = []
+        for indice, employe in enumerate(employes):
+            pentes, previsions, variations, tendances_indicateurs = {}, {}, {}, {}
+            for nom in INDICATEURS:
+                pente, prevision, moyenne, points = regressions[nom][indice]
+                tendances_indicateurs[nom], variations[nom] = TendanceService._direction(nom, pente, moyenne, points)
+                pentes[nom] = round(pente, 3)
+                previsions[nom] = round(TendanceService._borner(nom, prevision), 2)
+            tendances = {cle: tendances_indicateurs[nom] for cle, nom in TENDANCES.items()}
+            score = sum(
+                max(-1.0, min(1.0, variation / SEUIL_SCORE)) for variation in variations.values()
+            ) / len(variations) * 100
+
+            resultat = {
+                'employe': employe.cin,
+                'nom_complet': f"{employe.nom} {employe.prenom}",
+                'type_employe': 'Stagiaire' if employe.titre == 'stagiaire' else 'Employé fixe',
+                'periode': {'debut': mois_str[0], 'fin': mois_str[-1], 'nb_mois': nb_mois,
+                            'mois_analyses': nb_mois - debuts[indice]},
+                'tendances': tendances,
+                'pentes_mensuelles': pentes,
+                'score': round(score, 1),
+                'predictions': {
+                    'prochain_mois': {
+                        'mois': mois_prevu,
+                        'heures_estimees': f"{previsions['heures']:.0f}h",
+                        'taux_regularite_estime': f"{previsions['taux_regularite']:.0f}%",
+                        'valeurs': previsions,
+                        'recommandation': TendanceService._recommandation(tendances),
+                    }
+                },
+                'alertes': TendanceService._alertes(series, indice, tendances, previsions),
+            }
+            if avec_series:
+                resultat['series'] = {'mois': mois_str}
+                for nom in INDICATEURS:
+                    resultat['series'][nom] = series[nom][indice]
+                resultat['series']['ponctualite'] = {
+                    statut: series[statut][indice] for statut in ('parfait', 'acceptable', 'inacceptable')
+                }
+            resultats.append(resultat)
+        return resultats
+
+    @staticmethod
+    def tendances_employe(employe, nb_mois=NB_MOIS_PAR_DEFAUT):
+        """Tendances d'un employé (mises en cache jusqu'à la prochaine écriture le concernant)"""
+        periode = TendanceService.mois_periode(nb_mois)
+        return StatsCache.get_or_compute(
+            StatsCache.cle_tendances(f"emp:{employe.cin}", periode),
+            lambda: TendanceService.analyser([employe], nb_mois)[0],
+        )
+
+    @staticmethod
+    def tendances_departement(departement_id, nb_mois=NB_MOIS_PAR_DEFAUT, portee=None, avec_series=False):
+        """Tendances des employés d'un département (limités à ``portee``), du score le plus bas au plus haut"""
+        from api.models import Employe
+
+        def calculer():
+            employes = Employe.objects.filter(departement_id=departement_id).only(
+                'cin', 'nom', 'prenom', 'titre'
+            ).order_by('cin')
+            conditions = ()
+            if portee is not None:
+                employes = portee.filtrer_employes(employes)
+                conditions = (portee.filtre_employes('employe__'),)
+            employes = list(employes)
+            resultats = TendanceService.analyser(
+                employes, nb_mois, avec_series, conditions, employe__departement_id=departement_id
+            ) if employes else []
+            resultats.sort(key=lambda resultat: (resultat['score'], resultat['employe']))
+
+            resume = {}
+            for resultat in resultats:
+                for cle, valeur in resultat['tendances'].items():
+                    resume.setdefault(cle, {}).setdefault(valeur, 0)
+                    resume[cle][valeur] += 1
+            return {
+                'departement': departement_id,
+                'nb_employes': len(resultats),
+                'methode': 'numpy' if NUMPY_AVAILABLE else 'python',
+                'resume': resume,
+                'employes': resultats,
+            }
+
+        periode = TendanceService.mois_periode(nb_mois)
+        complements = [portee.cle() if portee is not None else 'tous']
+        if avec_series:
+            complements.append('series')
+        return StatsCache.get_or_compute(
+            StatsCache.cle_tendances(f"dep:{departement_id}", periode, *complements),
+            calculer,
+        )
@@ -0,0 +1,137 @@
+# signals.py
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from .authentication import oublier_utilisateur, publier_version_jeton
+from .models import CustomUser, Departement, Employe, Pointage, StatistiquesEmploye, StatistiquesGlobales
+from .services.acces_service import AccesService
+from .services.effectif_service import EffectifService
+from .services.presence_live_service import PresenceLiveService
+from .services.presence_service import PresenceService
+from .services.recherche_service import RechercheService
+from .services.stats_cache import StatsCache
+
+
+@receiver(post_save, sender=Pointage)
+def pointage_enregistre(sender, instance, raw=False, **kwargs):
+    """Met à jour les agrégats du jour du pointage (et de l'ancien jour s'il a changé)"""
+    if raw:
+        return
+
+    cle = (instance.employe_id, instance.date_pointage)
+    cles = {cle}
+    cle_origine = getattr(instance, '_cle_origine', None)
+    if cle_origine and cle_origine != cle:
+        cles.add(cle_origine)
+    instance._cle_origine = cle
+
+    PresenceService.actualiser_jours(cles)
+    PresenceLiveService.appliquer_pointages([instance])
+
+
+@receiver(post_delete, sender=Pointage)
+def pointage_supprime(sender, instance, **kwargs):
+    PresenceService.actualiser_jours({(instance.employe_id, instance.date_pointage)})
+    PresenceLiveService.appliquer_pointages([instance], supprimes=True)
+
+
+@receiver(post_save, sender=Employe)
+def employe_enregistre(sender, instance, created=False, raw=False, **kwargs):
+    """Reclasse l'historique si le département ou les horaires de l'employé ont changé"""
+    if raw:
+        return
+
+    valeurs = {champ: getattr(instance, champ) for champ in Employe.CHAMPS_SUIVIS}
+    valeurs_origine = getattr(instance, '_valeurs_origine', None)
+    instance._valeurs_origine = valeurs
+
+    if not created and valeurs_origine is not None and valeurs_origine != valeurs:
+        PresenceService.actualiser_employe(instance.cin)
+
+    # Nom ou département affiché sur le tableau des présences (ignoré si chargé sans ces champs)
+    if not created and 'nom' in instance.__dict__ and 'prenom' in instance.__dict__:
+        PresenceLiveService.actualiser_employe(
+            instance.cin, f"{instance.nom} {instance.prenom}", instance.departement_id
+        )
+
+    # Effectifs: incréments atomiques, sans relire ni réécrire les départements
+    if created:
+        EffectifService.ajuster({instance.departement_id: 1})
+    elif valeurs_origine is not None:
+        EffectifService.deplacer(valeurs_origine['departement_id'], instance.departement_id)
+    else:
+        # Instance construite hors base pour une ligne existante: ancien département inconnu
+        EffectifService.recompter({instance.departement_id})
+
+    # Portées d'accès: nouvel employé ou changement de département
+    if created or valeurs_origine is None or valeurs_origine.get('departement_id') != instance.departement_id:
+        AccesService.invalider_apres_commit()
+
+    # Index de recherche en mémoire à reconstruire
+    RechercheService.invalider_apres_commit()
+
+    # Fiche employé et effectifs modifiés
+    portees = {f"emp:{instance.cin}", "global", f"dep:{instance.departement_id}"}
+    if valeurs_origine and valeurs_origine.get('departement_id'):
+        portees.add(f"dep:{valeurs_origine['departement_id']}")
+    StatsCache.incrementer_versions_apres_commit(portees)
+
+
+@receiver(post_delete, sender=Employe)
+def employe_supprime(sender, instance, **kwargs):
+    EffectifService.ajuster({instance.departement_id: -1})
+    AccesService.invalider_apres_commit()
+    RechercheService.invalider_apres_commit()
+    StatsCache.incrementer_versions_apres_commit(
+        {f"emp:{instance.cin}", "global", f"dep:{instance.departement_id}"}
+    )
+
+
+@receiver(post_save, sender=Departement)
+@receiver(post_delete, sender=Departement)
+def departement_modifie(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    StatsCache.incrementer_versions_apres_commit({"global", f"dep:{instance.id_departement}"})
+    # Le responsable a pu changer
+    AccesService.invalider_apres_commit()
+
+
+@receiver(post_save, sender=StatistiquesEmploye)
+@receiver(post_delete, sender=StatistiquesEmploye)
+def statistiques_employe_modifiees(sender, raw=False, **kwargs):
+    """Validateurs HTTP (ETag) de la liste des statistiques enregistrées"""
+    if not raw:
+        StatsCache.incrementer_versions_apres_commit({"stockees:employe"})
+
+
+@receiver(post_save, sender=StatistiquesGlobales)
+@receiver(post_delete, sender=StatistiquesGlobales)
+def statistiques_globales_modifiees(sender, raw=False, **kwargs):
+    if not raw:
+        StatsCache.incrementer_versions_apres_commit({"stockees:globales"})
+
+
+@receiver(post_save, sender=CustomUser)
+def utilisateur_enregistre(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Version de révocation des jetons (incrémentée par CustomUser.save si nécessaire);
+    # l'entrée du cache des utilisateurs de ce processus est rechargée à la prochaine requête
+    def publier():
+        oublier_utilisateur(instance.pk)
+        publier_version_jeton(instance)
+    transaction.on_commit(publier)
+    # Email modifié: les départements dont l'utilisateur est responsable changent
+    if update_fields is None or 'email' in update_fields:
+        AccesService.invalider_apres_commit()
+    # Auteur affiché avec les statistiques enregistrées
+    if update_fields is None or {'email', 'nom'} & set(update_fields):
+        StatsCache.incrementer_versions_apres_commit({"stockees:employe"})
+
+
+@receiver(post_delete, sender=CustomUser)
+def utilisateur_supprime(sender, instance, **kwargs):
+    oublier_utilisateur(instance.pk)
+    AccesService.invalider_apres_commit()
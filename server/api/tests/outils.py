@@ -0,0 +1,53 @@
+# outils.py - Jeux de données des tests: utilisateurs, départements, employés, pointages
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import CustomUser, Departement, Employe, Pointage
+
+MOT_DE_PASSE = 'MotDePasse-2024'
+
+
+def mois_precedent():
+    """Premier jour du dernier mois clôturé"""
+    return (timezone.now().date().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+
+def creer_utilisateur(email='gestionnaire@test.fr', **champs):
+    return CustomUser.objects.create_user(email, MOT_DE_PASSE, **champs)
+
+
+def creer_departement(id_departement='D1', responsable='responsable@test.fr', **champs):
+    champs.setdefault('nom', f'Département {id_departement}')
+    champs.setdefault('localisation', 'Siège')
+    return Departement.objects.create(id_departement=id_departement, responsable=responsable, **champs)
+
+
+def creer_employe(numero, departement, created_by=None, **champs):
+    champs.setdefault('nom', f'Nom{numero}')
+    champs.setdefault('prenom', f'Prenom{numero}')
+    champs.setdefault('email', f'employe{numero}@test.fr')
+    champs.setdefault('poste', 'Agent')
+    champs.setdefault('titre', 'employe')
+    if champs['titre'] == 'employe':
+        champs.setdefault('matricule', f'{numero:06d}')
+    return Employe.objects.create(
+        cin=f'{numero:012d}', departement=departement, created_by=created_by, **champs
+    )
+
+
+def pointer(employe, jour, entree=time(8, 0), sortie=time(16, 0), **champs):
+    return Pointage.objects.create(
+        employe=employe, date_pointage=jour, heure_entree=entree, heure_sortie=sortie, **champs
+    )
+
+
+class TestCaseApi(TestCase):
+    """Cache vidé avant chaque test: les versions et résultats en cache survivent aux rollbacks"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
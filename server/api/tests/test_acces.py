@@ -0,0 +1,146 @@
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, RapportJob, StatistiquesEmploye
+from api.permissions import IsOwnerOrAdminForWrite
+from api.services import acces_service
+from api.services.acces_service import AccesService
+from api.services.rapport_service import RapportService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, pointer
+
+
+class AccesTestCase(TestCaseApi):
+    """Un gestionnaire (employés 1 et 2, responsable de D2) et les employés d'un autre (3 et 4)"""
+
+    def setUp(self):
+        super().setUp()
+        self.gestionnaire = creer_utilisateur()
+        self.admin = CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024')
+        d1 = creer_departement('D1', responsable='autre@test.fr')
+        d2 = creer_departement('D2', responsable=self.gestionnaire.email)
+        self.a = creer_employe(1, d1, created_by=self.gestionnaire)
+        self.b = creer_employe(2, d1, created_by=self.gestionnaire)
+        self.c = creer_employe(3, d1)
+        self.d = creer_employe(4, d2)
+        for employe in (self.a, self.c, self.d):
+            pointer(employe, date(2025, 3, 3))
+            StatistiquesEmploye.objects.create(
+                employe=employe, type_periode='mensuel', periode_debut=date(2025, 3, 1), periode_fin=date(2025, 3, 31)
+            )
+
+    def client_de(self, utilisateur):
+        client = APIClient()
+        client.force_authenticate(utilisateur)
+        return client
+
+
+class PorteeTests(AccesTestCase):
+    """Portée calculée, tests d'appartenance et mise en cache"""
+
+    def test_portee(self):
+        portee = AccesService.portee(self.gestionnaire)
+
+        self.assertEqual(portee.employes, {self.a.cin, self.b.cin})
+        self.assertEqual(portee.departements_responsable, {'D2'})
+        self.assertEqual(portee.employes_responsable, {self.d.cin})
+        self.assertTrue(portee.peut_lire_employe(self.a.cin))
+        self.assertTrue(portee.peut_lire_employe(self.d.cin))           # responsable de D2
+        self.assertFalse(portee.peut_lire_employe(self.c.cin))
+        self.assertTrue(portee.peut_modifier(self.d.pointages.get()))
+        self.assertFalse(portee.peut_modifier(self.c.pointages.get()))
+        self.assertTrue(AccesService.portee(self.admin).peut_lire_employe(self.c.cin))
+
+    def test_cache_local_recalcule_a_chaque_requete(self):
+        AccesService.portee(self.gestionnaire)
+        with self.assertNumQueries(2):
+            AccesService.portee(CustomUser(pk=self.gestionnaire.pk, email=self.gestionnaire.email))
+
+    def test_cache_partage_jusqu_a_l_invalidation(self):
+        def portee():
+            return AccesService.portee(CustomUser(pk=self.gestionnaire.pk, email=self.gestionnaire.email))
+
+        with mock.patch.object(acces_service, 'cache_partage', return_value=True):
+            portee()
+            with self.assertNumQueries(0):
+                self.assertEqual(portee().employes, {self.a.cin, self.b.cin})
+
+            with self.captureOnCommitCallbacks(execute=True):
+                nouveau = creer_employe(5, self.a.departement, created_by=self.gestionnaire)
+            self.assertIn(nouveau.cin, portee().employes)
+
+    def test_permission_d_ecriture(self):
+        permission = IsOwnerOrAdminForWrite()
+        requete = RequestFactory().delete('/')
+        requete.user = self.gestionnaire
+
+        self.assertTrue(permission.has_object_permission(requete, None, self.d.pointages.get()))
+        self.assertFalse(permission.has_object_permission(requete, None, self.c.pointages.get()))
+        # L'employé concerné lui-même
+        pointage = SimpleNamespace(employe=SimpleNamespace(user_id=self.gestionnaire.pk))
+        self.assertTrue(permission.has_object_permission(requete, None, pointage))
+
+
+class ListesRestreintesTests(AccesTestCase):
+    """Listes, exports et rapports limités aux employés de la portée"""
+
+    def cins(self, client, url, cle='cin'):
+        return sorted(ligne[cle] for ligne in client.get(url).json()['results'])
+
+    def test_listes(self):
+        gestionnaire, admin = self.client_de(self.gestionnaire), self.client_de(self.admin)
+
+        # Employés créés (a, b) et employés du département dont il est responsable (d)
+        self.assertEqual(self.cins(gestionnaire, '/api/employes/'), [self.a.cin, self.b.cin, self.d.cin])
+        self.assertEqual(len(self.cins(admin, '/api/employes/')), 4)
+        self.assertEqual(self.cins(gestionnaire, '/api/pointages/', 'employe'), [self.a.cin, self.d.cin])
+        self.assertEqual(len(self.cins(admin, '/api/pointages/', 'employe')), 3)
+        statistiques = gestionnaire.get('/api/statistiques-employe/').json()['results']
+        self.assertEqual(sorted(ligne['employe']['cin'] for ligne in statistiques), [self.a.cin, self.d.cin])
+        self.assertEqual(gestionnaire.get(f'/api/employes/{self.c.cin}/').status_code, 404)
+
+    def test_propre_fiche(self):
+        utilisateur = creer_utilisateur('employe3@test.fr')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.c.user = utilisateur
+            self.c.save()
+        client = self.client_de(utilisateur)
+
+        self.assertEqual(self.cins(client, '/api/employes/'), [self.c.cin])
+        self.assertEqual(self.cins(client, '/api/pointages/', 'employe'), [self.c.cin])
+        self.assertTrue(AccesService.portee(utilisateur).peut_lire_employe(self.c.cin))
+        self.assertEqual(client.get(f'/api/employes/{self.a.cin}/').status_code, 404)
+
+    def test_etag_propre_a_la_portee(self):
+        url = '/api/statistiques-employe/'
+        etag_admin = self.client_de(self.admin).get(url)['ETag']
+        reponse = self.client_de(self.gestionnaire).get(url, HTTP_IF_NONE_MATCH=etag_admin)
+
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(reponse['ETag'], etag_admin)
+
+    def test_exports(self):
+        contenu = b''.join(self.client_de(self.gestionnaire).get('/api/exports/pointages/').streaming_content)
+        lignes = contenu.decode().strip().splitlines()[1:]
+        self.assertEqual(sorted(ligne.split(',')[1] for ligne in lignes), [self.a.cin, self.d.cin])
+
+        contenu = b''.join(self.client_de(self.admin).get('/api/exports/pointages/').streaming_content)
+        self.assertEqual(len(contenu.decode().strip().splitlines()), 4)
+
+    def test_rapport_departement(self):
+        parametres = RapportService.restreindre(
+            RapportService.preparer_parametres('departement', {'departement': 'D1', 'mois': '2025-03'}),
+            AccesService.portee(self.gestionnaire),
+        )
+        self.assertEqual(parametres['created_by'], self.gestionnaire.pk)
+        self.assertNotIn('created_by', RapportService.restreindre({}, AccesService.portee(self.admin)))
+
+        job = RapportJob(type_rapport='departement', parametres=parametres, created_by=self.admin)
+        self.assertTrue(RapportService.peut_acceder(self.gestionnaire, job))
+        self.assertFalse(RapportService.peut_acceder(creer_utilisateur('tiers@test.fr'), job))
+        job = RapportJob(type_rapport='employe', parametres={'cin': self.c.cin}, created_by=self.admin)
+        self.assertFalse(RapportService.peut_acceder(self.gestionnaire, job))
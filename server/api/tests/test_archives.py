@@ -0,0 +1,172 @@
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date, time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, Pointage, PresenceJournaliere
+from api.services import archive_service
+from api.services.archive_service import ArchiveError, ArchiveService
+from api.services.export_service import ExportService
+from api.services.pointage_import_service import PointageImportService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, pointer
+
+
+class ArchivesTestCase(TestCaseApi):
+    """Répertoire d'archives temporaire propre à chaque test"""
+
+    def setUp(self):
+        super().setUp()
+        self.repertoire = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.repertoire, ignore_errors=True)
+        reglages = override_settings(ARCHIVES_POINTAGES_DIR=self.repertoire)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.employe = creer_employe(1, creer_departement('D1'))
+
+
+class ArchivesTests(ArchivesTestCase):
+    """Découpage des lectures et années en lecture seule (indépendant de NumPy)"""
+
+    def marquer_archivee(self, annee):
+        dossier = self.repertoire / str(annee)
+        dossier.mkdir()
+        (dossier / archive_service.FICHIER_MANIFESTE).write_text(json.dumps({'annee': annee}))
+
+    def test_segments(self):
+        self.assertEqual(ArchiveService.segments(date(2019, 6, 1), date(2021, 3, 1)), [(None, date(2019, 6, 1), date(2021, 3, 1))])
+
+        self.marquer_archivee(2020)
+        self.assertEqual(ArchiveService.segments(date(2019, 6, 1), date(2021, 3, 1)), [
+            (None, date(2019, 6, 1), date(2019, 12, 31)),
+            (2020, date(2020, 1, 1), date(2020, 12, 31)),
+            (None, date(2021, 1, 1), date(2021, 3, 1)),
+        ])
+        self.assertEqual(ArchiveService.segments(None, None), [
+            (None, None, date(2019, 12, 31)), (2020, date(2020, 1, 1), date(2020, 12, 31)), (None, date(2021, 1, 1), None),
+        ])
+        self.assertEqual(ArchiveService.segments(date(2020, 3, 1), date(2020, 4, 30)), [(2020, date(2020, 3, 1), date(2020, 4, 30))])
+
+    def test_annee_archivee_en_lecture_seule(self):
+        self.marquer_archivee(2020)
+        self.assertTrue(ArchiveService.est_archivee(date(2020, 5, 4)))
+        self.assertEqual(ArchiveService.derniere_annee_archivable(), timezone.now().year - 3)
+
+        resultat = PointageImportService.importer(
+            [{'employe': self.employe.cin, 'date_pointage': '2020-05-04', 'heure_entree': '08:00'}],
+            CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'),
+        )
+        self.assertIn("L'année 2020 est archivée (lecture seule).", resultat['resultats'][0]['erreurs'])
+
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.get(email='admin@test.fr'))
+        reponse = client.post('/api/pointages/', {
+            'employe': self.employe.cin, 'date_pointage': '2020-05-04', 'heure_entree': '08:00',
+        }, format='json')
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn('date_pointage', reponse.json())
+
+    def test_stats_mensuelles_parametres_invalides(self):
+        self.marquer_archivee(2020)
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+        for parametres in ('annee=2020&mois=13', 'annee=2020&mois=x', 'annee=0&mois=1'):
+            with self.subTest(parametres=parametres):
+                self.assertEqual(client.get(f'/api/pointages/stats_mensuelles/?{parametres}').status_code, 400)
+
+    @unittest.skipIf(archive_service.NUMPY_AVAILABLE, "Refus propre à l'absence de NumPy")
+    def test_archivage_sans_numpy(self):
+        pointer(self.employe, date(2020, 5, 4))
+        with self.assertRaises(ArchiveError):
+            ArchiveService.archiver(2020)
+        with self.assertRaises(CommandError):
+            call_command('archiver_pointages', '--annee', '2020', stdout=StringIO())
+        self.assertEqual(Pointage.objects.count(), 1)
+
+
+@unittest.skipUnless(archive_service.NUMPY_AVAILABLE, "Archives: NumPy requis")
+class ArchivesNumpyTests(ArchivesTestCase):
+    """Archivage, lecture et restauration d'une année close"""
+
+    def setUp(self):
+        super().setUp()
+        pointer(self.employe, date(2020, 5, 4), remarque='Réunion')
+        pointer(self.employe, date(2020, 5, 5), entree=time(8, 40), sortie=None)
+        pointer(self.employe, date(2020, 11, 2))
+        self.pointage_recent = pointer(self.employe, timezone.now().date().replace(day=1))
+        self.avant = sorted(
+            Pointage.objects.filter(date_pointage__year=2020).values(
+                'id_pointage', 'date_pointage', 'heure_entree', 'heure_sortie', 'duree_travail', 'remarque',
+                'ponctualite_statut', 'retard_minutes',
+            ), key=lambda ligne: ligne['date_pointage'],
+        )
+
+    def test_archivage_et_lecture(self):
+        presences = PresenceJournaliere.objects.count()
+        self.assertEqual(ArchiveService.archiver(2020), 3)
+
+        self.assertEqual(ArchiveService.annees_archivees(), [2020])
+        self.assertFalse(Pointage.objects.filter(date_pointage__year=2020).exists())
+        # Agrégats conservés: les statistiques restent servies depuis la base
+        self.assertEqual(PresenceJournaliere.objects.count(), presences)
+
+        lues = list(ArchiveService.lignes(2020))
+        self.assertEqual([{cle: ligne[cle] for cle in self.avant[0]} for ligne in lues], self.avant)
+        self.assertEqual(ArchiveService.totaux(2020), (2, 16 * 3600))
+        self.assertEqual(len(list(ArchiveService.lignes(2020, date(2020, 5, 5), date(2020, 5, 31)))), 1)
+
+        exportees = list(ExportService.lignes_pointages(date(2020, 1, 1)))
+        self.assertEqual([ligne[0] for ligne in exportees], [*(l['id_pointage'] for l in self.avant), self.pointage_recent.pk])
+
+        with self.assertRaises(ArchiveError):
+            ArchiveService.archiver(2020)
+
+    def test_annees_refusees(self):
+        with self.assertRaises(ArchiveError):
+            ArchiveService.archiver(timezone.now().year)
+        with self.assertRaises(ArchiveError):
+            ArchiveService.archiver(2015)       # aucun pointage
+
+    def test_restauration(self):
+        call_command('archiver_pointages', stdout=StringIO())
+        self.assertEqual(ArchiveService.restaurer(2020), 3)
+
+        self.assertEqual(ArchiveService.annees_archivees(), [])
+        apres = list(Pointage.objects.filter(date_pointage__year=2020).order_by('date_pointage').values(*self.avant[0]))
+        self.assertEqual(apres, self.avant)
+
+    def test_modification_pendant_l_archivage(self):
+        lire = ArchiveService._lire
+
+        def lire_puis_pointer(dossier):
+            # Pointage ajouté entre la lecture de l'année et sa suppression
+            pointer(self.employe, date(2020, 12, 1))
+            return lire(dossier)
+
+        with mock.patch.object(ArchiveService, '_lire', side_effect=lire_puis_pointer):
+            with self.assertRaisesRegex(ArchiveError, 'modifiés pendant'):
+                ArchiveService.archiver(2020)
+
+        self.assertEqual(ArchiveService.annees_archivees(), [])
+        self.assertEqual(list(self.repertoire.iterdir()), [])
+        self.assertEqual(Pointage.objects.filter(date_pointage__year=2020).count(), 3)
+
+    def test_restauration_employe_supprime(self):
+        parti = creer_employe(2, self.employe.departement)
+        pointer(parti, date(2020, 6, 1))
+        ArchiveService.archiver(2020)
+        parti.delete()
+
+        with self.assertLogs('api.services.archive_service', 'WARNING'):
+            self.assertEqual(ArchiveService.restaurer(2020), 3)
+        self.assertEqual(Pointage.objects.filter(date_pointage__year=2020).count(), 3)
+        self.assertEqual(ArchiveService.annees_archivees(), [])
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.test import RequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from api import authentication
+from api.authentication import ClaimsTokenObtainPairSerializer, ClaimsTokenRefreshSerializer, JWTClaimsAuthentication
+from api.models import CustomUser
+
+from .outils import TestCaseApi, creer_utilisateur
+
+
+class AuthentificationTests(TestCaseApi):
+    """Jetons à claims signés, LRU des utilisateurs et révocation"""
+
+    def setUp(self):
+        super().setUp()
+        authentication._utilisateurs.clear()
+        self.addCleanup(authentication._utilisateurs.clear)
+        self.utilisateur = creer_utilisateur()
+        self.jeton = ClaimsTokenObtainPairSerializer.get_token(self.utilisateur)
+
+    def authentifier(self, jeton=None):
+        jeton = jeton or self.jeton.access_token
+        requete = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {jeton}')
+        return JWTClaimsAuthentication().authenticate(requete)[0]
+
+    def revoquer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.utilisateur.set_password('NouveauMotDePasse-2025')
+            self.utilisateur.save()
+
+    def test_claims(self):
+        acces = self.jeton.access_token
+        self.assertEqual((acces['email'], acces['is_superuser'], acces['rev']), (self.utilisateur.email, False, 0))
+        self.assertEqual(self.authentifier().pk, self.utilisateur.pk)
+
+    def test_cache_local_relu_a_chaque_requete(self):
+        self.authentifier()
+        with self.assertNumQueries(1):
+            self.authentifier()
+        self.assertFalse(authentication._utilisateurs)
+
+    def test_revocation_par_un_autre_processus_sans_cache_partage(self):
+        self.authentifier()
+        # Écriture d'un autre processus: ni signal ni version publiée ici
+        CustomUser.objects.filter(pk=self.utilisateur.pk).update(version_jeton=1)
+        with self.assertRaises(AuthenticationFailed):
+            self.authentifier()
+
+    def test_lru_avec_cache_partage(self):
+        with mock.patch.object(authentication, 'cache_partage', return_value=True):
+            self.authentifier()
+            with self.assertNumQueries(0):
+                premiere, seconde = self.authentifier(), self.authentifier()
+            # Copie par requête
+            self.assertIsNot(premiere, seconde)
+
+            self.revoquer()
+            with self.assertRaises(AuthenticationFailed):
+                self.authentifier()
+            nouveau = ClaimsTokenObtainPairSerializer.get_token(self.utilisateur)
+            self.assertEqual(self.authentifier(nouveau.access_token).pk, self.utilisateur.pk)
+
+    def test_utilisateur_desactive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.utilisateur.is_active = False
+            self.utilisateur.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentifier()
+
+    def test_renouvellement_refuse_apres_revocation(self):
+        self.assertIn('access', ClaimsTokenRefreshSerializer().validate({'refresh': str(self.jeton)}))
+        self.revoquer()
+        with self.assertRaises(InvalidToken):
+            ClaimsTokenRefreshSerializer().validate({'refresh': str(self.jeton)})
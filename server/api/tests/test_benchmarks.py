@@ -0,0 +1,69 @@
+from api.benchmarks.donnees import GenerateurDonnees
+from api.benchmarks.mesures import comparer, mesurer
+from api.benchmarks.scenarios import scenarios
+from api.models import CustomUser, Departement, Employe, Pointage, PresenceJournaliere
+from api.services.effectif_service import EffectifService
+
+from .outils import TestCaseApi
+
+PETIT_JEU = {'departements': 2, 'employes': 6, 'annees': 0.1}
+
+
+class BancDeMesureTests(TestCaseApi):
+    """Générateur de données synthétiques, mesures et scénarios du banc"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = CustomUser.objects.create_superuser('benchmark@exemple.com', 'benchmark')
+
+    def test_jeu_de_donnees_coherent(self):
+        totaux = GenerateurDonnees(**PETIT_JEU).generer(self.utilisateur)
+
+        self.assertEqual((totaux['departements'], totaux['employes']), (2, 6))
+        self.assertEqual(totaux['pointages'], Pointage.objects.count())
+        self.assertEqual(totaux['presences'], PresenceJournaliere.objects.count())
+        self.assertEqual(EffectifService.reconcilier(corriger=False), [])
+        # Horaires propres à chaque employé, métriques calculées à l'insertion
+        self.assertGreater(len(set(Employe.objects.values_list('heure_entree_attendue', flat=True))), 1)
+        self.assertFalse(Pointage.objects.filter(heure_sortie__isnull=False, duree_travail__isnull=True).exists())
+
+    def test_generation_reproductible(self):
+        GenerateurDonnees(**PETIT_JEU).generer(self.utilisateur)
+        premier = list(Pointage.objects.order_by('id_pointage').values_list('heure_entree', 'heure_sortie'))
+        Pointage.objects.all().delete()
+        Employe.objects.all().delete()
+        Departement.objects.all().delete()
+
+        GenerateurDonnees(**PETIT_JEU).generer(self.utilisateur)
+        second = list(Pointage.objects.order_by('id_pointage').values_list('heure_entree', 'heure_sortie'))
+        self.assertEqual(premier, second)
+
+    def test_parametre_inconnu(self):
+        with self.assertRaises(ValueError):
+            GenerateurDonnees(salaries=10)
+
+    def test_scenarios_executables(self):
+        GenerateurDonnees(**PETIT_JEU).generer(self.utilisateur)
+
+        for nom, fonction, preparer in scenarios(self.utilisateur):
+            with self.subTest(nom):
+                if preparer:
+                    preparer()
+                fonction()
+
+    def test_mesure_et_comparaison(self):
+        appels = []
+        resultat = mesurer('scenario', lambda: CustomUser.objects.count(), repetitions=3, preparer=lambda: appels.append(1))
+
+        self.assertEqual(resultat['requetes'], 1)
+        self.assertEqual(len(appels), 4)   # + l'exécution sous tracemalloc
+        self.assertLessEqual(resultat['temps_ms']['min'], resultat['temps_ms']['max'])
+
+        reference = {'resultats': [{**resultat, 'temps_ms': {**resultat['temps_ms'], 'mediane': 2.0}}]}
+        courant = {'resultats': [
+            {**resultat, 'temps_ms': {**resultat['temps_ms'], 'mediane': 3.0}},
+            {'nom': 'nouveau', 'erreur': 'HTTP 500'},
+        ]}
+        lignes = comparer(reference, courant)
+        self.assertEqual(len(lignes), 1)
+        self.assertEqual((lignes[0]['temps_ms'], lignes[0]['ratio_temps']), ((2.0, 3.0), 1.5))
@@ -0,0 +1,77 @@
+from datetime import date, time
+
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.services.classement_service import ClassementService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, pointer
+
+DEBUT, FIN = date(2025, 3, 1), date(2025, 3, 31)
+
+
+class ClassementTests(TestCaseApi):
+    """Classement par fonctions de fenêtrage: rangs ex æquo, rang par département, percentile"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        d1, d2 = creer_departement('D1'), creer_departement('D2', responsable='autre@test.fr')
+        self.a = creer_employe(1, d1, created_by=self.utilisateur)
+        self.b = creer_employe(2, d1, created_by=self.utilisateur)
+        self.c = creer_employe(3, d2)
+        self.d = creer_employe(4, d2)
+        for jour in (3, 4, 5):
+            pointer(self.a, date(2025, 3, jour))
+        for jour in (3, 4):
+            pointer(self.b, date(2025, 3, jour))
+        pointer(self.c, date(2025, 3, 3))
+        pointer(self.c, date(2025, 3, 4))
+        pointer(self.c, date(2025, 3, 5), entree=time(8, 45), sortie=time(16, 45))
+
+    def lignes(self, critere, **filtres):
+        return [ClassementService.formater(ligne) for ligne in ClassementService.classement(DEBUT, FIN, critere, **filtres)]
+
+    def test_classement_par_heures(self):
+        lignes = self.lignes('heures')
+
+        self.assertEqual([ligne['cin'] for ligne in lignes], [self.a.cin, self.c.cin, self.b.cin, self.d.cin])
+        self.assertEqual([ligne['position'] for ligne in lignes], [1, 2, 3, 4])
+        self.assertEqual([ligne['rang'] for ligne in lignes], [1, 1, 3, 4])
+        self.assertEqual([ligne['rang_departement'] for ligne in lignes], [1, 1, 2, 2])
+        self.assertEqual([ligne['percentile'] for ligne in lignes], [100.0, 100.0, 33.3, 0.0])
+        self.assertEqual(lignes[0]['heures_travaillees'], 24.0)
+        self.assertEqual((lignes[3]['jours_travailles'], lignes[3]['jours_absents']), (0, 31))
+
+    def test_autres_criteres(self):
+        taux = self.lignes('taux_parfait')
+        self.assertEqual([ligne['cin'] for ligne in taux], [self.a.cin, self.b.cin, self.c.cin, self.d.cin])
+        self.assertEqual(taux[2]['taux_parfait'], 66.67)
+
+        absences = self.lignes('absences')
+        self.assertEqual([ligne['jours_absents'] for ligne in absences], [28, 28, 29, 31])
+
+    def test_une_requete(self):
+        with self.assertNumQueries(1):
+            list(ClassementService.classement(DEBUT, FIN, 'heures', departement='D1'))
+
+    def test_endpoint_pagine(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+
+        premiere = client.get('/api/statistiques/classement/?mois=2025-03&page_size=3').json()
+        self.assertEqual([ligne['position'] for ligne in premiere['results']], [1, 2, 3])
+        self.assertEqual(premiere['periode'], {'debut': '2025-03-01', 'fin': '2025-03-31'})
+        suite = client.get(premiere['next']).json()
+        self.assertEqual([ligne['cin'] for ligne in suite['results']], [self.d.cin])
+
+        self.assertEqual(client.get('/api/statistiques/classement/?critere=salaire').status_code, 400)
+        self.assertEqual(client.get('/api/statistiques/classement/?mois=2025-13').status_code, 400)
+        self.assertEqual(client.get('/api/statistiques/classement/?debut=2025-03-10&fin=2025-03-01').status_code, 400)
+
+    def test_endpoint_restreint_aux_employes_de_l_utilisateur(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+
+        contenu = client.get('/api/statistiques/classement/?mois=2025-03').json()
+        self.assertEqual([ligne['cin'] for ligne in contenu['results']], [self.a.cin, self.b.cin])
@@ -0,0 +1,63 @@
+from datetime import date, time
+
+from rest_framework.test import APIClient
+
+from api.services.statistics_service import StatisticsService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, pointer
+
+
+class ComparaisonMoisTests(TestCaseApi):
+    """Fenêtre de N mois calendaires calculée en une requête groupée"""
+
+    CLES = (
+        'jours_travailles', 'jours_absents', 'heures_travail_total', 'ponctualite_parfaite',
+        'ponctualite_acceptable', 'ponctualite_inacceptable', 'taux_absence', 'regularite_statut',
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        self.employe = creer_employe(1, creer_departement('D1'), created_by=self.utilisateur)
+        # Fin janvier, février (mois court), 1er et 31 mars
+        pointer(self.employe, date(2025, 1, 31), entree=time(8, 40))
+        pointer(self.employe, date(2025, 2, 3))
+        pointer(self.employe, date(2025, 2, 28), entree=time(8, 20))
+        pointer(self.employe, date(2025, 3, 1))
+        pointer(self.employe, date(2025, 3, 31))
+
+    def test_mois_calendaires_sans_saut_ni_doublon(self):
+        fenetre = StatisticsService.calculate_employee_monthly_stats_window(self.employe, '2025-03', 4)
+
+        self.assertEqual([mois for mois, _ in fenetre], [
+            date(2025, 3, 1), date(2025, 2, 1), date(2025, 1, 1), date(2024, 12, 1),
+        ])
+        self.assertEqual([stats['jours_travailles'] for _, stats in fenetre], [2, 2, 1, 0])
+
+    def test_chaque_mois_identique_au_calcul_mensuel(self):
+        fenetre = StatisticsService.calculate_employee_monthly_stats_window(self.employe, '2025-03', 4)
+
+        for mois, stats in fenetre:
+            attendu = StatisticsService.calculate_employee_monthly_stats(self.employe, mois)
+            for cle in self.CLES:
+                self.assertEqual(stats[cle], attendu[cle], f"{mois} {cle}")
+
+    def test_une_requete_quelle_que_soit_la_fenetre(self):
+        with self.assertNumQueries(1):
+            StatisticsService.calculate_employee_monthly_stats_window(self.employe, '2025-03', 3)
+        with self.assertNumQueries(1):
+            StatisticsService.calculate_employee_monthly_stats_window(self.employe, '2025-03', 24)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+        url = f'/api/statistiques/comparaison-heures/{self.employe.cin}/'
+
+        contenu = client.get(f'{url}?date=2025-03&months=3').json()
+        self.assertEqual([m['date_reference'] for m in contenu['mois_precedents']], ['2025-03', '2025-02', '2025-01'])
+        self.assertEqual(contenu['mois_precedents'][1]['ponctualite_acceptable'], 1)
+        self.assertEqual(contenu['mois_precedents'][1]['taux_parfait'], 50.0)
+        self.assertEqual(len(client.get(f'{url}?date=2025-03&months=24').json()['mois_precedents']), 24)
+
+        for valeur in ('0', '25', 'abc'):
+            self.assertEqual(client.get(f'{url}?months={valeur}').status_code, 400)
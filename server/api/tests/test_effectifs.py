@@ -0,0 +1,144 @@
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.models import Departement, Employe
+from api.services.employe_import_service import EmployeImportService, ImportEmployesError
+from api.services.effectif_service import EffectifService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur
+
+
+class EffectifsTests(TestCaseApi):
+    """nbr_employe tenu par incréments atomiques, réconciliation"""
+
+    def setUp(self):
+        super().setUp()
+        self.d1 = creer_departement('D1')
+        self.d2 = creer_departement('D2', responsable='autre@test.fr')
+
+    def effectifs(self):
+        return dict(Departement.objects.values_list('pk', 'nbr_employe'))
+
+    def test_creation_deplacement_suppression(self):
+        alice = creer_employe(1, self.d1)
+        creer_employe(2, self.d1)
+        self.assertEqual(self.effectifs(), {'D1': 2, 'D2': 0})
+
+        alice.departement = self.d2
+        alice.save()
+        self.assertEqual(self.effectifs(), {'D1': 1, 'D2': 1})
+
+        alice.nom = 'Renommee'
+        alice.save()
+        self.assertEqual(self.effectifs(), {'D1': 1, 'D2': 1})
+
+        alice.delete()
+        self.assertEqual(self.effectifs(), {'D1': 1, 'D2': 0})
+
+    def test_enregistrement_sans_cascade_sur_le_departement(self):
+        alice = creer_employe(1, self.d1)
+        alice.poste = 'Analyste'
+        # Validation (département, unicités) puis UPDATE: ni relecture ni réécriture du département
+        with self.assertNumQueries(4) as requetes:
+            alice.save()
+        self.assertFalse([r for r in requetes.captured_queries if 'UPDATE "api_departement"' in r['sql']])
+
+    def test_instance_perimee_n_ecrase_pas_le_compteur(self):
+        perime = Departement.objects.get(pk='D1')
+        creer_employe(1, self.d1)
+
+        perime.nom = 'Nouveau nom'
+        perime.save()
+        self.assertEqual(Departement.objects.get(pk='D1').nbr_employe, 1)
+
+    def test_reconciliation(self):
+        creer_employe(1, self.d1)
+        creer_employe(2, self.d1)
+        Departement.objects.filter(pk='D1').update(nbr_employe=7)
+        Departement.objects.filter(pk='D2').update(nbr_employe=3)
+
+        sortie = StringIO()
+        call_command('reconcilier_effectifs', '--verifier', stdout=sortie)
+        self.assertIn('D1: 7 -> 2', sortie.getvalue())
+        self.assertEqual(self.effectifs(), {'D1': 7, 'D2': 3})
+
+        call_command('reconcilier_effectifs', stdout=StringIO())
+        self.assertEqual(self.effectifs(), {'D1': 2, 'D2': 0})
+        self.assertEqual(EffectifService.reconcilier(), [])
+
+
+class ImportEmployesTests(TestCaseApi):
+    """Import en masse des employés: validation par lot, bulk_create, compteurs"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        self.d1 = creer_departement('D1')
+        self.d2 = creer_departement('D2', responsable='autre@test.fr')
+        self.existant = creer_employe(1, self.d1)
+
+    def ligne(self, numero, **valeurs):
+        return {
+            'cin': f'{numero:012d}', 'titre': 'employe', 'matricule': f'{numero:06d}',
+            'nom': f'Nom{numero}', 'prenom': 'Prenom', 'email': f'import{numero}@test.fr',
+            'poste': 'Technicien', 'departement': 'D1', **valeurs,
+        }
+
+    def test_resultat_par_ligne(self):
+        lignes = [
+            self.ligne(10),
+            self.ligne(11, departement='D2', titre='stagiaire', matricule=None, heure_entree_attendue='09:00'),
+            self.ligne(1),                                          # CIN existant
+            self.ligne(10, email='autre10@test.fr'),                # CIN en double dans le lot
+            self.ligne(12, matricule='000001'),                     # matricule pris
+            self.ligne(13, departement='D9'),
+            self.ligne(14, cin='123'),
+            self.ligne(15, titre='stagiaire'),                      # matricule réservé aux employés
+            self.ligne(16, email='pas-un-email'),
+        ]
+
+        resultat = EmployeImportService.importer(lignes, self.utilisateur)
+
+        self.assertEqual((resultat['total'], resultat['crees'], resultat['erreurs']), (9, 2, 7))
+        erreurs = [r.get('erreurs', []) for r in resultat['resultats']]
+        self.assertIn("Un employé avec ce CIN existe déjà.", erreurs[2])
+        self.assertIn("CIN en double dans le lot.", erreurs[3])
+        self.assertIn("Ce matricule est déjà attribué à un autre employé fixe", erreurs[4])
+        self.assertIn("Département non trouvé.", erreurs[5])
+        self.assertIn("Le CIN doit contenir exactement 12 chiffres", erreurs[6])
+        self.assertIn("Le matricule est réservé aux employés fixes uniquement", erreurs[7])
+        self.assertIn("email invalide: pas-un-email", erreurs[8])
+
+        stagiaire = Employe.objects.get(cin=f'{11:012d}')
+        self.assertEqual(stagiaire.created_by, self.utilisateur)
+        self.assertEqual(stagiaire.heure_entree_attendue.hour, 9)
+        self.assertEqual(dict(Departement.objects.values_list('pk', 'nbr_employe')), {'D1': 2, 'D2': 1})
+
+    def test_requetes_constantes(self):
+        lignes = [self.ligne(numero, departement=('D1', 'D2')[numero % 2]) for numero in range(100, 160)]
+        # Départements, CIN, emails, matricules, insertion, compteurs (+ savepoint)
+        with self.assertNumQueries(8):
+            resultat = EmployeImportService.importer(lignes, self.utilisateur)
+        self.assertEqual(resultat['crees'], 60)
+        self.assertEqual(EffectifService.reconcilier(corriger=False), [])
+
+    def test_lot_trop_volumineux(self):
+        with self.settings(EMPLOYE_BULK_MAX_LIGNES=2):
+            with self.assertRaises(ImportEmployesError):
+                EmployeImportService.importer([self.ligne(n) for n in range(10, 13)], self.utilisateur)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+        colonnes = 'cin;titre;matricule;nom;prenom;email;poste;departement'
+        contenu = f"{colonnes}\n{20:012d};employe;000020;Nom;Prenom;csv20@test.fr;Poste;D2\n"
+
+        reponse = client.post('/api/employes/bulk/', {'fichier': SimpleUploadedFile('employes.csv', contenu.encode())})
+        self.assertEqual(reponse.status_code, 201)
+        self.assertEqual(Departement.objects.get(pk='D2').nbr_employe, 1)
+
+        self.assertEqual(client.post('/api/employes/bulk/', [self.ligne(1)], format='json').status_code, 400)
+        self.assertEqual(client.post('/api/employes/bulk/', {'a': 1}, format='json').status_code, 400)
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from datetime import time, timedelta
+
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.services.export_service import ExportService
+from api.services.statistics_service import StatisticsService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class ExportDonneesTests(TestCaseApi):
+    """Exports en flux CSV / NDJSON des pointages et des statistiques mensuelles"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.mois = mois_precedent()
+        self.d1, self.d2 = creer_departement('D1'), creer_departement('D2', responsable='autre@test.fr')
+        self.alice = creer_employe(1, self.d1)
+        self.bruno = creer_employe(2, self.d2)
+        for decalage in range(3):
+            pointer(self.alice, self.mois + timedelta(days=decalage), entree=time(8, 15 * decalage))
+        pointer(self.bruno, self.mois + timedelta(days=1))
+
+    def telecharger(self, url):
+        reponse = self.client.get(url)
+        self.assertEqual(reponse.status_code, 200)
+        return reponse, b''.join(reponse.streaming_content).decode('utf-8')
+
+    def test_pointages_csv(self):
+        reponse, contenu = self.telecharger('/api/exports/pointages/')
+
+        self.assertEqual(reponse['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="pointages_', reponse['Content-Disposition'])
+        lignes = list(csv.reader(io.StringIO(contenu)))
+        self.assertEqual(lignes[0], ExportService.COLONNES_POINTAGES)
+        self.assertEqual(len(lignes), 5)
+        # Triés par date puis employé
+        self.assertEqual([ligne[1] for ligne in lignes[1:]], [self.alice.cin, self.alice.cin, self.bruno.cin, self.alice.cin])
+        premiere = dict(zip(lignes[0], lignes[1]))
+        self.assertEqual(premiere['date_pointage'], self.mois.isoformat())
+        self.assertEqual(premiere['heure_entree'], '08:00:00')
+        self.assertEqual(premiere['departement'], 'D1')
+
+    def test_pointages_ndjson_filtres(self):
+        debut = (self.mois + timedelta(days=1)).isoformat()
+        reponse, contenu = self.telecharger(f'/api/exports/pointages/?output=ndjson&departement=D1&debut={debut}')
+
+        self.assertEqual(reponse['Content-Type'], 'application/x-ndjson')
+        objets = [json.loads(ligne) for ligne in contenu.splitlines()]
+        self.assertEqual([o['date_pointage'] for o in objets], [
+            (self.mois + timedelta(days=1)).isoformat(), (self.mois + timedelta(days=2)).isoformat(),
+        ])
+        self.assertEqual({o['employe_cin'] for o in objets}, {self.alice.cin})
+        self.assertEqual(objets[1]['retard_minutes'], 30)
+
+    def test_statistiques_mensuelles_identiques_au_calcul(self):
+        fin = self.mois + timedelta(days=27)
+        _, contenu = self.telecharger(
+            f'/api/exports/statistiques-mensuelles/?output=ndjson&debut={self.mois}&fin={fin}'
+        )
+
+        objets = {o['employe_cin']: o for o in map(json.loads, contenu.splitlines())}
+        self.assertEqual(set(objets), {self.alice.cin, self.bruno.cin})
+        for employe in (self.alice, self.bruno):
+            attendu = StatisticsService.calculate_employee_monthly_stats(employe, self.mois)
+            exporte = objets[employe.cin]
+            self.assertEqual(exporte['mois'], self.mois.strftime('%Y-%m'))
+            for cle in ('jours_travailles', 'jours_absents', 'ponctualite_parfaite',
+                        'ponctualite_inacceptable', 'retard_moyen_minutes', 'taux_presence'):
+                self.assertEqual(exporte[cle], attendu[cle], cle)
+
+    def test_parametres_invalides(self):
+        self.assertEqual(self.client.get('/api/exports/pointages/?output=xlsx').status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/inconnue/').status_code, 404)
+        fin = self.mois - timedelta(days=1)
+        self.assertEqual(
+            self.client.get(f'/api/exports/statistiques-mensuelles/?debut={self.mois}&fin={fin}').status_code, 400
+        )
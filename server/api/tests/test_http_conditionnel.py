@@ -0,0 +1,109 @@
+import time as horloge
+from datetime import time, timedelta
+from unittest import mock
+
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.services import stats_cache
+from api.services.statistics_service import StatisticsService
+from api.services.stats_cache import StatsCache
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, mois_precedent, pointer
+
+
+class GetConditionnelTests(TestCaseApi):
+    """ETag / Last-Modified des statistiques: 304 sans calcul, nouvelle représentation après écriture"""
+
+    def setUp(self):
+        super().setUp()
+        self.mois = mois_precedent()
+        self.employe = creer_employe(1, creer_departement('D1'))
+        self.pointage = pointer(self.employe, self.mois)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+        self.url = f"/api/statistiques/employe/{self.employe.cin}/?date={self.mois:%Y-%m}"
+
+    def plus_tard(self, secondes=2):
+        """Horloge des versions avancée: la seconde de la dernière écriture est écoulée"""
+        return mock.patch.object(stats_cache.time, 'time_ns', return_value=horloge.time_ns() + secondes * 10**9)
+
+    def test_304_sans_calcul(self):
+        self.client.get(self.url)
+        with self.plus_tard():
+            reponse = self.client.get(self.url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn('private', reponse['Cache-Control'])
+        self.assertIn('max-age', reponse['Cache-Control'])      # mois clôturé
+
+        with mock.patch.object(StatisticsService, 'calculate_employee_monthly_stats') as calcul, self.plus_tard():
+            non_modifiee = self.client.get(self.url, HTTP_IF_NONE_MATCH=reponse['ETag'])
+            depuis = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=reponse['Last-Modified'])
+        calcul.assert_not_called()
+        self.assertEqual((non_modifiee.status_code, depuis.status_code), (304, 304))
+        self.assertEqual(non_modifiee['ETag'], reponse['ETag'])
+
+    def test_nouvelle_representation_apres_ecriture(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pointage.heure_sortie = time(18, 0)
+            self.pointage.save()
+
+        reponse = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(reponse['ETag'], etag)
+        self.assertEqual(reponse.json()['heures_travail_total'], '10:00:00')
+
+    def test_last_modified_a_la_seconde_superieure(self):
+        seconde = horloge.time_ns() // 10**9 - 10
+        with mock.patch.object(stats_cache.time, 'time_ns', return_value=seconde * 10**9 + 100):
+            StatsCache.incrementer_versions({'test'})
+            # Seconde en cours: une autre écriture pourrait y tomber, pas de date
+            self.assertIsNone(StatsCache.validateur(['test']).last_modified)
+        self.assertEqual(StatsCache.validateur(['test']).last_modified, seconde + 1)
+
+        StatsCache.incrementer_versions({'test'})
+        with self.plus_tard():
+            self.assertGreater(StatsCache.validateur(['test']).last_modified, seconde + 1)
+
+    def test_sans_last_modified_pendant_la_seconde_d_ecriture(self):
+        with self.plus_tard(-5):
+            self.client.get(self.url)
+        depuis = self.client.get(self.url)['Last-Modified']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pointage.heure_sortie = time(18, 0)
+            self.pointage.save()
+        with mock.patch.object(stats_cache.time, 'time_ns', return_value=StatsCache.versions(
+            f"emp:{self.employe.cin}:{self.mois:%Y-%m}"
+        )[0]):
+            reponse = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=depuis)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertFalse(reponse.has_header('Last-Modified'))
+
+    def test_representations_distinctes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(f"{self.url}&periode=semaine")['ETag'], etag)
+        # Enregistrement demandé: jamais de 304
+        self.assertEqual(self.client.get(f"{self.url}&save=true", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_periode_en_cours(self):
+        reponse = self.client.get(f"/api/statistiques/employe/{self.employe.cin}/")
+        self.assertIn('no-cache', reponse['Cache-Control'])
+
+    def test_pas_de_304_sans_acces(self):
+        etag = self.client.get(self.url)['ETag']
+        client = APIClient()
+        client.force_authenticate(creer_utilisateur())
+        self.assertEqual(client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+
+    def test_statistiques_globales(self):
+        url = f"/api/statistiques/global/?mois={self.mois:%Y-%m}"
+        reponse = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=reponse['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pointer(creer_employe(2, self.employe.departement), self.mois + timedelta(days=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=reponse['ETag']).status_code, 200)
+        # Copie plus ancienne que la dernière écriture
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200)
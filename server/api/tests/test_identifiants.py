@@ -0,0 +1,91 @@
+from datetime import date, time
+
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, Departement, Pointage, SequenceIdentifiant
+from api.services import identifiant_service
+from api.services.identifiant_service import IdentifiantService
+
+from .outils import TestCaseApi, creer_departement, creer_employe
+
+
+class Rollback(Exception):
+    pass
+
+
+@override_settings(IDENTIFIANTS_TAILLE_BLOC=10)
+class IdentifiantsTests(TestCaseApi):
+    """Allocation par blocs, format réservé et rollback de la transaction englobante"""
+
+    def setUp(self):
+        super().setUp()
+        identifiant_service._blocs.clear()
+        self.addCleanup(identifiant_service._blocs.clear)
+
+    def test_format_et_unicite(self):
+        identifiants = IdentifiantService.allouer('pointage', 25)
+
+        self.assertEqual(identifiants[0], 'P000000001')
+        self.assertEqual(len(set(identifiants)), 25)
+        self.assertTrue(all(IdentifiantService.est_reserve(i) for i in identifiants))
+        self.assertEqual(IdentifiantService.allouer('departement'), ['D000000001'])
+        for saisi in ('', None, 'P12', 'X000000001', 'D1'):
+            self.assertFalse(IdentifiantService.est_reserve(saisi), saisi)
+
+    def test_sequence_demarre_apres_les_identifiants_existants(self):
+        Departement.objects.create(id_departement='D000000041', nom='Existant')
+        self.assertEqual(IdentifiantService.allouer('departement'), ['D000000042'])
+
+    def test_bloc_distribue_en_memoire_apres_validation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            premier = IdentifiantService.allouer('pointage')
+        with self.assertNumQueries(0):
+            suivants = IdentifiantService.allouer('pointage', 9)
+
+        self.assertEqual([premier[0], suivants[-1]], ['P000000001', 'P000000010'])
+        self.assertEqual(SequenceIdentifiant.objects.get(nom='pointage').prochain, 11)
+
+    def test_bloc_annule_par_rollback_non_conserve(self):
+        try:
+            with transaction.atomic():
+                IdentifiantService.allouer('pointage')
+                raise Rollback
+        except Rollback:
+            pass
+
+        # La réservation a disparu avec la transaction: rien n'est distribué depuis la mémoire
+        prochain, fin = identifiant_service._blocs.get('pointage', (0, 0))
+        self.assertGreaterEqual(prochain, fin)
+        with self.captureOnCommitCallbacks(execute=True):
+            identifiants = IdentifiantService.allouer('pointage', 3)
+        self.assertEqual(SequenceIdentifiant.objects.get(nom='pointage').prochain, 11)
+        self.assertEqual(identifiants, ['P000000001', 'P000000002', 'P000000003'])
+        self.assertEqual(IdentifiantService.allouer('pointage'), ['P000000004'])
+
+    def test_pointage_et_departement_generes(self):
+        departement = Departement.objects.create(nom='Généré')
+        employe = creer_employe(1, departement)
+        pointage = Pointage.objects.create(employe=employe, date_pointage=date(2025, 3, 3), heure_entree=time(8, 0))
+
+        self.assertTrue(IdentifiantService.est_reserve(departement.pk))
+        self.assertTrue(IdentifiantService.est_reserve(pointage.pk))
+
+    def test_format_reserve_refuse_a_la_saisie(self):
+        employe = creer_employe(1, creer_departement('D1'))
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+
+        reponse = client.post('/api/pointages/', {
+            'id_pointage': 'P000000500', 'employe': employe.cin, 'date_pointage': '2025-03-03', 'heure_entree': '08:00',
+        }, format='json')
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn('id_pointage', reponse.json())
+
+        departement = {'nom': 'Saisi', 'responsable': 'r@test.fr', 'localisation': 'Siège'}
+        reponse = client.post('/api/departements/', {'id_departement': 'D000000500', **departement}, format='json')
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn('id_departement', reponse.json())
+        reponse = client.post('/api/departements/', {'id_departement': 'D-SAISI', **departement}, format='json')
+        self.assertEqual(reponse.status_code, 201)
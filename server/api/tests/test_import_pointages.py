@@ -0,0 +1,124 @@
+from datetime import time, timedelta
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from api.models import Pointage, PresenceJournaliere
+from api.services.pointage_import_service import PointageImportService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, mois_precedent, pointer
+
+
+class ImportPointagesTests(TestCaseApi):
+    """Import en masse: un résultat par ligne, insertion groupée, agrégats à jour"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        departement = creer_departement('D1')
+        self.alice = creer_employe(1, departement, created_by=self.utilisateur)
+        self.bruno = creer_employe(2, departement, created_by=self.utilisateur)
+        self.inactif = creer_employe(3, departement, created_by=self.utilisateur, statut='inactif')
+        self.autre = creer_employe(4, departement, created_by=creer_utilisateur('autre@test.fr'))
+        self.jour = mois_precedent()
+
+    def ligne(self, employe, jour=None, **valeurs):
+        return {
+            'employe': employe.cin if hasattr(employe, 'cin') else employe,
+            'date_pointage': (jour or self.jour).isoformat(),
+            'heure_entree': '08:00', 'heure_sortie': '16:00', **valeurs,
+        }
+
+    def test_resultat_par_ligne(self):
+        pointer(self.bruno, self.jour)
+        lignes = [
+            self.ligne(self.alice),
+            self.ligne(self.alice, heure_entree='08:45', jour=self.jour + timedelta(days=1)),
+            self.ligne(self.alice),                                     # doublon dans le lot
+            self.ligne(self.bruno),                                     # déjà en base
+            self.ligne(self.inactif),
+            self.ligne(self.autre),                                     # hors portée
+            self.ligne('000000000999'),
+            self.ligne(self.alice, date_pointage='31/02', jour=None),
+            self.ligne(self.alice, heure_sortie='07:00', jour=self.jour + timedelta(days=2)),
+        ]
+
+        resultat = PointageImportService.importer(lignes, self.utilisateur)
+
+        self.assertEqual((resultat['total'], resultat['crees'], resultat['erreurs']), (9, 2, 7))
+        statuts = [r['statut'] for r in resultat['resultats']]
+        self.assertEqual(statuts, ['cree', 'cree'] + ['erreur'] * 7)
+        erreurs = [r.get('erreurs', []) for r in resultat['resultats']]
+        self.assertIn("Doublon dans le lot pour cet employé à cette date.", erreurs[2])
+        self.assertIn("Un pointage existe déjà pour cet employé à cette date.", erreurs[3])
+        self.assertIn("Les employés inactifs ne peuvent pas effectuer de pointage.", erreurs[4])
+        self.assertIn("Vous ne pouvez pointer que pour vos propres employés.", erreurs[5])
+        self.assertIn("Employé non trouvé.", erreurs[6])
+        self.assertIn("date_pointage invalide: 31/02", erreurs[7])
+        self.assertIn("L'heure de sortie doit être après l'heure d'entrée.", erreurs[8])
+
+        # Identifiants générés, métriques calculées, agrégats journaliers à jour
+        crees = Pointage.objects.filter(employe=self.alice).order_by('date_pointage')
+        self.assertEqual([p.id_pointage for p in crees], [r['id_pointage'] for r in resultat['resultats'][:2]])
+        self.assertEqual(crees[1].retard_minutes, 45)
+        self.assertEqual(crees[1].ponctualite_statut, 'inacceptable')
+        self.assertEqual(PresenceJournaliere.objects.filter(employe=self.alice).count(), 2)
+
+    def test_upsert_conserve_l_identifiant(self):
+        existant = pointer(self.alice, self.jour, id_pointage='EXIST1')
+
+        resultat = PointageImportService.importer(
+            [self.ligne(self.alice, heure_sortie='18:00'), self.ligne(self.bruno)], self.utilisateur, upsert=True
+        )
+
+        self.assertEqual((resultat['crees'], resultat['mis_a_jour']), (1, 1))
+        self.assertEqual(resultat['resultats'][0]['id_pointage'], 'EXIST1')
+        existant.refresh_from_db()
+        self.assertEqual(existant.heure_sortie, time(18, 0))
+        self.assertEqual(existant.duree_travail, timedelta(hours=10))
+        self.assertEqual(PresenceJournaliere.objects.get(employe=self.alice).secondes_travail, 10 * 3600)
+
+    def test_insertion_concurrente(self):
+        """Pointage enregistré par une autre requête après la vérification du lot"""
+        calculer = Pointage.calculer_metriques_en_lot
+
+        def concurrent(pointages, employes=None):
+            # Appelé après les vérifications du lot, juste avant l'insertion
+            rival = Pointage(employe=self.bruno, date_pointage=self.jour, heure_entree=time(7, 0))
+            calculer([rival])
+            Pointage.objects.bulk_create([rival])
+            return calculer(pointages, employes)
+
+        with mock.patch.object(Pointage, 'calculer_metriques_en_lot', side_effect=concurrent):
+            resultat = PointageImportService.importer(
+                [self.ligne(self.alice), self.ligne(self.bruno)], self.utilisateur
+            )
+
+        self.assertEqual((resultat['crees'], resultat['erreurs']), (1, 1))
+        self.assertEqual(resultat['resultats'][0]['statut'], 'cree')
+        self.assertEqual(resultat['resultats'][1]['statut'], 'erreur')
+        self.assertTrue(Pointage.objects.filter(employe=self.alice).exists())
+        self.assertEqual(Pointage.objects.get(employe=self.bruno).heure_entree, time(7, 0))
+
+    def test_endpoint_csv(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+        contenu = (
+            "employe;date_pointage;heure_entree;heure_sortie\n"
+            f"{self.alice.cin};{self.jour.isoformat()};08:00;16:00\n"
+            f"{self.bruno.cin};{self.jour.isoformat()};08:10;\n"
+        )
+
+        reponse = client.post('/api/pointages/bulk/', contenu, content_type='text/csv')
+
+        self.assertEqual(reponse.status_code, 201)
+        self.assertEqual(reponse.json()['crees'], 2)
+        self.assertIsNone(Pointage.objects.get(employe=self.bruno).heure_sortie)
+
+    def test_lot_entierement_rejete(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+
+        reponse = client.post('/api/pointages/bulk/', [self.ligne(self.inactif)], format='json')
+        self.assertEqual(reponse.status_code, 400)
+        self.assertEqual(client.post('/api/pointages/bulk/', {'a': 1}, format='json').status_code, 400)
@@ -0,0 +1,99 @@
+import json
+from datetime import time, timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.lecture_rapide import PlanLecture, encoder_json
+from api.models import CustomUser, Employe, Pointage
+from api.serializers import PointageSerializer
+from api.services.precalcul_service import PrecalculService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, mois_precedent, pointer
+
+
+class LectureRapideTests(TestCaseApi):
+    """Listes servies par values(): même sortie que les serializers DRF"""
+
+    URLS = [
+        '/api/employes/', '/api/pointages/', '/api/statistiques-employe/', '/api/statistiques-globales/',
+        '/api/employes/?fields=cin,nom,departement_nom,matricule_display',
+        '/api/pointages/?fields=id_pointage,employe,duree_travail,heure_sortie',
+        '/api/employes/?page_size=2&type=stagiaire',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        mois = mois_precedent()
+        auteur = creer_utilisateur()
+        departement = creer_departement('D1', description='Équipe « nuit »')
+        employes = [
+            creer_employe(1, departement, created_by=auteur, nom='Éloïse'),
+            creer_employe(2, departement, titre='stagiaire', marge_tolerance_minutes=5),
+            creer_employe(3, creer_departement('D2'), statut='inactif'),
+        ]
+        pointer(employes[0], mois, remarque='Réunion')
+        pointer(employes[0], mois + timedelta(days=1), entree=time(8, 40), sortie=None)
+        pointer(employes[1], mois, entree=time(9, 5), sortie=time(17, 30))
+        PrecalculService.precalculer(types=('mensuel', 'global'))
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+
+    def test_sortie_identique_au_serializer(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                rapide = self.client.get(url)
+                with override_settings(LECTURE_RAPIDE_ENABLED=False):
+                    drf = self.client.get(url)
+                self.assertEqual(rapide.status_code, 200)
+                self.assertTrue(rapide.json()['results'])
+                self.assertEqual(rapide.json(), drf.json())
+
+    def test_pas_plus_de_requetes(self):
+        for url in self.URLS[:4]:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as rapide:
+                    self.client.get(url)
+                with override_settings(LECTURE_RAPIDE_ENABLED=False), CaptureQueriesContext(connection) as drf:
+                    self.client.get(url)
+                self.assertLessEqual(len(rapide), len(drf))
+
+    def test_plan_pointages_identique_au_serializer(self):
+        queryset = Pointage.objects.select_related('employe', 'created_by').order_by('id_pointage')
+        plan = PlanLecture(PointageSerializer)
+        self.assertEqual(
+            plan.formater(queryset.values(*plan.colonnes)),
+            [dict(ligne) for ligne in PointageSerializer(queryset, many=True).data],
+        )
+
+    def test_api_navigable_par_drf(self):
+        reponse = self.client.get('/api/employes/', HTTP_ACCEPT='text/html')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertTrue(reponse['Content-Type'].startswith('text/html'))
+
+
+class PlanLectureTests(SimpleTestCase):
+    """Configuration et encodage du plan de lecture"""
+
+    def test_champ_calcule_non_decrit(self):
+        class SansDescription(serializers.ModelSerializer):
+            anciennete = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Employe
+                fields = ['cin', 'anciennete']
+
+            def get_anciennete(self, obj):
+                return 0
+
+        with self.assertRaises(ImproperlyConfigured):
+            PlanLecture(SansDescription)
+
+    def test_encodage_comme_jsonrenderer(self):
+        donnees = {'nom': 'Éloïse « test »', 'valeurs': [1, 2.5, None, True]}
+        self.assertEqual(json.loads(encoder_json(donnees)), json.loads(JSONRenderer().render(donnees)))
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class PaginationCurseurTests(TestCaseApi):
+    """Pagination par curseur (keyset) et ?fields= des listes"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.departement = creer_departement('D1')
+        # Noms en double: le tri (nom, prenom, cin) départage par le CIN
+        self.employes = [
+            creer_employe(numero, self.departement, nom=f'Nom{numero % 4}', prenom='Meme')
+            for numero in range(1, 24)
+        ]
+
+    def parcourir(self, url):
+        pages = []
+        while url:
+            reponse = self.client.get(url)
+            self.assertEqual(reponse.status_code, 200)
+            contenu = reponse.json()
+            pages.append(contenu)
+            url = contenu['next']
+        return pages
+
+    def test_parcours_sans_doublon_ni_trou(self):
+        pages = self.parcourir('/api/employes/?page_size=5')
+
+        self.assertEqual([len(page['results']) for page in pages], [5, 5, 5, 5, 3])
+        cins = [employe['cin'] for page in pages for employe in page['results']]
+        attendu = [e.cin for e in sorted(self.employes, key=lambda e: (e.nom, e.prenom, e.cin))]
+        self.assertEqual(cins, attendu)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_retour_arriere(self):
+        pages = self.parcourir('/api/employes/?page_size=5')
+
+        precedente = self.client.get(pages[2]['previous']).json()
+        self.assertEqual(precedente['results'], pages[1]['results'])
+        self.assertEqual(self.client.get(precedente['previous']).json()['results'], pages[0]['results'])
+
+    def test_insertion_pendant_le_parcours(self):
+        premiere = self.client.get('/api/employes/?page_size=5').json()
+        # Trié avant le curseur: ni doublon ni décalage des pages suivantes
+        creer_employe(99, self.departement, nom='Aaa')
+
+        suite = self.parcourir(premiere['next'])
+        cins = [e['cin'] for e in premiere['results']] + [e['cin'] for page in suite for e in page['results']]
+        self.assertEqual(len(cins), len(set(cins)))
+        self.assertEqual(len(cins), 23)
+
+    def test_pointages_a_dates_egales(self):
+        jour = mois_precedent()
+        for employe in self.employes[:8]:
+            pointer(employe, jour)
+            pointer(employe, jour + timedelta(days=1))
+
+        pages = self.parcourir('/api/pointages/?page_size=3')
+        resultats = [p for page in pages for p in page['results']]
+        self.assertEqual(len(resultats), 16)
+        self.assertEqual(len({p['id_pointage'] for p in resultats}), 16)
+        cles = [(p['date_pointage'], p['id_pointage']) for p in resultats]
+        self.assertEqual(cles, sorted(cles, key=lambda c: (-int(c[0].replace('-', '')), c[1])))
+
+    def test_tri_demande(self):
+        pages = self.parcourir('/api/employes/?page_size=4&ordering=-cin')
+        cins = [e['cin'] for page in pages for e in page['results']]
+        self.assertEqual(cins, sorted((e.cin for e in self.employes), reverse=True))
+
+    def test_champs_demandes(self):
+        contenu = self.client.get('/api/employes/?page_size=2&fields=cin,nom').json()
+        self.assertEqual([list(e) for e in contenu['results']], [['cin', 'nom'], ['cin', 'nom']])
+
+    def test_curseur_invalide(self):
+        self.assertEqual(self.client.get('/api/employes/?cursor=pas-un-curseur').status_code, 404)
@@ -0,0 +1,82 @@
+import unittest
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import Pointage
+from api.services.partition_service import PartitionService, PartitionnementError
+
+from .outils import TestCaseApi, creer_departement, creer_employe, pointer
+
+
+class PartitionnementTests(TestCaseApi):
+    """Noms, mois à créer et refus hors PostgreSQL"""
+
+    def test_noms_et_mois_a_creer(self):
+        table = Pointage._meta.db_table
+        self.assertEqual(PartitionService.nom_partition(date(2025, 3, 1)), f"{table}_p2025_03")
+        self.assertEqual(PartitionService.nom_partition_defaut(), f"{table}_defaut")
+
+        mois_courant = timezone.now().date().replace(day=1)
+        mois = list(PartitionService._mois_a_creer(mois_courant, 2))
+        self.assertEqual(len(mois), 3)
+        self.assertEqual(mois[0], mois_courant)
+        self.assertTrue(all(m.day == 1 for m in mois))
+
+    def test_retention_non_definie(self):
+        self.assertEqual(PartitionService.detacher_selon_retention(), [])
+
+    @unittest.skipIf(connection.vendor == 'postgresql', "Refus propre aux autres bases")
+    def test_refus_hors_postgresql(self):
+        self.assertFalse(PartitionService.est_partitionnee())
+        with self.assertRaises(PartitionnementError):
+            PartitionService.convertir()
+        with self.assertRaises(PartitionnementError):
+            PartitionService.creer_partitions()
+        for options in (['--convertir'], ['--lister'], [], ['--detacher-avant', '2025-01']):
+            with self.subTest(options=options), self.assertRaises(CommandError):
+                call_command('partitionner_pointages', *options, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('partitionner_pointages', '--expliquer', '2025-1-x', stdout=StringIO())
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Partitionnement: PostgreSQL uniquement")
+class PartitionnementPostgresqlTests(TestCaseApi):
+    """Conversion, création, élagage et détachement sur une vraie table partitionnée"""
+
+    def setUp(self):
+        super().setUp()
+        self.mois = timezone.now().date().replace(day=1)
+        self.ancien = (self.mois - timedelta(days=1)).replace(day=1)
+        self.employe = creer_employe(1, creer_departement('D1'))
+        pointer(self.employe, self.ancien)
+        pointer(self.employe, self.mois)
+
+    def test_conversion_et_elagage(self):
+        self.assertEqual(PartitionService.convertir(avance=1), 3)
+        self.assertTrue(PartitionService.est_partitionnee())
+        with self.assertRaises(PartitionnementError):
+            PartitionService.convertir()
+
+        noms = [nom for nom, _, _ in PartitionService.partitions()]
+        self.assertIn(PartitionService.nom_partition(self.ancien), noms)
+        self.assertIn(PartitionService.nom_partition_defaut(), noms)
+        self.assertEqual(Pointage.objects.count(), 2)
+
+        queryset = Pointage.objects.filter(date_pointage__gte=self.mois, date_pointage__lt=self.mois + timedelta(days=28))
+        self.assertEqual(PartitionService.partitions_parcourues(queryset), [PartitionService.nom_partition(self.mois)])
+
+    def test_creation_et_detachement(self):
+        PartitionService.convertir(avance=0)
+        creees = PartitionService.creer_partitions(avance=2)
+        self.assertEqual(len(creees), 2)
+
+        with override_settings(POINTAGE_PARTITIONS_RETENTION_MOIS=0):
+            self.assertEqual(PartitionService.detacher_selon_retention(), [])
+        detachees = PartitionService.detacher(self.mois, supprimer=True)
+        self.assertEqual(detachees, [PartitionService.nom_partition(self.ancien)])
+        self.assertEqual(list(Pointage.objects.values_list('date_pointage', flat=True)), [self.mois])
@@ -0,0 +1,94 @@
+import random
+import unittest
+from datetime import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.models import Pointage
+from api.services import ponctualite
+from api.services.ponctualite import classer, classer_pointages
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class ClassificationTests(SimpleTestCase):
+    """Règles de ponctualité communes aux pointages, agrégats et statistiques"""
+
+    def categories(self, retards, departs, marges=None):
+        nb = len(retards)
+        resultat = classer(
+            [480 + retard for retard in retards], [960 - depart for depart in departs],
+            [480] * nb, [960] * nb, marges or [10] * nb,
+        )
+        return resultat['categorie']
+
+    def test_bornes(self):
+        self.assertEqual(
+            self.categories([0, 10, 11, 30, 31, 0], [0, 10, 0, 30, 0, 31]),
+            ['parfait', 'parfait', 'acceptable', 'acceptable', 'inacceptable', 'inacceptable'],
+        )
+
+    def test_retard_et_depart_anticipe_tous_deux_bornes(self):
+        # « ET »: un retard acceptable ne compense pas un départ très anticipé
+        self.assertEqual(self.categories([5, 40], [40, 5]), ['inacceptable', 'inacceptable'])
+
+    def test_marge_par_employe(self):
+        self.assertEqual(self.categories([15, 15, 15], [0, 0, 0], marges=[20, 0, None]), [
+            'parfait', 'acceptable', 'acceptable',
+        ])
+
+    def test_arrivee_en_avance_et_depart_tardif(self):
+        resultat = classer([450], [1000], [480], [960], [10])
+        self.assertEqual((resultat['retard_minutes'], resultat['depart_avance_minutes']), ([0], [0]))
+        self.assertEqual((resultat['entree_ponctuelle'], resultat['sortie_ponctuelle']), ([True], [True]))
+
+    @unittest.skipUnless(ponctualite.NUMPY_AVAILABLE, "NumPy non installé")
+    def test_numpy_identique_au_python(self):
+        aleatoire = random.Random(7)
+        nb = 500
+        donnees = (
+            [aleatoire.randint(420, 600) for _ in range(nb)], [aleatoire.randint(840, 1020) for _ in range(nb)],
+            [aleatoire.choice((450, 480, 510)) for _ in range(nb)], [aleatoire.choice((930, 960, 990)) for _ in range(nb)],
+            [aleatoire.choice((None, 0, 5, 10, 15)) for _ in range(nb)],
+        )
+        avec_numpy = classer(*donnees)
+        with mock.patch.object(ponctualite, 'NUMPY_AVAILABLE', False):
+            self.assertEqual(classer(*donnees), avec_numpy)
+
+
+class ClassementPointagesTests(TestCaseApi):
+    """Pointage.save, insertion en lot et agrégats donnent la même classification"""
+
+    def setUp(self):
+        super().setUp()
+        self.jour = mois_precedent()
+        self.employe = creer_employe(
+            1, creer_departement('D1'), heure_entree_attendue=time(9, 0),
+            heure_sortie_attendue=time(17, 0), marge_tolerance_minutes=5,
+        )
+
+    def test_enregistrement_individuel(self):
+        pointage = pointer(self.employe, self.jour, entree=time(9, 20), sortie=time(17, 0))
+
+        self.assertEqual((pointage.retard_minutes, pointage.ponctualite_statut), (20, 'acceptable'))
+        self.assertFalse(pointage.entree_ponctuelle)
+        self.assertEqual(self.employe.presences.get().ponctualite_statut, 'acceptable')
+
+    def test_lot_identique_a_l_enregistrement_individuel(self):
+        heures = [(time(9, 0), time(17, 0)), (time(9, 6), time(17, 0)), (time(9, 25), time(16, 50)),
+                  (time(8, 30), time(16, 20)), (time(9, 0), None)]
+        individuels = []
+        for decalage, (entree, sortie) in enumerate(heures):
+            p = pointer(self.employe, self.jour.replace(day=decalage + 1), entree=entree, sortie=sortie)
+            individuels.append((p.ponctualite_statut, p.retard_minutes, p.depart_avance_minutes))
+
+        lot = [Pointage(employe=self.employe, heure_entree=entree, heure_sortie=sortie) for entree, sortie in heures]
+        classer_pointages(lot, {self.employe.cin: self.employe})
+
+        self.assertEqual(
+            [(p.ponctualite_statut, p.retard_minutes, p.depart_avance_minutes) for p in lot[:4]], individuels[:4]
+        )
+        self.assertEqual([statut for statut, _, _ in individuels[:4]], ['parfait', 'acceptable', 'acceptable', 'inacceptable'])
+        # Pointage incomplet laissé tel quel
+        self.assertEqual(lot[4].ponctualite_statut, 'non_calcule')
@@ -0,0 +1,78 @@
+from datetime import time, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from api.models import StatistiquesEmploye, StatistiquesGlobales
+from api.services.precalcul_service import PrecalculService
+from api.services.statistics_service import StatisticsService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class PrecalculTests(TestCaseApi):
+    """Précalcul incrémental des statistiques des périodes closes"""
+
+    def setUp(self):
+        super().setUp()
+        self.mois = mois_precedent()
+        departement = creer_departement('D1')
+        self.alice = creer_employe(1, departement)
+        self.bruno = creer_employe(2, departement)
+        self.pointage = pointer(self.alice, self.mois + timedelta(days=2))
+        pointer(self.alice, self.mois + timedelta(days=3), entree=time(8, 40))
+        pointer(self.bruno, self.mois + timedelta(days=3))
+
+    def precalculer(self, **options):
+        return PrecalculService.precalculer(types=('mensuel', 'global'), **options)
+
+    def test_statistiques_des_periodes_closes(self):
+        self.assertEqual(self.precalculer(), {'mensuel': 2, 'global': 1})
+
+        stockee = StatistiquesEmploye.objects.get(employe=self.alice, type_periode='mensuel')
+        attendu = StatisticsService.calculate_employee_monthly_stats(self.alice, self.mois)
+        self.assertEqual(stockee.periode_debut, self.mois)
+        for champ in ('jours_travailles', 'jours_absents', 'heures_travail_total', 'ponctualite_parfaite',
+                      'ponctualite_inacceptable', 'taux_presence'):
+            self.assertEqual(getattr(stockee, champ), attendu[champ], champ)
+
+        globales = StatistiquesGlobales.objects.get(periode=self.mois)
+        self.assertEqual((globales.total_pointages, globales.total_employes), (3, 2))
+
+    def test_incremental(self):
+        self.precalculer()
+        self.assertEqual(self.precalculer(), {'mensuel': 0, 'global': 0})
+
+        # Même nombre de jours, présences modifiées après le calcul
+        self.pointage.heure_sortie = time(18, 0)
+        self.pointage.save()
+        self.assertEqual(self.precalculer(), {'mensuel': 1, 'global': 1})
+        stockee = StatistiquesEmploye.objects.get(employe=self.alice, type_periode='mensuel')
+        self.assertEqual(stockee.heures_travail_total, timedelta(hours=10) + timedelta(hours=7, minutes=20))
+        self.assertEqual(StatistiquesEmploye.objects.filter(type_periode='mensuel').count(), 2)
+
+        self.assertEqual(self.precalculer(complet=True), {'mensuel': 2, 'global': 1})
+
+    def test_periode_courante_ignoree(self):
+        PrecalculService.precalculer()
+
+        aujourdhui = timezone.now().date()
+        semaine = aujourdhui - timedelta(days=aujourdhui.weekday())
+        self.assertFalse(StatistiquesEmploye.objects.filter(type_periode='hebdo', periode_fin__gte=semaine).exists())
+        self.assertFalse(StatistiquesEmploye.objects.filter(type_periode='mensuel', periode_debut__gt=self.mois).exists())
+        # Les semaines closes sans présence sont aussi écrites (à zéro)
+        hebdo = StatistiquesEmploye.objects.filter(type_periode='hebdo', employe=self.bruno)
+        self.assertEqual(hebdo.count(), (semaine - hebdo.order_by('periode_debut').first().periode_debut).days // 7)
+        self.assertEqual(hebdo.filter(jours_travailles=0).count(), hebdo.count() - 1)
+
+    def test_commande(self):
+        sortie = StringIO()
+        call_command('precalculer_statistiques', '--types', 'mensuel', stdout=sortie)
+        self.assertIn('mensuel: 2', sortie.getvalue())
+        self.assertFalse(StatistiquesGlobales.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command('precalculer_statistiques', '--types', 'trimestriel', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('precalculer_statistiques', '--depuis', '2025-13-01', stdout=StringIO())
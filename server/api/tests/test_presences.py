@@ -0,0 +1,120 @@
+from datetime import time, timedelta
+
+from api.models import PresenceDepartementJournaliere, PresenceJournaliere
+from api.services.presence_service import PresenceService
+from api.services.statistics_service import StatisticsService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class PresencesJournalieresTests(TestCaseApi):
+    """Agrégats journaliers tenus à jour à chaque écriture de Pointage"""
+
+    def setUp(self):
+        super().setUp()
+        self.jour = mois_precedent() + timedelta(days=3)
+        self.departement = creer_departement('D1')
+        self.alice = creer_employe(1, self.departement)
+        self.bruno = creer_employe(2, self.departement)
+
+    def presence_departement(self, jour=None):
+        return PresenceDepartementJournaliere.objects.filter(departement=self.departement, date=jour or self.jour).first()
+
+    def test_pointage_enregistre(self):
+        pointer(self.alice, self.jour, entree=time(8, 20), sortie=time(16, 0))
+        pointer(self.bruno, self.jour)
+
+        presence = PresenceJournaliere.objects.get(employe=self.alice, date=self.jour)
+        self.assertEqual(presence.secondes_travail, 7 * 3600 + 40 * 60)
+        self.assertEqual(presence.retard_minutes, 20)
+        self.assertEqual(presence.ponctualite_statut, 'acceptable')
+
+        departement = self.presence_departement()
+        self.assertEqual(departement.nb_pointages, 2)
+        self.assertEqual(departement.secondes_travail, 15 * 3600 + 40 * 60)
+        self.assertEqual(departement.retard_minutes_total, 20)
+        self.assertEqual((departement.ponctualite_parfaite, departement.ponctualite_acceptable), (1, 1))
+
+    def test_pointage_incomplet_ignore(self):
+        pointage = pointer(self.alice, self.jour, sortie=None)
+        self.assertFalse(PresenceJournaliere.objects.exists())
+
+        pointage.heure_sortie = time(15, 0)
+        pointage.save()
+        presence = PresenceJournaliere.objects.get(employe=self.alice)
+        self.assertEqual(presence.depart_avance_minutes, 60)
+        self.assertEqual(presence.ponctualite_statut, 'inacceptable')
+
+    def test_pointage_modifie_et_deplace(self):
+        pointage = pointer(self.alice, self.jour)
+        pointer(self.bruno, self.jour)
+
+        pointage.date_pointage = self.jour + timedelta(days=1)
+        pointage.heure_sortie = time(17, 0)
+        pointage.save()
+
+        self.assertFalse(PresenceJournaliere.objects.filter(employe=self.alice, date=self.jour).exists())
+        self.assertEqual(self.presence_departement().nb_pointages, 1)
+        lendemain = self.presence_departement(self.jour + timedelta(days=1))
+        self.assertEqual((lendemain.nb_pointages, lendemain.secondes_travail), (1, 9 * 3600))
+
+    def test_pointage_supprime(self):
+        pointage = pointer(self.alice, self.jour)
+        pointer(self.bruno, self.jour, entree=time(9, 0))
+
+        pointage.delete()
+        self.assertFalse(PresenceJournaliere.objects.filter(employe=self.alice).exists())
+        departement = self.presence_departement()
+        self.assertEqual(
+            (departement.nb_pointages, departement.ponctualite_parfaite, departement.ponctualite_inacceptable),
+            (1, 0, 1),
+        )
+
+        self.bruno.pointages.get().delete()
+        self.assertIsNone(self.presence_departement())
+
+    def test_changement_de_departement(self):
+        pointer(self.alice, self.jour)
+        autre = creer_departement('D2')
+
+        self.alice.departement = autre
+        self.alice.save()
+
+        self.assertEqual(PresenceJournaliere.objects.get(employe=self.alice).departement_id, 'D2')
+        self.assertIsNone(self.presence_departement())
+        self.assertEqual(
+            PresenceDepartementJournaliere.objects.get(departement=autre, date=self.jour).nb_pointages, 1
+        )
+
+    def test_reconstruction_identique_au_suivi_incremental(self):
+        for decalage in range(6):
+            pointer(self.alice, self.jour + timedelta(days=decalage), entree=time(8, 5 * decalage))
+            pointer(self.bruno, self.jour + timedelta(days=decalage), sortie=time(15, 40 + decalage))
+
+        def etat():
+            return (
+                sorted(PresenceJournaliere.objects.values_list(
+                    'employe_id', 'date', 'secondes_travail', 'retard_minutes', 'ponctualite_statut'
+                )),
+                sorted(PresenceDepartementJournaliere.objects.values_list(
+                    'departement_id', 'date', 'nb_pointages', 'secondes_travail', 'ponctualite_parfaite'
+                )),
+            )
+
+        incremental = etat()
+        self.assertEqual(PresenceService.reconstruire(), 12)
+        self.assertEqual(etat(), incremental)
+
+    def test_detail_des_heures_des_statistiques_mensuelles(self):
+        for decalage in range(7):
+            pointer(self.alice, self.jour + timedelta(days=decalage))
+
+        stats = StatisticsService.calculate_employee_monthly_stats(self.alice, self.jour)
+
+        self.assertEqual(stats['jours_travailles'], 7)
+        self.assertEqual(stats['heures_travail_total'], timedelta(hours=56))
+        details = stats['_debug']['heures_details']
+        self.assertEqual(len(details), 5)
+        self.assertEqual(details[0], {
+            'date': self.jour, 'duree': timedelta(hours=8), 'entree': time(8, 0), 'sortie': time(16, 0),
+        })
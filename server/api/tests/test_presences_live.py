@@ -0,0 +1,206 @@
+import asyncio
+from datetime import date, time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.services import presence_live_service
+from api.services.acces_service import AccesService
+from api.services.presence_live_service import PresenceLiveService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, pointer
+
+
+class Rollback(Exception):
+    pass
+
+
+def reinitialiser_index():
+    """État de processus remis à zéro: l'index sera rechargé depuis la base"""
+    with presence_live_service._verrou:
+        presence_live_service._index.clear()
+        presence_live_service._employes.clear()
+        presence_live_service._historique.clear()
+        presence_live_service._abonnes.clear()
+        presence_live_service._jour = None
+        presence_live_service._version = None
+        presence_live_service._derniere_synchronisation = 0.0
+        presence_live_service._resynchroniser = False
+
+
+class PresencesLiveTests(TestCaseApi):
+    """Index des présences du jour tenu à jour par les écritures validées"""
+
+    def setUp(self):
+        super().setUp()
+        reinitialiser_index()
+        self.addCleanup(reinitialiser_index)
+        self.jour = timezone.localdate()
+        self.d1, self.d2 = creer_departement('D1'), creer_departement('D2')
+        self.alice = creer_employe(1, self.d1)
+        self.bruno = creer_employe(2, self.d2)
+
+    def pointer_valide(self, employe, **champs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return pointer(employe, self.jour, **champs)
+
+    def presences(self, departement=None):
+        return {
+            p['cin']: p['statut']
+            for presences in PresenceLiveService.instantane(departement)['departements'].values()
+            for p in presences
+        }
+
+    def test_chargement_initial_puis_lecture_en_memoire(self):
+        pointer(self.alice, self.jour, sortie=None)
+        pointer(self.bruno, date(2025, 3, 3))
+
+        instantane = PresenceLiveService.instantane()
+        self.assertEqual(instantane['jour'], self.jour.isoformat())
+        self.assertEqual(instantane['presents'], 1)
+        self.assertEqual(instantane['departements'], {'D1': [{
+            'id_pointage': self.alice.pointages.get().pk, 'cin': self.alice.cin, 'nom_complet': 'Nom1 Prenom1',
+            'departement': 'D1', 'statut': 'present', 'heure_entree': '08:00', 'heure_sortie': None,
+        }]})
+        with self.assertNumQueries(0):
+            PresenceLiveService.instantane('D1')
+
+    def test_evenements_des_ecritures(self):
+        depart = PresenceLiveService.instantane()['sequence']
+        pointage = self.pointer_valide(self.alice, sortie=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            pointage.heure_sortie = time(16, 0)
+            pointage.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            pointage.remarque = 'Réunion'
+            pointage.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            pointage.delete()
+
+        evenements = PresenceLiveService.depuis(depart)
+        self.assertEqual([e['type'] for e in evenements], ['entree', 'sortie', 'retrait'])
+        self.assertEqual([e['sequence'] for e in evenements], [depart + 1, depart + 2, depart + 3])
+        self.assertEqual(self.presences(), {})
+
+    def test_rollback_sans_effet(self):
+        depart = PresenceLiveService.instantane()['sequence']
+        try:
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                pointer(self.alice, self.jour)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.assertEqual(PresenceLiveService.depuis(depart), [])
+        self.assertEqual(self.presences(), {})
+
+    def test_changement_de_departement(self):
+        self.pointer_valide(self.alice, sortie=None)
+        depart = PresenceLiveService.instantane()['sequence']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.departement = self.d2
+            self.alice.save()
+
+        self.assertEqual([e['type'] for e in PresenceLiveService.depuis(depart)], ['retrait', 'entree'])
+        self.assertEqual(self.presences('D1'), {})
+        self.assertEqual(self.presences('D2'), {self.alice.cin: 'present'})
+        self.assertEqual([e['type'] for e in PresenceLiveService.depuis(depart, 'D1')], ['retrait'])
+
+    def test_historique_insuffisant(self):
+        self.pointer_valide(self.alice)
+        sequence = PresenceLiveService.instantane()['sequence']
+
+        self.assertIsNone(PresenceLiveService.depuis(sequence + 1))
+        presence_live_service._historique.clear()
+        self.pointer_valide(self.bruno)
+        self.assertEqual(len(PresenceLiveService.depuis(sequence)), 1)
+        self.assertIsNone(PresenceLiveService.depuis(sequence - 1))
+
+    @override_settings(PRESENCE_LIVE_SYNCHRONISATION_SECONDES=0)
+    def test_synchronisation_des_ecritures_d_un_autre_processus(self):
+        PresenceLiveService.instantane()
+        # Écriture non répercutée ici (callbacks on_commit non exécutés), signalée par la version partagée
+        pointer(self.bruno, self.jour)
+        PresenceLiveService.synchroniser()
+        self.assertEqual(self.presences(), {})
+
+        cache.set(presence_live_service.CLE_VERSION, 1, timeout=None)
+        PresenceLiveService.synchroniser()
+        self.assertEqual(self.presences(), {self.bruno.cin: 'parti'})
+
+    def test_abonne_deborde(self):
+        async def remplir():
+            abonne = PresenceLiveService.abonner('D1')
+            try:
+                for sequence in range(presence_live_service.TAILLE_FILE_ABONNE + 1):
+                    abonne._deposer({'type': 'entree', 'sequence': sequence})
+                return abonne.deborde, abonne.file.qsize()
+            finally:
+                PresenceLiveService.desabonner(abonne)
+
+        self.assertEqual(asyncio.run(remplir()), (True, presence_live_service.TAILLE_FILE_ABONNE))
+        self.assertFalse(presence_live_service._abonnes)
+
+    def test_endpoints(self):
+        self.pointer_valide(self.alice, sortie=None)
+        self.pointer_valide(self.bruno)
+        client = APIClient()
+        self.assertEqual(client.get('/api/presences/').status_code, 401)
+
+        client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+        contenu = client.get('/api/presences/?departement=D2').json()
+        self.assertEqual(list(contenu['departements']), ['D2'])
+        self.assertEqual(contenu['presents'], 0)
+        self.assertEqual(client.get('/api/presences/').json()['presents'], 1)
+
+        # Flux SSE: ASGI uniquement
+        client.force_authenticate(creer_utilisateur())
+        self.assertEqual(client.get('/api/presences/flux/').status_code, 501)
+
+    def test_limite_a_la_portee(self):
+        responsable = creer_utilisateur('responsable@test.fr')      # responsable de D1 et D2 (outils)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.d2.responsable = 'autre@test.fr'
+            self.d2.save()
+        depart = PresenceLiveService.instantane()['sequence']
+        self.pointer_valide(self.alice, sortie=None)
+        self.pointer_valide(self.bruno, sortie=None)
+
+        client = APIClient()
+        client.force_authenticate(responsable)
+        self.assertEqual(list(client.get('/api/presences/').json()['departements']), ['D1'])
+        client.force_authenticate(creer_utilisateur())
+        self.assertEqual(client.get('/api/presences/').json()['departements'], {})
+
+        portee = AccesService.portee(responsable)
+        evenements = PresenceLiveService.depuis(depart, portee=portee)
+        self.assertEqual([e['presence']['cin'] for e in evenements], [self.alice.cin])
+
+        sorties = [
+            (p.id_pointage, p.employe_id, p.date_pointage, p.heure_entree, time(17, 0))
+            for p in (self.alice.pointages.get(), self.bruno.pointages.get())
+        ]
+
+        async def recevoir():
+            abonne = PresenceLiveService.abonner(portee=portee)
+            try:
+                await asyncio.to_thread(PresenceLiveService._appliquer, sorties, False)
+                await asyncio.sleep(0)
+                return [abonne.file.get_nowait()['presence']['cin'] for _ in range(abonne.file.qsize())]
+            finally:
+                PresenceLiveService.desabonner(abonne)
+
+        self.assertEqual(asyncio.run(recevoir()), [self.alice.cin])
+
+    def test_jour_du_fuseau_configure(self):
+        pointer(self.bruno, date(2025, 3, 3), sortie=None)
+        with mock.patch.object(presence_live_service.timezone, 'localdate', return_value=date(2025, 3, 3)):
+            instantane = PresenceLiveService.instantane()
+        self.assertEqual(instantane['jour'], '2025-03-03')
+        self.assertEqual(instantane['presents'], 1)
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import RapportJob
+from api.services.rapport_service import RapportService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, mois_precedent, pointer
+
+
+@override_settings(RAPPORTS_EXECUTION='synchrone')
+class RapportsAsynchronesTests(TestCaseApi):
+    """Rapports PDF en arrière-plan: soumission, déduplication, accès, téléchargement"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        self.client = APIClient()
+        self.client.force_authenticate(self.utilisateur)
+        self.mois = mois_precedent()
+        self.employe = creer_employe(1, creer_departement('D1'), created_by=self.utilisateur)
+        pointer(self.employe, self.mois)
+
+    def soumettre(self, **donnees):
+        with self.captureOnCommitCallbacks(execute=True):
+            reponse = self.client.post('/api/rapports/', donnees, format='json')
+        return reponse
+
+    def test_soumission_puis_telechargement(self):
+        reponse = self.soumettre(type='employe', cin=self.employe.cin, date=self.mois.isoformat())
+        self.assertEqual(reponse.status_code, 202)
+        job_id = reponse.json()['id']
+
+        etat = self.client.get(f'/api/rapports/{job_id}/').json()
+        self.assertEqual(etat['statut'], 'termine')
+
+        fichier = self.client.get(f'/api/rapports/{job_id}/telecharger/')
+        self.assertEqual(fichier.status_code, 200)
+        self.assertEqual(fichier['Content-Type'], 'application/pdf')
+        self.assertTrue(fichier.content.startswith(b'%PDF'))
+
+    def test_demande_identique_reutilisee(self):
+        premier = self.soumettre(type='employe', cin=self.employe.cin, date=self.mois.isoformat()).json()
+        # Même mois désigné par un autre jour: paramètres normalisés identiques
+        second = self.soumettre(type='employe', cin=self.employe.cin, date=(self.mois + timedelta(days=9)).isoformat())
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['id'], premier['id'])
+        self.assertEqual(RapportJob.objects.count(), 1)
+
+    def test_nouvelle_donnee_nouveau_rapport(self):
+        premier = self.soumettre(type='global', mois=self.mois.isoformat()).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            pointer(self.employe, self.mois + timedelta(days=1))
+
+        second = self.soumettre(type='global', mois=self.mois.isoformat()).json()
+        self.assertNotEqual(second['id'], premier['id'])
+
+    def test_acces_reserve(self):
+        job_id = self.soumettre(type='employe', cin=self.employe.cin).json()['id']
+        autre = APIClient()
+        autre.force_authenticate(creer_utilisateur('autre@test.fr'))
+
+        self.assertEqual(autre.get(f'/api/rapports/{job_id}/').status_code, 404)
+        self.assertEqual(autre.get(f'/api/rapports/{job_id}/telecharger/').status_code, 404)
+        self.assertEqual(autre.post('/api/rapports/', {'type': 'employe', 'cin': self.employe.cin}).status_code, 403)
+
+    def test_parametres_invalides(self):
+        self.assertEqual(self.soumettre(type='employe').status_code, 400)
+        self.assertEqual(self.soumettre(type='inconnu').status_code, 400)
+        self.assertEqual(self.soumettre(type='employe', cin='000000000999').status_code, 404)
+
+    def test_rapport_non_disponible_ou_expire(self):
+        with mock.patch.object(RapportService, '_planifier'):
+            job_id = self.soumettre(type='global').json()['id']
+        self.assertEqual(self.client.get(f'/api/rapports/{job_id}/telecharger/').status_code, 409)
+
+        RapportJob.objects.filter(pk=job_id).update(date_expiration=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.client.get(f'/api/rapports/{job_id}/telecharger/').status_code, 410)
+
+    def test_erreur_de_generation(self):
+        with mock.patch.object(RapportService, 'generer', side_effect=RuntimeError("ReportLab n'est pas installé")):
+            job_id = self.soumettre(type='global').json()['id']
+
+        job = RapportJob.objects.get(pk=job_id)
+        self.assertEqual((job.statut, job.erreur), ('erreur', "ReportLab n'est pas installé"))
+
+    def test_purge(self):
+        with mock.patch.object(RapportService, '_planifier'):
+            perdu = self.soumettre(type='global').json()['id']
+            expire = self.soumettre(type='employe', cin=self.employe.cin).json()['id']
+        maintenant = timezone.now()
+        RapportJob.objects.filter(pk=perdu).update(date_creation=maintenant - timedelta(hours=1))
+        RapportJob.objects.filter(pk=expire).update(date_expiration=maintenant)
+
+        self.assertEqual(RapportService.purger(maintenant), (1, 1))
+        self.assertEqual(RapportJob.objects.get(pk=perdu).statut, 'erreur')
+        self.assertFalse(RapportJob.objects.filter(pk=expire).exists())
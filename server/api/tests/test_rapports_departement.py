@@ -0,0 +1,85 @@
+import io
+import zipfile
+from datetime import time, timedelta
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.services.statistics_service import StatisticsService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, mois_precedent, pointer
+
+
+@override_settings(RAPPORTS_EXECUTION='synchrone')
+class RapportsDepartementTests(TestCaseApi):
+    """Rapports mensuels de tout un département: ZIP de PDF ou PDF unique"""
+
+    CLES = (
+        'jours_travailles', 'jours_absents', 'heures_travail_total', 'ponctualite_parfaite',
+        'ponctualite_acceptable', 'ponctualite_inacceptable', 'retard_moyen_minutes', 'taux_presence',
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.mois = mois_precedent()
+        self.utilisateur = creer_utilisateur()
+        self.autre = creer_utilisateur('autre@test.fr')
+        self.departement = creer_departement('D1')
+        self.employes = [
+            creer_employe(numero, self.departement, created_by=self.utilisateur if numero < 4 else self.autre)
+            for numero in range(1, 6)
+        ]
+        for decalage, employe in enumerate(self.employes):
+            pointer(employe, self.mois + timedelta(days=decalage), entree=time(8, 10 * decalage))
+            pointer(employe, self.mois + timedelta(days=decalage + 1))
+        self.admin = APIClient()
+        self.admin.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+
+    def test_statistiques_groupees_identiques_au_calcul_unitaire(self):
+        groupees = StatisticsService.calculate_department_employees_monthly_stats('D1', self.mois)
+
+        self.assertEqual(len(groupees), 5)
+        for employe, stats in groupees:
+            attendu = StatisticsService.calculate_employee_monthly_stats(employe, self.mois)
+            for cle in self.CLES:
+                self.assertEqual(stats[cle], attendu[cle], cle)
+
+    def test_job_zip(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self.admin.post('/api/rapports/', {
+                'type': 'departement', 'departement': 'D1', 'mois': self.mois.isoformat(),
+            }, format='json').json()
+
+        fichier = self.admin.get(f"/api/rapports/{job['id']}/telecharger/")
+        self.assertEqual(fichier['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(fichier.content)) as archive:
+            noms = archive.namelist()
+            self.assertEqual(len(noms), 5)
+            self.assertTrue(all(archive.read(nom).startswith(b'%PDF') for nom in noms))
+        self.assertTrue(any(self.employes[0].cin in nom for nom in noms))
+
+    def test_export_direct_pdf_unique(self):
+        reponse = self.admin.get(f'/api/statistiques/export-pdf/?type=departement&departement=D1&mois={self.mois}&sortie=pdf')
+
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse['Content-Type'], 'application/pdf')
+        self.assertIn(f'rapports_D1_{self.mois.strftime("%Y-%m")}.pdf', reponse['Content-Disposition'])
+        self.assertTrue(reponse.content.startswith(b'%PDF'))
+
+    def test_lot_restreint_aux_employes_de_l_utilisateur(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+
+        reponse = client.get(f'/api/statistiques/export-pdf/?type=departement&departement=D1&mois={self.mois}')
+        self.assertEqual(reponse['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(reponse.content)) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+
+    def test_parametres_invalides(self):
+        url = '/api/statistiques/export-pdf/?type=departement'
+        self.assertEqual(self.admin.get(url).status_code, 400)
+        self.assertEqual(self.admin.get(f'{url}&departement=D1&sortie=docx').status_code, 400)
+        self.assertEqual(self.admin.get(f'{url}&departement=D9').status_code, 404)
+        creer_departement('D2', responsable='vide@test.fr')
+        self.assertEqual(self.admin.get(f'{url}&departement=D2').status_code, 404)
@@ -0,0 +1,116 @@
+import importlib
+import unittest
+
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.services.acces_service import AccesService
+from api.services import recherche_service
+from api.services.recherche_service import RechercheService, normaliser
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur
+
+
+class RechercheTestCase(TestCaseApi):
+
+    def setUp(self):
+        super().setUp()
+        recherche_service._version = None
+        self.addCleanup(setattr, recherche_service, '_version', None)
+        departement = creer_departement('D1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.helene = creer_employe(1, departement, nom='Martin', prenom='Hélène', poste='Comptable')
+            self.marc = creer_employe(2, departement, nom='Dupont', prenom='Marc', poste='Martinet')
+            self.martine = creer_employe(3, departement, nom='Durand', prenom='Martine', poste='Agent')
+
+    def cins(self, terme, **options):
+        return [resultat['cin'] for resultat in RechercheService.employes(terme, **options)]
+
+
+@unittest.skipIf(connection.vendor == 'postgresql', "Index en mémoire: autres bases")
+class RechercheMemoireTests(RechercheTestCase):
+    """Index des préfixes en mémoire: correspondance, classement et reconstruction"""
+
+    def test_normalisation(self):
+        self.assertEqual(normaliser('Hélène ÉTÉ'), 'helene ete')
+        self.assertEqual(self.cins('helene'), [self.helene.cin])
+        self.assertEqual(self.cins('HÉL'), [self.helene.cin])
+
+    def test_classement(self):
+        # Mot entier du nom > préfixe du prénom > préfixe du poste
+        self.assertEqual(self.cins('martin'), [self.helene.cin, self.martine.cin, self.marc.cin])
+        self.assertEqual(RechercheService.employes('martin')[0]['score'], 4.0)
+        # Ex æquo (préfixe du nom ou du prénom): ordre alphabétique des noms
+        self.assertEqual(self.cins('mar'), [self.marc.cin, self.martine.cin, self.helene.cin])
+
+    def test_tous_les_mots_requis(self):
+        self.assertEqual(self.cins('mar dup'), [self.marc.cin])
+        self.assertEqual(self.cins('martin agent'), [self.martine.cin])
+        self.assertEqual(self.cins('martin zorro'), [])
+        self.assertEqual(self.cins('  -- '), [])
+
+    def test_limite(self):
+        self.assertEqual(len(self.cins('mar', limite=2)), 2)
+        self.assertEqual(len(self.cins('mar', limite=0)), 1)
+
+    def test_reconstruction_apres_ecriture(self):
+        self.cins('mar')
+        with self.assertNumQueries(0):
+            self.cins('dur')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nouveau = creer_employe(4, self.helene.departement, nom='Marchal', prenom='Paul')
+        self.assertIn(nouveau.cin, self.cins('marc'))
+        with self.captureOnCommitCallbacks(execute=True):
+            nouveau.delete()
+        self.assertNotIn(nouveau.cin, self.cins('marc'))
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_superuser('admin@test.fr', 'MotDePasse-2024'))
+
+        contenu = client.get('/api/employes/recherche/?q=dup').json()
+        self.assertEqual(contenu['moteur'], 'index_memoire')
+        self.assertEqual([r['cin'] for r in contenu['resultats']], [self.marc.cin])
+        self.assertEqual(contenu['resultats'][0]['departement'], 'D1')
+        self.assertEqual(client.get('/api/employes/recherche/').json()['resultats'], [])
+        self.assertEqual(client.get('/api/employes/recherche/?q=a&limite=x').status_code, 400)
+
+
+class RecherchePorteeTests(RechercheTestCase):
+    """Résultats limités à la portée de l'utilisateur, quel que soit le moteur"""
+
+    def test_hors_portee_exclus(self):
+        utilisateur = creer_utilisateur()
+        self.assertEqual(self.cins('mar', portee=AccesService.portee(utilisateur)), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marc.created_by = utilisateur
+            self.marc.save()
+        portee = AccesService.portee(CustomUser.objects.get(pk=utilisateur.pk))
+        self.assertEqual(self.cins('mar', portee=portee), [self.marc.cin])
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(creer_utilisateur())
+        self.assertEqual(client.get('/api/employes/recherche/?q=mar').json()['resultats'], [])
+
+
+class IndexPostgresqlTests(unittest.TestCase):
+    """La migration crée exactement les index dont dépendent les requêtes de RechercheService"""
+
+    def test_migration_et_service_identiques(self):
+        migration = importlib.import_module('api.migrations.0009_index_recherche')
+        self.assertEqual(migration.INDEX_POSTGRESQL, recherche_service.INDEX_POSTGRESQL)
+        self.assertEqual(migration.DOCUMENT_EMPLOYE, recherche_service.DOCUMENT_EMPLOYE)
+        self.assertEqual(migration.NOM_COMPLET_EMPLOYE, recherche_service.NOM_COMPLET_EMPLOYE)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Recherche plein texte: PostgreSQL uniquement")
+class RecherchePostgresqlTests(RechercheTestCase):
+    """Plein texte (préfixes) puis trigrammes pour les fautes de frappe"""
+
+    def test_prefixes_et_fautes_de_frappe(self):
+        self.assertEqual(self.cins('mar dup'), [self.marc.cin])
+        self.assertEqual(self.cins('dupond marc')[:1], [self.marc.cin])
@@ -0,0 +1,49 @@
+from datetime import date
+from unittest import mock
+
+from django.test import Client
+from django.utils import timezone
+
+from api.authentication import ClaimsTokenObtainPairSerializer
+from api.services.statistics_async_service import StatisticsAsyncService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur
+
+
+class StatistiquesAsyncTests(TestCaseApi):
+    """Vues asynchrones: accès vérifié avant tout calcul, date de référence analysée comme en synchrone"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        departement = creer_departement('D1', responsable='autre@test.fr')
+        self.sien = creer_employe(1, departement, created_by=self.utilisateur)
+        self.autre = creer_employe(2, departement)
+        jeton = ClaimsTokenObtainPairSerializer.get_token(self.utilisateur).access_token
+        self.client = Client(HTTP_AUTHORIZATION=f'Bearer {jeton}')
+        calcul = mock.patch.object(StatisticsAsyncService, 'employe', new=mock.AsyncMock(return_value=(None, None)))
+        self.calcul = calcul.start()
+        self.addCleanup(calcul.stop)
+
+    def test_authentification_requise(self):
+        self.assertEqual(Client().get(f'/api/statistiques/async/employe/{self.sien.cin}/').status_code, 401)
+        self.assertEqual(Client().get('/api/statistiques/async/export-pdf/?cin=1').status_code, 401)
+
+    def test_acces_verifie_avant_le_calcul(self):
+        for url in (f'/api/statistiques/async/employe/{self.autre.cin}/',
+                    f'/api/statistiques/async/export-pdf/?cin={self.autre.cin}'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 403)
+        for url in ('/api/statistiques/async/employe/inconnu/', '/api/statistiques/async/export-pdf/?cin=inconnu'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.calcul.assert_not_called()
+
+    def test_date_de_reference(self):
+        for url in (f'/api/statistiques/async/employe/{self.sien.cin}/?',
+                    f'/api/statistiques/async/export-pdf/?cin={self.sien.cin}&'):
+            with self.subTest(url=url):
+                self.client.get(f'{url}date=2025-03&periode=semaine')
+                self.calcul.assert_awaited_with(self.sien.cin, 'semaine', date(2025, 3, 1))
+                self.client.get(f'{url}date=2025-13-45')
+                self.calcul.assert_awaited_with(self.sien.cin, 'mois', timezone.now().date())
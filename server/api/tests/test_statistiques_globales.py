@@ -0,0 +1,65 @@
+from datetime import time, timedelta
+
+from api.services.statistics_service import StatisticsService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class StatistiquesGlobalesMensuellesTests(TestCaseApi):
+    """calculate_global_monthly_stats: agrégats groupés, nombre de requêtes fixe"""
+
+    def setUp(self):
+        super().setUp()
+        self.mois = mois_precedent()
+        self.ventes = creer_departement('D1')
+        self.achats = creer_departement('D2')
+        creer_departement('D3')
+        self.alice = creer_employe(1, self.ventes)
+        self.bruno = creer_employe(2, self.ventes)
+        self.chloe = creer_employe(3, self.achats)
+        creer_employe(4, self.achats, statut='inactif')
+
+        jour = self.mois
+        pointer(self.alice, jour)                                   # parfait
+        pointer(self.alice, jour + timedelta(days=1), entree=time(8, 20))   # acceptable
+        pointer(self.bruno, jour, entree=time(9, 0))                # inacceptable
+        pointer(self.chloe, jour + timedelta(days=2), sortie=time(18, 0))   # parfait (sortie tardive)
+        # Mois suivant: hors période
+        pointer(self.chloe, self.mois.replace(day=28) + timedelta(days=7))
+
+    def test_totaux_par_entreprise(self):
+        stats = StatisticsService.calculate_global_monthly_stats(self.mois)
+
+        self.assertEqual(stats['total_employes'], 4)
+        self.assertEqual(stats['employes_actifs'], 3)
+        self.assertEqual(stats['total_departements'], 3)
+        self.assertEqual(stats['departements_actifs'], 2)
+        self.assertEqual(stats['total_pointages'], 4)
+        self.assertEqual(
+            (stats['ponctualite_parfaite'], stats['ponctualite_acceptable'], stats['ponctualite_inacceptable']),
+            (2, 1, 1),
+        )
+        secondes = 8 * 3600 + (7 * 3600 + 40 * 60) + 7 * 3600 + 10 * 3600
+        self.assertEqual(stats['heures_travail_total'], secondes)
+        self.assertEqual(stats['jours_total_possibles'], 3 * stats['jours_passes_mois'])
+
+    def test_detail_par_departement(self):
+        stats = StatisticsService.calculate_global_monthly_stats(self.mois)
+        departements = {d['id']: d for d in stats['departements_data']}
+
+        self.assertEqual(departements['D1']['pointages_count'], 3)
+        self.assertEqual(departements['D1']['employes_actifs'], 2)
+        self.assertEqual(departements['D2']['employes_count'], 2)
+        self.assertEqual(departements['D2']['heures_travail'], timedelta(hours=10))
+        self.assertFalse(departements['D3']['est_actif'])
+
+    def test_nombre_de_requetes_independant_du_volume(self):
+        with self.assertNumQueries(2):
+            StatisticsService._compute_global_monthly_stats(self.mois)
+
+        for numero in range(5, 25):
+            employe = creer_employe(numero, creer_departement(f'X{numero}'))
+            pointer(employe, self.mois)
+        with self.assertNumQueries(2):
+            stats = StatisticsService._compute_global_monthly_stats(self.mois)
+        self.assertEqual(stats['total_pointages'], 24)
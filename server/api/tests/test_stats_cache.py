@@ -0,0 +1,87 @@
+from datetime import time, timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api.checks import verifier_cache_partage, verifier_cache_partage_deploiement
+from api.services.statistics_service import StatisticsService
+from api.services.stats_cache import StatsCache
+
+from .outils import TestCaseApi, creer_departement, creer_employe, mois_precedent, pointer
+
+
+class StatsCacheTests(TestCaseApi):
+    """Résultats en cache sous des versions de données incrémentées par les écritures"""
+
+    def setUp(self):
+        super().setUp()
+        self.mois = mois_precedent()
+        self.employe = creer_employe(1, creer_departement('D1'))
+        with self.captureOnCommitCallbacks(execute=True):
+            pointer(self.employe, self.mois)
+
+    def test_lecture_servie_par_le_cache(self):
+        premier = StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)
+        with self.assertNumQueries(0):
+            second = StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)
+        self.assertEqual(second['jours_travailles'], premier['jours_travailles'])
+
+        compteurs = StatsCache.compteurs()
+        self.assertEqual((compteurs['hits'], compteurs['misses']), (1, 1))
+
+    def test_ecriture_du_mois_invalide(self):
+        self.assertEqual(StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)['jours_travailles'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pointer(self.employe, self.mois + timedelta(days=1), entree=time(9, 0))
+
+        stats = StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)
+        self.assertEqual(stats['jours_travailles'], 2)
+        self.assertEqual(stats['ponctualite_inacceptable'], 1)
+        self.assertGreater(StatsCache.compteurs()['invalidations'], 0)
+
+    def test_ecriture_d_un_autre_mois_conserve_l_entree(self):
+        StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pointer(self.employe, self.mois - timedelta(days=3))
+
+        with self.assertNumQueries(0):
+            StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)
+
+    def test_versions_non_publiees_avant_commit(self):
+        StatisticsService.calculate_employee_monthly_stats(self.employe, self.mois)
+        cle = StatsCache.cle_employe_mensuel(self.employe.cin, self.mois)
+
+        with self.captureOnCommitCallbacks(execute=False) as rappels:
+            pointer(self.employe, self.mois + timedelta(days=2))
+        self.assertEqual(StatsCache.cle_employe_mensuel(self.employe.cin, self.mois), cle)
+
+        for rappel in rappels:
+            rappel()
+        self.assertNotEqual(StatsCache.cle_employe_mensuel(self.employe.cin, self.mois), cle)
+
+    def test_duree_de_conservation_bornee(self):
+        today = timezone.now().date()
+        self.assertEqual(StatsCache.timeout(self.mois, self.mois + timedelta(days=27)), 7 * 24 * 3600)
+        with override_settings(STATS_CACHE_TIMEOUT_PERIODE_CLOSE=3600, STATS_CACHE_TIMEOUT_PERIODE_COURANTE=60):
+            self.assertEqual(StatsCache.timeout(self.mois, self.mois + timedelta(days=27)), 3600)
+            self.assertEqual(StatsCache.timeout(today, today), 60)
+
+
+class CachePartageCheckTests(TestCaseApi):
+    LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    PARTAGE = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_api'}}
+
+    def identifiants(self):
+        return [p.id for p in verifier_cache_partage(None) + verifier_cache_partage_deploiement(None)]
+
+    def test_cache_local_signale_hors_debug(self):
+        with override_settings(DEBUG=False, CACHES=self.LOCAL):
+            self.assertEqual(self.identifiants(), ['api.W001', 'api.E001'])
+        with override_settings(DEBUG=True, CACHES=self.LOCAL):
+            self.assertEqual(self.identifiants(), ['api.E001'])
+
+    def test_cache_partage_accepte(self):
+        with override_settings(DEBUG=False, CACHES=self.PARTAGE):
+            self.assertEqual(self.identifiants(), [])
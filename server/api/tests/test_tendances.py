@@ -0,0 +1,90 @@
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from api.services import tendance_service
+from api.services.statistics_service import StatisticsService
+from api.services.tendance_service import TendanceService
+
+from .outils import TestCaseApi, creer_departement, creer_employe, creer_utilisateur, pointer
+
+
+class TendancesTests(TestCaseApi):
+    """Séries mensuelles par employé, pente des indicateurs, prévisions"""
+
+    def setUp(self):
+        super().setUp()
+        self.utilisateur = creer_utilisateur()
+        self.periode = TendanceService.mois_periode(12)
+        departement = creer_departement('D1')
+        self.alice = creer_employe(1, departement, created_by=self.utilisateur)
+        self.bruno = creer_employe(2, departement, created_by=creer_utilisateur('autre@test.fr'))
+        # Alice: un jour de présence de plus chaque mois; Bruno: deux derniers mois seulement
+        for indice, mois in enumerate(self.periode):
+            for jour in range(indice + 1):
+                pointer(self.alice, mois + timedelta(days=jour))
+        for mois in self.periode[-2:]:
+            pointer(self.bruno, mois)
+
+    def test_series_et_directions(self):
+        alice, bruno = TendanceService.analyser([self.alice, self.bruno], 12)
+
+        self.assertEqual(alice['series']['mois'], [m.strftime('%Y-%m') for m in self.periode])
+        self.assertEqual(alice['series']['heures'], [8.0 * (indice + 1) for indice in range(12)])
+        self.assertEqual(alice['series']['ponctualite']['parfait'], list(range(1, 13)))
+        self.assertEqual(alice['tendances']['productivite'], 'en_amelioration')
+        self.assertEqual(alice['tendances']['presence'], 'en_amelioration')
+        self.assertEqual(alice['tendances']['regularite'], 'stable')
+        self.assertEqual(alice['pentes_mensuelles']['heures'], 8.0)
+        self.assertEqual(alice['predictions']['prochain_mois']['valeurs']['heures'], 104.0)
+        self.assertGreater(alice['score'], 0)
+
+        self.assertEqual(bruno['periode']['mois_analyses'], 2)
+        self.assertEqual(set(bruno['tendances'].values()), {'donnees_insuffisantes'})
+        self.assertEqual(bruno['predictions']['prochain_mois']['recommandation'],
+                         "Historique insuffisant pour une recommandation")
+
+    def test_series_identiques_aux_statistiques_mensuelles(self):
+        (alice,) = TendanceService.analyser([self.alice], 12)
+
+        for indice in (0, 6, 11):
+            stats = StatisticsService.calculate_employee_monthly_stats(self.alice, self.periode[indice])
+            self.assertEqual(alice['series']['taux_presence'][indice], stats['taux_presence'])
+            self.assertEqual(alice['series']['heures'][indice], round(stats['heures_travail_total_hours'], 2))
+
+    @unittest.skipUnless(tendance_service.NUMPY_AVAILABLE, "NumPy non installé")
+    def test_regression_numpy_identique_au_python(self):
+        valeurs = [[float(i * i % 7) for i in range(12)], [0.0] * 5 + [3.0, 4.0, 9.0] + [1.0] * 4, [0.0] * 12]
+        debuts = [0, 5, 12]
+        avec_numpy = TendanceService._regression(valeurs, debuts)
+        with mock.patch.object(tendance_service, 'NUMPY_AVAILABLE', False):
+            sans_numpy = TendanceService._regression(valeurs, debuts)
+        for ligne_numpy, ligne_python in zip(avec_numpy, sans_numpy):
+            for a, b in zip(ligne_numpy, ligne_python):
+                self.assertAlmostEqual(a, b)
+
+    def test_regression_python(self):
+        with mock.patch.object(tendance_service, 'NUMPY_AVAILABLE', False):
+            (pente, prevision, moyenne, points), (_, _, _, aucun) = TendanceService._regression(
+                [[0.0, 0.0, 2.0, 4.0, 6.0], [0.0] * 5], [1, 5]
+            )
+        self.assertEqual((pente, prevision, moyenne, points), (2.0, 8.0, 3.0, 4))
+        self.assertEqual(aucun, 0)
+
+    def test_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.utilisateur)
+
+        reponse = client.get(f'/api/statistiques/tendances/{self.alice.cin}/?nb_mois=12')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['tendances']['productivite'], 'en_amelioration')
+        self.assertEqual(client.get(f'/api/statistiques/tendances/{self.alice.cin}/?nb_mois=6').status_code, 400)
+        self.assertEqual(client.get(f'/api/statistiques/tendances/{self.bruno.cin}/').status_code, 403)
+
+        departement = client.get('/api/statistiques/tendances/departement/D1/').json()
+        # Seuls les employés de l'utilisateur
+        self.assertEqual([e['employe'] for e in departement['employes']], [self.alice.cin])
+        self.assertNotIn('series', departement['employes'][0])
+        self.assertEqual(client.get('/api/statistiques/tendances/departement/D9/').status_code, 404)
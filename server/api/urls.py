@@ -8,9 +8,20 @@ from .views import (
     EmployeePonctualiteAnalysisAPIView,
     EmployeeHeuresComparisonAPIView, 
     EmployeeMonthlyTrendsAPIView,
+    DepartementTendancesAPIView,
     EmployeeStatisticsAPIView,
     GlobalStatisticsAPIView,
+    EmployeeStatisticsAsyncView,
+    GlobalStatisticsAsyncView,
+    ExportStatisticsPDFAsyncView,
     ExportStatisticsPDFAPIView,
+    ExportDonneesAPIView,
+    RapportJobAPIView,
+    RapportTelechargementAPIView,
+    StatistiquesCacheAPIView,
+    ClassementAPIView,
+    PresencesInstantaneAPIView,
+    PresencesFluxView,
     StatistiquesEmployeViewSet,
     StatistiquesGlobalesViewSet
 )
@@ -41,8 +52,32 @@ urlpatterns = [
     # Statistiques globales - avec préfixe /api/
     path('api/statistiques/global/', GlobalStatisticsAPIView.as_view(), name='global_stats'),
     
+    # Variantes asynchrones (ASGI): requêtes indépendantes en parallèle, rendu PDF hors boucle
+    path('api/statistiques/async/employe/', EmployeeStatisticsAsyncView.as_view(), name='employee_stats_async'),
+    path('api/statistiques/async/employe/<str:cin>/', EmployeeStatisticsAsyncView.as_view(), name='employee_stats_detail_async'),
+    path('api/statistiques/async/global/', GlobalStatisticsAsyncView.as_view(), name='global_stats_async'),
+    path('api/statistiques/async/export-pdf/', ExportStatisticsPDFAsyncView.as_view(), name='export_stats_pdf_async'),
+    
+    # Classement des employés (rang, percentile), paginé par curseur
+    path('api/statistiques/classement/', ClassementAPIView.as_view(), name='classement'),
+    
+    # Présences du jour: instantané et flux SSE des changements (ASGI)
+    path('api/presences/', PresencesInstantaneAPIView.as_view(), name='presences_instantane'),
+    path('api/presences/flux/', PresencesFluxView.as_view(), name='presences_flux'),
+    
+    # Compteurs du cache des statistiques (administrateurs)
+    path('api/statistiques/cache/', StatistiquesCacheAPIView.as_view(), name='stats_cache'),
+    
     # Export PDF - avec préfixe /api/
     path('api/statistiques/export-pdf/', ExportStatisticsPDFAPIView.as_view(), name='export_stats_pdf'),
+    
+    # Rapports PDF asynchrones (soumission, état, téléchargement)
+    path('api/rapports/', RapportJobAPIView.as_view(), name='rapport_soumettre'),
+    path('api/rapports/<uuid:job_id>/', RapportJobAPIView.as_view(), name='rapport_detail'),
+    path('api/rapports/<uuid:job_id>/telecharger/', RapportTelechargementAPIView.as_view(), name='rapport_telecharger'),
+    
+    # Exports en flux CSV / NDJSON
+    path('api/exports/<str:ressource>/', ExportDonneesAPIView.as_view(), name='export_donnees'),
 
     # ✅ CORRECTION : URLs pour les analyses avancées - avec préfixe /api/
     path('api/statistiques/ponctualite/', EmployeePonctualiteAnalysisAPIView.as_view(), name='employee-ponctualite'),
@@ -51,6 +86,7 @@ urlpatterns = [
     path('api/statistiques/comparaison-heures/', EmployeeHeuresComparisonAPIView.as_view(), name='employee-comparaison-heures'),
     path('api/statistiques/comparaison-heures/<str:cin>/', EmployeeHeuresComparisonAPIView.as_view(), name='employee-comparaison-heures-detail'),
     
+    path('api/statistiques/tendances/departement/<str:departement_id>/', DepartementTendancesAPIView.as_view(), name='departement-tendances'),
     path('api/statistiques/tendances/', EmployeeMonthlyTrendsAPIView.as_view(), name='employee-tendances'),
     path('api/statistiques/tendances/<str:cin>/', EmployeeMonthlyTrendsAPIView.as_view(), name='employee-tendances-detail'),
 ]
\ No newline at end of file
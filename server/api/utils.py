@@ -0,0 +1,19 @@
+# utils.py - Fonctions sans dépendance aux vues (partagées par les vues et les commandes)
+from datetime import datetime
+
+
+def parse_date(date_str):
+    """Parse une date depuis une chaîne"""
+    if not date_str:
+        return None
+    try:
+        if isinstance(date_str, str):
+            for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+                try:
+                    return datetime.strptime(date_str, fmt).date()
+                except ValueError:
+                    continue
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
+        return date_str
+    except Exception:
+        return None
@@ -1,60 +1,209 @@
 # views.py
-import io
+import asyncio
 import logging
-import re
 import json
-from datetime import datetime, timedelta, time
+from datetime import date, datetime, timedelta, time
 from django.utils import timezone
-from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.views import APIView
+from rest_framework.serializers import BaseSerializer
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from django_filters.rest_framework import DjangoFilterBackend
+from django.core.exceptions import FieldDoesNotExist
 from django.core.mail import send_mail
 from django.conf import settings
 
-# Import conditionnel pour ReportLab
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import mm, inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.lib import colors
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-
-from .models import Departement, Employe, Pointage, StatistiquesEmploye, StatistiquesGlobales
+
+from .models import Departement, Employe, Pointage, StatistiquesEmploye, StatistiquesGlobales, RapportJob
 from .serializers import (
     CustomUserSerializer, DepartementSerializer, EmployeSerializer,
     PointageSerializer, StatistiquesEmployeSerializer, StatistiquesGlobalesSerializer,
-    EmployeeStatsCalculatedSerializer, GlobalStatsCalculatedSerializer
+    EmployeeStatsCalculatedSerializer, GlobalStatsCalculatedSerializer, RapportJobSerializer
 )
 from .permissions import IsOwnerOrAdminForWrite, IsAuthenticatedCRUD, IsOwnerOrReadOnlyForSelf
+from .parsers import CSVTextParser
+from .lecture_rapide import PlanLecture, encoder_json
+from .utils import parse_date
+from .pagination import (
+    PointagePagination, EmployePagination,
+    StatistiquesEmployePagination, StatistiquesGlobalesPagination, ClassementPagination
+)
 
 # Import de StatisticsService
 from .services.statistics_service import StatisticsService
+from .services.stats_cache import StatsCache
+from .services.pointage_import_service import PointageImportService, ImportPointagesError
+from .services.employe_import_service import EmployeImportService, ImportEmployesError
+from .services.export_service import ExportService, FORMATS as FORMATS_EXPORT
+from .services.pdf_service import PdfService, REPORTLAB_AVAILABLE
+from .services.rapport_service import RapportService
+from .services.tendance_service import TendanceService
+from .services.classement_service import ClassementService
+from .services.archive_service import ArchiveService
+from .services.acces_service import AccesService
+from .services.statistics_async_service import StatisticsAsyncService
+from .services.presence_live_service import PresenceLiveService, EPOQUE as EPOQUE_PRESENCES
+from .services.recherche_service import RechercheService, LIMITE_PAR_DEFAUT as LIMITE_RECHERCHE
 
 logger = logging.getLogger(__name__)
 
-def parse_date(date_str):
-    """Parse une date depuis une chaîne"""
-    if not date_str:
-        return None
-    try:
-        if isinstance(date_str, str):
-            for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
-                try:
-                    return datetime.strptime(date_str, fmt).date()
-                except ValueError:
-                    continue
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-        return date_str
-    except Exception:
-        return None
+def date_reference_statistiques(valeur):
+    """Date de référence des statistiques (YYYY-MM ou YYYY-MM-DD); aujourd'hui si absente ou invalide"""
+    if valeur:
+        try:
+            if len(valeur) == 7 and '-' in valeur:
+                return datetime.strptime(valeur + '-01', '%Y-%m-%d').date()
+            return datetime.strptime(valeur, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return timezone.now().date()
+
+
+class ChampsDynamiquesViewMixin:
+    """Paramètre ?fields=a,b: restreint la sortie du serializer et les colonnes SQL (only())
+    
+    Le serializer doit utiliser ChampsDynamiquesMixin.
+    """
+    fields_query_param = 'fields'
+    
+    def get_champs_demandes(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return None
+        valeur = request.query_params.get(self.fields_query_param)
+        if not valeur:
+            return None
+        return [champ.strip() for champ in valeur.split(',') if champ.strip()] or None
+    
+    def get_serializer(self, *args, **kwargs):
+        champs = self.get_champs_demandes()
+        if champs:
+            kwargs.setdefault('fields', champs)
+        return super().get_serializer(*args, **kwargs)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        champs = self.get_champs_demandes()
+        if champs:
+            colonnes, relations = self._colonnes_sql(queryset.model, champs)
+            if colonnes is not None:
+                queryset = queryset.select_related(None).select_related(*relations).only(*colonnes)
+        return queryset
+    
+    def _colonnes_sql(self, model, champs):
+        """Colonnes et relations (select_related) nécessaires aux champs demandés"""
+        serializer_class = self.get_serializer_class()
+        champs_serializer = serializer_class().fields
+        # Colonnes des champs calculés: celles déclarées pour la lecture rapide
+        sources_sql = {
+            nom: list(calcule.colonnes) for nom, calcule in getattr(serializer_class, 'lecture_rapide', {}).items()
+        }
+        
+        colonnes = {model._meta.pk.name}
+        relations = set()
+        relations_completes = set()
+        
+        for nom in champs:
+            field = champs_serializer.get(nom)
+            if nom in sources_sql:
+                chemins = sources_sql[nom]
+            elif field is None:
+                continue
+            elif field.source == '*':
+                # Champ calculé sans dépendances déclarées: pas de restriction possible
+                return None, None
+            else:
+                chemins = ['__'.join(field.source_attrs)]
+            
+            for chemin in chemins:
+                colonne, relations_chemin, complete = self._resoudre_chemin(model, chemin)
+                if colonne is None:
+                    return None, None
+                colonnes.add(colonne)
+                relations.update(relations_chemin)
+                if complete or isinstance(field, BaseSerializer):
+                    relations_completes.add(colonne)
+                    relations.add(colonne)
+        
+        # Une relation sérialisée entièrement ne doit pas être restreinte à quelques colonnes
+        colonnes = {
+            c for c in colonnes
+            if not any(c.startswith(f'{relation}__') for relation in relations_completes)
+        }
+        return sorted(colonnes), sorted(relations)
+    
+    @staticmethod
+    def _resoudre_chemin(model, chemin):
+        """Résout 'employe__nom' en (colonne, relations traversées, relation entière requise)"""
+        parties = chemin.split('__')
+        chemin_resolu = []
+        relations = []
+        modele_courant = model
+        
+        for index, partie in enumerate(parties):
+            if partie.startswith('get_') and partie.endswith('_display'):
+                partie = partie[len('get_'):-len('_display')]
+            try:
+                field = modele_courant._meta.get_field(partie)
+            except FieldDoesNotExist:
+                # Propriété ou méthode: il faut l'objet lié entier
+                if not chemin_resolu:
+                    return None, [], False
+                return '__'.join(chemin_resolu), relations, True
+            
+            chemin_resolu.append(partie)
+            derniere = index == len(parties) - 1
+            if field.is_relation and (field.many_to_one or field.one_to_one) and not derniere:
+                relations.append('__'.join(chemin_resolu))
+                modele_courant = field.related_model
+                continue
+            if field.is_relation and not (field.many_to_one or field.one_to_one):
+                return None, [], False
+            break
+        
+        return '__'.join(chemin_resolu), relations, False
+
+
+class ListeRapideMixin:
+    """list() sans la sérialisation champ par champ pour les réponses JSON.
+    
+    Les lignes sont lues par values() (colonnes du PlanLecture du serializer),
+    paginées comme d'habitude, formatées par le plan puis encodées directement
+    (orjson si disponible). Même sortie que le serializer, ?fields= compris;
+    l'API navigable et les autres formats passent par le chemin DRF.
+    À placer avant ChampsDynamiquesViewMixin.
+    """
+    
+    def list(self, request, *args, **kwargs):
+        if not (
+            getattr(settings, 'LECTURE_RAPIDE_ENABLED', True)
+            and isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer)
+        ):
+            return super().list(request, *args, **kwargs)
+        
+        plan = PlanLecture.pour(self.get_serializer_class(), self.get_champs_demandes())
+        queryset = self.filter_queryset(self.get_queryset())
+        colonnes = set(plan.colonnes)
+        
+        if self.paginator is None:
+            contenu = plan.formater(queryset.values(*colonnes))
+        else:
+            # Colonnes du tri: position du curseur
+            colonnes.update(champ.lstrip('-') for champ in self.paginator.get_ordering(request, queryset, self))
+            lignes = self.paginate_queryset(queryset.values(*colonnes))
+            contenu = self.paginator.get_paginated_response(plan.formater(lignes)).data
+        return HttpResponse(encoder_json(contenu), content_type='application/json')
+
 
 class CurrentUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -86,18 +235,21 @@ class DepartementViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
-class EmployeViewSet(viewsets.ModelViewSet):
-    queryset = Employe.objects.select_related('departement').all()
+class EmployeViewSet(ListeRapideMixin, ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
+    queryset = Employe.objects.select_related('departement', 'created_by').all()
     serializer_class = EmployeSerializer
     permission_classes = [IsAuthenticatedCRUD]
+    pagination_class = EmployePagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
+    # ?search=: icontains servi par les index trigrammes sous PostgreSQL (migration 0009); typeahead: action recherche
     search_fields = ['nom', 'prenom', 'email', 'cin', 'matricule', 'poste']
     filterset_fields = ['departement', 'statut', 'titre']
     ordering_fields = ['nom', 'prenom', 'cin']
-    ordering = ['nom', 'prenom']
+    ordering = ['nom', 'prenom', 'cin']
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # Employés de la portée de l'utilisateur (tous pour un superutilisateur)
+        queryset = AccesService.portee(self.request.user).filtrer_employes(super().get_queryset())
         
         # Filtrer par type d'employé si spécifié
         employe_type = self.request.query_params.get('type')
@@ -112,6 +264,31 @@ class EmployeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(
+        detail=False, methods=['post'], url_path='bulk',
+        parser_classes=[JSONParser, CSVTextParser, MultiPartParser]
+    )
+    def bulk(self, request):
+        """Import en masse: liste JSON, corps text/csv ou fichier CSV (champ 'fichier')"""
+        try:
+            if isinstance(request.data, str):
+                lignes = EmployeImportService.lire_csv(request.data)
+            elif 'fichier' in request.FILES:
+                lignes = EmployeImportService.lire_csv(request.FILES['fichier'].read())
+            else:
+                lignes = EmployeImportService.lire_donnees(request.data)
+            resultat = EmployeImportService.importer(lignes, request.user)
+        except (ImportEmployesError, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if resultat['total'] and resultat['erreurs'] == resultat['total']:
+            code = status.HTTP_400_BAD_REQUEST
+        elif resultat['crees']:
+            code = status.HTTP_201_CREATED
+        else:
+            code = status.HTTP_200_OK
+        return Response(resultat, status=code)
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         total_employes = Employe.objects.count()
@@ -132,15 +309,37 @@ class EmployeViewSet(viewsets.ModelViewSet):
             'pourcentage_employes_fixes': round((employes_fixes_actifs / total_employes * 100) if total_employes > 0 else 0, 2)
         })
 
-class PointageViewSet(viewsets.ModelViewSet):
-    queryset = Pointage.objects.select_related('employe').all()
+    @action(detail=False, methods=['get'])
+    def recherche(self, request):
+        """Recherche instantanée (typeahead): ?q=<début des mots>&limite=<1-50>, résultats classés"""
+        terme = request.query_params.get('q', '').strip()
+        try:
+            limite = int(request.query_params.get('limite', LIMITE_RECHERCHE))
+        except ValueError:
+            return Response({"error": "limite doit être un entier"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'q': terme,
+            'moteur': RechercheService.moteur(),
+            # Mêmes employés que la liste: portée de l'utilisateur
+            'resultats': RechercheService.employes(terme, limite, AccesService.portee(request.user)) if terme else [],
+        })
+
+class PointageViewSet(ListeRapideMixin, ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
+    queryset = Pointage.objects.select_related('employe', 'created_by').all()
     serializer_class = PointageSerializer
     permission_classes = [IsAuthenticatedCRUD]
+    pagination_class = PointagePagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
+    # Index trigrammes sous PostgreSQL sur les colonnes de l'employé et la remarque (migration 0009)
     search_fields = ['employe__nom', 'employe__prenom', 'remarque']
     filterset_fields = ['date_pointage', 'employe']
-    ordering_fields = ['date_pointage', 'heure_entree']
-    ordering = ['-date_pointage', 'heure_entree']
+    ordering_fields = ['date_pointage', 'heure_entree', 'id_pointage']
+    ordering = ['-date_pointage', 'id_pointage']
+
+    def get_queryset(self):
+        # Pointages des employés de la portée de l'utilisateur
+        return AccesService.portee(self.request.user).filtrer_employes(super().get_queryset(), 'employe__')
 
     def create(self, request, *args, **kwargs):
         employe_cin = request.data.get('employe')
@@ -154,7 +353,7 @@ class PointageViewSet(viewsets.ModelViewSet):
                     )
                 
                 # Vérifier que l'utilisateur peut pointer pour cet employé
-                if not (request.user.is_superuser or employe.created_by == request.user):
+                if not AccesService.portee(request.user).peut_pointer(employe.cin):
                     return Response(
                         {"error": "Vous ne pouvez pointer que pour vos propres employés."},
                         status=status.HTTP_403_FORBIDDEN
@@ -171,10 +370,57 @@ class PointageViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(
+        detail=False, methods=['post'], url_path='bulk',
+        parser_classes=[JSONParser, CSVTextParser, MultiPartParser]
+    )
+    def bulk(self, request):
+        """Import en masse: liste JSON, corps text/csv ou fichier CSV (champ 'fichier').
+        
+        ?upsert=true met à jour le pointage existant du même employé à la même date.
+        """
+        upsert = request.query_params.get('upsert', '').lower() in ('1', 'true', 'oui')
+        try:
+            if isinstance(request.data, str):
+                lignes = PointageImportService.lire_csv(request.data)
+            elif 'fichier' in request.FILES:
+                lignes = PointageImportService.lire_csv(request.FILES['fichier'].read())
+            else:
+                lignes = PointageImportService.lire_donnees(request.data)
+            resultat = PointageImportService.importer(lignes, request.user, upsert=upsert)
+        except (ImportPointagesError, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if resultat['total'] and resultat['erreurs'] == resultat['total']:
+            code = status.HTTP_400_BAD_REQUEST
+        elif resultat['crees']:
+            code = status.HTTP_201_CREATED
+        else:
+            code = status.HTTP_200_OK
+        return Response(resultat, status=code)
+
     @action(detail=False, methods=['get'])
     def stats_mensuelles(self, request):
-        mois = int(request.query_params.get('mois', datetime.now().month))
-        annee = int(request.query_params.get('annee', datetime.now().year))
+        try:
+            mois = int(request.query_params.get('mois', datetime.now().month))
+            annee = int(request.query_params.get('annee', datetime.now().year))
+            date(annee, mois, 1)
+        except ValueError:
+            return Response(
+                {"error": "mois (1-12) et annee doivent être des entiers valides"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if ArchiveService.est_archivee(annee):
+            premier = date(annee, mois, 1)
+            nombre, secondes = ArchiveService.totaux(
+                annee, premier, (premier + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            )
+            return Response({
+                'mois': mois,
+                'annee': annee,
+                'total_heures': secondes / 3600,
+                'nombre_pointages': nombre
+            })
         pointages = Pointage.objects.filter(
             date_pointage__year=annee,
             date_pointage__month=mois,
@@ -188,64 +434,156 @@ class PointageViewSet(viewsets.ModelViewSet):
             'nombre_pointages': pointages.count()
         })
 
-class StatistiquesEmployeViewSet(viewsets.ReadOnlyModelViewSet):
+# -----------------------
+# GET conditionnels (ETag / Last-Modified) des statistiques
+# -----------------------
+def complements_requete(request):
+    """Ce qui distingue deux représentations des mêmes données: chemin, paramètres, type de média"""
+    return (
+        request.path,
+        sorted((cle, sorted(valeurs)) for cle, valeurs in request.GET.lists()),
+        getattr(request, 'accepted_media_type', None) or 'application/json',
+    )
+
+
+def validateur_statistiques_employe(request, cin):
+    type_periode, _, _, fin, reference = StatisticsAsyncService.periode_employe(
+        request.GET.get('periode', 'mois'), date_reference_statistiques(request.GET.get('date'))
+    )
+    portees = (
+        StatsCache.portees_employe_hebdo(cin, reference) if type_periode == 'semaine'
+        else StatsCache.portees_employe_mensuel(cin, reference)
+    )
+    return StatsCache.validateur(portees, *complements_requete(request), fin=fin)
+
+
+def validateur_statistiques_globales(request):
+    mois = date_reference_statistiques(request.GET.get('mois')).replace(day=1)
+    fin = (mois + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return StatsCache.validateur(StatsCache.portees_global_mensuel(mois), *complements_requete(request), fin=fin)
+
+
+def appliquer_validateur(response, validateur):
+    """ETag, Last-Modified et Cache-Control sur une réponse 200 ou 304"""
+    if validateur is None or response.status_code not in (200, 304):
+        return response
+    response['ETag'] = validateur.etag
+    if validateur.last_modified is not None:
+        response['Last-Modified'] = http_date(validateur.last_modified)
+    if validateur.max_age is None:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, private=True, max_age=validateur.max_age)
+    return response
+
+
+def reponse_non_modifiee(request, validateur):
+    """304 si la copie du client (If-None-Match, If-Modified-Since) est à jour, sinon None"""
+    response = get_conditional_response(request, etag=validateur.etag, last_modified=validateur.last_modified)
+    return appliquer_validateur(response, validateur) if response is not None else None
+
+
+class ReponseConditionnelleMixin:
+    """``conditionnel`` répond 304 avant tout calcul; les réponses 200 reçoivent les mêmes validateurs"""
+    validateur_http = None
+    
+    def conditionnel(self, request, validateur):
+        self.validateur_http = validateur
+        return reponse_non_modifiee(request, validateur)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return appliquer_validateur(response, self.validateur_http)
+
+
+class LectureConditionnelleMixin(ReponseConditionnelleMixin):
+    """list/retrieve conditionnels pour les données versionnées par ``portees_http`` (StatsCache)"""
+    portees_http = ()
+    
+    def validateur_lecture(self, request):
+        return StatsCache.validateur(self.portees_http, *complements_requete(request))
+    
+    def list(self, request, *args, **kwargs):
+        validateur = self.validateur_lecture(request)
+        return self.conditionnel(request, validateur) or super().list(request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        validateur = self.validateur_lecture(request)
+        return self.conditionnel(request, validateur) or super().retrieve(request, *args, **kwargs)
+
+
+class StatistiquesEmployeViewSet(LectureConditionnelleMixin, ListeRapideMixin, ChampsDynamiquesViewMixin, viewsets.ReadOnlyModelViewSet):
     """Vue pour les statistiques employés sauvegardées"""
-    queryset = StatistiquesEmploye.objects.select_related('employe', 'created_by').all()
+    # Lignes enregistrées, fiches employés et départements affichés avec elles
+    portees_http = ("epoque", "global", "stockees:employe")
+    queryset = StatistiquesEmploye.objects.select_related('employe__departement', 'created_by').all()
     serializer_class = StatistiquesEmployeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StatistiquesEmployePagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     search_fields = ['employe__nom', 'employe__prenom', 'employe__cin']
     filterset_fields = ['employe', 'type_periode', 'periode_debut', 'periode_fin']
-    ordering_fields = ['periode_debut', 'date_calcul']
-    ordering = ['-periode_debut', '-date_calcul']
+    ordering_fields = ['periode_debut', 'date_calcul', 'id']
+    ordering = ['-periode_debut', '-id']
+    
+    def get_queryset(self):
+        # Statistiques des employés de la portée de l'utilisateur
+        return AccesService.portee(self.request.user).filtrer_employes(super().get_queryset(), 'employe__')
+    
+    def validateur_lecture(self, request):
+        # Lignes limitées à la portée: la représentation dépend aussi de l'utilisateur et de sa portée
+        portee = AccesService.portee(request.user)
+        complements = complements_requete(request)
+        if not portee.tout:
+            complements = (*complements, portee.cle())
+        return StatsCache.validateur(self.portees_http, *complements)
 
-class StatistiquesGlobalesViewSet(viewsets.ReadOnlyModelViewSet):
+class StatistiquesGlobalesViewSet(LectureConditionnelleMixin, ListeRapideMixin, ChampsDynamiquesViewMixin, viewsets.ReadOnlyModelViewSet):
     """Vue pour les statistiques globales sauvegardées"""
+    portees_http = ("epoque", "stockees:globales")
     queryset = StatistiquesGlobales.objects.all()
     serializer_class = StatistiquesGlobalesSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StatistiquesGlobalesPagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['type_periode', 'periode']
     ordering_fields = ['periode', 'date_calcul']
-    ordering = ['-periode', '-date_calcul']
+    ordering = ['-periode']
 
-class EmployeeStatisticsAPIView(APIView):
+class EmployeeStatisticsAPIView(ReponseConditionnelleMixin, APIView):
     """API pour les statistiques employés calculées en temps réel avec nouveau système"""
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, cin=None):
         try:
-            if cin:
-                employe = Employe.objects.get(cin=cin)
-            else:
+            if not cin:
                 cin = request.GET.get('cin')
                 if not cin:
                     return Response(
                         {"error": "CIN requis"}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
-                employe = Employe.objects.get(cin=cin)
+            
+            # Copie du client à jour: 304 sans charger l'employé ni calculer (hors enregistrement demandé)
+            if (
+                request.GET.get('save', 'false').lower() != 'true'
+                and AccesService.portee(request.user).peut_lire_employe(cin)
+            ):
+                non_modifiee = self.conditionnel(request, validateur_statistiques_employe(request, cin))
+                if non_modifiee is not None:
+                    return non_modifiee
+            
+            employe = Employe.objects.get(cin=cin)
             
             # Vérifier que l'utilisateur a accès à ces statistiques
-            if not (request.user.is_superuser or employe.created_by == request.user):
+            if not AccesService.portee(request.user).peut_lire_employe(employe.cin):
                 return Response(
                     {"error": "Vous n'avez pas accès aux statistiques de cet employé."},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
             periode_type = request.GET.get('periode', 'mois')
-            date_reference_str = request.GET.get('date')
-            
-            if date_reference_str:
-                try:
-                    if len(date_reference_str) == 7 and '-' in date_reference_str:
-                        date_reference = datetime.strptime(date_reference_str + '-01', '%Y-%m-%d').date()
-                    else:
-                        date_reference = datetime.strptime(date_reference_str, '%Y-%m-%d').date()
-                except ValueError as e:
-                    date_reference = timezone.now().date()
-            else:
-                date_reference = timezone.now().date()
+            date_reference = date_reference_statistiques(request.GET.get('date'))
             
             if periode_type == 'semaine':
                 stats = StatisticsService.calculate_employee_weekly_stats(employe, date_reference)
@@ -273,25 +611,18 @@ class EmployeeStatisticsAPIView(APIView):
 
 # views.py - Partie GlobalStatisticsAPIView
 # views.py - Partie GlobalStatisticsAPIView
-class GlobalStatisticsAPIView(APIView):
+class GlobalStatisticsAPIView(ReponseConditionnelleMixin, APIView):
     """API pour les statistiques globales calculées en temps réel"""
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
         try:
-            periode_type = request.GET.get('periode', 'mensuel')
-            mois_str = request.GET.get('mois')
+            non_modifiee = self.conditionnel(request, validateur_statistiques_globales(request))
+            if non_modifiee is not None:
+                return non_modifiee
             
-            if mois_str:
-                try:
-                    if len(mois_str) == 7 and '-' in mois_str:
-                        mois = datetime.strptime(mois_str + '-01', '%Y-%m-%d').date()
-                    else:
-                        mois = datetime.strptime(mois_str, '%Y-%m-%d').date().replace(day=1)
-                except ValueError as e:
-                    mois = timezone.now().date().replace(day=1)
-            else:
-                mois = timezone.now().date().replace(day=1)
+            periode_type = request.GET.get('periode', 'mensuel')
+            mois = date_reference_statistiques(request.GET.get('mois')).replace(day=1)
             
             if periode_type == 'mensuel':
                 stats = StatisticsService.calculate_global_monthly_stats(mois)
@@ -320,6 +651,269 @@ class GlobalStatisticsAPIView(APIView):
             )
 
 
+class StatistiquesCacheAPIView(APIView):
+    """Compteurs du cache des statistiques (hits, misses, invalidations) pour le dimensionnement"""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response(StatsCache.compteurs())
+    
+    def delete(self, request):
+        StatsCache.reinitialiser_compteurs()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ClassementAPIView(APIView):
+    """Classement des employés d'un département (ou de l'entreprise) sur une période.
+    
+    Paramètres: critere=heures|taux_parfait|absences, departement, statut,
+    mois=YYYY-MM (défaut: mois courant) ou debut/fin, page_size, cursor.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        params = request.query_params
+        mois = params.get('mois')
+        if params.get('debut') or params.get('fin'):
+            debut = parse_date(params.get('debut'))
+            fin = parse_date(params.get('fin'))
+        elif mois:
+            try:
+                debut = datetime.strptime(mois, '%Y-%m').date()
+            except ValueError:
+                debut = None
+            fin = (debut + timedelta(days=32)).replace(day=1) - timedelta(days=1) if debut else None
+        else:
+            debut = timezone.now().date().replace(day=1)
+            fin = timezone.now().date()
+        if not debut or not fin or fin < debut:
+            return Response(
+                {"error": "Période invalide (mois=YYYY-MM ou debut/fin=YYYY-MM-DD)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        critere = params.get('critere', 'heures')
+        try:
+            lignes = ClassementService.classement(
+                debut, fin, critere,
+                departement=params.get('departement'),
+                statut=params.get('statut'),
+                # Les non-administrateurs ne classent que leurs propres employés
+                portee=AccesService.portee(request.user),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        paginator = ClassementPagination()
+        page = paginator.paginate_queryset(lignes, request, view=self)
+        response = paginator.get_paginated_response([ClassementService.formater(ligne) for ligne in page])
+        response.data.update({
+            'critere': critere,
+            'periode': {'debut': debut.isoformat(), 'fin': fin.isoformat()},
+            'departement': params.get('departement'),
+        })
+        return response
+
+
+class ExportDonneesAPIView(APIView):
+    """Export en flux (CSV ou NDJSON) des pointages et statistiques.
+    
+    Ressources: pointages, statistiques-employe, statistiques-mensuelles.
+    Paramètres: output=csv|ndjson, debut, fin, departement, statut (employé),
+    type_periode (statistiques-employe).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    TYPES_CONTENU = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+    
+    def get(self, request, ressource):
+        format_sortie = request.query_params.get('output', 'csv').lower()
+        if format_sortie not in FORMATS_EXPORT:
+            return Response(
+                {"error": f"Format non supporté: {format_sortie} (csv ou ndjson)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        debut = parse_date(request.query_params.get('debut'))
+        fin = parse_date(request.query_params.get('fin'))
+        filtres = {
+            'departement': request.query_params.get('departement'),
+            'statut': request.query_params.get('statut'),
+            # Employés de la portée de l'utilisateur (tous pour un superutilisateur)
+            'portee': AccesService.portee(request.user),
+        }
+        
+        if ressource == 'pointages':
+            colonnes = ExportService.COLONNES_POINTAGES
+            lignes = ExportService.lignes_pointages(debut, fin, **filtres)
+        elif ressource == 'statistiques-employe':
+            colonnes = ExportService.COLONNES_STATISTIQUES_EMPLOYE
+            lignes = ExportService.lignes_statistiques_employe(
+                debut, fin, type_periode=request.query_params.get('type_periode'), **filtres
+            )
+        elif ressource == 'statistiques-mensuelles':
+            today = timezone.now().date()
+            debut = debut or today.replace(day=1)
+            fin = fin or today
+            if fin < debut:
+                return Response(
+                    {"error": "La date de fin doit être postérieure à la date de début"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            colonnes = ExportService.COLONNES_STATS_MENSUELLES
+            lignes = ExportService.lignes_stats_mensuelles(debut, fin, **filtres)
+        else:
+            return Response(
+                {"error": f"Ressource inconnue: {ressource}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response = StreamingHttpResponse(
+            ExportService.flux(colonnes, lignes, format_sortie),
+            content_type=self.TYPES_CONTENU[format_sortie]
+        )
+        nom_fichier = f"{ressource}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{format_sortie}"
+        response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+        return response
+
+
+def _portee_presences(utilisateur):
+    """Portée appliquée aux présences (None: toutes)"""
+    portee = AccesService.portee(utilisateur)
+    return None if portee.tout else portee
+
+
+class PresencesInstantaneAPIView(APIView):
+    """Présences du jour par département (index en mémoire, sans lecture de la table des pointages).
+    
+    Paramètre: departement. Le flux /api/presences/flux/ envoie ensuite les changements.
+    Limité aux employés de la portée de l'utilisateur.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        PresenceLiveService.synchroniser()
+        return Response(PresenceLiveService.instantane(
+            request.query_params.get('departement') or None, _portee_presences(request.user)
+        ))
+
+
+class AuthentificationJWTAsyncMixin:
+    """Authentification JWT des vues Django asynchrones (hors DRF)"""
+    # Accepte aussi le jeton en paramètre access_token (clients qui ne peuvent pas envoyer d'en-tête)
+    jeton_en_parametre = False
+    
+    def _authentifier(self, request):
+        from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+        from .authentication import JWTClaimsAuthentication
+        
+        authentification = JWTClaimsAuthentication()
+        try:
+            resultat = authentification.authenticate(request)
+            if resultat is None and self.jeton_en_parametre and request.GET.get('access_token'):
+                jeton = authentification.get_validated_token(request.GET['access_token'])
+                return authentification.get_user(jeton)
+            return resultat[0] if resultat else None
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            return None
+    
+    async def utilisateur(self, request):
+        """Utilisateur actif authentifié ou None"""
+        utilisateur = await sync_to_async(self._authentifier)(request)
+        if utilisateur is None or not utilisateur.is_active:
+            return None
+        return utilisateur
+
+
+class PresencesFluxView(AuthentificationJWTAsyncMixin, View):
+    """Flux Server-Sent Events des présences du jour (à servir en ASGI).
+    
+    Événements: 'instantane' (état complet, à l'ouverture ou après un retard du
+    client) puis 'delta' (entree, sortie, modification, retrait). L'en-tête
+    Last-Event-ID permet de reprendre sans instantané si l'historique le permet.
+    Authentification: en-tête Authorization ou paramètre access_token
+    (EventSource ne peut pas envoyer d'en-tête). Paramètre: departement.
+    Limité aux employés de la portée de l'utilisateur à l'ouverture du flux.
+    """
+    HEARTBEAT_SECONDES = 15
+    jeton_en_parametre = True
+    
+    @staticmethod
+    def _evenement(nom, donnees, identifiant=None):
+        lignes = f"id: {identifiant}\n" if identifiant else ""
+        return f"{lignes}event: {nom}\ndata: {json.dumps(donnees, default=str)}\n\n"
+    
+    @staticmethod
+    def _derniere_sequence(request):
+        """Séquence de Last-Event-ID si elle a été émise par ce processus"""
+        epoque, _, sequence = request.headers.get('Last-Event-ID', '').partition(':')
+        if epoque == EPOQUE_PRESENCES and sequence.isdigit():
+            return int(sequence)
+        return None
+    
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # En WSGI un flux asynchrone infini serait lu en entier avant d'être envoyé
+            return JsonResponse(
+                {"error": "Flux disponible uniquement en ASGI; utiliser /api/presences/ en WSGI"},
+                status=501
+            )
+        utilisateur = await self.utilisateur(request)
+        if utilisateur is None:
+            return JsonResponse({"error": "Authentification requise"}, status=401)
+        
+        portee = await sync_to_async(_portee_presences)(utilisateur)
+        departement = request.GET.get('departement') or None
+        derniere_sequence = self._derniere_sequence(request)
+        heartbeat = getattr(settings, 'PRESENCE_LIVE_HEARTBEAT_SECONDES', self.HEARTBEAT_SECONDES)
+        
+        async def flux():
+            abonne = PresenceLiveService.abonner(departement, portee)
+            try:
+                await sync_to_async(PresenceLiveService.synchroniser)()
+                evenements = None
+                if derniere_sequence is not None:
+                    evenements = PresenceLiveService.depuis(derniere_sequence, departement, portee)
+                if evenements is None:
+                    instantane = await sync_to_async(PresenceLiveService.instantane)(departement, portee)
+                    derniere = instantane['sequence']
+                    yield self._evenement('instantane', instantane, f"{EPOQUE_PRESENCES}:{derniere}")
+                else:
+                    derniere = derniere_sequence
+                    for evenement in evenements:
+                        derniere = evenement['sequence']
+                        yield self._evenement('delta', evenement, f"{EPOQUE_PRESENCES}:{derniere}")
+                
+                while True:
+                    try:
+                        evenement = await asyncio.wait_for(abonne.file.get(), timeout=heartbeat)
+                    except asyncio.TimeoutError:
+                        # Rattrape les écritures des autres processus; garde la connexion ouverte
+                        await sync_to_async(PresenceLiveService.synchroniser)()
+                        if abonne.file.empty():
+                            yield ": ping\n\n"
+                        continue
+                    
+                    if abonne.deborde or evenement['type'] == 'instantane':
+                        abonne.deborde = False
+                        while not abonne.file.empty():
+                            abonne.file.get_nowait()
+                        instantane = await sync_to_async(PresenceLiveService.instantane)(departement, portee)
+                        derniere = instantane['sequence']
+                        yield self._evenement('instantane', instantane, f"{EPOQUE_PRESENCES}:{derniere}")
+                    elif evenement['sequence'] > derniere:
+                        # Déjà inclus dans l'instantané ou l'historique sinon
+                        derniere = evenement['sequence']
+                        yield self._evenement('delta', evenement, f"{EPOQUE_PRESENCES}:{derniere}")
+            finally:
+                PresenceLiveService.desabonner(abonne)
+        
+        response = StreamingHttpResponse(flux(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Désactive la mise en tampon des proxys (nginx)
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class EmployeePonctualiteAnalysisAPIView(APIView):
     """Analyse détaillée de la ponctualité d'un employé avec nouveau système"""
     permission_classes = [permissions.IsAuthenticated]
@@ -337,7 +931,7 @@ class EmployeePonctualiteAnalysisAPIView(APIView):
             employe = Employe.objects.get(cin=cin)
             
             # Vérifier que l'utilisateur a accès
-            if not (request.user.is_superuser or employe.created_by == request.user):
+            if not AccesService.portee(request.user).peut_lire_employe(employe.cin):
                 return Response(
                     {"error": "Vous n'avez pas accès à l'analyse de cet employé."},
                     status=status.HTTP_403_FORBIDDEN
@@ -417,8 +1011,10 @@ class EmployeePonctualiteAnalysisAPIView(APIView):
             return "Ponctualité problématique, fréquents retards et départs anticipés."
 
 class EmployeeHeuresComparisonAPIView(APIView):
-    """Comparaison des heures travaillées sur plusieurs mois"""
+    """Comparaison des heures travaillées sur plusieurs mois (?months=N, 24 au plus)"""
     permission_classes = [permissions.IsAuthenticated]
+    MOIS_PAR_DEFAUT = 3
+    MOIS_MAX = 24
     
     def get(self, request, cin=None):
         try:
@@ -433,17 +1029,25 @@ class EmployeeHeuresComparisonAPIView(APIView):
             employe = Employe.objects.get(cin=cin)
             
             # Vérifier que l'utilisateur a accès
-            if not (request.user.is_superuser or employe.created_by == request.user):
+            if not AccesService.portee(request.user).peut_lire_employe(employe.cin):
                 return Response(
                     {"error": "Vous n'avez pas accès aux données de cet employé."},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            periode_type = request.GET.get('periode', 'mois')
             date_reference_str = request.GET.get('date')
+            try:
+                nb_mois = int(request.GET.get('months') or self.MOIS_PAR_DEFAUT)
+            except ValueError:
+                nb_mois = 0
+            if not 1 <= nb_mois <= self.MOIS_MAX:
+                return Response(
+                    {"error": f"months doit être un entier entre 1 et {self.MOIS_MAX}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
-            # Générer les comparaisons sur les 3 derniers mois
-            comparison_data = self._generate_comparison_data(employe, date_reference_str)
+            # Comparaison des N derniers mois calendaires
+            comparison_data = self._generate_comparison_data(employe, date_reference_str, nb_mois)
             
             return Response(comparison_data)
             
@@ -459,8 +1063,8 @@ class EmployeeHeuresComparisonAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _generate_comparison_data(self, employe, date_reference_str):
-        """Génère des données de comparaison pour les 3 derniers mois"""
+    def _generate_comparison_data(self, employe, date_reference_str, nb_mois=MOIS_PAR_DEFAUT):
+        """Génère des données de comparaison pour les N derniers mois (une requête)"""
         
         if date_reference_str:
             try:
@@ -472,41 +1076,31 @@ class EmployeeHeuresComparisonAPIView(APIView):
         
         mois_comparaison = []
         
-        # Analyser les 3 derniers mois
-        for i in range(3):
-            mois_date = current_date - timedelta(days=30*i)
-            mois_date = mois_date.replace(day=1)
+        for mois_date, stats in StatisticsService.calculate_employee_monthly_stats_window(
+            employe, current_date, nb_mois
+        ):
+            # Récupérer les métriques de ponctualité
+            ponctualite_parfaite = stats.get('ponctualite_parfaite', 0)
+            ponctualite_acceptable = stats.get('ponctualite_acceptable', 0)
+            ponctualite_inacceptable = stats.get('ponctualite_inacceptable', 0)
+            regularite_statut = stats.get('regularite_statut', 'acceptable')
             
-            try:
-                # Calculer les stats pour ce mois
-                stats = StatisticsService.calculate_employee_monthly_stats(employe, mois_date)
-                
-                # Récupérer les métriques de ponctualité
-                ponctualite_parfaite = stats.get('ponctualite_parfaite', 0)
-                ponctualite_acceptable = stats.get('ponctualite_acceptable', 0)
-                ponctualite_inacceptable = stats.get('ponctualite_inacceptable', 0)
-                regularite_statut = stats.get('regularite_statut', 'acceptable')
-                
-                total_jours = ponctualite_parfaite + ponctualite_acceptable + ponctualite_inacceptable
-                taux_parfait = (ponctualite_parfaite / total_jours * 100) if total_jours > 0 else 0
-                
-                mois_comparaison.append({
-                    'mois': mois_date.strftime('%b %Y'),
-                    'date_reference': mois_date.strftime('%Y-%m'),
-                    'heures_travaillees': str(stats.get('heures_travail_total', timedelta())),
-                    'jours_travailles': stats.get('jours_travailles', 0),
-                    'jours_absents': stats.get('jours_absents', 0),
-                    'ponctualite_parfaite': ponctualite_parfaite,
-                    'ponctualite_acceptable': ponctualite_acceptable,
-                    'ponctualite_inacceptable': ponctualite_inacceptable,
-                    'regularite_statut': regularite_statut,
-                    'taux_parfait': round(taux_parfait, 1),
-                    'taux_absence': stats.get('taux_absence', 0)
-                })
-                
-            except Exception as e:
-                logger.warning(f"Erreur calcul mois {mois_date}: {str(e)}")
-                continue
+            total_jours = ponctualite_parfaite + ponctualite_acceptable + ponctualite_inacceptable
+            taux_parfait = (ponctualite_parfaite / total_jours * 100) if total_jours > 0 else 0
+            
+            mois_comparaison.append({
+                'mois': mois_date.strftime('%b %Y'),
+                'date_reference': mois_date.strftime('%Y-%m'),
+                'heures_travaillees': str(stats.get('heures_travail_total', timedelta())),
+                'jours_travailles': stats.get('jours_travailles', 0),
+                'jours_absents': stats.get('jours_absents', 0),
+                'ponctualite_parfaite': ponctualite_parfaite,
+                'ponctualite_acceptable': ponctualite_acceptable,
+                'ponctualite_inacceptable': ponctualite_inacceptable,
+                'regularite_statut': regularite_statut,
+                'taux_parfait': round(taux_parfait, 1),
+                'taux_absence': stats.get('taux_absence', 0)
+            })
         
         return {
             'employe': employe.cin,
@@ -533,16 +1127,18 @@ class EmployeeMonthlyTrendsAPIView(APIView):
             employe = Employe.objects.get(cin=cin)
             
             # Vérifier que l'utilisateur a accès
-            if not (request.user.is_superuser or employe.created_by == request.user):
+            if not AccesService.portee(request.user).peut_lire_employe(employe.cin):
                 return Response(
                     {"error": "Vous n'avez pas accès aux tendances de cet employé."},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # Générer des tendances basées sur les données existantes
-            trends_data = self._generate_trends_data(employe)
+            try:
+                nb_mois = TendanceService.nb_mois(request.GET.get('nb_mois'))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
-            return Response(trends_data)
+            return Response(TendanceService.tendances_employe(employe, nb_mois))
             
         except Employe.DoesNotExist:
             return Response(
@@ -555,59 +1151,38 @@ class EmployeeMonthlyTrendsAPIView(APIView):
                 {"error": str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+class DepartementTendancesAPIView(APIView):
+    """Tendances de tous les employés d'un département (du score le plus bas au plus haut)"""
+    permission_classes = [permissions.IsAuthenticated]
     
-    def _generate_trends_data(self, employe):
-        """Génère des données de tendances"""
+    def get(self, request, departement_id):
+        if not Departement.objects.filter(pk=departement_id).exists():
+            return Response(
+                {"error": "Département non trouvé"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            nb_mois = TendanceService.nb_mois(request.GET.get('nb_mois'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Pour l'instant, retourner des données de démonstration
-        # Dans un vrai système, vous analyseriez l'historique des pointages
-        return {
-            'employe': employe.cin,
-            'nom_complet': f"{employe.nom} {employe.prenom}",
-            'type_employe': 'Stagiaire' if employe.titre == 'stagiaire' else 'Employé fixe',
-            'tendances': {
-                'regularite': 'stable',
-                'ponctualite': 'en_amelioration',
-                'productivite': 'stable',
-                'presence': 'constante'
-            },
-            'predictions': {
-                'prochain_mois': {
-                    'heures_estimees': '160h',
-                    'taux_regularite_estime': '85%',
-                    'recommandation': 'Maintenir le rythme actuel'
-                }
-            },
-            'alertes': []
-        }
+        avec_series = request.GET.get('series', '').lower() in ('1', 'true', 'oui')
+        try:
+            # Les non-administrateurs ne voient que leurs propres employés
+            return Response(TendanceService.tendances_departement(
+                departement_id, nb_mois, portee=AccesService.portee(request.user), avec_series=avec_series
+            ))
+        except Exception as e:
+            logger.error(f"Erreur tendances département: {str(e)}")
+            return Response(
+                {"error": str(e)}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
 class ExportStatisticsPDFAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
-    def _normaliser_nom_fichier(self, nom):
-        correspondances = {
-            'à': 'a', 'á': 'a', 'â': 'a', 'ã': 'a', 'ä': 'a',
-            'è': 'e', 'é': 'e', 'ê': 'e', 'ë': 'e',
-            'ì': 'i', 'í': 'i', 'î': 'i', 'ï': 'i',
-            'ò': 'o', 'ó': 'o', 'ô': 'o', 'õ': 'o', 'ö': 'o',
-            'ù': 'u', 'ú': 'u', 'û': 'u', 'ü': 'u',
-            'ç': 'c', 'ñ': 'n',
-            'À': 'A', 'Á': 'A', 'Â': 'A', 'Ã': 'A', 'Ä': 'A',
-            'È': 'E', 'É': 'E', 'Ê': 'E', 'Ë': 'E',
-            'Ì': 'I', 'Í': 'I', 'Î': 'I', 'Ï': 'I',
-            'Ò': 'O', 'Ó': 'O', 'Ô': 'O', 'Õ': 'O', 'Ö': 'O',
-            'Ù': 'U', 'Ú': 'U', 'Û': 'U', 'Ü': 'U',
-            'Ç': 'C', 'Ñ': 'N'
-        }
-        
-        for accent, sans_accent in correspondances.items():
-            nom = nom.replace(accent, sans_accent)
-        
-        nom = re.sub(r'[^\w\s-]', '', nom)
-        nom = re.sub(r'[-\s]+', '_', nom)
-        
-        return nom.strip('_')
-    
     def _export_simple_fallback(self, request, export_type):
         """Fallback simple qui retourne un JSON au lieu d'essayer de générer un PDF"""
         return JsonResponse({
@@ -627,6 +1202,8 @@ class ExportStatisticsPDFAPIView(APIView):
                     return self._export_employee_pdf(request)
                 elif export_type == 'global':
                     return self._export_global_pdf(request)
+                elif export_type == 'departement':
+                    return self._export_departement(request)
                 else:
                     return Response(
                         {"error": "Type d'export non valide"}, 
@@ -652,7 +1229,7 @@ class ExportStatisticsPDFAPIView(APIView):
             employe = Employe.objects.get(cin=cin)
             
             # Vérifier que l'utilisateur a accès
-            if not (request.user.is_superuser or employe.created_by == request.user):
+            if not AccesService.portee(request.user).peut_lire_employe(employe.cin):
                 return Response(
                     {"error": "Vous n'avez pas accès au rapport de cet employé."},
                     status=status.HTTP_403_FORBIDDEN
@@ -679,177 +1256,11 @@ class ExportStatisticsPDFAPIView(APIView):
             logger.error(f"Erreur récupération stats employé: {str(e)}")
             return self._export_simple_fallback(request, 'employe')
         
-        buffer = io.BytesIO()
-        
         try:
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            # Titre principal
-            titre_type = "STAGIAIRE" if employe.titre == 'stagiaire' else "EMPLOYÉ FIXE"
-            title = Paragraph(f"RAPPORT DÉTAILLÉ DES STATISTIQUES - {titre_type}", styles['Title'])
-            elements.append(title)
-            elements.append(Spacer(1, 20))
-            
-            # Informations employé
-            info_style = styles['Normal']
-            info_elements = [
-                Paragraph(f"<b>Nom:</b> {employe.nom} {employe.prenom}", info_style),
-                Paragraph(f"<b>CIN:</b> {employe.cin}", info_style),
-                Paragraph(f"<b>Type:</b> {titre_type}", info_style),
-            ]
-            
-            if employe.titre == 'employe' and employe.matricule:
-                info_elements.append(Paragraph(f"<b>Matricule:</b> {employe.matricule}", info_style))
-            
-            # Horaires attendus
-            heure_entree = employe.heure_entree_attendue or time(8, 0)
-            heure_sortie = employe.heure_sortie_attendue or time(16, 0)
-            marge = employe.marge_tolerance_minutes or 10
-            
-            info_elements.extend([
-                Paragraph(f"<b>Horaires attendus:</b> {heure_entree.strftime('%H:%M')} - {heure_sortie.strftime('%H:%M')}", info_style),
-                Paragraph(f"<b>Marge de tolérance:</b> {marge} minutes", info_style),
-                Paragraph(f"<b>Département:</b> {employe.departement.nom if employe.departement else 'Non assigné'}", info_style),
-                Paragraph(f"<b>Poste:</b> {employe.poste}", info_style),
-                Paragraph(f"<b>Période analysée:</b> {stats.get('periode_debut', 'N/A')} à {stats.get('periode_fin', 'N/A')}", info_style),
-                Paragraph(f"<b>Type de période:</b> {stats.get('type_periode', 'N/A')}", info_style),
-            ])
-            
-            for element in info_elements:
-                elements.append(element)
-            
-            elements.append(Spacer(1, 25))
-            
-            # Section 1: POINTAGES ET ABSENCES
-            section_style = styles['Heading2']
-            elements.append(Paragraph("📊 STATISTIQUES DE POINTAGE ET ABSENCES", section_style))
-            elements.append(Spacer(1, 10))
-            
-            pointage_data = [
-                ['Heures totales travaillées', self._format_duration(stats.get('heures_travail_total'))],
-                ['Jours travaillés', f"{stats.get('jours_travailles', 0)} jours"],
-                ['Jours d\'absence', f"{stats.get('jours_absents', 0)} jours"],
-                ['Moyenne quotidienne', self._format_duration(stats.get('moyenne_heures_quotidiennes'))],
-            ]
-            
-            pointage_table = Table(pointage_data, colWidths=[100*mm, 60*mm])
-            pointage_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0F8FF')),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(pointage_table)
-            elements.append(Spacer(1, 20))
-            
-            # Section 2: PONCTUALITÉ ET RÉGULARITÉ (NOUVELLE SECTION)
-            elements.append(Paragraph("🕒 ANALYSE DE PONCTUALITÉ ET RÉGULARITÉ", section_style))
-            elements.append(Spacer(1, 10))
-            
-            ponctualite_data = [
-                ['Ponctualité parfaite', f"{stats.get('ponctualite_parfaite', 0)} jours"],
-                ['Ponctualité acceptable', f"{stats.get('ponctualite_acceptable', 0)} jours"],
-                ['Ponctualité inacceptable', f"{stats.get('ponctualite_inacceptable', 0)} jours"],
-                ['Retard moyen', f"{stats.get('retard_moyen_minutes', 0):.1f} min"],
-                ['Départ moyen anticipé', f"{stats.get('depart_avance_moyen_minutes', 0):.1f} min"],
-                ['Statut de régularité', f"{stats.get('regularite_statut', 'acceptable').upper()}"],
-                ['Taux de régularité', f"{stats.get('taux_regularite', 0):.1f}%"],
-            ]
-            
-            # Couleurs pour le statut de régularité
-            regularite_statut = stats.get('regularite_statut', 'acceptable')
-            statut_color = colors.green if regularite_statut == 'parfait' else colors.orange if regularite_statut == 'acceptable' else colors.red
-            
-            ponctualite_table = Table(ponctualite_data, colWidths=[80*mm, 80*mm])
-            ponctualite_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FF6B6B')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF5F5')),
-                ('TEXTCOLOR', (5, 5), (5, 5), statut_color),
-                ('FONTNAME', (5, 5), (5, 5), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(ponctualite_table)
-            elements.append(Spacer(1, 20))
-            
-            # Section 3: ANALYSE DES HEURES ET ABSENCES
-            elements.append(Paragraph("⏰ ANALYSE DES HEURES TRAVAILLÉES ET ABSENCES", section_style))
-            elements.append(Spacer(1, 10))
-            
-            jours_total_passes = stats.get('jours_total_passes', stats.get('jours_passes_mois', 0))
-            analyse_heures_data = [
-                ['Jours passés dans le mois', f"{stats.get('jours_passes_mois', 0)} jours"],
-                ['Jours totaux passés', f"{jours_total_passes} jours"],
-                ['Heures attendues', self._format_duration(stats.get('heures_attendues_jours_passes'))],
-                ['Heures réelles', self._format_duration(stats.get('heures_travail_total'))],
-                ['Écart', self._format_duration(stats.get('ecart_heures'))],
-                ['Statut des heures', f"{stats.get('statut_heures', 'N/A')}"],
-                ['Pourcentage d\'écart', f"{stats.get('pourcentage_ecart', 0):.1f}%"],
-                ['Taux de présence', f"{stats.get('taux_presence', 0):.1f}%"],
-                ['Taux d\'absence', f"{stats.get('taux_absence', 0):.1f}%"],
-            ]
-            
-            # Déterminer la couleur du statut
-            statut = stats.get('statut_heures', 'NORMAL')
-            statut_color = colors.green
-            if statut == 'INSUFFISANT':
-                statut_color = colors.red
-            elif statut == 'SURPLUS':
-                statut_color = colors.blue
-            
-            analyse_table = Table(analyse_heures_data, colWidths=[80*mm, 80*mm])
-            analyse_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4A4A4A')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8F9FA')),
-                ('TEXTCOLOR', (5, 5), (5, 5), statut_color),
-                ('TEXTCOLOR', (8, 8), (8, 8), colors.red if stats.get('taux_absence', 0) > 10 else colors.black),
-                ('FONTNAME', (5, 5), (5, 5), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(analyse_table)
-            elements.append(Spacer(1, 20))
-            
-            # Section 4: OBSERVATION (avec absences)
-            if stats.get('observation_heures'):
-                elements.append(Paragraph("📝 OBSERVATION ET RECOMMANDATIONS", section_style))
-                elements.append(Spacer(1, 10))
-                
-                observation_style = styles['Normal']
-                observation_text = Paragraph(f"<i>{stats.get('observation_heures', 'Aucune observation disponible.')}</i>", observation_style)
-                elements.append(observation_text)
-                elements.append(Spacer(1, 20))
-            
-            # Pied de page
-            footer_style = styles['Italic']
-            footer = Paragraph(f"Rapport généré le {timezone.now().strftime('%d/%m/%Y à %H:%M')} - Système de Gestion RH", footer_style)
-            elements.append(footer)
-            
-            # Construction du PDF
-            doc.build(elements)
-            buffer.seek(0)
-            
-            response = HttpResponse(buffer, content_type='application/pdf')
-            
-            nom_employe = f"{employe.nom}_{employe.prenom}"
-            nom_employe_normalise = self._normaliser_nom_fichier(nom_employe)
-            type_employe = "stagiaire" if employe.titre == 'stagiaire' else "employe"
-            nom_fichier = f"rapport_statistiques_{nom_employe_normalise}_{type_employe}_{employe.cin}.pdf"
+            contenu = PdfService.generer_pdf_employe(employe, stats)
             
+            response = HttpResponse(contenu, content_type='application/pdf')
+            nom_fichier = PdfService.nom_fichier_employe(employe)
             response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
             
             return response
@@ -858,171 +1269,16 @@ class ExportStatisticsPDFAPIView(APIView):
             logger.error(f"Erreur génération PDF ReportLab: {str(e)}")
             return self._export_simple_fallback(request, 'employe')
     
-    # views.py - Fonction _export_global_pdf complète
-
-    # views.py - Fonction _export_global_pdf (partie modifiée)
     def _export_global_pdf(self, request):
         mois_str = request.GET.get('mois')
         
         stats = StatisticsService.calculate_global_monthly_stats(mois_str)
         
-        buffer = io.BytesIO()
-        
         try:
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            title = Paragraph("RAPPORT STATISTIQUES GLOBALES", styles['Title'])
-            elements.append(title)
-            elements.append(Spacer(1, 20))
-            
-            periode_text = Paragraph(f"<b>Période:</b> {stats.get('periode', 'N/A').strftime('%B %Y') if hasattr(stats.get('periode'), 'strftime') else 'N/A'} ({stats.get('jours_passes_mois', 0)} jours analysés)", styles['Normal'])
-            elements.append(periode_text)
-            elements.append(Spacer(1, 25))
-            elements.append(Spacer(1, 10))
-            
-            # Section 1: RÉSUMÉ GLOBAL
-            section_style = styles['Heading2']
-            elements.append(Paragraph("🌐 RÉSUMÉ GLOBAL", section_style))
-            elements.append(Spacer(1, 10))
-            
-            resume_data = [
-                ['Total employés', f"{stats.get('total_employes', 0)}"],
-                ['Employés actifs', f"{stats.get('employes_actifs', 0)}"],
-                ['Taux d\'activité', f"{stats.get('taux_activite_global', 0):.1f}%"],
-                ['Total départements', f"{stats.get('total_departements', 0)}"],
-                ['Départements actifs', f"{stats.get('departements_actifs', 0)}"],
-            ]
-            
-            resume_table = Table(resume_data, colWidths=[80*mm, 80*mm])
-            resume_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0F8FF')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(resume_table)
-            elements.append(Spacer(1, 20))
-            elements.append(Spacer(1, 10))
-            
-            # Section 2: POINTAGE ET ABSENCES
-            elements.append(Paragraph("📅 POINTAGE ET ABSENCES GLOBALES", section_style))
-            elements.append(Spacer(1, 10))
-            
-            pointage_data = [
-                ['Jours analysés', f"{stats.get('jours_passes_mois', 0)} jours"],
-                ['Jours possibles de travail', f"{stats.get('jours_total_possibles', 0)} jours"],
-                ['Pointages effectués', f"{stats.get('total_pointages', 0)}"],
-                ['Jours travaillés', f"{stats.get('total_jours_travailles', 0)} jours"],
-                ['Total absences', f"{stats.get('total_absences', 0)} jours"],
-                ['Taux de présence', f"{stats.get('taux_presence', 0):.1f}%"],
-                ['Taux d\'absence global', f"{stats.get('taux_absence_global', 0):.1f}%"],
-            ]
-            
-            pointage_table = Table(pointage_data, colWidths=[80*mm, 80*mm])
-            pointage_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FF6B6B')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF5F5')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(pointage_table)
-            elements.append(Spacer(1, 20))
-            elements.append(Spacer(1, 10))
-            
-            # Section 4: PONCTUALITÉ ET RÉGULARITÉ
-            elements.append(Paragraph("🕒 PONCTUALITÉ ET RÉGULARITÉ GLOBALE", section_style))
-            elements.append(Spacer(1, 10))
-            
-            ponctualite_data = [
-                ['Ponctualité parfaite', f"{stats.get('ponctualite_parfaite', 0)}"],
-                ['Ponctualité acceptable', f"{stats.get('ponctualite_acceptable', 0)}"],
-                ['Ponctualité inacceptable', f"{stats.get('ponctualite_inacceptable', 0)}"],
-                ['Taux régularité parfaite', f"{stats.get('taux_regularite_parfaite', 0):.1f}%"],
-                ['Taux régularité acceptable', f"{stats.get('taux_regularite_acceptable', 0):.1f}%"],
-                ['Taux régularité inacceptable', f"{stats.get('taux_regularite_inacceptable', 0):.1f}%"],
-            ]
-            
-            ponctualite_table = Table(ponctualite_data, colWidths=[80*mm, 80*mm])
-            ponctualite_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6B48FF')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0F5FF')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(ponctualite_table)
-            elements.append(Spacer(1, 20))
-            elements.append(Spacer(1, 20))
-            
-            # Section 5: ANALYSE DES HEURES
-            elements.append(Paragraph("⏰ ANALYSE DES HEURES GLOBALES", section_style))
-            elements.append(Spacer(1, 10))
-            
-            statut = stats.get('statut_heures_global', 'NORMAL')
-            statut_color = colors.green
-            if statut == 'INSUFFISANT':
-                statut_color = colors.red
-            elif statut == 'SURPLUS':
-                statut_color = colors.blue
-            
-            heures_data = [
-                ['Heures attendues totales', self._format_duration(stats.get('heures_attendues_total'))],
-                ['Heures travaillées totales', self._format_duration(stats.get('heures_travail_total'))],
-                ['Moyenne quotidienne', self._format_duration(stats.get('moyenne_heures_quotidiennes'))],
-                ['Écart global', self._format_duration(stats.get('ecart_heures_global'))],
-                ['Pourcentage d\'écart', f"{stats.get('pourcentage_ecart_global', 0):.1f}%"],
-                ['Statut des heures', f"{statut}"],
-            ]
-            
-            heures_table = Table(heures_data, colWidths=[80*mm, 80*mm])
-            heures_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4A4A4A')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F8F9FA')),
-                ('TEXTCOLOR', (5, 5), (5, 5), statut_color),
-                ('FONTNAME', (5, 5), (5, 5), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC')),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(heures_table)
-            
-            # Section 6: OBSERVATION GLOBALE
-            if stats.get('observation_globale'):
-                elements.append(Spacer(1, 20))
-                elements.append(Paragraph("📝 OBSERVATION GLOBALE", section_style))
-                elements.append(Spacer(1, 10))
-                
-                observation_style = styles['Normal']
-                # Diviser l'observation en lignes plus petites
-                observation_lines = stats.get('observation_globale', '').split('\n')
-                for line in observation_lines:
-                    if line.strip():
-                        observation_text = Paragraph(f"• {line.strip()}", observation_style)
-                        elements.append(observation_text)
-            
-            elements.append(Spacer(1, 25))
-            footer = Paragraph(f"Rapport généré le {timezone.now().strftime('%d/%m/%Y à %H:%M')} - Système de Gestion RH", styles['Italic'])
-            elements.append(footer)
-            
-            doc.build(elements)
-            buffer.seek(0)
-            
-            response = HttpResponse(buffer, content_type='application/pdf')
-            
-            nom_fichier = f"statistiques_globales_{timezone.now().strftime('%Y%m%d')}.pdf"
+            contenu = PdfService.generer_pdf_global(stats)
             
+            response = HttpResponse(contenu, content_type='application/pdf')
+            nom_fichier = PdfService.nom_fichier_global()
             response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
             
             return response
@@ -1030,23 +1286,226 @@ class ExportStatisticsPDFAPIView(APIView):
         except Exception as e:
             logger.error(f"Erreur génération PDF global: {str(e)}")
             return self._export_simple_fallback(request, 'global')
+    
+    def _export_departement(self, request):
+        """Lot mensuel d'un département (sortie=zip|pdf), généré pendant la requête.
+        
+        Même génération que les rapports 'departement' de /api/rapports/ (une requête
+        groupée, rendu réparti entre processus); pour un gros département, préférer
+        le job asynchrone qui ne bloque pas le worker.
+        """
+        try:
+            parametres = RapportService.preparer_parametres('departement', request.GET)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not Departement.objects.filter(id_departement=parametres['departement']).exists():
+            return Response({"error": "Département non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+        # Seuls les employés de la portée de l'utilisateur figurent dans le lot
+        RapportService.restreindre(parametres, AccesService.portee(request.user))
+        
+        try:
+            contenu, nom_fichier = RapportService.generer('departement', parametres)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        
+        content_type = 'application/zip' if nom_fichier.endswith('.zip') else 'application/pdf'
+        response = HttpResponse(contenu, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+        return response
+
+
+# -----------------------
+# Variantes asynchrones (ASGI) des statistiques temps réel
+# -----------------------
+def reponse_json(donnees, status=200):
+    """Réponse JSON encodée comme les vues DRF (dates, durées, décimaux)"""
+    return HttpResponse(JSONRenderer().render(donnees), content_type='application/json', status=status)
 
+
+def refus_statistiques_employe(utilisateur, cin):
+    """None si l'utilisateur peut lire l'employé, sinon le statut de la réponse (404 ou 403)"""
+    if AccesService.portee(utilisateur).peut_lire_employe(cin):
+        return None
+    return 403 if Employe.objects.filter(cin=cin).exists() else 404
+
+
+class EmployeeStatisticsAsyncView(AuthentificationJWTAsyncMixin, View):
+    """Variante asynchrone de EmployeeStatisticsAPIView (mêmes paramètres, même réponse).
+    
+    La fiche employé et les totaux de la période sont lus en parallèle.
+    """
     
-    def _format_duration(self, duration):
-        if not duration:
-            return "0h 00min"
+    async def get(self, request, cin=None):
+        utilisateur = await self.utilisateur(request)
+        if utilisateur is None:
+            return reponse_json({"error": "Authentification requise"}, status=401)
+        
+        cin = cin or request.GET.get('cin')
+        if not cin:
+            return reponse_json({"error": "CIN requis"}, status=400)
+        
+        # Accès vérifié avant tout calcul
+        refus = await sync_to_async(refus_statistiques_employe)(utilisateur, cin)
+        if refus == 404:
+            return reponse_json({"error": "Employé non trouvé"}, status=404)
+        if refus == 403:
+            return reponse_json({"error": "Vous n'avez pas accès aux statistiques de cet employé."}, status=403)
+        
+        validateur = None
+        if request.GET.get('save', 'false').lower() != 'true':
+            validateur = await sync_to_async(validateur_statistiques_employe)(request, cin)
+            non_modifiee = reponse_non_modifiee(request, validateur)
+            if non_modifiee is not None:
+                return non_modifiee
         
         try:
-            if hasattr(duration, 'total_seconds'):
-                total_seconds = duration.total_seconds()
-            else:
-                total_seconds = float(duration)
+            employe, stats = await StatisticsAsyncService.employe(
+                cin, request.GET.get('periode', 'mois'), date_reference_statistiques(request.GET.get('date'))
+            )
+            if employe is None:
+                return reponse_json({"error": "Employé non trouvé"}, status=404)
+            
+            if request.GET.get('save', 'false').lower() == 'true':
+                await sync_to_async(StatisticsService.save_employee_stats_to_db)(stats)
             
-            hours = int(total_seconds // 3600)
-            minutes = int((total_seconds % 3600) // 60)
-            return f"{hours}h {minutes:02d}min"
-        except:
-            return "0h 00min"
+            return appliquer_validateur(reponse_json(EmployeeStatsCalculatedSerializer(stats).data), validateur)
+        except Exception as e:
+            logger.error(f"Erreur statistiques employé: {str(e)}")
+            return reponse_json({"error": str(e)}, status=500)
+
+
+
+class GlobalStatisticsAsyncView(AuthentificationJWTAsyncMixin, View):
+    """Variante asynchrone de GlobalStatisticsAPIView: effectifs et agrégats des départements lus en parallèle"""
+    
+    async def get(self, request):
+        if await self.utilisateur(request) is None:
+            return reponse_json({"error": "Authentification requise"}, status=401)
+        
+        validateur = await sync_to_async(validateur_statistiques_globales)(request)
+        non_modifiee = reponse_non_modifiee(request, validateur)
+        if non_modifiee is not None:
+            return non_modifiee
+        
+        try:
+            mois = date_reference_statistiques(request.GET.get('mois')).replace(day=1)
+            stats = await StatisticsAsyncService.global_mensuel(mois)
+            if request.GET.get('periode', 'mensuel') != 'mensuel':
+                stats['type_periode'] = 'annuel'
+            return appliquer_validateur(reponse_json(GlobalStatsCalculatedSerializer(stats).data), validateur)
+        except Exception as e:
+            logger.error(f"Erreur statistiques globales: {str(e)}")
+            return reponse_json({"error": str(e)}, status=500)
+
+
+class ExportStatisticsPDFAsyncView(AuthentificationJWTAsyncMixin, View):
+    """Variante asynchrone de ExportStatisticsPDFAPIView; le rendu ReportLab tourne dans un pool de processus"""
+    
+    async def get(self, request):
+        utilisateur = await self.utilisateur(request)
+        if utilisateur is None:
+            return reponse_json({"error": "Authentification requise"}, status=401)
+        
+        export_type = request.GET.get('type', 'employe')
+        if export_type not in ('employe', 'global'):
+            return reponse_json({"error": "Type d'export non valide"}, status=400)
+        if not REPORTLAB_AVAILABLE:
+            return ExportStatisticsPDFAPIView()._export_simple_fallback(request, export_type)
+        
+        try:
+            if export_type == 'global':
+                stats = await StatisticsAsyncService.global_mensuel(request.GET.get('mois'))
+                contenu = await StatisticsAsyncService.rendre_pdf('global', stats=stats)
+                nom_fichier = PdfService.nom_fichier_global()
+            else:
+                cin = request.GET.get('cin')
+                if not cin:
+                    return reponse_json({"error": "CIN requis"}, status=400)
+                refus = await sync_to_async(refus_statistiques_employe)(utilisateur, cin)
+                if refus == 404:
+                    return reponse_json({"error": "Employé non trouvé"}, status=404)
+                if refus == 403:
+                    return reponse_json({"error": "Vous n'avez pas accès au rapport de cet employé."}, status=403)
+                employe, stats = await StatisticsAsyncService.employe(
+                    cin, request.GET.get('periode', 'mois'), date_reference_statistiques(request.GET.get('date'))
+                )
+                if employe is None:
+                    return reponse_json({"error": "Employé non trouvé"}, status=404)
+                contenu = await StatisticsAsyncService.rendre_pdf('employe', employe, stats)
+                nom_fichier = PdfService.nom_fichier_employe(employe)
+        except Exception as e:
+            logger.error(f"Erreur génération PDF: {str(e)}")
+            return ExportStatisticsPDFAPIView()._export_simple_fallback(request, export_type)
+        
+        response = HttpResponse(contenu, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+        return response
+
+
+class RapportJobAPIView(APIView):
+    """Rapports PDF asynchrones: POST soumet un job, GET <id> donne son état.
+    
+    Corps du POST: type ('employe' | 'global' | 'departement'), cin, periode ('mois' | 'semaine'),
+    date, mois, departement, sortie ('zip' | 'pdf' pour un lot département).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        type_rapport = request.data.get('type', 'employe')
+        try:
+            parametres = RapportService.preparer_parametres(type_rapport, request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if type_rapport == 'employe':
+            employe = Employe.objects.filter(cin=parametres['cin']).only('cin').first()
+            if employe is None:
+                return Response({"error": "Employé non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+            if not AccesService.portee(request.user).peut_lire_employe(employe.cin):
+                return Response(
+                    {"error": "Vous n'avez pas accès au rapport de cet employé."},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+        elif type_rapport == 'departement':
+            if not Departement.objects.filter(id_departement=parametres['departement']).exists():
+                return Response({"error": "Département non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+            # Seuls les employés de la portée de l'utilisateur figurent dans le lot
+            RapportService.restreindre(parametres, AccesService.portee(request.user))
+        
+        job, _ = RapportService.soumettre(type_rapport, parametres, request.user)
+        data = RapportJobSerializer(job, context={'request': request}).data
+        code = status.HTTP_200_OK if job.statut == 'termine' else status.HTTP_202_ACCEPTED
+        return Response(data, status=code)
+    
+    def get(self, request, job_id):
+        job = RapportJob.objects.defer('contenu').filter(pk=job_id).first()
+        if job is None or not RapportService.peut_acceder(request.user, job):
+            return Response({"error": "Rapport non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(RapportJobSerializer(job, context={'request': request}).data)
+
+
+class RapportTelechargementAPIView(APIView):
+    """Téléchargement du fichier d'un rapport terminé (PDF, ou ZIP pour un lot département)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = RapportJob.objects.filter(pk=job_id).first()
+        if job is None or not RapportService.peut_acceder(request.user, job):
+            return Response({"error": "Rapport non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+        if job.date_expiration <= timezone.now():
+            return Response({"error": "Rapport expiré"}, status=status.HTTP_410_GONE)
+        if job.statut != 'termine':
+            return Response(
+                {"error": "Rapport non disponible", "statut": job.statut},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        content_type = 'application/zip' if job.nom_fichier.endswith('.zip') else 'application/pdf'
+        response = HttpResponse(bytes(job.contenu), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.nom_fichier}"'
+        return response
+
 
 # AJOUT DES VUES D'AUTHENTIFICATION JWT
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -40,7 +41,8 @@ MIDDLEWARE = [
 # DRF + JWT
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication sans requête par appel (claims signés, cache des utilisateurs)
+        "api.authentication.JWTClaimsAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -56,6 +58,8 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    "TOKEN_OBTAIN_SERIALIZER": "api.authentication.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "api.authentication.ClaimsTokenRefreshSerializer",
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -98,6 +102,27 @@ DATABASES = {
     }
 }
 
+# Cache partagé par tous les workers: versions du cache des statistiques, portées
+# d'accès et révocations des jetons y sont publiées (voir api.checks).
+# POINTAGE_CACHE_URL (ex. redis://127.0.0.1:6379/1) et POINTAGE_CACHE_BACKEND viennent
+# de l'environnement; en DEBUG ou sans URL, cache local au processus (serveur de développement)
+CACHE_URL = os.environ.get('POINTAGE_CACHE_URL', '')
+if CACHE_URL and not DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ.get('POINTAGE_CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'pointage',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': 'pointage',
+        }
+    }
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [